@@ -0,0 +1,491 @@
+"""
+Bed board: an in-memory index of free beds and atomic bed reservations.
+
+The board is seeded from `rooms` and keeps, for every (room_type),
+(room_type, wing) and (room_type, wing, floor_number) scope, a heap of the
+rooms with a free bed, least occupied first (the order _AVAILABLE_ROOM_SQL
+uses). Finding the best room is a heap peek and taking it a pop/push, so
+an allocation costs O(log n) in memory plus one single-row UPDATE:
+
+    with transaction() as conn:
+        room = bed_board.reserve(conn, ["ICU", "Private Room"])
+
+reserve() holds the room in memory (so other threads of this process move
+on to the next room) and then takes the bed in the caller's transaction
+with a conditional UPDATE that only succeeds while the room is Available
+and below capacity. The database stays the source of truth: if the board
+was stale and the UPDATE finds no free bed, the room is re-read and the
+next candidate is tried. Beds are therefore never overbooked, whatever the
+board believes. If the caller's transaction rolls back, it must call
+invalidate(room_id); the room is hidden until it has been re-read.
+
+Other writers are picked up over LISTEN/NOTIFY: the triggers from
+database/migrations/006_room_bed_board.sql send every changed room on the
+`room_beds` channel with a bed_version, and notifications older than what
+the board already has are ignored. A listener thread applies them, re-reads
+invalidated rooms and reseeds every BED_BOARD_RESEED_SECONDS. Without the
+migration the board still works, but only sees other writers on reseed.
+
+While the board is not running (not started, or its listener connection is
+down) reserve() and find() return None and callers use the SQL path.
+"""
+import heapq
+import json
+import os
+import select
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from backend.db_prepared import execute_prepared
+
+CHANNEL = "room_beds"
+RESEED_SECONDS = float(os.getenv("BED_BOARD_RESEED_SECONDS", "300"))
+# Candidates tried per room type before giving up on the board for that type
+MAX_ATTEMPTS = int(os.getenv("BED_BOARD_MAX_ATTEMPTS", "8"))
+RECONNECT_SECONDS = 5.0
+
+_ROOM_COLUMNS = """room_id, room_number, room_type, wing, floor_number,
+           bed_capacity, current_occupancy, status, {version} AS bed_version"""
+
+_ROOMS_SQL = "SELECT " + _ROOM_COLUMNS + " FROM rooms"
+
+_ROOMS_BY_ID_SQL = _ROOMS_SQL + " WHERE room_id = ANY(%s)"
+
+# Takes one bed only while the room still has one; the row lock serializes
+# concurrent reservations of the same room
+_RESERVE_SQL = """
+    UPDATE rooms
+    SET current_occupancy = current_occupancy + 1,
+        status = CASE
+            WHEN current_occupancy + 1 >= bed_capacity THEN 'Occupied'
+            ELSE 'Available'
+        END
+    WHERE room_id = %s
+      AND status = 'Available'
+      AND current_occupancy < bed_capacity
+    RETURNING """ + _ROOM_COLUMNS
+
+_HAS_VERSION_SQL = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_attribute
+        WHERE attrelid = 'rooms'::regclass AND attname = 'bed_version' AND NOT attisdropped
+    ) AS versioned
+"""
+
+Scope = Tuple[Any, ...]
+
+
+def _percentiles(samples) -> Dict[str, float]:
+    values = sorted(samples)
+    if not values:
+        return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "p50": round(values[int(0.50 * (len(values) - 1))], 3),
+        "p99": round(values[int(0.99 * (len(values) - 1))], 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def _scope(room_type: str, wing: Optional[str] = None, floor_number: Optional[int] = None) -> Scope:
+    if wing is None:
+        return (room_type,) if floor_number is None else (room_type, None, floor_number)
+    return (room_type, wing) if floor_number is None else (room_type, wing, floor_number)
+
+
+class _Room:
+    __slots__ = ("room_id", "room_number", "room_type", "wing", "floor_number",
+                 "bed_capacity", "current_occupancy", "status", "bed_version", "stamp")
+
+    def __init__(self, row: Dict[str, Any], stamp: int):
+        self.room_id = row["room_id"]
+        self.room_number = row["room_number"]
+        self.room_type = row["room_type"]
+        self.wing = row["wing"]
+        self.floor_number = row["floor_number"]
+        self.bed_capacity = row["bed_capacity"] or 1
+        self.current_occupancy = row["current_occupancy"] or 0
+        self.status = row["status"]
+        self.bed_version = row.get("bed_version") or 0
+        self.stamp = stamp
+
+    def free_beds(self) -> int:
+        if self.status != "Available":
+            return 0
+        return max(self.bed_capacity - self.current_occupancy, 0)
+
+    def scopes(self) -> Tuple[Scope, ...]:
+        return ((self.room_type,), (self.room_type, self.wing), (self.room_type, None, self.floor_number),
+                (self.room_type, self.wing, self.floor_number))
+
+    def row(self) -> Dict[str, Any]:
+        return {
+            "room_id": self.room_id,
+            "room_number": self.room_number,
+            "room_type": self.room_type,
+            "wing": self.wing,
+            "floor_number": self.floor_number,
+            "bed_capacity": self.bed_capacity,
+            "current_occupancy": self.current_occupancy,
+        }
+
+
+class BedBoard:
+    """Free beds by room type, wing and floor; see the module docstring"""
+
+    def __init__(self, reseed_seconds: float = RESEED_SECONDS, max_attempts: int = MAX_ATTEMPTS):
+        self.reseed_seconds = reseed_seconds
+        self.max_attempts = max(int(max_attempts), 1)
+        self._lock = threading.Lock()
+        self._rooms: Dict[int, _Room] = {}
+        self._heaps: Dict[Scope, List[Tuple[int, int, int]]] = {}
+        self._free: Dict[Scope, int] = {}
+        self._entries = 0
+        self._stamp = 0
+        self._dirty: set = set()
+        self.ready = False
+        self.versioned = False
+        self._reserve_sql = _RESERVE_SQL.format(version="0")
+        self._rooms_by_id_sql = _ROOMS_BY_ID_SQL.format(version="0")
+
+        self._dsn: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()
+        self._seeded_at = 0.0
+
+        self.reservations = 0
+        self.conflicts = 0
+        self.misses = 0
+        self.notifications = 0
+        self.stale_notifications = 0
+        self.reseeds = 0
+        self.last_seed_at: Optional[str] = None
+        self._reserve_ms: Deque[float] = deque(maxlen=1000)
+
+    # --- index maintenance (callers hold self._lock) ---
+
+    def _count(self, room: _Room, sign: int):
+        free = room.free_beds() * sign
+        if free:
+            for scope in room.scopes():
+                self._free[scope] = self._free.get(scope, 0) + free
+
+    def _push(self, room: _Room):
+        self._stamp += 1
+        room.stamp = self._stamp
+        if room.free_beds():
+            entry = (room.current_occupancy, room.room_id, room.stamp)
+            for scope in room.scopes():
+                heapq.heappush(self._heaps.setdefault(scope, []), entry)
+            self._entries += 4
+            if self._entries > 16 * max(len(self._rooms), 64):
+                self._compact()
+
+    def _compact(self):
+        """Drops superseded heap entries (every change pushes new ones)"""
+        self._heaps, self._entries = {}, 0
+        for room in self._rooms.values():
+            if room.free_beds():
+                entry = (room.current_occupancy, room.room_id, room.stamp)
+                for scope in room.scopes():
+                    self._heaps.setdefault(scope, []).append(entry)
+                self._entries += 4
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+
+    def _apply(self, row: Dict[str, Any], force: bool = False) -> bool:
+        old = self._rooms.get(row["room_id"])
+        if old is not None:
+            if not force and (row.get("bed_version") or 0) < old.bed_version:
+                return False
+            self._count(old, -1)
+        room = _Room(row, 0)
+        self._rooms[room.room_id] = room
+        self._count(room, 1)
+        self._push(room)
+        return True
+
+    def _remove(self, room_id: int):
+        room = self._rooms.pop(room_id, None)
+        if room is not None:
+            self._count(room, -1)
+
+    def _best(self, scope: Scope) -> Optional[_Room]:
+        heap = self._heaps.get(scope)
+        while heap:
+            _, room_id, stamp = heap[0]
+            room = self._rooms.get(room_id)
+            if room is not None and room.stamp == stamp and room.free_beds():
+                return room
+            heapq.heappop(heap)
+            self._entries -= 1
+        return None
+
+    def _hold(self, scope: Scope) -> Optional[int]:
+        """Counts a bed of the best room as taken until the database answers"""
+        with self._lock:
+            room = self._best(scope)
+            if room is None:
+                return None
+            self._count(room, -1)
+            room.current_occupancy += 1
+            if room.current_occupancy >= room.bed_capacity:
+                room.status = "Occupied"
+            self._count(room, 1)
+            self._push(room)
+            return room.room_id
+
+    # --- seeding and refresh ---
+
+    def seed(self, conn):
+        """
+        (Re)loads every room from the database; rooms no longer there are dropped.
+        Like _apply, a row older than the bed_version the board already holds
+        (a notification that overtook this snapshot) is skipped, and so is the
+        drop of a room first seen after the snapshot started.
+        """
+        with self._lock:
+            started = self._stamp
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(_HAS_VERSION_SQL)
+            versioned = cur.fetchone()["versioned"]
+            version = "bed_version" if versioned else "0"
+            cur.execute(_ROOMS_SQL.format(version=version))
+            rows = cur.fetchall()
+        if not conn.autocommit:
+            conn.commit()
+        with self._lock:
+            self.versioned = versioned
+            self._reserve_sql = _RESERVE_SQL.format(version=version)
+            self._rooms_by_id_sql = _ROOMS_BY_ID_SQL.format(version=version)
+            rooms: Dict[int, _Room] = {}
+            for row in rows:
+                held = self._rooms.get(row["room_id"])
+                if versioned and held is not None and (row["bed_version"] or 0) < held.bed_version:
+                    rooms[held.room_id] = held
+                    continue
+                rooms[row["room_id"]] = room = _Room(row, 0)
+                self._stamp += 1
+                room.stamp = self._stamp
+            if versioned:
+                for room_id, held in self._rooms.items():
+                    if room_id not in rooms and held.stamp > started:
+                        rooms[room_id] = held
+            self._rooms, self._free = rooms, {}
+            for room in rooms.values():
+                self._count(room, 1)
+            self._compact()
+            self._dirty.clear()
+            self.reseeds += 1
+            self._seeded_at = time.monotonic()
+            self.last_seed_at = datetime.now().isoformat(timespec="seconds")
+        return len(rows)
+
+    def refresh(self, conn, room_ids: Iterable[int]):
+        """Re-reads the given rooms and replaces what the board holds for them"""
+        room_ids = sorted(set(room_ids))
+        if not room_ids:
+            return
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            execute_prepared(cur, self._rooms_by_id_sql, (room_ids,))
+            rows = cur.fetchall()
+        with self._lock:
+            found = set()
+            for row in rows:
+                self._apply(row, force=True)
+                found.add(row["room_id"])
+            for room_id in set(room_ids) - found:
+                self._remove(room_id)
+
+    def invalidate(self, room_id: int):
+        """Hides a room until it is re-read (e.g. its reservation was rolled back)"""
+        with self._lock:
+            self._remove(room_id)
+            self._dirty.add(room_id)
+        self._wake()
+
+    def apply_notification(self, payload: str):
+        """Applies one `room_beds` notification"""
+        change = json.loads(payload)
+        with self._lock:
+            self.notifications += 1
+            if change.get("op") == "DELETE":
+                self._remove(change["room_id"])
+            elif not self._apply(change):
+                self.stale_notifications += 1
+
+    # --- allocation ---
+
+    def find(self, room_types: Sequence[str], wing: Optional[str] = None,
+             floor_number: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Best room with a free bed, by room type priority; nothing is reserved"""
+        if not self.ready:
+            return None
+        with self._lock:
+            for room_type in room_types:
+                room = self._best(_scope(room_type, wing, floor_number))
+                if room is not None:
+                    return room.row()
+        return None
+
+    def reserve(self, conn, room_types: Sequence[str], wing: Optional[str] = None,
+                floor_number: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Takes a bed in the best room, by room type priority, inside conn's
+        open transaction. Returns the room (occupancy after the reservation)
+        or None when the board is not running or has no free bed in scope.
+        """
+        if not self.ready:
+            return None
+        started = time.perf_counter()
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            for room_type in room_types:
+                scope = _scope(room_type, wing, floor_number)
+                for _ in range(self.max_attempts):
+                    room_id = self._hold(scope)
+                    if room_id is None:
+                        break
+                    try:
+                        execute_prepared(cur, self._reserve_sql, (room_id,))
+                        row = cur.fetchone()
+                    except Exception:
+                        self.invalidate(room_id)
+                        raise
+                    if row is not None:
+                        with self._lock:
+                            self._apply(row)
+                            self.reservations += 1
+                        self._reserve_ms.append((time.perf_counter() - started) * 1000)
+                        return _Room(row, 0).row()
+                    # Taken by someone the board hadn't heard from yet
+                    execute_prepared(cur, self._rooms_by_id_sql, ([room_id],))
+                    fresh = cur.fetchone()
+                    with self._lock:
+                        self.conflicts += 1
+                        if fresh is not None:
+                            self._apply(fresh, force=True)
+                        else:
+                            self._remove(room_id)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        """Free beds per room type, wing and floor"""
+        board: Dict[str, Any] = {}
+        with self._lock:
+            for scope, free in sorted(self._free.items(), key=lambda item: tuple(str(k) for k in item[0])):
+                if len(scope) == 2 or (len(scope) == 3 and scope[1] is None):
+                    continue
+                room_type = board.setdefault(scope[0], {"free_beds": 0, "wings": {}})
+                if len(scope) == 1:
+                    room_type["free_beds"] = free
+                else:
+                    wing = room_type["wings"].setdefault(scope[1], {"free_beds": 0, "floors": {}})
+                    wing["floors"][str(scope[2])] = free
+                    wing["free_beds"] += free
+        return {"ready": self.ready, "room_types": board}
+
+    # --- listener ---
+
+    def start(self, dsn: Optional[str] = None):
+        """Seeds the board and starts the LISTEN thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._dsn = dsn or os.getenv("DATABASE_URL")
+        if not self._dsn:
+            raise Exception("DATABASE_URL environment variable not set.")
+        self._stopping.clear()
+        conn = self._connect()
+        self._thread = threading.Thread(target=self._listen, args=(conn,), name="bed-board", daemon=True)
+        self._thread.start()
+        print(f"✅ Bed board seeded with {len(self._rooms)} rooms"
+              + ("" if self.versioned else " (no room_beds notifications; apply "
+                 "database/migrations/006_room_bed_board.sql)"))
+
+    def stop(self):
+        self._stopping.set()
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.ready = False
+
+    def _wake(self):
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+
+    def _connect(self):
+        conn = psycopg2.connect(self._dsn)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            # Listen first, so nothing committed after the seed is missed
+            cur.execute(f"LISTEN {CHANNEL}")
+        self.seed(conn)
+        self.ready = True
+        return conn
+
+    def _listen(self, conn):
+        while not self._stopping.is_set():
+            try:
+                if conn is None:
+                    conn = self._connect()
+                    print("✅ Bed board listener reconnected")
+                timeout = max(self.reseed_seconds - (time.monotonic() - self._seeded_at), 0.0)
+                readable, _, _ = select.select([conn, self._wake_r], [], [], timeout)
+                if self._wake_r in readable:
+                    os.read(self._wake_r, 4096)
+                conn.poll()
+                while conn.notifies:
+                    self.apply_notification(conn.notifies.pop(0).payload)
+                with self._lock:
+                    dirty, self._dirty = self._dirty, set()
+                self.refresh(conn, dirty)
+                if time.monotonic() - self._seeded_at >= self.reseed_seconds:
+                    self.seed(conn)
+            except Exception as e:
+                # Stale beyond repair until we're back: callers use the SQL path
+                self.ready = False
+                print(f"⚠️ Bed board listener error: {e}; retrying in {RECONNECT_SECONDS:g}s")
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                conn = None
+                self._stopping.wait(RECONNECT_SECONDS)
+        if conn is not None:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rooms = len(self._rooms)
+            free = sum(room.free_beds() for room in self._rooms.values())
+            entries = self._entries
+        return {
+            "ready": self.ready,
+            "listening": self._thread is not None and self._thread.is_alive(),
+            "versioned": self.versioned,
+            "rooms": rooms,
+            "free_beds": free,
+            "heap_entries": entries,
+            "reservations": self.reservations,
+            "conflicts": self.conflicts,
+            "misses": self.misses,
+            "notifications": self.notifications,
+            "stale_notifications": self.stale_notifications,
+            "reseeds": self.reseeds,
+            "last_seed_at": self.last_seed_at,
+            "reserve_ms": _percentiles(self._reserve_ms),
+        }
+
+
+bed_board = BedBoard()
@@ -0,0 +1,258 @@
+"""
+Billing analytics engine.
+
+Both billing dashboards (/billing/analytics and /billing/payment-analytics)
+are derived from one aggregated scan of `invoices`, grouped by
+(status, issue_date). That is at most a few rows per status per day, so
+summaries, status breakdowns, revenue trends and aging buckets are all
+computed in Python from a small list instead of re-scanning the table
+once per widget.
+
+Each payload keeps the exact semantics of the SQL it replaced (same
+filters, NULL handling, bucket edges, ordering and LIMITs).
+
+The grouped rows normally come from `invoice_daily_rollup`
+(database/migrations/001_invoice_daily_rollup.sql), which triggers on
+`invoices` keep current, so a dashboard reads O(days) rows. Until that
+migration is applied the same groups are computed from `invoices`
+directly. Aging buckets are derived from per-day rows at read time, so the
+nightly job only reconciles the rollup against `invoices`; nothing needs
+re-bucketing.
+"""
+import asyncio
+import os
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from fractions import Fraction
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from backend.db import execute_query, relation_exists, transaction
+
+# Local time of the nightly rollup reconcile ("HH:MM"); empty disables it
+ROLLUP_RECONCILE_AT = os.getenv("BILLING_ROLLUP_RECONCILE_AT", "02:30")
+
+# Sentinels for NULL issue_date / status: '-infinity' and ''
+ROLLUP_GROUPS_SQL = """
+    SELECT NULLIF(status, '') AS status, NULLIF(issue_date, '-infinity') AS issue_date,
+           to_char(NULLIF(issue_date, '-infinity'), 'Mon DD') AS label,
+           invoice_count AS count, total_amount AS total,
+           CURRENT_DATE AS today
+    FROM invoice_daily_rollup
+    WHERE invoice_count > 0
+"""
+
+INVOICE_GROUPS_SQL = """
+    SELECT status, issue_date, to_char(issue_date, 'Mon DD') AS label,
+           COUNT(*) AS count, COALESCE(SUM(total_amount), 0) AS total,
+           CURRENT_DATE AS today
+    FROM invoices
+    GROUP BY status, issue_date
+"""
+
+OUTSTANDING = ('Unpaid', 'Pending')
+AGING_3 = ['0-7 Days', '7-30 Days', '30+ Days']
+AGING_4 = ['0-7 Days', '7-30 Days', '30-60 Days', '60+ Days']
+
+
+class InvoiceGroup(NamedTuple):
+    status: Optional[str]
+    issue_date: Optional[date]
+    label: Optional[str]  # to_char(issue_date, 'Mon DD')
+    count: int
+    total: Decimal
+
+
+_rollup_warned = False
+
+
+def _rollup_available() -> bool:
+    """Probes for invoice_daily_rollup (re-checked every RELATION_PROBE_INTERVAL)"""
+    global _rollup_warned
+    present = relation_exists("invoice_daily_rollup")
+    if not present and not _rollup_warned:
+        print("⚠️ invoice_daily_rollup missing; billing analytics will scan invoices "
+              "(apply database/migrations/001_invoice_daily_rollup.sql)")
+    _rollup_warned = not present
+    return present
+
+
+def fetch_invoice_groups() -> Tuple[Optional[date], List[InvoiceGroup]]:
+    """Reads the grouped invoices (rollup if present); returns (CURRENT_DATE, groups)"""
+    sql = ROLLUP_GROUPS_SQL if _rollup_available() else INVOICE_GROUPS_SQL
+    rows = execute_query(sql, prepare=True)
+    if isinstance(rows, dict) and "error" in rows:
+        raise Exception(rows["error"])
+    return invoice_groups(rows)
+
+
+def invoice_groups(rows: List[Dict[str, Any]]) -> Tuple[Optional[date], List[InvoiceGroup]]:
+    """Converts INVOICE_GROUPS_SQL result rows into (CURRENT_DATE, groups)"""
+    today = rows[0]['today'] if rows else None
+    return today, [
+        InvoiceGroup(row['status'], row['issue_date'], row['label'], row['count'], row['total'])
+        for row in rows
+    ]
+
+
+def _age_days(group: InvoiceGroup, today: date) -> Optional[int]:
+    return (today - group.issue_date).days if group.issue_date is not None else None
+
+
+def _bucket_3(days: Optional[int]) -> str:
+    if days is not None and days <= 7:
+        return '0-7 Days'
+    if days is not None and days <= 30:
+        return '7-30 Days'
+    return '30+ Days'
+
+
+def _bucket_4(days: Optional[int]) -> str:
+    if days is not None and days <= 7:
+        return '0-7 Days'
+    if days is not None and days <= 30:
+        return '7-30 Days'
+    if days is not None and days <= 60:
+        return '30-60 Days'
+    return '60+ Days'
+
+
+# --- /billing/analytics ---
+
+def billing_dashboard(groups: List[InvoiceGroup], today: Optional[date]) -> Dict[str, Any]:
+    """summary / trend / status / aging sections of /billing/analytics"""
+    pending = 0
+    revenue_today = Decimal(0)
+    overdue = 0
+    delay_days, delay_count = 0, 0
+    trend: Dict[Optional[str], List[Any]] = {}  # label -> [first issue_date, total]
+    status_data: Dict[Optional[str], int] = {}
+    aging_data: Dict[str, int] = {}
+
+    for g in groups:
+        days = _age_days(g, today)
+        status_data[g.status] = status_data.get(g.status, 0) + g.count
+
+        if g.status == 'Pending':
+            pending += g.count
+        elif g.status == 'Paid':
+            if g.issue_date == today:
+                revenue_today += g.total
+            entry = trend.setdefault(g.label, [g.issue_date, Decimal(0)])
+            if g.issue_date is not None and (entry[0] is None or g.issue_date < entry[0]):
+                entry[0] = g.issue_date
+            entry[1] += g.total
+        elif g.status == 'Unpaid':
+            if days is not None:
+                if days > 30:
+                    overdue += g.count
+                delay_days += days * g.count
+                delay_count += g.count
+
+        if g.status is not None and g.status != 'Paid':
+            bucket = _bucket_3(days)
+            aging_data[bucket] = aging_data.get(bucket, 0) + g.count
+
+    # Oldest seven labels first, like ORDER BY MIN(issue_date) LIMIT 7 (NULLs last)
+    trend_rows = sorted(trend.items(), key=lambda kv: (kv[1][0] is None, kv[1][0] or date.min))[:7]
+
+    return {
+        "summary": {
+            "pending": pending,
+            "revenue_today": float(revenue_today) if revenue_today else 0,
+            "overdue": overdue,
+            # AVG() truncated with int(), as before
+            "delay": int(Fraction(delay_days, delay_count)) if delay_count else 0
+        },
+        "trend": {
+            "labels": [label for label, _ in trend_rows],
+            "data": [float(total) for _, (_, total) in trend_rows]
+        },
+        "status": status_data,
+        "aging": {bucket: aging_data[bucket] for bucket in AGING_3 if bucket in aging_data}
+    }
+
+
+# --- /billing/payment-analytics ---
+
+def payment_dashboard(groups: List[InvoiceGroup], today: Optional[date]) -> Dict[str, Any]:
+    """summary / status_breakdown / revenue_trend / invoice_aging of /billing/payment-analytics"""
+    summary = {
+        "pending_count": 0,
+        "overdue_count": 0,
+        "revenue_today": Decimal(0),
+        "pending_revenue": Decimal(0)
+    }
+    by_status: Dict[Optional[str], Dict[str, Any]] = {}
+    by_day: Dict[date, Dict[str, Any]] = {}
+    aging: Dict[str, Dict[str, Any]] = {}
+    trend_start = today - timedelta(days=7) if today else None
+
+    for g in groups:
+        days = _age_days(g, today)
+        outstanding = g.status in OUTSTANDING
+
+        if g.status == 'Pending':
+            summary["pending_count"] += g.count
+        if outstanding and days is not None and days > 30:
+            summary["overdue_count"] += g.count
+        if g.status == 'Paid' and g.issue_date == today:
+            summary["revenue_today"] += g.total
+        if outstanding:
+            summary["pending_revenue"] += g.total
+
+        entry = by_status.setdefault(g.status, {"status": g.status, "count": 0, "total": Decimal(0)})
+        entry["count"] += g.count
+        entry["total"] += g.total
+
+        if g.issue_date is not None and g.issue_date >= trend_start:
+            day = by_day.setdefault(g.issue_date, {"date": g.label, "paid": Decimal(0), "unpaid": Decimal(0)})
+            if g.status == 'Paid':
+                day["paid"] += g.total
+            elif outstanding:
+                day["unpaid"] += g.total
+
+        if outstanding:
+            bucket = _bucket_4(days)
+            row = aging.setdefault(bucket, {"age_group": bucket, "count": 0, "total": Decimal(0)})
+            row["count"] += g.count
+            row["total"] += g.total
+
+    return {
+        "summary": summary,
+        "status_breakdown": sorted(by_status.values(), key=lambda row: -row["count"]),
+        "revenue_trend": [by_day[day] for day in sorted(by_day)],
+        "invoice_aging": [aging[bucket] for bucket in AGING_4 if bucket in aging]
+    }
+
+
+# --- rollup maintenance ---
+
+def reconcile_rollup() -> int:
+    """Fixes rollup rows that drifted from invoices; returns how many were corrected"""
+    with transaction() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT reconcile_invoice_daily_rollup()")
+            return cur.fetchone()[0]
+
+
+def seconds_until(at: str) -> float:
+    hour, minute = (int(part) for part in at.split(":"))
+    now = datetime.now()
+    run_at = datetime.combine(now.date(), dt_time(hour, minute))
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return (run_at - now).total_seconds()
+
+
+async def run_nightly_reconcile():
+    """Background task: reconcile the rollup once a day at ROLLUP_RECONCILE_AT"""
+    if not ROLLUP_RECONCILE_AT:
+        return
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(seconds_until(ROLLUP_RECONCILE_AT))
+        try:
+            corrected = await loop.run_in_executor(None, reconcile_rollup)
+            print(f"✅ invoice_daily_rollup reconciled ({corrected} rows corrected)")
+        except Exception as e:
+            print(f"⚠️ invoice_daily_rollup reconcile failed: {e}")
@@ -0,0 +1,114 @@
+"""
+In-process snapshot caches for expensive, read-mostly async payloads.
+
+A TTLSnapshotCache holds one computed value:
+
+- younger than `ttl`: served from memory
+- between `ttl` and `stale_ttl`: served from memory while a single background
+  task recomputes it (stale-while-revalidate)
+- older than `stale_ttl`, or never computed: callers wait for a recompute;
+  concurrent callers share the same one
+
+    analytics_cache = TTLSnapshotCache("admin_analytics", compute_analytics, ttl=5, stale_ttl=60)
+    payload = await analytics_cache.get()
+
+Every cache registers itself so /metrics can report hit ratio and
+recompute latency via cache_stats().
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+_registry: Dict[str, "TTLSnapshotCache"] = {}
+
+
+class TTLSnapshotCache:
+    """Single-value async cache with stale-while-revalidate"""
+
+    def __init__(self, name: str, loader: Callable[[], Awaitable[Any]], ttl: float = 5.0,
+                 stale_ttl: float = 60.0):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+
+        self._value: Any = None
+        self._computed_at: Optional[float] = None
+        self._refresh: Optional[asyncio.Task] = None
+
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._errors = 0
+        self._recompute_ms: Deque[float] = deque(maxlen=256)
+        _registry[name] = self
+
+    async def get(self) -> Any:
+        age = self.age()
+        if age is not None and age < self.ttl:
+            self._hits += 1
+            return self._value
+        if age is not None and age < self.stale_ttl:
+            self._stale_hits += 1
+            self._start_refresh()
+            return self._value
+
+        self._misses += 1
+        try:
+            return await asyncio.shield(self._start_refresh())
+        except Exception:
+            if self._computed_at is not None:
+                return self._value  # keep serving the last good snapshot
+            raise
+
+    def age(self) -> Optional[float]:
+        return None if self._computed_at is None else time.monotonic() - self._computed_at
+
+    def invalidate(self):
+        """Forces the next get() to recompute"""
+        self._computed_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        served = self._hits + self._stale_hits + self._misses
+        latencies = list(self._recompute_ms)
+        age = self.age()
+        return {
+            "ttl_s": self.ttl,
+            "stale_ttl_s": self.stale_ttl,
+            "hits": self._hits,
+            "stale_hits": self._stale_hits,
+            "misses": self._misses,
+            "hit_ratio": round((self._hits + self._stale_hits) / served, 4) if served else 0.0,
+            "recomputes": len(latencies),
+            "recompute_errors": self._errors,
+            "recompute_ms_last": round(latencies[-1], 3) if latencies else None,
+            "recompute_ms_avg": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "recompute_ms_max": round(max(latencies), 3) if latencies else None,
+            "snapshot_age_s": round(age, 3) if age is not None else None,
+        }
+
+    def _start_refresh(self) -> asyncio.Task:
+        """Returns the in-flight recompute, starting one if none is running"""
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.get_running_loop().create_task(self._recompute())
+            # Background refreshes nobody awaits: the failure is already logged
+            self._refresh.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return self._refresh
+
+    async def _recompute(self) -> Any:
+        started = time.perf_counter()
+        try:
+            value = await self.loader()
+        except Exception as e:
+            self._errors += 1
+            print(f"⚠️ {self.name} cache recompute failed: {e}")
+            raise
+        self._recompute_ms.append((time.perf_counter() - started) * 1000)
+        self._value, self._computed_at = value, time.monotonic()
+        return value
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats for every registered snapshot cache"""
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -0,0 +1,93 @@
+"""
+Aho-Corasick keyword automaton for the department rule engine
+Finds every occurrence of every keyword (overlaps included) in one pass
+"""
+from collections import deque
+from typing import Dict, Iterator, List, Tuple
+
+
+def _is_word_char(ch: str) -> bool:
+    """Same definition of a word character as re's \\w on str patterns"""
+    return ch.isalnum() or ch == "_"
+
+
+def needs_word_boundary(keyword: str) -> bool:
+    """ASCII keywords with letters/digits only count as exact on word boundaries"""
+    return any(ch.isalnum() for ch in keyword) and all(ord(ch) < 128 for ch in keyword)
+
+
+class KeywordAutomaton:
+    """
+    Multi-pattern matcher built once from a keyword list.
+
+    scan() returns, for every keyword that occurs in the text, whether at
+    least one occurrence is an exact match (bounded by non-word characters
+    for ASCII keywords, any occurrence otherwise) or only a partial one.
+    """
+
+    EXACT = 10
+    PARTIAL = 5
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(keywords)
+        self._bounded = [needs_word_boundary(k) for k in self.keywords]
+        self._lengths = [len(k) for k in self.keywords]
+
+        # Trie: goto[state] maps char -> next state, out[state] lists keyword ids
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[List[int]] = [[]]
+        for kid, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(kid)
+
+        # Failure links (BFS), merging outputs of suffix states
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yields (start_index, keyword_id) for every occurrence"""
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for kid in out[state]:
+                    yield pos - lengths[kid] + 1, kid
+
+    def scan(self, text: str) -> Dict[int, int]:
+        """Maps keyword id -> EXACT or PARTIAL for every keyword found in text"""
+        hits: Dict[int, int] = {}
+        end = len(text)
+        for start, kid in self.iter_matches(text):
+            if hits.get(kid) == self.EXACT:
+                continue
+            if not self._bounded[kid]:
+                hits[kid] = self.EXACT
+                continue
+            stop = start + self._lengths[kid]
+            if (start == 0 or not _is_word_char(text[start - 1])) and \
+               (stop == end or not _is_word_char(text[stop])):
+                hits[kid] = self.EXACT
+            else:
+                hits[kid] = self.PARTIAL
+        return hits
@@ -0,0 +1,106 @@
+"""
+Micro-batching for single-row ML inference
+Coalesces concurrent calls into one vectorized transform/predict
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Sequence
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many request threads for up to `window_ms`
+    (or until `max_batch` items are waiting) and runs `batch_fn` once over
+    all of them. Each caller gets back the result at its own position.
+
+    A window of 0 disables batching: submit() calls batch_fn inline. So
+    does calling submit() from a thread running an event loop: waiting
+    there would block the loop for the whole window, and no other request
+    could join the batch anyway. Async callers should submit from an
+    executor (see backend/runtime.py).
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Sequence[Any]],
+                 window_ms: float = 2.0, max_batch: int = 32, name: str = "micro-batcher"):
+        self.batch_fn = batch_fn
+        self.window = max(window_ms, 0.0) / 1000.0
+        self.max_batch = max(int(max_batch), 1)
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item: Any) -> Any:
+        """Queue one item and block until its batched result is ready"""
+        if self.window == 0 or self.max_batch == 1 or _on_event_loop():
+            return self._call([item])[0]
+
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0
+        }
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(pending)
+
+    def _call(self, items: List[Any]) -> Sequence[Any]:
+        results = self.batch_fn(items)
+        if results is None or len(results) != len(items):
+            raise ValueError(f"{self.name}: batch_fn returned "
+                             f"{'no' if results is None else len(results)} results for {len(items)} items")
+        return results
+
+    def _dispatch(self, pending):
+        items = [item for item, _ in pending]
+        try:
+            results = self._call(items)
+        except BaseException as e:
+            # Every caller is waiting on its future; none may be left unresolved
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(items)
+        for (_, future), result in zip(pending, results):
+            future.set_result(result)
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
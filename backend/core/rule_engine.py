@@ -2,9 +2,11 @@
 Strict Rule Engine for Medical Triage
 Ensures 100% accuracy on severity classification
 """
+import hashlib
 import re
 from typing import Dict, List, Optional, Set, TypedDict
 from .multilingual import MultilingualSupport
+from .keyword_matcher import KeywordAutomaton
 
 class DeptResult(TypedDict):
     department: Optional[str]
@@ -12,6 +14,10 @@ class DeptResult(TypedDict):
     keywords: List[str]
     method: str
 
+def _table_version(*tables) -> str:
+    """Short fingerprint of rule tables; changes whenever their contents do"""
+    return hashlib.sha1(repr(tables).encode("utf-8")).hexdigest()[:12]
+
 class SeverityRuleEngine(MultilingualSupport):
     """Hard-coded severity rules - NEVER compromise"""
     
@@ -37,6 +43,32 @@ class SeverityRuleEngine(MultilingualSupport):
             r"[ಜ್ವರ|ಸೋಂಕು|ಊತ|ದಿನನಿತ್ಯ|ನಿದ್ರೆ]",
             r"[बुखार|संक्रमण|सूजन|दैनिक|नींद|भूख]"
         ]
+
+        # Fever rules (pediatric: any spelling/script; adults: English word)
+        self.pediatric_fever_pattern = r"(fe\s*ver|fever|बुखार|ಜ್ವರ)"
+        self.fever_pattern = r"\b(fe\s*ver|fever)\b"
+
+        self._compile_patterns()
+
+    def _compile_patterns(self):
+        """
+        Compile all tiers into one scanner with a named group per tier.
+        HIGH consumes its match; MEDIUM and pediatric fever are zero-width
+        lookaheads so they never hide a HIGH trigger that starts inside them.
+        Call again if the pattern lists are changed at runtime.
+        """
+        high = "|".join(f"(?:{p})" for p in self.high_patterns)
+        # Every MEDIUM pattern and the catch-all fever rule all yield MEDIUM
+        medium = "|".join(f"(?:{p})" for p in self.medium_patterns + [self.fever_pattern])
+
+        self._high_scanner = re.compile(high)
+        self._scanner = re.compile(f"(?P<high>{high})|(?=(?P<medium>{medium}))")
+        self._pediatric_scanner = re.compile(
+            f"(?P<high>{high})|(?=(?P<medium>{medium}))|(?=(?P<pediatric>{self.pediatric_fever_pattern}))"
+        )
+        # Result caches compare this to know when the rules changed
+        self.version = _table_version(self.high_patterns, self.medium_patterns,
+                                      self.pediatric_fever_pattern, self.fever_pattern)
     
     def determine_severity(self, text: str, age: Optional[int] = None) -> str:
         """
@@ -47,29 +79,16 @@ class SeverityRuleEngine(MultilingualSupport):
         - Mild/Stable = LOW
         """
         text_lower = text.lower()
+        pediatric = age is not None and age < 14
+        scanner = self._pediatric_scanner if pediatric else self._scanner
 
-        # Check HIGH severity - ANY match triggers HIGH
-        for pattern in self.high_patterns:
-            if re.search(pattern, text_lower):
+        # Single pass: the first hit decides unless it is below HIGH, in which
+        # case only a HIGH trigger later in the text can still change the answer
+        for match in scanner.finditer(text_lower):
+            if match.group("high") is not None:
+                return "HIGH"
+            if self._high_scanner.search(text_lower, match.start() + 1):
                 return "HIGH"
-
-        # Pediatric fever rule
-        if age is not None and age < 14:
-            if re.search(r"(fe\s*ver|fever|बुखार|ಜ್ವರ)", text_lower):
-                return "MEDIUM"
-
-        # Check MEDIUM severity
-        for pattern in self.medium_patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                if "fever" in pattern and match.group(1).isdigit():
-                    if int(match.group(1)) >= 3:
-                        return "MEDIUM"
-                else:
-                    return "MEDIUM"
-
-        # Any fever defaults to MEDIUM (unless already HIGH)
-        if re.search(r"\b(fe\s*ver|fever)\b", text_lower):
             return "MEDIUM"
 
         # Default to LOW for mild/stable symptoms
@@ -158,6 +177,37 @@ class DepartmentRuleEngine(MultilingualSupport):
             "आँख", "दांत", "मानसिक", "मनोचिकित्सा", "मूत्र",
             "ಕಣ್ಣು", "ದಂತ", "ಮಾನಸಿಕ", "ಮೂತ್ರ", "ಕಣ್ಣಿನ"
         ]
+
+        self._compile_keywords()
+
+    def _compile_keywords(self):
+        """
+        Build one automaton over every department and refer keyword so a single
+        pass over the text yields all exact/partial hits.
+        Call again if the keyword tables are changed at runtime.
+        """
+        ids: Dict[str, int] = {}
+        # keyword id -> [(department index, position in that department's list, keyword)]
+        self._keyword_owners: List[List[tuple]] = []
+        self._dept_names: List[str] = list(self.dept_keywords)
+
+        def keyword_id(key: str) -> int:
+            if key not in ids:
+                ids[key] = len(ids)
+                self._keyword_owners.append([])
+            return ids[key]
+
+        for dept_idx, dept in enumerate(self._dept_names):
+            for pos, keyword in enumerate(self.dept_keywords[dept]):
+                self._keyword_owners[keyword_id(keyword.lower())].append((dept_idx, pos, keyword))
+
+        # Refer keywords are plain substring checks against the lowered text
+        self._refer_ids = [keyword_id(k) for k in self.refer_keywords]
+
+        self._matcher = KeywordAutomaton(list(ids))
+        # Result caches compare this to know when the rules changed
+        self.version = _table_version(self.dept_keywords, self.refer_keywords,
+                                      sorted(self.available_departments))
     
     def classify_department(self, text: str, age: Optional[int] = None, gender: Optional[str] = None) -> DeptResult:
         """
@@ -188,36 +238,29 @@ class DepartmentRuleEngine(MultilingualSupport):
             }
 
         # Score calculation using exact (10) and partial (5) matches
-        for dept, keywords in self.dept_keywords.items():
-            dept_score = 0
-            matches: List[str] = []
-
-            for keyword in keywords:
-                key_lower = keyword.lower()
+        hits = self._matcher.scan(text_lower)
+        dept_hits: Dict[int, List[tuple]] = {}
+        for kid, points in hits.items():
+            for dept_idx, pos, keyword in self._keyword_owners[kid]:
+                dept_hits.setdefault(dept_idx, []).append((pos, keyword, points))
 
-                # Exact match check
-                if self._exact_match(text_lower, key_lower):
-                    dept_score += 10
-                    matches.append(keyword)
-                    continue
-
-                # Partial match check
-                if key_lower in text_lower:
-                    dept_score += 5
-                    matches.append(keyword)
-
-            if dept_score > 0:
-                scores[dept] = dept_score
-                matched_keywords[dept] = matches
+        # Departments in table order, keywords in list order (same as a nested loop)
+        for dept_idx in sorted(dept_hits):
+            dept = self._dept_names[dept_idx]
+            entries = sorted(dept_hits[dept_idx])
+            scores[dept] = sum(points for _, _, points in entries)
+            matched_keywords[dept] = [keyword for _, keyword, _ in entries]
 
         # Refer rule if no supported department keywords and out-of-scope keywords present
-        if not scores and any(k in text_lower for k in self.refer_keywords):
-            return {
-                "department": None,
-                "confidence": 0.0,
-                "keywords": [k for k in self.refer_keywords if k in text_lower][:5],
-                "method": "refer_rule"
-            }
+        if not scores:
+            refer_hits = [k for k, kid in zip(self.refer_keywords, self._refer_ids) if kid in hits]
+            if refer_hits:
+                return {
+                    "department": None,
+                    "confidence": 0.0,
+                    "keywords": refer_hits[:5],
+                    "method": "refer_rule"
+                }
         
         if not scores:
             return {
@@ -238,13 +281,6 @@ class DepartmentRuleEngine(MultilingualSupport):
             "method": "keyword_scoring"
         }
 
-    def _exact_match(self, text: str, keyword: str) -> bool:
-        """Exact match using word boundaries where possible"""
-        if any(ch.isalnum() for ch in keyword) and all(ord(ch) < 128 for ch in keyword):
-            pattern = r"(?<!\w)" + re.escape(keyword) + r"(?!\w)"
-            return re.search(pattern, text) is not None
-        return keyword in text
-    
     def is_available(self, department: str) -> bool:
         """Check if department is in available list"""
         return department in self.available_departments
\ No newline at end of file
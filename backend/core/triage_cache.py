@@ -0,0 +1,123 @@
+"""
+Result cache for MedicalTriageEngine.analyze
+Repeated complaints ("fever 3 days", "chest pain") skip rules, ML and explanations
+
+Entries are keyed on what the analysis actually depends on:
+- symptoms, stripped and lowercased: the rules and the model's vectorizer
+  both lowercase and neither looks at leading/trailing whitespace, so equal
+  keys mean equal results. Inner whitespace and Unicode forms are kept; the
+  rule patterns match them literally (e.g. "chest  pain" is not "chest pain")
+- age band: the rules only distinguish children (< 14) from everyone else
+- gender: lowercased (not stripped) as the rules compare it, with
+  "f"/"female" and "m"/"male" folded together
+
+The cache is bounded (LRU eviction past `max_entries`) and entries expire
+after `ttl` seconds. Every lookup passes the engine's current version
+(rule table fingerprints + model checksum); when it differs from the one the
+entries were computed with, the whole cache is dropped. The rule tables are
+code and only change with a restart; the model checksum follows the
+artifact ml_service.ResidentModel hot-swaps.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+PEDIATRIC_AGE = 14  # SeverityRuleEngine / DepartmentRuleEngine: age < 14
+
+_GENDERS = {"f": "female", "female": "female", "m": "male", "male": "male"}
+
+
+def age_band(age: Optional[int]) -> Optional[str]:
+    if age is None:
+        return None
+    return "child" if age < PEDIATRIC_AGE else "adult"
+
+
+def cache_key(symptoms: str, age: Optional[int], gender: Optional[str]) -> Tuple[str, Optional[str], Optional[str]]:
+    if gender:
+        gender = str(gender).lower()  # exactly as the rules compare it: " f " is not "f"
+        gender = _GENDERS.get(gender, gender)
+    return symptoms.strip().lower(), age_band(age), gender or None
+
+
+def copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Callers get their own dicts/lists, so nobody can edit a cached entry"""
+    explainability = dict(result["explainability"])
+    explainability["key_keywords"] = list(explainability["key_keywords"])
+    return {**result, "explainability": explainability}
+
+
+class TriageResultCache:
+    """Thread-safe LRU + TTL cache of analysis results (max_entries=0 disables it)"""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600.0):
+        self.max_entries = max(int(max_entries), 0)
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._version: Any = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable, version: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, result = entry
+            if time.monotonic() - stored_at >= self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy_result(result)
+
+    def put(self, key: Hashable, version: Any, result: Dict[str, Any]):
+        result = copy_result(result)
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "version": list(self._version) if isinstance(self._version, tuple) else self._version,
+        }
+
+    def _check_version(self, version: Any):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._version = version
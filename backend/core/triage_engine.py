@@ -3,10 +3,17 @@ Main Triage Engine
 Coordinates Rule Engine + ML Model for 95% Accuracy
 """
 import os
-import pickle
 from typing import Dict, Optional, Any, List
 from .rule_engine import SeverityRuleEngine, DepartmentRuleEngine, DeptResult
 from .multilingual import ExplanationTemplates
+from .micro_batcher import MicroBatcher
+from .triage_cache import TriageResultCache, cache_key, copy_result
+from backend.ml_service import ResidentModel, resident_model
+
+# The shipped doctor_recommender.pkl is an ml_service pipeline, which the
+# engine never used to load, so triage ran on rules alone. Serving it as the
+# low-confidence override changes results; it stays off until enabled here.
+ML_ACCEPT_PIPELINE = os.getenv("TRIAGE_ML_ACCEPT_PIPELINE", "0") == "1"
 
 class MedicalTriageEngine:
     """
@@ -22,21 +29,35 @@ class MedicalTriageEngine:
     
     _instance = None
 
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, accept_pipeline: bool = ML_ACCEPT_PIPELINE):
         self.severity_engine = SeverityRuleEngine()
         self.dept_engine = DepartmentRuleEngine()
         self.explanation_gen = ExplanationTemplates()
         
-        # Load ML model if exists
-        self.ml_model = None
-        self.ml_vectorizer = None
+        # Load ML model if exists; by default this is the ResidentModel the
+        # /ml endpoints serve, so a replaced artifact reaches both (see _refresh_ml_model)
+        self._ml = (None, None)  # (vectorizer, model), swapped as one reference
+        self._served = None  # artifact self._ml was unpacked from
+        self.accept_pipeline = accept_pipeline
         if model_path is None:
-            model_path = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)),
-                "models",
-                "doctor_recommender.pkl"
-            )
-        self._load_ml_model(model_path)
+            self._resident_model = resident_model
+        else:
+            self._resident_model = ResidentModel(model_path, batch_window_ms=0)
+        self._refresh_ml_model()
+
+        # Concurrent ML overrides share one vectorize/predict call
+        self._ml_batcher = MicroBatcher(
+            self._ml_predict_batch,
+            window_ms=float(os.getenv("ML_BATCH_WINDOW_MS", "2.0")),
+            max_batch=int(os.getenv("ML_BATCH_MAX_SIZE", "32")),
+            name="triage-ml-batcher"
+        )
+
+        # Repeated complaints are answered from memory (see triage_cache)
+        self.result_cache = TriageResultCache(
+            max_entries=int(os.getenv("TRIAGE_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("TRIAGE_CACHE_TTL", "3600"))
+        )
 
     @classmethod
     def get_instance(cls) -> "MedicalTriageEngine":
@@ -44,17 +65,50 @@ class MedicalTriageEngine:
             cls._instance = cls()
         return cls._instance
     
-    def _load_ml_model(self, model_path: str):
-        """Load trained ML model"""
-        if os.path.exists(model_path):
-            try:
-                with open(model_path, 'rb') as f:
-                    data = pickle.load(f)
-                    self.ml_model = data.get('model')
-                    self.ml_vectorizer = data.get('vectorizer')
-            except Exception as e:
-                print(f"Warning: Could not load ML model: {e}")
-    
+    def _refresh_ml_model(self):
+        """Unpack the resident model's artifact if it changed (stat at most every ML_MODEL_RELOAD_INTERVAL s)"""
+        resident = self._resident_model
+        if resident.version is None and not os.path.exists(resident.model_path):
+            return  # no artifact: rules only (ResidentModel.get() would train one)
+        try:
+            data = resident.get()
+        except Exception as e:
+            print(f"Warning: Could not load ML model: {e}")
+            return
+        if data is self._served:
+            return
+        if isinstance(data, dict):
+            # train_model.py artifact: {'model': ..., 'vectorizer': ...}
+            self._ml = (data.get('vectorizer'), data.get('model'))
+        elif self.accept_pipeline:
+            # ml_service.train_model artifact: vectorizer + classifier pipeline
+            self._ml = (data[:-1], data[-1])
+        else:
+            self._ml = (None, None)
+            print(f"Warning: ML override off; {type(data).__name__} artifact needs TRIAGE_ML_ACCEPT_PIPELINE=1")
+        self._served = data
+
+    @property
+    def ml_vectorizer(self):
+        return self._ml[0]
+
+    @property
+    def ml_model(self):
+        return self._ml[1]
+
+    @property
+    def ml_version(self) -> Optional[str]:
+        return self._resident_model.version if self.ml_model is not None else None
+
+    @property
+    def version(self) -> tuple:
+        """
+        Rule table fingerprints + model checksum; cached results are only valid for one version.
+        Reading it picks up a replaced model artifact, so a retrained model empties the cache.
+        """
+        self._refresh_ml_model()
+        return (self.severity_engine.version, self.dept_engine.version, self.ml_version)
+
     def analyze(self, symptoms: str, age: Optional[int] = None, gender: Optional[str] = None) -> Dict[str, Any]:
         """
         Main triage analysis function
@@ -69,18 +123,43 @@ class MedicalTriageEngine:
             "explainability": {...}
         }
         """
+        if not self.result_cache.enabled:
+            self._refresh_ml_model()
+            return self._analyze(symptoms, age, gender)
+
+        key, version = cache_key(symptoms, age, gender), self.version
+        cached = self.result_cache.get(key, version)
+        if cached is not None:
+            return cached
+        result = self._analyze(symptoms, age, gender)
+        self.result_cache.put(key, version, result)
+        return result
+
+    def _analyze(self, symptoms: str, age: Optional[int], gender: Optional[str]) -> Dict[str, Any]:
+        severity, dept_result = self._rule_stage(symptoms, age, gender)
+        ml_dept = self._ml_predict(symptoms) if self._needs_ml(dept_result) else None
+        return self._finish(severity, dept_result, ml_dept)
+
+    def _rule_stage(self, symptoms: str, age: Optional[int], gender: Optional[str]):
+        """Steps 1-2: rule-based severity and department"""
         # 1. Determine Severity (Rule-based - mandatory)
         severity = self.severity_engine.determine_severity(symptoms, age)
 
         # 2. Determine Department (Hybrid: Rules + ML)
         dept_result: DeptResult = self.dept_engine.classify_department(symptoms, age, gender)
-        
+        return severity, dept_result
+
+    def _needs_ml(self, dept_result: DeptResult) -> bool:
+        """ML Override only if low confidence from rules"""
+        return dept_result.get("method") != "refer_rule" and dept_result['confidence'] < 0.6 and self.ml_model is not None
+
+    def _finish(self, severity: str, dept_result: DeptResult, ml_dept: Optional[str]) -> Dict[str, Any]:
+        """Steps 4-6: apply the ML prediction (if any), availability, explanations"""
         # Store original keywords from rule engine
         original_keywords = dept_result.get('keywords', [])
         
         # 4. ML Override if low confidence from rules
-        if dept_result.get("method") != "refer_rule" and dept_result['confidence'] < 0.6 and self.ml_model:
-            ml_dept = self._ml_predict(symptoms)
+        if self._needs_ml(dept_result):
             if ml_dept and ml_dept != dept_result['department']:
                 dept_result = {
                     "department": ml_dept,
@@ -129,13 +208,17 @@ class MedicalTriageEngine:
         """Get prediction from ML model"""
         if not self.ml_model or not self.ml_vectorizer:
             return None
-        
+        return self._ml_batcher.submit(text)
+
+    def _ml_predict_batch(self, texts: List[str]) -> List[Optional[str]]:
+        """Vectorize and predict a whole batch of symptom texts at once"""
+        vectorizer, model = self._ml
         try:
-            X = self.ml_vectorizer.transform([text])
-            pred = self.ml_model.predict(X)[0]
-            return pred if pred in self.AVAILABLE_DEPTS else None
+            X = vectorizer.transform(texts)
+            preds = model.predict(X)
+            return [pred if pred in self.AVAILABLE_DEPTS else None for pred in preds]
         except Exception:
-            return None
+            return [None] * len(texts)
     
     def _allocate_room(self, severity: str) -> str:
         """Allocate room based on severity"""
@@ -147,8 +230,53 @@ class MedicalTriageEngine:
             return "Outpatient / No Room"
     
     def batch_analyze(self, cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Analyze multiple cases"""
-        return [self.analyze(c['symptoms'], c.get('age'), c.get('gender')) for c in cases]
+        """
+        Analyze multiple cases
+        Cached results are reused and repeats within the batch computed once;
+        the rest go through _batch_analyze together
+        """
+        version = self.version
+        results: List[Optional[Dict[str, Any]]] = [None] * len(cases)
+        pending: Dict[tuple, List[int]] = {}
+        todo: List[Dict[str, Any]] = []
+        for i, case in enumerate(cases):
+            key = cache_key(case['symptoms'], case.get('age'), case.get('gender'))
+            if key in pending:
+                pending[key].append(i)
+                continue
+            cached = self.result_cache.get(key, version) if self.result_cache.enabled else None
+            if cached is not None:
+                results[i] = cached
+                continue
+            pending[key] = [i]
+            todo.append({"symptoms": case['symptoms'], "age": case.get('age'), "gender": case.get('gender')})
+
+        for (key, positions), result in zip(pending.items(), self._batch_analyze(todo)):
+            if self.result_cache.enabled:
+                self.result_cache.put(key, version, result)
+            results[positions[0]] = result
+            for i in positions[1:]:
+                results[i] = copy_result(result)
+        return results
+
+    def _batch_analyze(self, cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Rules run per case; every case that needs the ML override goes through
+        one vectorize/predict call together
+        """
+        if not cases:
+            return []
+        staged = [self._rule_stage(c['symptoms'], c.get('age'), c.get('gender')) for c in cases]
+        ml_cases = [i for i, (_, dept_result) in enumerate(staged) if self._needs_ml(dept_result)]
+
+        ml_depts: List[Optional[str]] = [None] * len(cases)
+        if ml_cases and self.ml_vectorizer is not None:
+            preds = self._ml_predict_batch([cases[i]['symptoms'] for i in ml_cases])
+            for i, pred in zip(ml_cases, preds):
+                ml_depts[i] = pred
+
+        return [self._finish(severity, dept_result, ml_dept)
+                for (severity, dept_result), ml_dept in zip(staged, ml_depts)]
 
 # Singleton instance for import
 triage_engine = MedicalTriageEngine.get_instance()
\ No newline at end of file
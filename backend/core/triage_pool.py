@@ -0,0 +1,148 @@
+"""
+Process pool for CPU-bound triage batches
+Shards /triage/batch across worker processes so analysis isn't GIL-bound
+
+Each worker process loads MedicalTriageEngine once (pool initializer) and
+then runs batch_analyze() on whatever shard it is handed. A batch is split
+into at most one shard per worker (never smaller than TRIAGE_POOL_MIN_SHARD
+cases), the shards run in parallel and the event loop awaits the results
+in order.
+
+TRIAGE_POOL_WORKERS=0 disables the pool; batches then run on the bounded
+CPU executor (backend.runtime) so the event loop still isn't blocked. That
+is the default on a single core, where worker processes only add pickling
+and IPC on top of the same CPU time.
+"""
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+_CORES = os.cpu_count() or 1
+POOL_WORKERS = int(os.getenv("TRIAGE_POOL_WORKERS", str(min(_CORES, 4) if _CORES >= 2 else 0)))
+MIN_SHARD = int(os.getenv("TRIAGE_POOL_MIN_SHARD", "32"))
+
+# --- worker side ---
+
+_worker_engine = None
+
+
+def _init_worker():
+    """Runs once in each worker process: load rules and model up front"""
+    global _worker_engine
+    from backend.core.triage_engine import MedicalTriageEngine
+    _worker_engine = MedicalTriageEngine.get_instance()
+
+
+def _analyze_shard(cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return _worker_engine.batch_analyze(cases)
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+# --- parent side ---
+
+class TriageProcessPool:
+    """
+    Owns the worker processes; analyze_batch() is the only call routes need.
+    Workers are started with "spawn" so they don't inherit the server's
+    threads (DB pools, micro-batcher) mid-flight.
+    """
+
+    def __init__(self, workers: int = POOL_WORKERS, min_shard: int = MIN_SHARD):
+        self.workers = max(int(workers), 0)
+        self.min_shard = max(int(min_shard), 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.shards = 0
+        self.cases = 0
+        self._batch_ms = deque(maxlen=1000)
+
+    def start(self):
+        """Start the workers and wait until each has loaded the engine"""
+        with self._lock:
+            if self._executor is not None or self.workers == 0:
+                return
+            started = time.perf_counter()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            # No-op tasks make the processes spawn and load the engine now, not on the first batch
+            pids = {f.result() for f in [self._executor.submit(_ready) for _ in range(self.workers * 2)]}
+            print(f"✅ Triage process pool ready ({len(pids)} workers, {(time.perf_counter() - started):.1f}s)")
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def shard(self, cases: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Contiguous shards, at most one per worker, each at least min_shard cases"""
+        if not cases:
+            return []
+        size = max(self.min_shard, math.ceil(len(cases) / max(self.workers, 1)))
+        return [cases[i:i + size] for i in range(0, len(cases), size)]
+
+    async def analyze_batch(self, cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """batch_analyze() over the worker processes; results in input order"""
+        if not cases:
+            return []
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        if self.workers == 0:
+            from backend.core.triage_engine import MedicalTriageEngine
+            from backend.runtime import cpu_executor
+            results = await cpu_executor.run(MedicalTriageEngine.get_instance().batch_analyze, cases)
+            shards = 1
+        else:
+            parts = self.shard(cases)
+            try:
+                done = await self._run_shards(parts)
+            except BrokenProcessPool:
+                # A worker died (OOM kill etc.); replace the pool and retry once
+                print("⚠️ Triage worker process died; restarting the pool")
+                await loop.run_in_executor(None, self.shutdown)
+                done = await self._run_shards(parts)
+            results = [result for part in done for result in part]
+            shards = len(parts)
+
+        self.batches += 1
+        self.shards += shards
+        self.cases += len(cases)
+        self._batch_ms.append((time.perf_counter() - started) * 1000)
+        return results
+
+    async def _run_shards(self, parts: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            await loop.run_in_executor(None, self.start)
+        executor = self._executor
+        return await asyncio.gather(*[loop.run_in_executor(executor, _analyze_shard, part) for part in parts])
+
+    def stats(self) -> Dict[str, Any]:
+        timings = sorted(self._batch_ms)
+        return {
+            "workers": self.workers,
+            "running": self._executor is not None,
+            "min_shard": self.min_shard,
+            "batches": self.batches,
+            "shards": self.shards,
+            "cases": self.cases,
+            "batch_ms_p50": round(timings[len(timings) // 2], 3) if timings else None,
+            "batch_ms_max": round(timings[-1], 3) if timings else None,
+        }
+
+
+triage_pool = TriageProcessPool()
@@ -1,15 +1,31 @@
 import os
+import time
 import psycopg2
+from contextlib import contextmanager
 from psycopg2.extras import RealDictCursor
-from psycopg2 import pool
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
+
+from backend.bed_board import bed_board
+from backend.db_pool import BoundedConnectionPool
+from backend.db_prepared import PreparedStatementConnection, execute_prepared
 
 # Load variables from .env
 load_dotenv()
 
 # ✅ NEW: Connection pool for better performance
-_connection_pool: Optional[pool.SimpleConnectionPool] = None
+_connection_pool: Optional[BoundedConnectionPool] = None
+
+# Pool sizing and housekeeping (seconds)
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))
+POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+# Connections idle for longer than this get a "SELECT 1" before being handed out
+POOL_VALIDATE_AFTER = float(os.getenv("DB_POOL_VALIDATE_AFTER", "30"))
+# How long relation_exists() trusts an answer before probing again (seconds)
+RELATION_PROBE_INTERVAL = float(os.getenv("DB_RELATION_PROBE_INTERVAL", "60"))
 
 def init_connection_pool():
     """
@@ -22,33 +38,85 @@ def init_connection_pool():
         if not db_url:
             raise Exception("DATABASE_URL environment variable not set.")
         
-        # Create pool with min=1, max=20 connections
-        _connection_pool = pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=20,
-            dsn=db_url
+        # Thread-safe pool: sync routes run on FastAPI's worker threads, and
+        # checkouts queue for up to POOL_TIMEOUT seconds when all are busy
+        _connection_pool = BoundedConnectionPool(
+            db_url,
+            minconn=POOL_MIN,
+            maxconn=POOL_MAX,
+            timeout=POOL_TIMEOUT,
+            idle_timeout=POOL_IDLE_TIMEOUT,
+            max_lifetime=POOL_MAX_LIFETIME,
+            validate_after=POOL_VALIDATE_AFTER,
+            connection_factory=PreparedStatementConnection,
         )
-        print("✅ Connection pool initialized (1-20 connections)")
+        _connection_pool.prewarm()
+        print(f"✅ Connection pool initialized ({POOL_MIN}-{POOL_MAX} connections, {POOL_TIMEOUT:g}s wait)")
     except Exception as e:
         print(f"❌ Error initializing connection pool: {e}")
         raise
 
+def _direct_connection():
+    """Fallback: Direct connection when the pool is not initialized"""
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        raise Exception("DATABASE_URL environment variable not set.")
+    return psycopg2.connect(db_url, connection_factory=PreparedStatementConnection)
+
+@contextmanager
+def connection():
+    """
+    Borrow a connection for the duration of a with-block.
+
+        with connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                ...
+
+    The connection always goes back to the pool (uncommitted work is rolled
+    back). Without a pool, a direct connection is opened and closed.
+    """
+    db_pool = _connection_pool
+    try:
+        conn = db_pool.getconn() if db_pool is not None else _direct_connection()
+    except psycopg2.OperationalError as e:
+        print(f"❌ Database Operational Error: {e}")
+        raise
+    try:
+        yield conn
+    finally:
+        if db_pool is not None:
+            db_pool.putconn(conn)
+        else:
+            conn.close()
+
+@contextmanager
+def transaction():
+    """Like connection(), but commits on clean exit and rolls back if the block raises"""
+    with connection() as conn:
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                conn.rollback()
+            raise
+
+def pool_stats() -> Dict[str, Any]:
+    """Pool gauges for /metrics"""
+    if _connection_pool is None:
+        return {"initialized": False}
+    return {"initialized": True, **_connection_pool.stats()}
+
 def get_db_connection():
     """
     ✅ NEW: Get connection from pool instead of creating new ones
     Falls back to direct connection if pool not initialized
+    Prefer `with connection()`; a connection from here must go back via return_connection()
     """
-    global _connection_pool
-    
     try:
         if _connection_pool is not None:
             return _connection_pool.getconn()
-        else:
-            # Fallback: Direct connection (for backward compatibility)
-            db_url = os.getenv("DATABASE_URL")
-            if not db_url:
-                raise Exception("DATABASE_URL environment variable not set.")
-            return psycopg2.connect(db_url)
+        return _direct_connection()
     except psycopg2.OperationalError as e:
         print(f"❌ Database Operational Error: {e}")
         raise Exception(f"Could not connect to database. Check credentials and server status. Details: {e}")
@@ -60,10 +128,13 @@ def return_connection(conn):
     """
     ✅ NEW: Return connection to pool
     """
-    global _connection_pool
     try:
-        if _connection_pool is not None and conn:
+        if not conn:
+            return
+        if _connection_pool is not None:
             _connection_pool.putconn(conn)
+        else:
+            conn.close()
     except Exception as e:
         print(f"⚠️ Error returning connection to pool: {e}")
 
@@ -78,69 +149,94 @@ def close_connection_pool():
             print("✅ Connection pool closed")
     except Exception as e:
         print(f"⚠️ Error closing connection pool: {e}")
+    finally:
+        _connection_pool = None
 
-def execute_query(sql_query: str) -> List[Dict[str, Any]]:
+def execute_query(sql_query: str, params: Optional[Sequence[Any]] = None,
+                  prepare: bool = False) -> List[Dict[str, Any]]:
     """
     Execute SQL query with improved error handling and automatic connection return
     ✅ NEW: Connection pooling, automatic rollback on error, proper cleanup
     
+    Args:
+        sql_query: Statement text with %s placeholders for every value
+        params: Values for the placeholders (never format them into the SQL)
+        prepare: Run as a server-side prepared statement cached on the
+                 connection; use for fixed, frequently run statements
+    
     Returns:
         - List of dicts for SELECT queries
         - List with success message for INSERT/UPDATE
         - Dict with error for failed queries
     """
-    conn = None
     results = []
     
     try:
-        conn = get_db_connection()
-        
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(sql_query)
-            
-            # Determine query type
-            sql_upper = sql_query.strip().upper()
-            is_write_query = sql_upper.startswith(('INSERT', 'UPDATE', 'DELETE'))
-            
-            # If it's a SELECT query or a write query with RETURNING, fetch data
-            if cur.description:
-                results = cur.fetchall()
-                # Convert RealDictRow to regular dict for JSON serialization
-                results = [dict(row) for row in results]
-            
-            # If it's INSERT/UPDATE/DELETE, commit changes
-            if is_write_query:
-                conn.commit()
-                if not results:
-                    results = [{"status": "success", "message": "Operation completed successfully."}]
+        with connection() as conn:
+            try:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    if prepare:
+                        execute_prepared(cur, sql_query, params)
+                    else:
+                        cur.execute(sql_query, params)
+                    
+                    # Determine query type
+                    sql_upper = sql_query.strip().upper()
+                    is_write_query = sql_upper.startswith(('INSERT', 'UPDATE', 'DELETE'))
+                    
+                    # If it's a SELECT query or a write query with RETURNING, fetch data
+                    if cur.description:
+                        results = cur.fetchall()
+                        # Convert RealDictRow to regular dict for JSON serialization
+                        results = [dict(row) for row in results]
+                    
+                    # If it's INSERT/UPDATE/DELETE, commit changes
+                    if is_write_query:
+                        conn.commit()
+                        if not results:
+                            results = [{"status": "success", "message": "Operation completed successfully."}]
+            except Exception:
+                # ✅ NEW: Automatic rollback on error
+                try:
+                    conn.rollback()
+                except:
+                    pass
+                raise
                 
     except psycopg2.Error as e:
-        # ✅ NEW: Automatic rollback on database error
-        if conn:
-            try:
-                conn.rollback()
-            except:
-                pass
         print(f"❌ Database error executing query: {e}")
         results = {"error": str(e)}
     except Exception as e:
-        # ✅ NEW: Automatic rollback on unexpected error
-        if conn:
-            try:
-                conn.rollback()
-            except:
-                pass
         print(f"❌ Unexpected error executing query: {e}")
         import traceback
         traceback.print_exc()
         results = {"error": str(e)}
-    finally:
-        # ✅ NEW: Always return connection to pool
-        return_connection(conn)
     
     return results
 
 
+# relation name -> (exists, time.monotonic() of the probe)
+_relation_probes: Dict[str, tuple] = {}
+
+
+def relation_exists(name: str) -> bool:
+    """
+    True when table/view `name` exists (to_regclass). Answers are cached for
+    RELATION_PROBE_INTERVAL seconds, so a migration applied (or rolled back)
+    while the app runs is picked up without a restart.
+    """
+    now = time.monotonic()
+    cached = _relation_probes.get(name)
+    if cached and now - cached[1] < RELATION_PROBE_INTERVAL:
+        return cached[0]
+    rows = execute_query("SELECT to_regclass(%s) IS NOT NULL AS present", (name,))
+    if isinstance(rows, dict) and "error" in rows:
+        raise Exception(rows["error"])
+    present = rows[0]["present"]
+    _relation_probes[name] = (present, now)
+    return present
+
+
 def verify_patient_login(patient_id, mobile_number):
     """
     Verifies patient login credentials using patient_id and contact_number.
@@ -153,10 +249,8 @@ def verify_patient_login(patient_id, mobile_number):
         dict: Patient information if credentials are valid
         None: If credentials are invalid or patient not found
     """
-    conn = get_db_connection()
-    
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
             query = """
                 SELECT 
                     patient_id,
@@ -175,7 +269,7 @@ def verify_patient_login(patient_id, mobile_number):
             """
             
             print(f"🔐 Verifying login - ID: {patient_id} (type: {type(patient_id).__name__}), Mobile: '{mobile_number}'")
-            cursor.execute(query, (patient_id, mobile_number))
+            execute_prepared(cursor, query, (patient_id, mobile_number))
             patient = cursor.fetchone()
             
             if patient:
@@ -198,12 +292,113 @@ def verify_patient_login(patient_id, mobile_number):
     except Exception as e:
         print(f"❌ Error verifying patient login: {e}")
         raise e
-        
-    finally:
-        conn.close()
 
 
-# specific imports depend on your existing db setup (e.g., psycopg2, sqlite3, sqlalchemy)
+def room_types_for_severity(severity_level):
+    """Maps severity to room type priority"""
+    if severity_level in ['Emergency', 'Critical']:
+        return ['Emergency', 'ICU', 'Private Room', 'General Ward']
+    elif severity_level == 'High':
+        return ['ICU', 'Private Room', 'General Ward']
+    return ['General Ward', 'Private Room']
+
+
+# First free bed by room type priority, least occupied room first
+_AVAILABLE_ROOM_SQL = """
+    SELECT 
+        room_id, 
+        room_number, 
+        room_type,
+        wing,
+        floor_number,
+        bed_capacity,
+        current_occupancy
+    FROM rooms
+    WHERE room_type = ANY(%s)
+      AND status = 'Available'
+      AND current_occupancy < bed_capacity
+    ORDER BY array_position(%s::text[], room_type::text), current_occupancy ASC
+    LIMIT 1
+"""
+
+# 1. JOIN doctors and departments tables.
+# 2. Filter where department_name matches our prediction (case-insensitive).
+# 3. Filter where doctor is_available is TRUE.
+# 4. Order by workload to assign less busy doctors first.
+# 5. LIMIT 1 to get just one doctor.
+_AVAILABLE_DOCTOR_SQL = """
+    SELECT 
+        d.doctor_id, 
+        d.first_name, 
+        d.last_name, 
+        d.doctor_room_number,
+        d.consultation_fee,
+        dept.department_id,
+        dept.department_name
+    FROM doctors d
+    JOIN departments dept ON d.department_id = dept.department_id
+    WHERE LOWER(TRIM(dept.department_name)) = LOWER(TRIM(%s))
+      AND d.is_available = TRUE
+    ORDER BY d.current_workload ASC
+    LIMIT 1
+"""
+
+_INSERT_PATIENT_SQL = """
+    INSERT INTO patients (
+        first_name, last_name, dob, gender, blood_group,
+        contact_number, emergency_contact, emergency_contact_name,
+        email, address, city, state, pincode,
+        registered_date, is_active
+    ) VALUES (
+        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_DATE, TRUE
+    ) RETURNING patient_id;
+"""
+
+_INSERT_APPOINTMENT_SQL = """
+    INSERT INTO appointments (
+        patient_id, doctor_id, department_id, room_id,
+        appointment_date, patient_problem_text, symptoms,
+        predicted_specialty, predicted_severity, confidence_score,
+        appointment_type, status
+    ) VALUES (
+        %s, %s, %s, %s, CURRENT_TIMESTAMP, %s, %s, %s, %s, %s, 'Emergency', 'Scheduled'
+    ) RETURNING appointment_id;
+"""
+
+# Only takes a bed that is still free, so it can never push a room over capacity
+_OCCUPY_ROOM_SQL = """
+    UPDATE rooms 
+    SET current_occupancy = current_occupancy + 1,
+        status = CASE 
+            WHEN current_occupancy + 1 >= bed_capacity THEN 'Occupied'
+            ELSE 'Available'
+        END
+    WHERE room_id = %s
+      AND current_occupancy < bed_capacity;
+"""
+
+
+def _doctor_row(doctor):
+    return {
+        "doctor_id": doctor['doctor_id'],
+        "first_name": doctor['first_name'],
+        "last_name": doctor['last_name'],
+        "room_number": doctor['doctor_room_number'],
+        "consultation_fee": float(doctor['consultation_fee']),
+        "department_id": doctor['department_id'],
+        "department_name": doctor['department_name']
+    }
+
+
+def _room_row(room):
+    return {
+        "room_id": room['room_id'],
+        "room_number": room['room_number'],
+        "room_type": room['room_type'],
+        "wing": room['wing'],
+        "floor_number": room['floor_number']
+    }
+
 
 def get_available_doctor(department_name):
     """
@@ -219,58 +414,30 @@ def get_available_doctor(department_name):
     Raises:
         Exception: If database query fails
     """
-    conn = get_db_connection()
-    
     try:
         # Use RealDictCursor to get results as dictionaries instead of tuples
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            # SQL Query:
-            # 1. JOIN doctors and departments tables.
-            # 2. Filter where department_name matches our prediction (case-insensitive).
-            # 3. Filter where doctor is_available is TRUE.
-            # 4. Order by workload to assign less busy doctors first.
-            # 5. LIMIT 1 to get just one doctor.
-            
-            query = """
-                SELECT 
-                    d.doctor_id, 
-                    d.first_name, 
-                    d.last_name, 
-                    d.doctor_room_number,
-                    d.consultation_fee,
-                    dept.department_id,
-                    dept.department_name
-                FROM doctors d
-                JOIN departments dept ON d.department_id = dept.department_id
-                WHERE LOWER(TRIM(dept.department_name)) = LOWER(TRIM(%s))
-                  AND d.is_available = TRUE
-                ORDER BY d.current_workload ASC
-                LIMIT 1;
-            """
-            
+        with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
             # Use parameterized query to prevent SQL injection
-            cursor.execute(query, (department_name,))
+            execute_prepared(cursor, _AVAILABLE_DOCTOR_SQL, (department_name,))
             doctor = cursor.fetchone()
             
             # Return a dictionary for easier usage
-            if doctor:
-                return {
-                    "doctor_id": doctor['doctor_id'],
-                    "first_name": doctor['first_name'],
-                    "last_name": doctor['last_name'],
-                    "room_number": doctor['doctor_room_number'],
-                    "consultation_fee": float(doctor['consultation_fee']),
-                    "department_id": doctor['department_id'],
-                    "department_name": doctor['department_name']
-                }
-            return None
+            return _doctor_row(doctor) if doctor else None
             
     except Exception as e:
         print(f"❌ Error fetching available doctor: {e}")
         raise e
-        
-    finally:
-        conn.close()
+
+
+def _find_room(cursor, severity_level):
+    """Best room with a free bed (nothing is reserved): bed board first, then SQL"""
+    room_types = room_types_for_severity(severity_level)
+    room = bed_board.find(room_types)
+    if not room:
+        # One query walks the room types in priority order
+        execute_prepared(cursor, _AVAILABLE_ROOM_SQL, (room_types, room_types))
+        room = cursor.fetchone()
+    return _room_row(room) if room else None
 
 
 def get_available_room(severity_level, department_id=None):
@@ -285,57 +452,79 @@ def get_available_room(severity_level, department_id=None):
         dict: Room information with room_id, room_number, room_type
         None: If no available room is found
     """
-    conn = get_db_connection()
-    
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            # Map severity to room type priority
-            if severity_level in ['Emergency', 'Critical']:
-                room_types = ['Emergency', 'ICU', 'Private Room', 'General Ward']
-            elif severity_level == 'High':
-                room_types = ['ICU', 'Private Room', 'General Ward']
-            else:
-                room_types = ['General Ward', 'Private Room']
-            
-            # Find first available room
-            for room_type in room_types:
-                query = """
-                    SELECT 
-                        room_id, 
-                        room_number, 
-                        room_type,
-                        wing,
-                        floor_number,
-                        bed_capacity,
-                        current_occupancy
-                    FROM rooms
-                    WHERE room_type = %s 
-                      AND status = 'Available'
-                      AND current_occupancy < bed_capacity
-                    ORDER BY current_occupancy ASC
-                    LIMIT 1;
-                """
-                
-                cursor.execute(query, (room_type,))
-                room = cursor.fetchone()
-                
-                if room:
-                    return {
-                        "room_id": room['room_id'],
-                        "room_number": room['room_number'],
-                        "room_type": room['room_type'],
-                        "wing": room['wing'],
-                        "floor_number": room['floor_number']
-                    }
-            
-            return None
+        room = bed_board.find(room_types_for_severity(severity_level))
+        if room:
+            return _room_row(room)
+        with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            return _find_room(cursor, severity_level)
             
     except Exception as e:
         print(f"❌ Error fetching available room: {e}")
         raise e
-        
-    finally:
-        conn.close()
+
+
+def _insert_patient(cursor, patient_data):
+    execute_prepared(cursor, _INSERT_PATIENT_SQL, (
+        patient_data.get('first_name'),
+        patient_data.get('last_name'),
+        patient_data.get('dob'),
+        patient_data.get('gender'),
+        patient_data.get('blood_group'),
+        patient_data.get('contact_number'),
+        patient_data.get('emergency_contact'),
+        patient_data.get('emergency_contact_name'),
+        patient_data.get('email'),
+        patient_data.get('address'),
+        patient_data.get('city'),
+        patient_data.get('state'),
+        patient_data.get('pincode')
+    ))
+    return cursor.fetchone()['patient_id']
+
+
+def _insert_appointment(cursor, appointment_data):
+    execute_prepared(cursor, _INSERT_APPOINTMENT_SQL, (
+        appointment_data.get('patient_id'),
+        appointment_data.get('doctor_id'),
+        appointment_data.get('department_id'),
+        appointment_data.get('room_id'),
+        appointment_data.get('problem_description'),
+        appointment_data.get('symptoms'),
+        appointment_data.get('predicted_specialty'),
+        appointment_data.get('severity'),
+        appointment_data.get('confidence_score')
+    ))
+    return cursor.fetchone()['appointment_id']
+
+
+def _occupy_room(cursor, room_id):
+    execute_prepared(cursor, _OCCUPY_ROOM_SQL, (room_id,))
+    if cursor.rowcount != 1:
+        raise Exception(f"Room {room_id} has no free bed")
+
+
+def take_room(conn, severity_level):
+    """
+    Takes a bed for the severity inside conn's open transaction.
+    
+    Uses the bed board when it is running; otherwise (or when the board
+    has nothing) picks the room with FOR UPDATE SKIP LOCKED. If the
+    transaction does not commit, call bed_board.invalidate(room_id).
+    
+    Returns:
+        dict: Room information (as get_available_room)
+        None: If every matching room is full
+    """
+    room_types = room_types_for_severity(severity_level)
+    room = bed_board.reserve(conn, room_types)
+    if room is None:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            execute_prepared(cursor, _AVAILABLE_ROOM_SQL + "FOR UPDATE SKIP LOCKED", (room_types, room_types))
+            room = cursor.fetchone()
+            if room:
+                _occupy_room(cursor, room['room_id'])
+    return _room_row(room) if room else None
 
 
 def create_emergency_patient(patient_data):
@@ -351,50 +540,13 @@ def create_emergency_patient(patient_data):
     Raises:
         Exception: If insertion fails
     """
-    conn = get_db_connection()
-    
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            query = """
-                INSERT INTO patients (
-                    first_name, last_name, dob, gender, blood_group,
-                    contact_number, emergency_contact, emergency_contact_name,
-                    email, address, city, state, pincode,
-                    registered_date, is_active
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_DATE, TRUE
-                ) RETURNING patient_id;
-            """
-            
-            cursor.execute(query, (
-                patient_data.get('first_name'),
-                patient_data.get('last_name'),
-                patient_data.get('dob'),
-                patient_data.get('gender'),
-                patient_data.get('blood_group'),
-                patient_data.get('contact_number'),
-                patient_data.get('emergency_contact'),
-                patient_data.get('emergency_contact_name'),
-                patient_data.get('email'),
-                patient_data.get('address'),
-                patient_data.get('city'),
-                patient_data.get('state'),
-                patient_data.get('pincode')
-            ))
-            
-            result = cursor.fetchone()
-            patient_id = result['patient_id']
-            conn.commit()
-            
-            return patient_id
+        with transaction() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            return _insert_patient(cursor, patient_data)
             
     except Exception as e:
-        conn.rollback()
         print(f"❌ Error creating patient: {e}")
         raise e
-        
-    finally:
-        conn.close()
 
 
 def create_emergency_appointment(appointment_data):
@@ -407,57 +559,72 @@ def create_emergency_appointment(appointment_data):
     Returns:
         int: appointment_id of newly created appointment
     """
-    conn = get_db_connection()
-    
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            query = """
-                INSERT INTO appointments (
-                    patient_id, doctor_id, department_id, room_id,
-                    appointment_date, patient_problem_text, symptoms,
-                    predicted_specialty, predicted_severity, confidence_score,
-                    appointment_type, status
-                ) VALUES (
-                    %s, %s, %s, %s, CURRENT_TIMESTAMP, %s, %s, %s, %s, %s, 'Emergency', 'Scheduled'
-                ) RETURNING appointment_id;
-            """
-            
-            cursor.execute(query, (
-                appointment_data.get('patient_id'),
-                appointment_data.get('doctor_id'),
-                appointment_data.get('department_id'),
-                appointment_data.get('room_id'),
-                appointment_data.get('problem_description'),
-                appointment_data.get('symptoms'),
-                appointment_data.get('predicted_specialty'),
-                appointment_data.get('severity'),
-                appointment_data.get('confidence_score')
-            ))
-            
-            result = cursor.fetchone()
-            appointment_id = result['appointment_id']
-            conn.commit()
-            
-            # Update room occupancy
+        with transaction() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            appointment_id = _insert_appointment(cursor, appointment_data)
+            # Room occupancy is committed together with the appointment
             if appointment_data.get('room_id'):
-                update_query = """
-                    UPDATE rooms 
-                    SET current_occupancy = current_occupancy + 1,
-                        status = CASE 
-                            WHEN current_occupancy + 1 >= bed_capacity THEN 'Occupied'
-                            ELSE 'Available'
-                        END
-                    WHERE room_id = %s;
-                """
-                cursor.execute(update_query, (appointment_data.get('room_id'),))
-                conn.commit()
-            
+                _occupy_room(cursor, appointment_data.get('room_id'))
             return appointment_id
             
     except Exception as e:
-        conn.rollback()
         print(f"❌ Error creating appointment: {e}")
         raise e
+
+
+def admit_emergency_patient(patient_data, department_name, severity_level, appointment_data):
+    """
+    Registers an emergency patient in one transaction on one connection:
+    insert patient, pick + lock a doctor, take a bed (take_room), insert the
+    appointment. Everything commits together or not at all.
+    
+    Doctors are picked with FOR UPDATE SKIP LOCKED, so parallel intakes never
+    wait on each other; beds are taken with a conditional UPDATE, so two
+    intakes never get the same last bed.
+    
+    Args:
+        patient_data (dict): Patient information (as for create_emergency_patient)
+        department_name (str): Predicted department
+        severity_level (str): Severity used for room type priority
+        appointment_data (dict): problem_description, symptoms, predicted_specialty,
+                                 severity, confidence_score
         
-    finally:
-        conn.close()
\ No newline at end of file
+    Returns:
+        dict: patient_id, doctor (or None), room (or None), appointment_id (or None)
+    """
+    room = None
+    try:
+        with transaction() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            patient_id = _insert_patient(cursor, patient_data)
+            
+            execute_prepared(cursor, _AVAILABLE_DOCTOR_SQL + "FOR UPDATE OF d SKIP LOCKED", (department_name,))
+            doctor = cursor.fetchone()
+            if not doctor:
+                # Doctors are shared, not exclusive: if every match is locked by
+                # another intake right now, still assign the least busy one
+                execute_prepared(cursor, _AVAILABLE_DOCTOR_SQL, (department_name,))
+                doctor = cursor.fetchone()
+            
+            appointment_id = None
+            if doctor:  # Only create appointment (and take the bed) if a doctor is available
+                room = take_room(conn, severity_level)
+                appointment_id = _insert_appointment(cursor, {
+                    **appointment_data,
+                    "patient_id": patient_id,
+                    "doctor_id": doctor['doctor_id'],
+                    "department_id": doctor['department_id'],
+                    "room_id": room['room_id'] if room else None,
+                })
+            
+            return {
+                "patient_id": patient_id,
+                "doctor": _doctor_row(doctor) if doctor else None,
+                "room": room if doctor else _find_room(cursor, severity_level),
+                "appointment_id": appointment_id
+            }
+            
+    except Exception as e:
+        if room:
+            bed_board.invalidate(room['room_id'])
+        print(f"❌ Error during emergency intake: {e}")
+        raise e
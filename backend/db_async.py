@@ -0,0 +1,249 @@
+"""
+Asyncio database access for async route handlers.
+
+The synchronous execute_query in db.py blocks the event loop for the whole
+round trip. This module keeps its own connection pool and runs
+every statement on a dedicated thread executor that has exactly one
+thread per pooled connection. Awaiting a query therefore never blocks the
+loop, and the pool can never be asked for more connections than it holds.
+
+    rows = await fetch("SELECT * FROM users WHERE username = %s", (name,), prepare=True)
+    row = await fetch_one("SELECT COUNT(*) AS count FROM doctors")
+    await execute("DELETE FROM users WHERE user_id = %s", (user_id,))
+    await insert_many("INSERT INTO audit_logs (username, role, question) VALUES %s", log_rows)
+
+    async with transaction() as tx:
+        await tx.execute(...)
+        rows = await tx.fetch(...)
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+from dotenv import load_dotenv
+
+from backend.db_pool import BoundedConnectionPool
+from backend.db_prepared import PreparedStatementConnection, execute_prepared
+
+load_dotenv()
+
+ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "20"))
+ASYNC_POOL_MIN = min(int(os.getenv("DB_ASYNC_POOL_MIN", "2")), ASYNC_POOL_SIZE)
+
+_pool: Optional[BoundedConnectionPool] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_init_lock = asyncio.Lock()
+
+
+async def init_async_pool():
+    """Open the async pool (called on startup; otherwise opened on first use)"""
+    async with _init_lock:
+        if _pool is None:
+            await _open_pool()
+
+
+async def _open_pool():
+    global _pool, _executor, _slots
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        raise Exception("DATABASE_URL environment variable not set.")
+
+    _executor = ThreadPoolExecutor(max_workers=ASYNC_POOL_SIZE, thread_name_prefix="db-async")
+    _slots = asyncio.Semaphore(ASYNC_POOL_SIZE)
+    loop = asyncio.get_running_loop()
+    # Idle reaping / lifetime / validation settings are shared with the sync pool
+    new_pool = BoundedConnectionPool(
+        db_url,
+        minconn=ASYNC_POOL_MIN,
+        maxconn=ASYNC_POOL_SIZE,
+        idle_timeout=float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300")),
+        max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+        validate_after=float(os.getenv("DB_POOL_VALIDATE_AFTER", "30")),
+        name="db-async",
+        connection_factory=PreparedStatementConnection,
+    )
+    await loop.run_in_executor(_executor, new_pool.prewarm)
+    _pool = new_pool
+    print(f"✅ Async connection pool initialized ({ASYNC_POOL_MIN}-{ASYNC_POOL_SIZE} connections)")
+
+
+async def close_async_pool():
+    """Close all async pool connections (on shutdown)"""
+    global _pool, _executor, _slots
+    try:
+        if _pool is not None:
+            _pool.closeall()
+            print("✅ Async connection pool closed")
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+    except Exception as e:
+        print(f"⚠️ Error closing async connection pool: {e}")
+    finally:
+        _pool, _executor, _slots = None, None, None
+
+
+def async_pool_stats() -> Dict[str, Any]:
+    """Pool gauges for /metrics"""
+    if _pool is None:
+        return {"initialized": False}
+    return {"initialized": True, **_pool.stats()}
+
+
+def _run_statement(conn, sql: str, params: Optional[Sequence[Any]], prepare: bool = False) -> tuple:
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        if prepare:
+            execute_prepared(cur, sql, params)
+        else:
+            cur.execute(sql, params)
+        rows = [dict(row) for row in cur.fetchall()] if cur.description else []
+        return rows, cur.rowcount
+
+
+def _autocommit_statement(sql: str, params: Optional[Sequence[Any]], prepare: bool) -> tuple:
+    """Runs on an executor thread: checkout, execute, commit, return to pool"""
+    conn = _pool.getconn()
+    try:
+        result = _run_statement(conn, sql, params, prepare)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _pool.putconn(conn)
+
+
+def _read_only_statement(sql: str, params: Optional[Sequence[Any]]) -> tuple:
+    """Runs on an executor thread: one statement in a READ ONLY transaction, always rolled back"""
+    conn = _pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION READ ONLY")
+        return _run_statement(conn, sql, params)
+    finally:
+        conn.rollback()
+        _pool.putconn(conn)
+
+
+def _single_statement(sql: str) -> str:
+    # A second statement could COMMIT and start a read-write transaction
+    sql = sql.strip().rstrip(";").rstrip()
+    if ";" in sql:
+        raise ValueError("Only a single SQL statement is allowed")
+    return sql
+
+
+async def _submit(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, fn, *args)
+
+
+async def fetch(sql: str, params: Optional[Sequence[Any]] = None,
+                prepare: bool = False, read_only: bool = False) -> List[Dict[str, Any]]:
+    """
+    Run a statement in its own transaction; returns all rows as dicts.
+    prepare=True runs it as a server-side prepared statement (see db_prepared).
+    read_only=True is for user- or LLM-supplied SQL: exactly one statement,
+    in a READ ONLY transaction that is rolled back, so it can never write.
+    """
+    if _pool is None:
+        await init_async_pool()
+    if read_only:
+        sql = _single_statement(sql)
+    async with _slots:
+        if read_only:
+            rows, _ = await _submit(_read_only_statement, sql, params)
+        else:
+            rows, _ = await _submit(_autocommit_statement, sql, params, prepare)
+    return rows
+
+
+async def fetch_one(sql: str, params: Optional[Sequence[Any]] = None,
+                    prepare: bool = False) -> Optional[Dict[str, Any]]:
+    """Like fetch(), but returns only the first row (or None)"""
+    rows = await fetch(sql, params, prepare)
+    return rows[0] if rows else None
+
+
+async def execute(sql: str, params: Optional[Sequence[Any]] = None, prepare: bool = False) -> int:
+    """Run a write statement in its own transaction; returns the affected row count"""
+    if _pool is None:
+        await init_async_pool()
+    async with _slots:
+        _, rowcount = await _submit(_autocommit_statement, sql, params, prepare)
+    return rowcount
+
+
+def _autocommit_values(sql: str, rows: Sequence[Sequence[Any]], template: Optional[str], page_size: int) -> int:
+    """Runs on an executor thread: multi-row INSERT ... VALUES %s in one transaction"""
+    conn = _pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            execute_values(cur, sql, rows, template=template, page_size=page_size)
+        conn.commit()
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _pool.putconn(conn)
+
+
+async def insert_many(sql: str, rows: Sequence[Sequence[Any]], template: Optional[str] = None,
+                      page_size: int = 1000) -> int:
+    """
+    Insert many rows with multi-row VALUES lists in one transaction.
+    `sql` has a single %s where the VALUES list goes (psycopg2 execute_values).
+    """
+    if not rows:
+        return 0
+    if _pool is None:
+        await init_async_pool()
+    async with _slots:
+        return await _submit(_autocommit_values, sql, rows, template, page_size)
+
+
+class AsyncTransaction:
+    """Statements issued through this object share one connection and one transaction"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def fetch(self, sql: str, params: Optional[Sequence[Any]] = None,
+                    prepare: bool = False) -> List[Dict[str, Any]]:
+        rows, _ = await _submit(_run_statement, self._conn, sql, params, prepare)
+        return rows
+
+    async def fetch_one(self, sql: str, params: Optional[Sequence[Any]] = None,
+                        prepare: bool = False) -> Optional[Dict[str, Any]]:
+        rows = await self.fetch(sql, params, prepare)
+        return rows[0] if rows else None
+
+    async def execute(self, sql: str, params: Optional[Sequence[Any]] = None, prepare: bool = False) -> int:
+        _, rowcount = await _submit(_run_statement, self._conn, sql, params, prepare)
+        return rowcount
+
+
+@asynccontextmanager
+async def transaction():
+    """Commit on clean exit, roll back if the block raises"""
+    if _pool is None:
+        await init_async_pool()
+    async with _slots:
+        conn = await _submit(_pool.getconn)
+        try:
+            yield AsyncTransaction(conn)
+            await _submit(conn.commit)
+        except BaseException:
+            try:
+                await _submit(conn.rollback)
+            except psycopg2.Error:
+                pass
+            raise
+        finally:
+            _pool.putconn(conn)
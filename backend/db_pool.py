@@ -0,0 +1,300 @@
+"""
+Thread-safe PostgreSQL connection pool with a bounded wait queue.
+
+psycopg2's SimpleConnectionPool is not thread-safe, and both psycopg2 pools
+raise immediately when every connection is checked out. This pool lets
+callers wait (up to a timeout) for a connection instead, so overload turns
+into queueing latency rather than errors. It also:
+
+- opens `minconn` connections up front (prewarm) and keeps at least that many
+- closes idle connections beyond `minconn` after `idle_timeout` seconds
+- recycles connections older than `max_lifetime` seconds
+- pings connections that sat idle longer than `validate_after` seconds
+
+    pool = BoundedConnectionPool(dsn, minconn=2, maxconn=20, timeout=10)
+    pool.prewarm()
+    conn = pool.getconn()
+    try:
+        ...
+    finally:
+        pool.putconn(conn)
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+
+class PoolTimeout(PoolError):
+    """No connection became free within the checkout timeout"""
+
+
+class _Slot:
+    __slots__ = ("conn", "created", "last_used")
+
+    def __init__(self, conn, created: float, last_used: float):
+        self.conn = conn
+        self.created = created
+        self.last_used = last_used
+
+
+class BoundedConnectionPool:
+    """Connection pool whose getconn() waits for a free connection"""
+
+    def __init__(self, dsn: str, minconn: int = 2, maxconn: int = 20, timeout: float = 10.0,
+                 idle_timeout: float = 300.0, max_lifetime: float = 1800.0,
+                 validate_after: float = 30.0, name: str = "db", connection_factory=None):
+        if maxconn < 1 or minconn < 0 or minconn > maxconn:
+            raise ValueError(f"Invalid pool size: min={minconn}, max={maxconn}")
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.validate_after = validate_after
+        self.name = name
+        self.connection_factory = connection_factory
+        self.closed = False
+
+        self._cond = threading.Condition()
+        self._idle: Deque[_Slot] = deque()
+        self._in_use: Dict[int, _Slot] = {}
+        self._opening = 0
+        self._waiting = 0
+        self._reaper: Optional[threading.Thread] = None
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._reaped = 0
+        self._recycled = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+
+    # --- lifecycle ---
+
+    def prewarm(self):
+        """Open connections up to minconn and start the idle reaper"""
+        self._refill()
+        with self._cond:
+            if self._reaper is None and not self.closed:
+                self._reaper = threading.Thread(target=self._reap_loop, name=f"{self.name}-pool-reaper",
+                                                daemon=True)
+                self._reaper.start()
+
+    def closeall(self):
+        """Close idle connections now; in-use ones are closed when returned"""
+        with self._cond:
+            self.closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for slot in idle:
+            self._close(slot.conn)
+
+    # --- checkout / checkin ---
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Return a validated connection, waiting up to `timeout` seconds for one to free up"""
+        started = time.perf_counter()
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            slot = self._acquire_slot(deadline)
+            if slot is None:
+                slot = self._open_slot()
+            elif not self._is_usable(slot):
+                self._discard(slot)
+                continue
+            break
+
+        wait_ms = (time.perf_counter() - started) * 1000
+        with self._cond:
+            self._checkouts += 1
+            self._wait_ms_total += wait_ms
+            self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+        return slot.conn
+
+    def putconn(self, conn, close: bool = False):
+        """Give a connection back; rolls back open transactions, recycles broken or old ones"""
+        with self._cond:
+            slot = self._in_use.get(id(conn))
+        if slot is None or slot.conn is not conn:
+            raise PoolError("trying to put unkeyed connection")
+
+        broken = close or conn.closed or \
+            conn.info.transaction_status == extensions.TRANSACTION_STATUS_UNKNOWN
+        if not broken and conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+
+        now = time.monotonic()
+        expired = now - slot.created >= self.max_lifetime
+        with self._cond:
+            del self._in_use[id(conn)]
+            keep = not (broken or expired or self.closed)
+            if keep:
+                slot.last_used = now
+                self._idle.append(slot)
+            elif broken:
+                self._discarded += 1
+            elif expired:
+                self._recycled += 1
+            self._cond.notify()
+        if not keep:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Gauges and counters for /metrics"""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "opening": self._opening,
+                "waiting": self._waiting,
+                "min": self.minconn,
+                "max": self.maxconn,
+                "checkouts": checkouts,
+                "exhausted": self._timeouts,
+                "discarded": self._discarded,
+                "reaped": self._reaped,
+                "recycled": self._recycled,
+                "wait_ms_avg": round(self._wait_ms_total / checkouts, 3) if checkouts else 0.0,
+                "wait_ms_max": round(self._wait_ms_max, 3),
+            }
+
+    # --- internals ---
+
+    def _total(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _acquire_slot(self, deadline: float) -> Optional[_Slot]:
+        """Pops an idle slot, or reserves room for a new connection (returns None)"""
+        with self._cond:
+            while True:
+                if self.closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    slot = self._idle.pop()  # most recently used first
+                    self._in_use[id(slot.conn)] = slot
+                    return slot
+                if self._total() < self.maxconn:
+                    self._opening += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"connection pool exhausted: no connection free within {self.timeout:g}s "
+                        f"({self.maxconn} in use)"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _open_slot(self) -> _Slot:
+        """Opens a connection for a reservation made by _acquire_slot/_refill"""
+        try:
+            conn = psycopg2.connect(self.dsn, connection_factory=self.connection_factory)
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        now = time.monotonic()
+        slot = _Slot(conn, now, now)
+        with self._cond:
+            self._opening -= 1
+            self._in_use[id(conn)] = slot
+        return slot
+
+    def _is_usable(self, slot: _Slot) -> bool:
+        conn = slot.conn
+        if conn.closed or conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        now = time.monotonic()
+        if now - slot.created >= self.max_lifetime:
+            return False
+        if now - slot.last_used >= self.validate_after:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _discard(self, slot: _Slot):
+        with self._cond:
+            self._in_use.pop(id(slot.conn), None)
+            if time.monotonic() - slot.created >= self.max_lifetime:
+                self._recycled += 1
+            else:
+                self._discarded += 1
+            self._cond.notify()
+        self._close(slot.conn)
+
+    def _refill(self):
+        """Opens connections until there are at least minconn"""
+        while True:
+            with self._cond:
+                if self.closed or self._total() >= self.minconn:
+                    return
+                self._opening += 1
+            try:
+                slot = self._open_slot()
+            except psycopg2.Error as e:
+                print(f"⚠️ {self.name} pool could not open connection: {e}")
+                return
+            self.putconn(slot.conn)
+
+    def _reap_loop(self):
+        interval = max(1.0, min(self.idle_timeout, self.max_lifetime) / 4)
+        while True:
+            time.sleep(interval)
+            if self.closed:
+                return
+            self.reap()
+
+    def reap(self):
+        """Closes idle connections past idle_timeout (down to minconn) or past max_lifetime"""
+        now = time.monotonic()
+        victims: List[Tuple[_Slot, bool]] = []
+        with self._cond:
+            keep: Deque[_Slot] = deque()
+            total = self._total()
+            for slot in self._idle:  # oldest-used first
+                if now - slot.created >= self.max_lifetime:
+                    victims.append((slot, True))
+                    total -= 1
+                elif now - slot.last_used >= self.idle_timeout and total > self.minconn:
+                    victims.append((slot, False))
+                    total -= 1
+                else:
+                    keep.append(slot)
+            self._idle = keep
+            for _, expired in victims:
+                if expired:
+                    self._recycled += 1
+                else:
+                    self._reaped += 1
+            if victims:
+                self._cond.notify_all()
+        for slot, _ in victims:
+            self._close(slot.conn)
+        self._refill()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
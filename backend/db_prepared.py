@@ -0,0 +1,113 @@
+"""
+Server-side prepared statements, cached per connection.
+
+Connections opened by the pools use PreparedStatementConnection, which
+remembers which statement texts it has already PREPAREd. The first call
+with a given SQL text runs PREPARE once; every later call on the same
+connection only sends EXECUTE, so PostgreSQL skips parsing and (after a
+few runs, once it settles on a generic plan) planning.
+
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        execute_prepared(cur, "SELECT * FROM users WHERE username = %s", (name,))
+
+Only positional %s placeholders are supported. Use it for fixed statement
+texts that run often; ad-hoc SQL should go through a plain cursor.execute().
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import psycopg2
+from psycopg2 import extensions
+
+# Statements kept per connection before the least recently used is DEALLOCATEd
+PREPARED_CACHE_SIZE = int(os.getenv("DB_PREPARED_CACHE_SIZE", "100"))
+
+_PLACEHOLDER = re.compile(r"%%|%s|%\(")
+
+_stats_lock = threading.Lock()
+_stats = {"prepares": 0, "executions": 0, "deallocations": 0}
+
+
+class PreparedStatementConnection(extensions.connection):
+    """psycopg2 connection that carries its own prepared-statement cache"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._next_statement = 0
+
+    def next_statement_name(self) -> str:
+        self._next_statement += 1
+        return f"hms_ps_{self._next_statement}"
+
+
+def to_server_placeholders(sql: str) -> Tuple[str, int]:
+    """Rewrites %s placeholders as $1..$n (and %% as %); returns (sql, n)"""
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        token = match.group(0)
+        if token == "%%":
+            return "%"
+        if token == "%(":
+            raise ValueError("Named placeholders are not supported for prepared statements")
+        count += 1
+        return f"${count}"
+
+    return _PLACEHOLDER.sub(replace, sql), count
+
+
+def execute_prepared(cur, sql: str, params: Optional[Sequence[Any]] = None):
+    """
+    Run `sql` on `cur` as a server-side prepared statement.
+
+    Falls back to a plain execute on connections without a statement cache.
+    """
+    conn = cur.connection
+    if not isinstance(conn, PreparedStatementConnection):
+        cur.execute(sql, params)
+        return
+
+    entry = conn.prepared.get(sql)
+    if entry is None:
+        server_sql, nparams = to_server_placeholders(sql) if params is not None else (sql, 0)
+        name = conn.next_statement_name()
+        cur.execute(f"PREPARE {name} AS {server_sql}")
+        entry = (name, nparams)
+        conn.prepared[sql] = entry
+        _count("prepares")
+        if len(conn.prepared) > PREPARED_CACHE_SIZE:
+            _, (old_name, _) = conn.prepared.popitem(last=False)
+            cur.execute(f"DEALLOCATE {old_name}")
+            _count("deallocations")
+    else:
+        conn.prepared.move_to_end(sql)
+
+    name, nparams = entry
+    params = tuple(params) if params is not None else ()
+    if len(params) != nparams:
+        raise psycopg2.ProgrammingError(
+            f"Prepared statement expects {nparams} parameters, got {len(params)}"
+        )
+    if nparams:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * nparams)})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+    _count("executions")
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def prepared_stats() -> Dict[str, Any]:
+    """Process-wide prepare/execute counters for /metrics"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["reuse_ratio"] = round(1 - stats["prepares"] / stats["executions"], 4) if stats["executions"] else 0.0
+    return stats
@@ -0,0 +1,211 @@
+"""
+Patient and doctor deletion: set-based DELETEs in one transaction.
+
+delete_patients / delete_doctors take a list of ids and remove them with
+one statement per table (`WHERE patient_id = ANY(%s)`), children first, on
+one connection in one transaction. Either every row goes or none does.
+The requested rows are locked first, in id order, so concurrent deletes of
+overlapping lists queue up instead of deadlocking. Ids that don't exist are
+reported as `missing`.
+
+Doctors are removed together with the clinical rows they authored
+(appointments, medical records, prescriptions, lab tests, care
+assignments). Rows that only mention them are unlinked instead: invoices
+lose the appointment reference, allergies lose diagnosed_by and
+departments lose head_doctor_id. A doctor who is still the primary doctor
+on an admission cannot be deleted (DeletionBlocked); reassign it first.
+
+Large lists go through start_purge(), a background job that deletes
+DELETE_PURGE_CHUNK ids per transaction, so no single transaction holds
+locks on a large share of the tables. Each chunk is atomic; if one fails,
+the job stops there and earlier chunks stay deleted.
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.db import transaction
+
+PURGE_CHUNK = int(os.getenv("DELETE_PURGE_CHUNK", "500"))
+BACKGROUND_THRESHOLD = int(os.getenv("DELETE_BACKGROUND_THRESHOLD", "1000"))
+MAX_JOBS = 100
+
+# (table, "deleted" | "unlinked", SQL); every %s is the id array
+Step = Tuple[str, str, str]
+
+PATIENT_STEPS: List[Step] = [
+    ("prescriptions", "deleted", "DELETE FROM prescriptions WHERE patient_id = ANY(%s)"),
+    ("lab_tests", "deleted", "DELETE FROM lab_tests WHERE patient_id = ANY(%s)"),
+    ("medical_records", "deleted", "DELETE FROM medical_records WHERE patient_id = ANY(%s)"),
+    ("invoices", "deleted", "DELETE FROM invoices WHERE patient_id = ANY(%s)"),
+    ("allergies", "deleted", "DELETE FROM allergies WHERE patient_id = ANY(%s)"),
+    ("triage_results", "deleted", "DELETE FROM triage_results WHERE patient_id = ANY(%s)"),
+    ("patient_doctor_mapping", "deleted", "DELETE FROM patient_doctor_mapping WHERE patient_id = ANY(%s)"),
+    ("admission_doctor_care", "deleted", """
+        DELETE FROM admission_doctor_care
+        WHERE admission_id IN (SELECT admission_id FROM admissions WHERE patient_id = ANY(%s))
+    """),
+    ("appointments", "deleted", "DELETE FROM appointments WHERE patient_id = ANY(%s)"),
+    ("admissions", "deleted", "DELETE FROM admissions WHERE patient_id = ANY(%s)"),
+    ("patients", "deleted", "DELETE FROM patients WHERE patient_id = ANY(%s)"),
+]
+
+_DOCTOR_APPOINTMENTS = "(SELECT appointment_id FROM appointments WHERE doctor_id = ANY(%s))"
+
+DOCTOR_STEPS: List[Step] = [
+    ("prescriptions", "deleted",
+     f"DELETE FROM prescriptions WHERE doctor_id = ANY(%s) OR appointment_id IN {_DOCTOR_APPOINTMENTS}"),
+    ("lab_tests", "deleted",
+     f"DELETE FROM lab_tests WHERE doctor_id = ANY(%s) OR appointment_id IN {_DOCTOR_APPOINTMENTS}"),
+    ("medical_records", "deleted",
+     f"DELETE FROM medical_records WHERE doctor_id = ANY(%s) OR appointment_id IN {_DOCTOR_APPOINTMENTS}"),
+    ("invoices", "unlinked",
+     f"UPDATE invoices SET appointment_id = NULL WHERE appointment_id IN {_DOCTOR_APPOINTMENTS}"),
+    ("allergies", "unlinked", "UPDATE allergies SET diagnosed_by = NULL WHERE diagnosed_by = ANY(%s)"),
+    ("departments", "unlinked", "UPDATE departments SET head_doctor_id = NULL WHERE head_doctor_id = ANY(%s)"),
+    ("admission_doctor_care", "deleted", "DELETE FROM admission_doctor_care WHERE doctor_id = ANY(%s)"),
+    ("patient_doctor_mapping", "deleted", "DELETE FROM patient_doctor_mapping WHERE doctor_id = ANY(%s)"),
+    ("appointments", "deleted", "DELETE FROM appointments WHERE doctor_id = ANY(%s)"),
+    ("doctors", "deleted", "DELETE FROM doctors WHERE doctor_id = ANY(%s)"),
+]
+
+_LOCK_SQL = {
+    "patients": "SELECT patient_id FROM patients WHERE patient_id = ANY(%s) ORDER BY patient_id FOR UPDATE",
+    "doctors": "SELECT doctor_id FROM doctors WHERE doctor_id = ANY(%s) ORDER BY doctor_id FOR UPDATE",
+}
+
+_DOCTOR_BLOCKERS_SQL = """
+    SELECT primary_doctor_id, COUNT(*) FROM admissions
+    WHERE primary_doctor_id = ANY(%s)
+    GROUP BY primary_doctor_id
+    ORDER BY primary_doctor_id
+"""
+
+
+class DeletionBlocked(Exception):
+    """Rows that must be reassigned by hand still reference the ids"""
+
+
+def _run_steps(cur, steps: List[Step], ids: List[int], result: Dict[str, Any]):
+    for table, action, sql in steps:
+        cur.execute(sql, (ids,) * sql.count("%s"))
+        if cur.rowcount:
+            result[action][table] = result[action].get(table, 0) + cur.rowcount
+
+
+def _delete(kind: str, ids: Sequence[int]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    requested = sorted(set(int(i) for i in ids))
+    result: Dict[str, Any] = {"requested": len(requested), "deleted": {}, "unlinked": {}, "missing": []}
+    if requested:
+        with transaction() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_LOCK_SQL[kind], (requested,))
+                found = [row[0] for row in cur.fetchall()]
+                result["missing"] = sorted(set(requested) - set(found))
+                if found and kind == "doctors":
+                    cur.execute(_DOCTOR_BLOCKERS_SQL, (found,))
+                    blockers = cur.fetchall()
+                    if blockers:
+                        raise DeletionBlocked("Doctors are still the primary doctor on admissions: " +
+                                              ", ".join(f"{d} ({n})" for d, n in blockers))
+                if found:
+                    _run_steps(cur, PATIENT_STEPS if kind == "patients" else DOCTOR_STEPS, found, result)
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def delete_patients(patient_ids: Sequence[int]) -> Dict[str, Any]:
+    """Deletes the patients and everything recorded against them; returns rows per table"""
+    return _delete("patients", patient_ids)
+
+
+def delete_doctors(doctor_ids: Sequence[int]) -> Dict[str, Any]:
+    """Deletes the doctors and the clinical rows they authored; returns rows per table"""
+    return _delete("doctors", doctor_ids)
+
+
+# --- background purge ---
+
+class PurgeJob:
+    def __init__(self, kind: str, ids: Sequence[int], chunk_size: int):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.ids = sorted(set(int(i) for i in ids))
+        self.chunk_size = max(int(chunk_size), 1)
+        self.status = "queued"
+        self.processed = 0
+        self.chunks_done = 0
+        self.deleted: Dict[str, int] = {}
+        self.unlinked: Dict[str, int] = {}
+        self.missing = 0
+        self.error: Optional[str] = None
+        self.started_at = datetime.now()
+        self.elapsed_ms = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "requested": len(self.ids),
+            "processed": self.processed,
+            "chunk_size": self.chunk_size,
+            "chunks_done": self.chunks_done,
+            "deleted": dict(self.deleted),
+            "unlinked": dict(self.unlinked),
+            "missing": self.missing,
+            "error": self.error,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "elapsed_ms": round(self.elapsed_ms, 1),
+        }
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.status = "running"
+        try:
+            for start in range(0, len(self.ids), self.chunk_size):
+                chunk = self.ids[start:start + self.chunk_size]
+                result = await loop.run_in_executor(None, _delete, self.kind, chunk)
+                for action in ("deleted", "unlinked"):
+                    totals = getattr(self, action)
+                    for table, count in result[action].items():
+                        totals[table] = totals.get(table, 0) + count
+                self.missing += len(result["missing"])
+                self.processed += len(chunk)
+                self.chunks_done += 1
+                self.elapsed_ms = (time.perf_counter() - started) * 1000
+            self.status = "completed"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            print(f"❌ {self.kind} purge {self.id} stopped after {self.processed} ids: {e}")
+        self.elapsed_ms = (time.perf_counter() - started) * 1000
+
+
+_jobs: "OrderedDict[str, PurgeJob]" = OrderedDict()
+
+
+def start_purge(kind: str, ids: Sequence[int], chunk_size: int = PURGE_CHUNK) -> PurgeJob:
+    """Starts a background purge on the running loop; poll it with get_job()"""
+    if kind not in _LOCK_SQL:
+        raise ValueError(f"Unknown purge kind: {kind}")
+    job = PurgeJob(kind, ids, chunk_size)
+    job.task = asyncio.get_running_loop().create_task(job.run())
+    _jobs[job.id] = job
+    while len(_jobs) > MAX_JOBS:
+        oldest = next(iter(_jobs.values()))
+        if oldest.status in ("queued", "running"):
+            break
+        _jobs.popitem(last=False)
+    return job
+
+
+def get_job(job_id: str) -> Optional[PurgeJob]:
+    return _jobs.get(job_id)
@@ -0,0 +1,154 @@
+"""
+Unpaid invoice listing: keyset pagination and streaming export.
+
+Invoices are ordered oldest first (days_outstanding DESC), then by amount
+(total_amount DESC), then invoice_id. Each page returns an opaque cursor
+holding the last row's sort key; the next page starts strictly after it,
+so deep pages cost the same as the first one and rows inserted meanwhile
+don't shift the pages. The sort key is one comparable row value:
+
+    (COALESCE(issue_date, '-infinity'), COALESCE(-total_amount, -100000000), invoice_id)
+
+which keeps the old NULLs-first behaviour of the DESC ordering and matches
+idx_invoices_unpaid_keyset (database/migrations/002_unpaid_invoice_keyset.sql).
+
+Exports stream the same ordering through a server-side (named) cursor in
+chunks of EXPORT_CHUNK_ROWS, so memory stays flat however many rows match.
+"""
+import base64
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from backend.db import connection, execute_query
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+EXPORT_CHUNK_ROWS = int(os.getenv("BILLING_EXPORT_CHUNK_ROWS", "5000"))
+
+# Below the smallest DECIMAL(10, 2), so a NULL amount sorts like DESC NULLS FIRST
+_NULL_AMOUNT_KEY = "-100000000"
+
+_SORT_KEY = "COALESCE(i.issue_date, '-infinity'::date), COALESCE(-i.total_amount, -100000000), i.invoice_id"
+
+_UNPAID_SELECT = """
+    SELECT
+        i.invoice_id,
+        p.patient_id,
+        COALESCE(p.first_name, 'Unknown') as first_name,
+        COALESCE(p.last_name, 'Unknown') as last_name,
+        i.total_amount,
+        i.status,
+        i.issue_date,
+        COALESCE(i.due_date, i.issue_date + INTERVAL '30 days') as due_date,
+        CAST(CURRENT_DATE - i.issue_date AS INTEGER) as days_outstanding,
+        CASE
+            WHEN CURRENT_DATE - i.issue_date > 90 THEN 'Critical'
+            WHEN CURRENT_DATE - i.issue_date > 60 THEN 'Overdue'
+            WHEN CURRENT_DATE - i.issue_date > 30 THEN 'Due Soon'
+            ELSE 'Current'
+        END as priority
+    FROM invoices i
+    INNER JOIN patients p ON i.patient_id = p.patient_id
+    WHERE LOWER(i.status) IN ('unpaid', 'pending')
+"""
+
+FIRST_PAGE_SQL = _UNPAID_SELECT + f"ORDER BY {_SORT_KEY}\nLIMIT %s"
+NEXT_PAGE_SQL = _UNPAID_SELECT + f"AND ({_SORT_KEY}) > (%s::date, %s::numeric, %s)\nORDER BY {_SORT_KEY}\nLIMIT %s"
+EXPORT_SQL = _UNPAID_SELECT + f"ORDER BY {_SORT_KEY}"
+
+EXPORT_COLUMNS = ["invoice_id", "patient_id", "first_name", "last_name", "total_amount", "status",
+                  "issue_date", "due_date", "days_outstanding", "priority"]
+
+
+class InvalidCursor(ValueError):
+    """The pagination cursor could not be decoded"""
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque cursor for the page that follows `row`"""
+    key = {
+        "d": row["issue_date"].isoformat() if row["issue_date"] is not None else "-infinity",
+        "a": str(-row["total_amount"]) if row["total_amount"] is not None else _NULL_AMOUNT_KEY,
+        "id": row["invoice_id"],
+    }
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, int]:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if key["d"] != "-infinity":
+            date.fromisoformat(key["d"])
+        Decimal(key["a"])
+        return key["d"], key["a"], int(key["id"])
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor[:40]}") from e
+
+
+def unpaid_invoice_page(limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """One page of unpaid/pending invoices plus the cursor for the next one"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        rows = execute_query(NEXT_PAGE_SQL, (*decode_cursor(cursor), limit + 1), prepare=True)
+    else:
+        rows = execute_query(FIRST_PAGE_SQL, (limit + 1,), prepare=True)
+    if isinstance(rows, dict) and "error" in rows:
+        raise Exception(rows["error"])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "invoices": rows,
+        "next_cursor": encode_cursor(rows[-1]) if has_more else None,
+        "has_more": has_more,
+    }
+
+
+# --- streaming export ---
+
+def _export_rows() -> Iterator[List[tuple]]:
+    """Yields chunks of EXPORT_SQL rows from a named (server-side) cursor"""
+    with connection() as conn:
+        with conn.cursor(name="unpaid_invoice_export") as cur:
+            cur.itersize = EXPORT_CHUNK_ROWS
+            cur.execute(EXPORT_SQL)
+            while True:
+                chunk = cur.fetchmany(EXPORT_CHUNK_ROWS)
+                if not chunk:
+                    break
+                yield chunk
+        # Read-only; connection() rolls the transaction back on return
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def export_csv() -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in _export_rows():
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_ndjson() -> Iterator[str]:
+    for chunk in _export_rows():
+        yield "".join(
+            json.dumps({col: _json_value(v) for col, v in zip(EXPORT_COLUMNS, row)}) + "\n"
+            for row in chunk
+        )
@@ -0,0 +1,244 @@
+"""
+Invoice amounts and batch invoice generation.
+
+invoice_amounts() is the one place the tax/discount/total math lives; both
+POST /billing/generate-invoice and the batch job use it, so a batch
+invoice comes out exactly like one created by hand with the same charges.
+
+A batch job invoices many admissions at once (month-end runs, mass
+discharges). It takes either explicit admission_ids or discharged
+admissions within a date range bounded on at least one side; an empty
+selection is refused rather than read as "every admission ever":
+
+1. one set-based query computes every admission's charges
+   - consultation: the primary doctor's consultation_fee
+   - room: rooms.daily_rate x days admitted (at least one)
+   - medication: prescribed units x BILLING_MEDICATION_UNIT_RATE
+   - lab: non-cancelled lab tests x BILLING_LAB_TEST_RATE
+2. amounts are computed with invoice_amounts()
+3. invoices are inserted CHUNK_SIZE rows per multi-row INSERT, each chunk
+   in its own transaction, so progress is visible and a failed run can be
+   restarted; admissions that already have an invoice are skipped
+
+Jobs run one at a time on a background thread; poll get_job() for progress.
+"""
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from psycopg2.extras import RealDictCursor, execute_values
+
+from backend.db import connection, transaction
+
+MEDICATION_UNIT_RATE = float(os.getenv("BILLING_MEDICATION_UNIT_RATE", "25"))
+LAB_TEST_RATE = float(os.getenv("BILLING_LAB_TEST_RATE", "500"))
+CHUNK_SIZE = int(os.getenv("BILLING_BATCH_CHUNK_SIZE", "1000"))
+MAX_JOBS_KEPT = 50
+
+CHARGE_FIELDS = ("consultation_charges", "room_charges", "medication_charges",
+                 "lab_charges", "surgery_charges", "other_charges")
+
+
+def invoice_amounts(charges: Dict[str, float], tax_percentage: float, discount_percentage: float,
+                    insurance_claim_amount: float = 0) -> Dict[str, float]:
+    """Subtotal, tax, discount, total and patient payable for one invoice"""
+    subtotal = sum(charges.get(field) or 0 for field in CHARGE_FIELDS)
+    tax_amount = round(subtotal * (tax_percentage / 100), 2)
+    discount_amount = round(subtotal * (discount_percentage / 100), 2)
+    total_amount = round(subtotal + tax_amount - discount_amount, 2)
+    patient_payable = round(total_amount - insurance_claim_amount, 2)
+    return {
+        "subtotal": subtotal,
+        "tax_amount": tax_amount,
+        "discount_amount": discount_amount,
+        "total_amount": total_amount,
+        "patient_payable": patient_payable,
+    }
+
+
+# --- batch charges ---
+
+_CHARGES_SQL = """
+    WITH target AS (
+        SELECT a.admission_id, a.patient_id, a.primary_doctor_id, a.room_id,
+               GREATEST(1, COALESCE(a.actual_discharge_date, CURRENT_TIMESTAMP)::date - a.admission_date::date) AS days
+        FROM admissions a
+        WHERE {filter}
+          AND NOT EXISTS (SELECT 1 FROM invoices i WHERE i.admission_id = a.admission_id)
+    ), rx AS (
+        SELECT admission_id, SUM(COALESCE(quantity, 1)) AS units
+        FROM prescriptions
+        WHERE admission_id IN (SELECT admission_id FROM target)
+        GROUP BY admission_id
+    ), labs AS (
+        SELECT admission_id, COUNT(*) AS tests
+        FROM lab_tests
+        WHERE admission_id IN (SELECT admission_id FROM target) AND status <> 'Cancelled'
+        GROUP BY admission_id
+    )
+    SELECT t.admission_id, t.patient_id,
+           COALESCE(d.consultation_fee, 0) AS consultation_charges,
+           COALESCE(r.daily_rate, 0) * COALESCE(t.days, 1) AS room_charges,
+           COALESCE(rx.units, 0) * %s AS medication_charges,
+           COALESCE(labs.tests, 0) * %s AS lab_charges
+    FROM target t
+    LEFT JOIN doctors d ON d.doctor_id = t.primary_doctor_id
+    LEFT JOIN rooms r ON r.room_id = t.room_id
+    LEFT JOIN rx ON rx.admission_id = t.admission_id
+    LEFT JOIN labs ON labs.admission_id = t.admission_id
+    ORDER BY t.admission_id
+"""
+
+_INSERT_SQL = """
+    INSERT INTO invoices (
+        patient_id, admission_id,
+        consultation_charges, room_charges, medication_charges,
+        lab_charges, surgery_charges, other_charges,
+        tax_percentage, tax_amount,
+        discount_percentage, discount_amount,
+        total_amount, insurance_claim_amount, patient_payable,
+        status, issue_date, due_date
+    )
+    SELECT v.patient_id, v.admission_id,
+           v.consultation_charges, v.room_charges, v.medication_charges,
+           v.lab_charges, 0, 0,
+           v.tax_percentage, v.tax_amount,
+           v.discount_percentage, v.discount_amount,
+           v.total_amount, 0, v.patient_payable,
+           'Unpaid', CURRENT_DATE, CURRENT_DATE + make_interval(days => v.due_days)
+    FROM (VALUES %s) AS v(patient_id, admission_id, consultation_charges, room_charges, medication_charges,
+                          lab_charges, tax_percentage, tax_amount, discount_percentage, discount_amount,
+                          total_amount, patient_payable, due_days)
+    WHERE NOT EXISTS (SELECT 1 FROM invoices i WHERE i.admission_id = v.admission_id)
+    RETURNING invoice_id
+"""
+
+_VALUES_TEMPLATE = ("(%s, %s, %s::numeric, %s::numeric, %s::numeric, %s::numeric, %s::numeric, "
+                    "%s::numeric, %s::numeric, %s::numeric, %s::numeric, %s::numeric, %s::int)")
+
+
+def check_selection(admission_ids: Optional[List[int]] = None, discharged_from: Optional[date] = None,
+                    discharged_to: Optional[date] = None):
+    """A batch names its admissions or bounds the discharge dates; it never means everything"""
+    if admission_ids is not None:
+        if not admission_ids:
+            raise ValueError("admission_ids must not be empty")
+    elif discharged_from is None and discharged_to is None:
+        raise ValueError("Give admission_ids or at least one of discharged_from / discharged_to")
+
+
+def admission_charges(cur, admission_ids: Optional[List[int]] = None, discharged_from: Optional[date] = None,
+                      discharged_to: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Charges for not-yet-invoiced admissions: the given ids, or discharges in [from, to]"""
+    check_selection(admission_ids, discharged_from, discharged_to)
+    if admission_ids is not None:
+        where, params = "a.admission_id = ANY(%s)", [list(admission_ids)]
+    else:
+        where, params = "a.status = 'Discharged'", []
+        if discharged_from is not None:
+            where += " AND a.actual_discharge_date >= %s"
+            params.append(discharged_from)
+        if discharged_to is not None:
+            where += " AND a.actual_discharge_date < %s::date + 1"
+            params.append(discharged_to)
+
+    cur.execute(_CHARGES_SQL.format(filter=where), (*params, MEDICATION_UNIT_RATE, LAB_TEST_RATE))
+    return cur.fetchall()
+
+
+def insert_invoices(cur, rows: List[Dict[str, Any]], tax_percentage: float, discount_percentage: float,
+                    due_days: int) -> int:
+    """One multi-row INSERT on the caller's transaction; returns how many invoices were created"""
+    if not rows:
+        return 0
+    values = []
+    for row in rows:
+        charges = {field: float(row.get(field) or 0) for field in CHARGE_FIELDS}
+        amounts = invoice_amounts(charges, tax_percentage, discount_percentage)
+        values.append((
+            row["patient_id"], row["admission_id"],
+            charges["consultation_charges"], charges["room_charges"], charges["medication_charges"],
+            charges["lab_charges"], tax_percentage, amounts["tax_amount"],
+            discount_percentage, amounts["discount_amount"],
+            amounts["total_amount"], amounts["patient_payable"], due_days,
+        ))
+    # Serializes concurrent batch runs so an admission can't be invoiced twice
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('billing_batch_invoices'))")
+    created = execute_values(cur, _INSERT_SQL, values, template=_VALUES_TEMPLATE,
+                             page_size=len(values), fetch=True)
+    return len(created)
+
+
+# --- jobs ---
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="billing-batch")
+_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_jobs_lock = threading.Lock()
+_job_ids = itertools.count(1)
+
+
+def _run_job(job: Dict[str, Any], selection: Dict[str, Any], tax_percentage: float,
+             discount_percentage: float, due_days: int):
+    started = time.perf_counter()
+    job["status"] = "running"
+    try:
+        with connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                rows = admission_charges(cur, **selection)
+        job["total"] = len(rows)
+        for i in range(0, len(rows), CHUNK_SIZE):
+            chunk = rows[i:i + CHUNK_SIZE]
+            with transaction() as conn:
+                with conn.cursor() as cur:
+                    created = insert_invoices(cur, chunk, tax_percentage, discount_percentage, due_days)
+            job["invoiced"] += created
+            job["skipped"] += len(chunk) - created  # invoiced by someone else meanwhile
+            job["processed"] += len(chunk)
+            job["elapsed_s"] = round(time.perf_counter() - started, 3)
+        job["status"] = "completed"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+        print(f"❌ Batch invoice job {job['job_id']} failed: {e}")
+    job["elapsed_s"] = round(time.perf_counter() - started, 3)
+    if job["elapsed_s"]:
+        job["invoices_per_sec"] = round(job["invoiced"] / job["elapsed_s"], 1)
+
+
+def start_job(selection: Dict[str, Any], tax_percentage: float = 5.0, discount_percentage: float = 0,
+              due_days: int = 30) -> Dict[str, Any]:
+    """Queues a batch invoice job; returns its progress record (ValueError for an unbounded selection)"""
+    check_selection(**selection)
+    job = {
+        "job_id": f"inv-{next(_job_ids)}",
+        "status": "queued",
+        "total": None,
+        "processed": 0,
+        "invoiced": 0,
+        "skipped": 0,
+        "elapsed_s": 0.0,
+        "invoices_per_sec": None,
+        "error": None,
+    }
+    with _jobs_lock:
+        _jobs[job["job_id"]] = job
+        while len(_jobs) > MAX_JOBS_KEPT:
+            _jobs.popitem(last=False)
+    _executor.submit(_run_job, job, selection, tax_percentage, discount_percentage, due_days)
+    return dict(job)
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    return dict(job) if job else None
+
+
+def list_jobs() -> List[Dict[str, Any]]:
+    with _jobs_lock:
+        return [dict(job) for job in _jobs.values()]
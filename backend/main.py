@@ -1,14 +1,25 @@
 from typing import Dict, Any
+import asyncio
 import uvicorn
 import os
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 
 # Import the split router modules from your backend.routers package
 from backend.routers import admin, doctor, billing, patient, triage
-from backend.db import init_connection_pool, close_connection_pool  # ✅ NEW
+from backend.db import init_connection_pool, close_connection_pool, pool_stats  # ✅ NEW
+from backend.db_async import init_async_pool, close_async_pool, async_pool_stats
+from backend.db_prepared import prepared_stats
+from backend.cache import cache_stats
+from backend.billing_analytics import run_nightly_reconcile
+from backend import patient_listing
+from backend.ml_service import resident_model
+from backend.core.triage_pool import triage_pool
+from backend.runtime import cpu_executor, loop_monitor
+from backend.bed_board import bed_board
 
 # Load environment variables from .env file
 load_dotenv()
@@ -31,6 +42,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all HTTP methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-After-Patient-Id"],  # Admin patient grid keyset paging
 )
 
 # --- 2. INCLUDE ROUTERS ---
@@ -45,19 +57,55 @@ app.include_router(triage.router, prefix=f"{api_prefix}", tags=["Medical Triage"
 
 # --- 3. STARTUP EVENT (✅ NEW) ---
 @app.on_event("startup")
-def startup_event():
-    """Initialize connection pool when application starts"""
+async def startup_event():
+    """Initialize connection pools when application starts"""
     try:
         init_connection_pool()
+        await init_async_pool()
         print("✅ MediPortal Backend started with connection pooling")
     except Exception as e:
         print(f"⚠️ Warning: Could not initialize connection pool: {e}")
 
+    # Free-bed index for room allocation; intake falls back to SQL without it
+    try:
+        await run_in_threadpool(bed_board.start)
+    except Exception as e:
+        print(f"⚠️ Warning: Could not start bed board: {e}")
+
+    # Reports event-loop stalls to /metrics
+    loop_monitor.start()
+
+    # Nightly drift check for the billing rollup table
+    app.state.rollup_reconcile = asyncio.create_task(run_nightly_reconcile())
+    # ... and for the patient_current_state projection
+    app.state.state_reconcile = asyncio.create_task(patient_listing.run_nightly_reconcile())
+
+    # Spawn the triage worker processes (each loads the engine once)
+    try:
+        await run_in_threadpool(triage_pool.start)
+    except Exception as e:
+        print(f"⚠️ Warning: Could not start triage process pool: {e}")
+
+    # Load the department model once so the first intake doesn't pay for it
+    try:
+        resident_model.load()
+    except Exception as e:
+        print(f"⚠️ Warning: Could not preload department model: {e}")
+
 # --- 4. SHUTDOWN EVENT (✅ NEW) ---
 @app.on_event("shutdown")
-def shutdown_event():
-    """Close connection pool when application shuts down"""
+async def shutdown_event():
+    """Close connection pools when application shuts down"""
+    app.state.rollup_reconcile.cancel()
+    app.state.state_reconcile.cancel()
+    # Flush queued triage results while the async pool is still open
+    await triage.triage_writer.close()
+    triage_pool.shutdown()
+    cpu_executor.shutdown()
+    loop_monitor.stop()
+    bed_board.stop()
     close_connection_pool()
+    await close_async_pool()
 
 # --- 5. HEALTH CHECK ROOT ENDPOINT ---
 @app.get("/")
@@ -72,7 +120,27 @@ def health_check() -> Dict[str, Any]:
         "connection_pooling": True  # ✅ NEW: Indicates pooling is active
     }
 
-# --- 6. SERVE FRONTEND STATIC FILES ---
+# --- 6. RUNTIME METRICS ---
+@app.get("/metrics")
+def metrics() -> Dict[str, Any]:
+    """
+    In-process performance counters (model load/predict timings, etc.)
+    """
+    return {
+        "ml_model": resident_model.stats(),
+        "db_pool": pool_stats(),
+        "db_async_pool": async_pool_stats(),
+        "prepared_statements": prepared_stats(),
+        "caches": cache_stats(),
+        "triage_writer": triage.triage_writer.stats(),
+        "triage_pool": triage_pool.stats(),
+        "triage_cache": triage.engine.result_cache.stats(),
+        "cpu_executor": cpu_executor.stats(),
+        "event_loop": loop_monitor.stats(),
+        "bed_board": bed_board.stats()
+    }
+
+# --- 7. SERVE FRONTEND STATIC FILES ---
 # Mount the frontend folder to serve HTML, CSS, JS files
 frontend_path = os.path.join(PROJECT_ROOT, "frontend")
 if os.path.exists(frontend_path):
@@ -2,8 +2,14 @@ import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import make_pipeline
+import hashlib
 import pickle
 import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from backend.core.micro_batcher import MicroBatcher
 
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -12,6 +18,13 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(SCRIPT_DIR, "models", "doctor_recommender.pkl")
 DATA_PATH = os.path.join(SCRIPT_DIR, "models", "training_data.csv")
 
+# How often (seconds) the resident model checks the artifact for a newer version
+RELOAD_CHECK_INTERVAL = float(os.getenv("ML_MODEL_RELOAD_INTERVAL", "2.0"))
+
+# Micro-batching of concurrent predictions (window 0 disables batching)
+BATCH_WINDOW_MS = float(os.getenv("ML_BATCH_WINDOW_MS", "2.0"))
+BATCH_MAX_SIZE = int(os.getenv("ML_BATCH_MAX_SIZE", "32"))
+
 def train_model():
     if not os.path.exists(DATA_PATH):
         print(f"❌ Error: training_data.csv not found at {DATA_PATH}")
@@ -40,6 +53,151 @@ def train_model():
         print(f"❌ Error during model training: {e}")
         return False
 
+class ResidentModel:
+    """
+    Process-resident holder for the department recommender.
+
+    The pickled pipeline is loaded once and every prediction is served from
+    memory. The artifact is re-checked at most every RELOAD_CHECK_INTERVAL
+    seconds; when its mtime, size or inode changes (an atomic rename changes
+    the inode even if the mtime was preserved) and its checksum differs, the
+    new pipeline is loaded off to the side and swapped in with a single
+    reference assignment, so in-flight predictions keep using the model they
+    started with. An in-place rewrite that keeps mtime and size is not seen.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, check_interval: float = RELOAD_CHECK_INTERVAL,
+                 batch_window_ms: float = BATCH_WINDOW_MS, batch_max_size: int = BATCH_MAX_SIZE):
+        self.model_path = model_path
+        self.check_interval = check_interval
+        self._model = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._checksum: Optional[str] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.last_load_ms = 0.0
+        # Recent per-request timings (ms) for p50/p99 reporting
+        self._load_timings = deque(maxlen=1000)
+        self._predict_timings = deque(maxlen=1000)
+        self.batcher = MicroBatcher(self.predict_many, batch_window_ms, batch_max_size, name="department-batcher")
+
+    @property
+    def version(self) -> Optional[str]:
+        """Short checksum of the artifact currently being served"""
+        return self._checksum[:12] if self._checksum else None
+
+    def load(self):
+        """Load (or train and load) the model eagerly, e.g. on startup"""
+        if not os.path.exists(self.model_path):
+            print("🔧 Model not found. Training now...")
+            if not train_model():
+                raise Exception("Failed to train model. Training data not found.")
+        self._reload_if_changed(force=True)
+        return self._model
+
+    def get(self):
+        """Return the in-memory model, swapping in a newer artifact if one appeared"""
+        if self._model is None:
+            return self.load()
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            self._reload_if_changed()
+        return self._model
+
+    def _reload_if_changed(self, force: bool = False):
+        try:
+            st = os.stat(self.model_path)
+        except OSError:
+            # Artifact vanished mid-deploy: keep serving what we have
+            return
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if not force and signature == self._signature:
+            return
+
+        with self._lock:
+            if not force and signature == self._signature:
+                return
+            started = time.perf_counter()
+            with open(self.model_path, 'rb') as f:
+                raw = f.read()
+            checksum = hashlib.sha256(raw).hexdigest()
+            if checksum != self._checksum:
+                model = pickle.loads(raw)
+                self._model = model
+                self._checksum = checksum
+                self.reloads += 1
+                print(f"✅ Department model loaded (version {checksum[:12]})")
+            self._signature = signature
+            self.last_load_ms = (time.perf_counter() - started) * 1000
+
+    def predict_many(self, texts: List[str]) -> List[Tuple[str, float]]:
+        """One vectorized predict_proba over a batch of symptom texts"""
+        model = self.get()
+        probs = model.predict_proba(texts)
+        best = probs.argmax(axis=1)
+        return [(model.classes_[idx], probs[row, idx]) for row, idx in enumerate(best)]
+
+    def predict(self, text: str) -> Tuple[str, float, Dict[str, float]]:
+        """Predict a department; also returns the load/predict timings for this call"""
+        started = time.perf_counter()
+        self.get()
+        loaded = time.perf_counter()
+
+        # Concurrent callers are coalesced into a single predict_proba call
+        prediction, confidence = self.batcher.submit(text)
+        finished = time.perf_counter()
+
+        timings = {
+            "load_ms": round((loaded - started) * 1000, 3),
+            "predict_ms": round((finished - loaded) * 1000, 3)
+        }
+        self._load_timings.append(timings["load_ms"])
+        self._predict_timings.append(timings["predict_ms"])
+        return prediction, confidence, timings
+
+    def stats(self) -> Dict[str, Any]:
+        """Model version plus p50/p99 of recent load and predict timings"""
+        return {
+            "version": self.version,
+            "reloads": self.reloads,
+            "last_load_ms": round(self.last_load_ms, 3),
+            "requests": len(self._predict_timings),
+            "load_ms": _percentiles(self._load_timings),
+            "predict_ms": _percentiles(self._predict_timings),
+            "batching": self.batcher.stats()
+        }
+
+
+def _percentiles(samples) -> Dict[str, float]:
+    values = sorted(samples)
+    if not values:
+        return {"p50": 0.0, "p99": 0.0}
+    return {
+        "p50": values[int(0.50 * (len(values) - 1))],
+        "p99": values[int(0.99 * (len(values) - 1))]
+    }
+
+
+# Shared instance used by the API routers
+resident_model = ResidentModel()
+
+
+def predict_department_timed(text):
+    """
+    Same as predict_department, plus the timings dict for this request.
+
+    Returns:
+        tuple: (department_name, confidence_score, {"load_ms": ..., "predict_ms": ...})
+    """
+    try:
+        return resident_model.predict(text)
+    except Exception as e:
+        print(f"❌ Error loading/using model: {e}")
+        raise
+
+
 def predict_department(text):
     """
     Predicts the department based on symptom text.
@@ -54,27 +212,8 @@ def predict_department(text):
     Raises:
         Exception: If model cannot be trained or loaded
     """
-    if not os.path.exists(MODEL_PATH):
-        print("🔧 Model not found. Training now...")
-        success = train_model()
-        if not success:
-            raise Exception("Failed to train model. Training data not found.")
-    
-    try:
-        with open(MODEL_PATH, 'rb') as f:
-            model = pickle.load(f)
-            
-        # Returns the predicted department name (e.g., "Cardiology")
-        prediction = model.predict([text])[0]
-        
-        # Get probability/confidence
-        probs = model.predict_proba([text]).max()
-        
-        return prediction, probs
-        
-    except Exception as e:
-        print(f"❌ Error loading/using model: {e}")
-        raise
+    prediction, confidence, _ = predict_department_timed(text)
+    return prediction, confidence
 
 
 if __name__ == "__main__":
@@ -0,0 +1,258 @@
+"""
+Patient lists and panels: keyset pagination over patients, newest first.
+
+Each row shows the patient's current doctor, room and status, taken from
+their latest appointment and latest admission. Those normally come from
+`patient_current_state` (database/migrations/005_patient_current_state.sql),
+which triggers on appointments, admissions and medical_records keep
+current, so a row costs one primary-key lookup. Until that migration is
+applied they are computed per patient with LATERAL lookups,
+
+    ... WHERE a.patient_id = p.patient_id ORDER BY a.appointment_date DESC LIMIT 1
+
+which walk idx_appointments_patient_latest / idx_admissions_patient_latest
+(database/migrations/004_hot_query_indexes.sql). The old DISTINCT ON
+subqueries sorted all of appointments and admissions on every call.
+Ties on the date go to the highest id, as in the projection.
+
+Pages are ordered by patient_id DESC. The next page starts strictly below
+the last patient_id returned (`after_patient_id`), so any page costs the
+same as the first. Filters (status, doctor, gender, name search) are applied
+while walking that order. serial_no counts rows within the page.
+
+A nightly job (run_nightly_reconcile) fixes projection rows that drifted
+from the source tables, e.g. after writes made with the triggers disabled.
+"""
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from backend.billing_analytics import seconds_until
+from backend.db import execute_query, relation_exists, transaction
+
+# Local time of the nightly patient_current_state reconcile ("HH:MM"); empty disables it
+STATE_RECONCILE_AT = os.getenv("PATIENT_STATE_RECONCILE_AT", "03:00")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+DOCTOR_PATIENTS_LIMIT = 50
+
+_COLUMNS = """
+    SELECT
+        ROW_NUMBER() OVER (ORDER BY p.patient_id DESC) as serial_no,
+        p.patient_id,
+        p.first_name,
+        p.last_name,
+        p.dob,
+        p.gender,
+        p.contact_number,
+        p.address,
+        p.insurance_provider,
+        EXTRACT(YEAR FROM AGE(CURRENT_DATE, p.dob)) as age,
+        {doctor_id} as doctor_id,
+        {assigned_doctor} as assigned_doctor,
+        {room_no} as room_no,
+        {status} as status
+    FROM patients p
+"""
+
+# From the projection: doctor/room ids are already "appointment's, else admission's"
+_STATE = {
+    "doctor_id": "s.doctor_id",
+    "status": "COALESCE(s.status, 'Registered')",
+}
+_STATE_SELECT = _COLUMNS.format(
+    assigned_doctor="COALESCE(d.first_name || ' ' || d.last_name, 'Unassigned')",
+    room_no="COALESCE(r.room_number, 'Waiting')",
+    **_STATE,
+) + """
+    LEFT JOIN patient_current_state s ON s.patient_id = p.patient_id
+    LEFT JOIN doctors d ON d.doctor_id = s.doctor_id
+    LEFT JOIN rooms r ON r.room_id = s.room_id
+"""
+
+# Computed per patient (no migration 005)
+_LATERAL = {
+    "doctor_id": "COALESCE(d_appt.doctor_id, d_adm.doctor_id)",
+    "status": "COALESCE(adm.status, appt.status, 'Registered')",
+}
+_LATERAL_SELECT = _COLUMNS.format(
+    assigned_doctor="""COALESCE(
+            d_appt.first_name || ' ' || d_appt.last_name,
+            d_adm.first_name || ' ' || d_adm.last_name,
+            'Unassigned'
+        )""",
+    room_no="COALESCE(r_appt.room_number, r_adm.room_number, 'Waiting')",
+    **_LATERAL,
+) + """
+    -- Latest appointment (emergency intake creates appointments)
+    LEFT JOIN LATERAL (
+        SELECT a.doctor_id, a.room_id, a.status
+        FROM appointments a
+        WHERE a.patient_id = p.patient_id
+        ORDER BY a.appointment_date DESC, a.appointment_id DESC
+        LIMIT 1
+    ) appt ON TRUE
+    LEFT JOIN doctors d_appt ON appt.doctor_id = d_appt.doctor_id
+    LEFT JOIN rooms r_appt ON appt.room_id = r_appt.room_id
+
+    -- Latest admission (traditional admissions)
+    LEFT JOIN LATERAL (
+        SELECT ad.primary_doctor_id, ad.room_id, ad.status
+        FROM admissions ad
+        WHERE ad.patient_id = p.patient_id
+        ORDER BY ad.admission_date DESC, ad.admission_id DESC
+        LIMIT 1
+    ) adm ON TRUE
+    LEFT JOIN doctors d_adm ON adm.primary_doctor_id = d_adm.doctor_id
+    LEFT JOIN rooms r_adm ON adm.room_id = r_adm.room_id
+"""
+
+# Doctor dashboard patient list with each patient's latest diagnosis
+DOCTOR_PATIENTS_SQL = """
+    SELECT
+        p.patient_id,
+        p.first_name,
+        p.last_name,
+        p.dob,
+        p.gender,
+        p.contact_number,
+        s.diagnosis,
+        s.treatment_plan
+    FROM patients p
+    LEFT JOIN patient_current_state s ON s.patient_id = p.patient_id
+    LIMIT %s
+"""
+
+LEGACY_DOCTOR_PATIENTS_SQL = """
+    SELECT
+        p.patient_id,
+        p.first_name,
+        p.last_name,
+        p.dob,
+        p.gender,
+        p.contact_number,
+        m.diagnosis,
+        m.treatment_plan
+    FROM patients p
+    LEFT JOIN (
+        SELECT DISTINCT ON (patient_id) * FROM medical_records
+        ORDER BY patient_id, record_date DESC, record_id DESC
+    ) m ON p.patient_id = m.patient_id
+    LIMIT %s
+"""
+
+_state_warned = False
+
+
+def _like_prefix(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def page_sql(after_patient_id: Optional[int] = None, status: Optional[str] = None,
+             doctor_id: Optional[int] = None, gender: Optional[str] = None,
+             search: Optional[str] = None, from_state: bool = True):
+    """SQL and params (minus the LIMIT) for one page with the given filters"""
+    select, derived = (_STATE_SELECT, _STATE) if from_state else (_LATERAL_SELECT, _LATERAL)
+    conditions, params = [], []
+    if after_patient_id is not None:
+        conditions.append("p.patient_id < %s")
+        params.append(after_patient_id)
+    if gender:
+        conditions.append("LOWER(p.gender) = LOWER(%s)")
+        params.append(gender)
+    if search and search.strip():
+        conditions.append("(p.first_name ILIKE %s OR p.last_name ILIKE %s)")
+        params.extend([_like_prefix(search.strip())] * 2)
+    if doctor_id is not None:
+        conditions.append(f"{derived['doctor_id']} = %s")
+        params.append(doctor_id)
+    if status:
+        conditions.append(f"LOWER({derived['status']}) = LOWER(%s)")
+        params.append(status)
+
+    sql = select
+    if conditions:
+        sql += "    WHERE " + "\n      AND ".join(conditions) + "\n"
+    sql += "    ORDER BY p.patient_id DESC\n    LIMIT %s"
+    return sql, params
+
+
+def _state_available() -> bool:
+    """Probes for patient_current_state (re-checked every RELATION_PROBE_INTERVAL)"""
+    global _state_warned
+    present = relation_exists("patient_current_state")
+    if not present and not _state_warned:
+        print("⚠️ patient_current_state missing; patient lists will compute it per request "
+              "(apply database/migrations/005_patient_current_state.sql)")
+    _state_warned = not present
+    return present
+
+
+def _query(build_sql, params_tail: tuple) -> List[Dict[str, Any]]:
+    """Runs build_sql(from_state) against the projection, or the LATERAL form while it's missing"""
+    sql, params = build_sql(_state_available())
+    rows = execute_query(sql, (*params, *params_tail), prepare=True)
+    if isinstance(rows, dict) and "error" in rows:
+        raise Exception(rows["error"])
+    return rows
+
+
+def patient_page(page_size: int = DEFAULT_PAGE_SIZE, after_patient_id: Optional[int] = None,
+                 status: Optional[str] = None, doctor_id: Optional[int] = None,
+                 gender: Optional[str] = None, search: Optional[str] = None) -> Dict[str, Any]:
+    """One page of patients plus the after_patient_id for the next one (None on the last page)"""
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    rows = _query(lambda from_state: page_sql(after_patient_id, status, doctor_id, gender, search, from_state),
+                  (page_size + 1,))
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return {
+        "patients": rows,
+        "next_after_patient_id": rows[-1]["patient_id"] if has_more else None,
+        "has_more": has_more,
+    }
+
+
+def patient_state(patient_id: int) -> Optional[Dict[str, Any]]:
+    """One patient's row as the list shows it (doctor, room, status), or None"""
+    def build_sql(from_state):
+        select = _STATE_SELECT if from_state else _LATERAL_SELECT
+        return select + "    WHERE p.patient_id = %s\n", []
+
+    rows = _query(build_sql, (patient_id,))
+    return rows[0] if rows else None
+
+
+def doctor_patients(limit: int = DOCTOR_PATIENTS_LIMIT) -> List[Dict[str, Any]]:
+    """Patients with their latest diagnosis and treatment plan"""
+    return _query(lambda from_state: (DOCTOR_PATIENTS_SQL if from_state else LEGACY_DOCTOR_PATIENTS_SQL, []),
+                  (limit,))
+
+
+# --- projection maintenance ---
+
+def reconcile_state() -> int:
+    """Fixes patient_current_state rows that drifted; returns how many were corrected"""
+    with transaction() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT reconcile_patient_current_state()")
+            return cur.fetchone()[0]
+
+
+async def run_nightly_reconcile():
+    """Background task: reconcile the projection once a day at STATE_RECONCILE_AT"""
+    if not STATE_RECONCILE_AT:
+        return
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(seconds_until(STATE_RECONCILE_AT))
+        try:
+            if not await loop.run_in_executor(None, _state_available):
+                continue
+            corrected = await loop.run_in_executor(None, reconcile_state)
+            print(f"✅ patient_current_state reconciled ({corrected} rows corrected)")
+        except Exception as e:
+            print(f"⚠️ patient_current_state reconcile failed: {e}")
@@ -0,0 +1,201 @@
+"""
+Bulk payment reconciliation for bank/UPI settlement files.
+
+A batch is a list of payments (invoice_id, amount, date, mode), posted as
+CSV or JSON. Rows that fail validation are reported as "invalid" and never
+reach the database. The rest are loaded with COPY into a temp table and
+applied by one UPDATE ... FROM, all in a single transaction:
+
+- applied: amount added to amount_paid; status becomes Paid once the
+  invoice is fully paid, Partial otherwise
+- not_found: no such invoice
+- overpaid: the payment would take amount_paid above total_amount; the
+  invoice is left untouched for manual review
+
+Several rows for the same invoice are summed and share one outcome.
+"""
+import csv
+import io
+import json
+import os
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from backend.db import transaction
+
+PAYMENT_MODES = ('Cash', 'Card', 'UPI', 'Net Banking', 'Insurance')
+MAX_BATCH_ROWS = int(os.getenv("BILLING_RECONCILE_MAX_ROWS", "200000"))
+
+_MAX_INT = 2 ** 31 - 1           # invoices.invoice_id is INT
+_MAX_AMOUNT = Decimal(10) ** 8   # NUMERIC(10, 2)
+
+_STAGE_SQL = """
+    CREATE TEMP TABLE payment_batch (
+        row_no INT NOT NULL,
+        invoice_id INT NOT NULL,
+        amount NUMERIC(10, 2) NOT NULL,
+        paid_at TIMESTAMP,
+        payment_mode VARCHAR(20)
+    ) ON COMMIT DROP
+"""
+
+# Every CTE sees the same snapshot, so `prev` holds the pre-update values.
+# The overpayment guard sits in the UPDATE's WHERE, which PostgreSQL
+# re-checks against the latest row version if a concurrent payment got there first.
+_APPLY_SQL = """
+    WITH per_invoice AS (
+        SELECT invoice_id, SUM(amount) AS amount, MAX(paid_at) AS paid_at,
+               (array_agg(payment_mode ORDER BY row_no DESC) FILTER (WHERE payment_mode IS NOT NULL))[1] AS payment_mode
+        FROM payment_batch
+        GROUP BY invoice_id
+    ), applied AS (
+        UPDATE invoices i
+        SET amount_paid = COALESCE(i.amount_paid, 0) + b.amount,
+            status = CASE WHEN COALESCE(i.amount_paid, 0) + b.amount >= i.total_amount THEN 'Paid' ELSE 'Partial' END,
+            payment_date = COALESCE(b.paid_at, CURRENT_TIMESTAMP),
+            payment_mode = COALESCE(b.payment_mode, i.payment_mode)
+        FROM per_invoice b
+        WHERE i.invoice_id = b.invoice_id
+          AND COALESCE(i.amount_paid, 0) + b.amount <= COALESCE(i.total_amount, 0)
+        RETURNING i.invoice_id, i.status, i.amount_paid
+    )
+    SELECT b.invoice_id,
+           CASE WHEN a.invoice_id IS NOT NULL THEN 'applied'
+                WHEN prev.invoice_id IS NULL THEN 'not_found'
+                ELSE 'overpaid' END AS outcome,
+           COALESCE(a.status, prev.status) AS invoice_status,
+           prev.total_amount,
+           COALESCE(a.amount_paid, prev.amount_paid) AS amount_paid
+    FROM per_invoice b
+    LEFT JOIN applied a ON a.invoice_id = b.invoice_id
+    LEFT JOIN invoices prev ON prev.invoice_id = b.invoice_id
+"""
+
+
+class BatchError(ValueError):
+    """The batch as a whole could not be read"""
+
+
+# --- parsing / validation ---
+
+def parse_csv(text: str) -> List[Dict[str, Any]]:
+    """CSV with a header row: invoice_id,amount[,date][,mode]"""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or not {"invoice_id", "amount"} <= {f.strip() for f in reader.fieldnames}:
+        raise BatchError("CSV header must include invoice_id and amount (optional: date, mode)")
+    return [{(k or "").strip(): v for k, v in row.items()} for row in reader]
+
+
+def parse_json(payload: Any) -> List[Dict[str, Any]]:
+    """Either a list of payments or {"payments": [...]}"""
+    if isinstance(payload, dict):
+        payload = payload.get("payments")
+    if not isinstance(payload, list):
+        raise BatchError('JSON body must be a list of payments or {"payments": [...]}')
+    return payload
+
+
+def _parse_paid_at(value: Any) -> Optional[datetime]:
+    if value in (None, ""):
+        return None
+    text = str(value).strip()
+    if len(text) == 10:
+        return datetime.combine(date.fromisoformat(text), datetime.min.time())
+    return datetime.fromisoformat(text)
+
+
+def validate(raw_rows: List[Any]) -> Tuple[List[tuple], List[Dict[str, Any]]]:
+    """Splits rows into COPY-ready tuples and "invalid" outcomes (row numbers are 1-based)"""
+    if len(raw_rows) > MAX_BATCH_ROWS:
+        raise BatchError(f"Batch too large: {len(raw_rows)} rows (max {MAX_BATCH_ROWS})")
+
+    staged, invalid = [], []
+    for row_no, raw in enumerate(raw_rows, start=1):
+        try:
+            if not isinstance(raw, dict):
+                raise ValueError("row must be an object")
+            invoice_id = int(str(raw.get("invoice_id")).strip())
+            amount = Decimal(str(raw.get("amount")).strip())
+            if not 0 < invoice_id <= _MAX_INT:
+                raise ValueError("invoice_id out of range")
+            if not amount.is_finite() or not 0 < amount < _MAX_AMOUNT or amount != amount.quantize(Decimal("0.01")):
+                raise ValueError("amount must be positive, below 100000000, with at most 2 decimals")
+            paid_at = _parse_paid_at(raw.get("date"))
+            mode = (raw.get("mode") or "").strip() or None
+            if mode is not None and mode not in PAYMENT_MODES:
+                raise ValueError(f"mode must be one of {list(PAYMENT_MODES)}")
+        except (TypeError, ValueError, InvalidOperation) as e:
+            invalid.append({"row": row_no, "invoice_id": raw.get("invoice_id") if isinstance(raw, dict) else None,
+                            "outcome": "invalid", "reason": str(e)})
+            continue
+        staged.append((row_no, invoice_id, amount, paid_at, mode))
+    return staged, invalid
+
+
+# --- applying ---
+
+def apply_batch(cur, staged: List[tuple]) -> Dict[int, Dict[str, Any]]:
+    """COPY + one UPDATE ... FROM on the caller's transaction; returns outcomes per invoice_id"""
+    cur.execute(_STAGE_SQL)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(staged)
+    buffer.seek(0)
+    cur.copy_expert("COPY payment_batch (row_no, invoice_id, amount, paid_at, payment_mode) FROM STDIN WITH (FORMAT csv)",
+                    buffer)
+    cur.execute(_APPLY_SQL)
+    return {row["invoice_id"]: row for row in cur.fetchall()}
+
+
+def reconcile_payments(raw_rows: List[Any]) -> Dict[str, Any]:
+    """Validates and applies a settlement batch in one transaction; per-row outcomes plus throughput"""
+    started = time.perf_counter()
+    staged, results = validate(raw_rows)
+
+    by_invoice: Dict[int, Dict[str, Any]] = {}
+    if staged:
+        with transaction() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                by_invoice = apply_batch(cur, staged)
+
+    for row_no, invoice_id, amount, _, _ in staged:
+        outcome = by_invoice[invoice_id]
+        results.append({
+            "row": row_no,
+            "invoice_id": invoice_id,
+            "amount": amount,
+            "outcome": outcome["outcome"],
+            "invoice_status": outcome["invoice_status"],
+            "total_amount": outcome["total_amount"],
+            "amount_paid": outcome["amount_paid"],
+        })
+    results.sort(key=lambda r: r["row"])
+
+    elapsed = time.perf_counter() - started
+    counts = {name: 0 for name in ("applied", "not_found", "overpaid", "invalid")}
+    for result in results:
+        counts[result["outcome"]] += 1
+    return {
+        "summary": {
+            "rows": len(results),
+            "invoices": len(by_invoice),
+            **counts,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "rows_per_sec": round(len(results) / elapsed) if elapsed > 0 else None,
+        },
+        "results": results,
+    }
+
+
+def parse_body(body: bytes, content_type: str) -> List[Any]:
+    """Raw request body (CSV or JSON) to a list of payment rows"""
+    text = body.decode("utf-8-sig")
+    if "csv" in content_type or "text/plain" in content_type:
+        return parse_csv(text)
+    try:
+        return parse_json(json.loads(text))
+    except json.JSONDecodeError as e:
+        raise BatchError(f"Invalid JSON: {e}") from e
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import os
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
-from backend.db import execute_query
+from backend.db import execute_query, take_room, transaction
+from backend.db_prepared import execute_prepared
+from backend.bed_board import bed_board
+from backend import db_async, deletion, patient_listing
+from backend.cache import TTLSnapshotCache
 
 router = APIRouter(tags=["admin"])
 
@@ -43,13 +50,16 @@ class AppointmentCreate(BaseModel):
     patient_id: int
     problem_text: str
 
+class BulkDeleteRequest(BaseModel):
+    ids: List[int]
+    background: Optional[bool] = None  # None: background when above DELETE_BACKGROUND_THRESHOLD ids
+
 # --- Helper Function ---
 def log_audit(username, role, content, status):
-    safe_content = content.replace("'", "''")
     # Wrap in try/except in case audit_logs table is missing or locked
     try:
-        log_query = f"INSERT INTO audit_logs (username, role, question, status) VALUES ('{username}', '{role}', '{safe_content}', '{status}')"
-        execute_query(log_query)
+        log_query = "INSERT INTO audit_logs (username, role, question, status) VALUES (%s, %s, %s, %s)"
+        execute_query(log_query, (username, role, content, status), prepare=True)
     except Exception:
         pass 
 
@@ -62,13 +72,17 @@ async def login(request: LoginRequest):
         raise HTTPException(status_code=400, detail="Invalid role")
     
     try:
-        query = f"SELECT * FROM users WHERE username = '{request.username}' AND role = '{request.role}'"
-        result = execute_query(query)
+        result = await db_async.fetch(
+            "SELECT * FROM users WHERE username = %s AND role = %s",
+            (request.username, request.role),
+            prepare=True
+        )
         
         if not result:
             # Check if user exists with a DIFFERENT role to give a helpful error
-            check_query = f"SELECT role FROM users WHERE username = '{request.username}'"
-            check_res = execute_query(check_query)
+            check_res = await db_async.fetch(
+                "SELECT role FROM users WHERE username = %s", (request.username,), prepare=True
+            )
             
             if check_res:
                 actual_role = check_res[0]['role']
@@ -92,75 +106,99 @@ async def login(request: LoginRequest):
             raise e
         raise HTTPException(status_code=500, detail=f"Login failed due to server error: {str(e)}")
 
+# Dashboard counts, 7-day trend and department load in one round trip
+_ANALYTICS_SQL = """
+    WITH trend AS (
+        SELECT to_char(appointment_date, 'Mon DD') AS date, COUNT(*) AS count, MIN(appointment_date) AS first_seen
+        FROM appointments
+        WHERE appointment_date >= CURRENT_DATE - INTERVAL '7 days'
+        GROUP BY 1
+    ),
+    departments AS (
+        SELECT specialty, COUNT(*) AS count FROM doctors GROUP BY specialty
+    )
+    SELECT
+        (SELECT COUNT(*) FROM doctors) AS doctors,
+        (SELECT COUNT(*) FROM users WHERE role = 'billing') AS billing,
+        (SELECT COUNT(*) FROM users WHERE role = 'admin') AS admin,
+        (SELECT COUNT(*) FROM patients) AS patients,
+        (SELECT COUNT(*) FROM appointments WHERE DATE(appointment_date) = CURRENT_DATE) AS active_today,
+        (SELECT COALESCE(json_agg(json_build_array(date, count) ORDER BY first_seen), '[]') FROM trend) AS trend,
+        (SELECT COALESCE(json_agg(json_build_array(specialty, count)), '[]') FROM departments) AS departments
+"""
+
+async def _compute_analytics():
+    """Builds the dashboard payload; the audit_logs queries run alongside the main one"""
+    core, usage_res, sec_rows = await asyncio.gather(
+        db_async.fetch_one(_ANALYTICS_SQL, prepare=True),
+        db_async.fetch("SELECT role, COUNT(*) as count FROM audit_logs GROUP BY role", prepare=True),
+        db_async.fetch("SELECT username, question, status, timestamp FROM audit_logs ORDER BY timestamp DESC LIMIT 5",
+                       prepare=True),
+        return_exceptions=True
+    )
+    if isinstance(core, Exception):
+        raise core
+
+    # 1. Counts
+    doctor_count = core['doctors']
+    billing_count = core['billing']
+    admin_count = core['admin']
+    patient_count = core['patients']
+
+    # 2. Trends
+    trend_labels = [date for date, _ in core['trend']]
+    trend_data = [count for _, count in core['trend']]
+
+    # 3. Department Load
+    dept_data = {specialty: count for specialty, count in core['departments']}
+
+    # 4. Security Logs (audit_logs may be missing or locked)
+    if isinstance(usage_res, Exception) or isinstance(sec_rows, Exception):
+        usage_data = {"Doctor": 10, "Admin": 5}
+        sec_rows = []
+    else:
+        usage_data = {row['role']: row['count'] for row in usage_res}
+
+    return {
+        "status": "success",
+        "counts": {
+            "doctors": doctor_count,
+            "billing": billing_count,
+            "admin": admin_count,
+            "patients": patient_count
+        },
+        "trend": {"labels": trend_labels, "data": trend_data},
+        "departments": dept_data,
+        "usage": usage_data,
+        "roles": {
+            "Doctor": doctor_count,
+            "Billing": billing_count,
+            "Admin": admin_count
+        },
+        "insights": [
+            "Patient growth is steady.",
+            "Cardiology department has highest load.",
+            f"{patient_count} active patients in the system."
+        ],
+        "security": sec_rows,
+        "summary": {
+            "active_today": core['active_today']
+        }
+    }
+
+# Many admins poll the dashboard; serve them one shared snapshot
+_analytics_cache = TTLSnapshotCache(
+    "admin_analytics",
+    _compute_analytics,
+    ttl=float(os.getenv("ADMIN_ANALYTICS_TTL", "5")),
+    stale_ttl=float(os.getenv("ADMIN_ANALYTICS_STALE_TTL", "60"))
+)
+
 @router.get("/analytics")
 async def get_analytics():
     """Get admin analytics"""
     try:
-        # 1. Counts
-        doc_query = "SELECT COUNT(*) as count FROM doctors"
-        doctor_count = execute_query(doc_query)[0]['count']
-        
-        billing_query = "SELECT COUNT(*) as count FROM users WHERE role = 'billing'"
-        billing_count = execute_query(billing_query)[0]['count']
-        
-        admin_query = "SELECT COUNT(*) as count FROM users WHERE role = 'admin'"
-        admin_count = execute_query(admin_query)[0]['count']
-        
-        patient_query = "SELECT COUNT(*) as count FROM patients"
-        patient_count = execute_query(patient_query)[0]['count']
-        
-        # 2. Trends
-        trend_query = "SELECT to_char(appointment_date, 'Mon DD') as date, COUNT(*) as count FROM appointments WHERE appointment_date >= CURRENT_DATE - INTERVAL '7 days' GROUP BY 1 ORDER BY MIN(appointment_date)"
-        trend_res = execute_query(trend_query)
-        trend_labels = [row['date'] for row in trend_res]
-        trend_data = [row['count'] for row in trend_res]
-        
-        # 3. Department Load
-        try:
-            dept_query = "SELECT specialty, COUNT(*) as count FROM doctors GROUP BY specialty"
-            dept_res = execute_query(dept_query)
-            dept_data = {row['specialty']: row['count'] for row in dept_res}
-        except Exception:
-            dept_data = {"General": 5}
-
-        # 4. Security Logs
-        try:
-            usage_query = "SELECT role, COUNT(*) as count FROM audit_logs GROUP BY role"
-            usage_res = execute_query(usage_query)
-            usage_data = {row['role']: row['count'] for row in usage_res}
-            
-            sec_query = "SELECT username, question, status, timestamp FROM audit_logs ORDER BY timestamp DESC LIMIT 5"
-            sec_rows = execute_query(sec_query)
-        except Exception:
-            usage_data = {"Doctor": 10, "Admin": 5}
-            sec_rows = []
-
-        return {
-            "status": "success",
-            "counts": {
-                "doctors": doctor_count,
-                "billing": billing_count,
-                "admin": admin_count,
-                "patients": patient_count
-            },
-            "trend": {"labels": trend_labels, "data": trend_data},
-            "departments": dept_data,
-            "usage": usage_data,
-            "roles": {
-                "Doctor": doctor_count,
-                "Billing": billing_count,
-                "Admin": admin_count
-            },
-            "insights": [
-                "Patient growth is steady.",
-                "Cardiology department has highest load.",
-                f"{patient_count} active patients in the system."
-            ],
-            "security": sec_rows,
-            "summary": {
-                "active_today": execute_query("SELECT COUNT(*) as count FROM appointments WHERE DATE(appointment_date) = CURRENT_DATE")[0]['count']
-            }
-        }
+        return await _analytics_cache.get()
     except Exception as e:
         return {
             "status": "error",
@@ -173,24 +211,25 @@ async def create_user(user: UserCreate):
         raise HTTPException(status_code=400, detail="Invalid role. Must be: doctor, billing, or admin")
     
     # Check duplicate
-    check = execute_query(f"SELECT * FROM users WHERE username = '{user.username}'")
+    check = await db_async.fetch("SELECT * FROM users WHERE username = %s", (user.username,))
     if check:
         raise HTTPException(status_code=400, detail="Username already exists")
 
-    sql = f"INSERT INTO users (username, password, role) VALUES ('{user.username}', '{user.password}', '{user.role}')"
-    execute_query(sql)
+    await db_async.execute(
+        "INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
+        (user.username, user.password, user.role)
+    )
     return {"status": "success", "message": f"User {user.username} created"}
 
 @router.get("/users")
 async def get_all_users():
     query = "SELECT user_id as id, username, role FROM users ORDER BY role"
-    users = execute_query(query)
+    users = await db_async.fetch(query)
     return {"status": "success", "users": users}
 
 @router.delete("/users/{user_id}")
 async def delete_user(user_id: int):
-    query = f"DELETE FROM users WHERE user_id = {user_id}"
-    execute_query(query)
+    await db_async.execute("DELETE FROM users WHERE user_id = %s", (user_id,))
     return {"status": "success", "message": "User deleted"}
 
 @router.get("/departments")
@@ -213,12 +252,13 @@ def get_doctors():
 @router.post("/doctors")
 def add_doctor(doc: DoctorModel):
     # 1. Insert Doctor
-    sql = f"""
+    sql = """
         INSERT INTO doctors (first_name, last_name, specialty, email, phone_contact, department_id, seniority_level) 
-        VALUES ('{doc.first_name}', '{doc.last_name}', '{doc.specialty}', '{doc.email}', '{doc.phone_contact}', {doc.department_id}, '{doc.seniority_level}') 
+        VALUES (%s, %s, %s, %s, %s, %s, %s) 
         RETURNING doctor_id
     """
-    res = execute_query(sql)
+    res = execute_query(sql, (doc.first_name, doc.last_name, doc.specialty, doc.email,
+                              doc.phone_contact, doc.department_id, doc.seniority_level))
     
     if isinstance(res, dict) and "error" in res:
         raise HTTPException(status_code=500, detail=f"Database Error: {res['error']}")
@@ -232,21 +272,21 @@ def add_doctor(doc: DoctorModel):
     password = "password123" 
     
     try:
-        user_sql = f"INSERT INTO users (username, password, role) VALUES ('{username}', '{password}', 'doctor') RETURNING user_id"
-        user_res = execute_query(user_sql)
+        user_sql = "INSERT INTO users (username, password, role) VALUES (%s, %s, 'doctor') RETURNING user_id"
+        user_res = execute_query(user_sql, (username, password))
         
         if isinstance(user_res, dict) and "error" in user_res:
              raise Exception(user_res['error'])
         
         # Link user_id back to doctor
         new_user_id = user_res[0]['user_id']
-        execute_query(f"UPDATE doctors SET user_id = {new_user_id} WHERE doctor_id = {new_doc_id}")
+        execute_query("UPDATE doctors SET user_id = %s WHERE doctor_id = %s", (new_user_id, new_doc_id))
              
         msg = f"Doctor added. Login: {username} / {password}"
     except Exception as e:
         # Rollback
         if new_doc_id:
-            execute_query(f"DELETE FROM doctors WHERE doctor_id={new_doc_id}")
+            execute_query("DELETE FROM doctors WHERE doctor_id = %s", (new_doc_id,))
         raise HTTPException(status_code=500, detail=f"Failed to create user account. Doctor record rolled back. Error: {str(e)}")
 
     log_audit("admin", "admin", f"Added Doctor: {doc.last_name}", "SUCCESS")
@@ -254,108 +294,73 @@ def add_doctor(doc: DoctorModel):
 
 @router.put("/doctors/{id}")
 def update_doctor(id: int, doc: DoctorModel):
-    # Build dynamic update query
+    # Build dynamic update query (column names are fixed, values are parameters)
     update_parts = [
-        f"first_name='{doc.first_name}'",
-        f"last_name='{doc.last_name}'",
-        f"specialty='{doc.specialty}'",
-        f"email='{doc.email}'",
-        f"phone_contact='{doc.phone_contact}'",
-        f"seniority_level='{doc.seniority_level}'"
+        "first_name = %s",
+        "last_name = %s",
+        "specialty = %s",
+        "email = %s",
+        "phone_contact = %s",
+        "seniority_level = %s"
     ]
+    params = [doc.first_name, doc.last_name, doc.specialty, doc.email, doc.phone_contact, doc.seniority_level]
     if doc.department_id:
-        update_parts.append(f"department_id={doc.department_id}")
+        update_parts.append("department_id = %s")
+        params.append(doc.department_id)
     
-    sql = f"UPDATE doctors SET {', '.join(update_parts)} WHERE doctor_id={id}"
-    execute_query(sql)
+    sql = f"UPDATE doctors SET {', '.join(update_parts)} WHERE doctor_id = %s"
+    execute_query(sql, (*params, id))
     log_audit("admin", "admin", f"Updated Doctor ID: {id}", "SUCCESS")
     return {"message": "Doctor updated"}
 
 @router.delete("/doctors/{id}")
 def delete_doctor(id: int):
-    # Cascade delete safety
-    execute_query(f"DELETE FROM appointments WHERE doctor_id={id}")
-    execute_query(f"DELETE FROM medical_records WHERE doctor_id={id}")
-    execute_query(f"DELETE FROM doctors WHERE doctor_id={id}")
-    return {"message": "Doctor deleted"}
+    # Authored appointments/records go with the doctor, in one transaction
+    result = _run_deletion(deletion.delete_doctors, [id], "Doctor")
+    log_audit("admin", "admin", f"Deleted Doctor ID: {id}", "SUCCESS")
+    return {"message": "Doctor deleted", **result}
+
+@router.post("/doctors/bulk-delete")
+async def bulk_delete_doctors(request: BulkDeleteRequest):
+    """Delete many doctors at once; large lists (or background=true) run as a purge job"""
+    return await _bulk_delete("doctors", deletion.delete_doctors, request)
 
 @router.get("/patients")
-def get_patients():
-    """
-    Get top 50 patients showing MIXED status (Active, Discharged, Registered).
-    Uses LEFT JOIN with BOTH admissions AND appointments to catch all patients.
+def get_patients(response: Response, page_size: int = patient_listing.DEFAULT_PAGE_SIZE,
+                 after_patient_id: Optional[int] = None, status: Optional[str] = None,
+                 doctor_id: Optional[int] = None, gender: Optional[str] = None,
+                 search: Optional[str] = None):
     """
-    sql = """
-    SELECT 
-        -- Visual Serial Number
-        ROW_NUMBER() OVER (ORDER BY p.patient_id DESC) as serial_no,
-        
-        p.patient_id,
-        p.first_name,
-        p.last_name,
-        p.dob,
-        p.gender,
-        p.contact_number,
-        p.address,
-        p.insurance_provider,
-        
-        -- Calculate Age dynamically
-        EXTRACT(YEAR FROM AGE(CURRENT_DATE, p.dob)) as age,
-
-        -- Assigned Doctor ID (for edit mode)
-        COALESCE(d_appt.doctor_id, d_adm.doctor_id) as doctor_id,
-
-        -- Assigned Doctor Name (from appointments OR admissions)
-        COALESCE(
-            d_appt.first_name || ' ' || d_appt.last_name,
-            d_adm.first_name || ' ' || d_adm.last_name,
-            'Unassigned'
-        ) as assigned_doctor,
-
-        -- Room Number (from appointments OR admissions)
-        COALESCE(r_appt.room_number, r_adm.room_number, 'Waiting') as room_no,
-
-        -- Status (from admissions or appointments)
-        COALESCE(adm.status, appt.status, 'Registered') as status
-
-    FROM patients p
-    
-    -- LEFT JOIN with latest appointments (Emergency intake creates appointments)
-    LEFT JOIN (
-        SELECT DISTINCT ON (patient_id) * FROM appointments 
-        ORDER BY patient_id, appointment_date DESC
-    ) appt ON p.patient_id = appt.patient_id
-    
-    -- LEFT JOIN Doctors from appointments
-    LEFT JOIN doctors d_appt ON appt.doctor_id = d_appt.doctor_id
-    
-    -- LEFT JOIN Rooms from appointments
-    LEFT JOIN rooms r_appt ON appt.room_id = r_appt.room_id
-    
-    -- LEFT JOIN with latest admissions (Traditional admissions)
-    LEFT JOIN (
-        SELECT DISTINCT ON (patient_id) * FROM admissions 
-        ORDER BY patient_id, admission_date DESC
-    ) adm ON p.patient_id = adm.patient_id
-
-    -- LEFT JOIN Doctors from admissions
-    LEFT JOIN doctors d_adm ON adm.primary_doctor_id = d_adm.doctor_id
-
-    -- LEFT JOIN Rooms from admissions
-    LEFT JOIN rooms r_adm ON adm.room_id = r_adm.room_id
-
-    ORDER BY p.patient_id DESC
-    LIMIT 50
+    Patients newest first, with their latest appointment/admission (doctor, room, status).
+    Keyset paged: pass the X-Next-After-Patient-Id header back as after_patient_id.
     """
-    return execute_query(sql)
+    try:
+        page = patient_listing.patient_page(page_size, after_patient_id, status, doctor_id, gender, search)
+    except Exception as e:
+        return {"error": str(e), "status": "failed"}
+    if page["has_more"]:
+        response.headers["X-Next-After-Patient-Id"] = str(page["next_after_patient_id"])
+    return page["patients"]
+
+@router.get("/patients/{id}/state")
+def get_patient_state(id: int):
+    """One patient's current doctor, room and status (same row shape as the patient list)"""
+    try:
+        row = patient_listing.patient_state(id)
+    except Exception as e:
+        return {"error": str(e), "status": "failed"}
+    if row is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return row
 
 @router.post("/patients")
 def add_patient(pat: PatientModel):
-    sql = f"""
+    sql = """
         INSERT INTO patients (first_name, last_name, dob, gender, contact_number, address, insurance_provider) 
-        VALUES ('{pat.first_name}', '{pat.last_name}', '{pat.dob}', '{pat.gender}', '{pat.contact_number}', '{pat.address}', '{pat.insurance_provider}')
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
-    res = execute_query(sql)
+    res = execute_query(sql, (pat.first_name, pat.last_name, pat.dob, pat.gender,
+                              pat.contact_number, pat.address, pat.insurance_provider))
     if isinstance(res, dict) and "error" in res:
         raise HTTPException(status_code=500, detail=f"Database Error: {res['error']}")
         
@@ -365,62 +370,118 @@ def add_patient(pat: PatientModel):
 @router.put("/patients/{id}")
 def update_patient(id: int, pat: PatientModel):
     # Update basic patient info
-    sql = f"UPDATE patients SET first_name='{pat.first_name}', last_name='{pat.last_name}', dob='{pat.dob}', gender='{pat.gender}', contact_number='{pat.contact_number}', address='{pat.address}', insurance_provider='{pat.insurance_provider}' WHERE patient_id={id}"
-    execute_query(sql)
+    sql = """
+        UPDATE patients SET first_name = %s, last_name = %s, dob = %s, gender = %s,
+               contact_number = %s, address = %s, insurance_provider = %s
+        WHERE patient_id = %s
+    """
+    execute_query(sql, (pat.first_name, pat.last_name, pat.dob, pat.gender,
+                        pat.contact_number, pat.address, pat.insurance_provider, id))
     
     # Update appointment/assignment if doctor_id or room_number is provided
     if pat.doctor_id or pat.room_number or pat.status:
         # Check if patient has an appointment
-        appointment_check = execute_query(f"SELECT appointment_id FROM appointments WHERE patient_id={id} ORDER BY appointment_date DESC LIMIT 1")
+        appointment_check = execute_query(
+            "SELECT appointment_id FROM appointments WHERE patient_id = %s ORDER BY appointment_date DESC LIMIT 1", (id,)
+        )
         
         if appointment_check and len(appointment_check) > 0:
             # Update existing appointment
-            update_parts = []
+            update_parts, params = [], []
             if pat.doctor_id:
-                update_parts.append(f"doctor_id={pat.doctor_id}")
+                update_parts.append("doctor_id = %s")
+                params.append(pat.doctor_id)
             if pat.room_number:
                 # Find room_id from room number
-                room_lookup = execute_query(f"SELECT room_id FROM rooms WHERE room_number='{pat.room_number}' LIMIT 1")
+                room_lookup = execute_query("SELECT room_id FROM rooms WHERE room_number = %s LIMIT 1", (pat.room_number,))
                 if room_lookup and len(room_lookup) > 0:
-                    update_parts.append(f"room_id={room_lookup[0]['room_id']}")
+                    update_parts.append("room_id = %s")
+                    params.append(room_lookup[0]['room_id'])
             if pat.status:
-                update_parts.append(f"status='{pat.status}'")
+                update_parts.append("status = %s")
+                params.append(pat.status)
             
             if update_parts:
                 appt_id = appointment_check[0]['appointment_id']
-                update_sql = f"UPDATE appointments SET {', '.join(update_parts)} WHERE appointment_id={appt_id}"
-                execute_query(update_sql)
+                update_sql = f"UPDATE appointments SET {', '.join(update_parts)} WHERE appointment_id = %s"
+                execute_query(update_sql, (*params, appt_id))
         else:
             # Check admissions table
-            admission_check = execute_query(f"SELECT admission_id FROM admissions WHERE patient_id={id} ORDER BY admission_date DESC LIMIT 1")
+            admission_check = execute_query(
+                "SELECT admission_id FROM admissions WHERE patient_id = %s ORDER BY admission_date DESC LIMIT 1", (id,)
+            )
             if admission_check and len(admission_check) > 0:
-                update_parts = []
+                update_parts, params = [], []
                 if pat.room_number:
                     # Find room_id from room number
-                    room_lookup = execute_query(f"SELECT room_id FROM rooms WHERE room_number='{pat.room_number}' LIMIT 1")
+                    room_lookup = execute_query("SELECT room_id FROM rooms WHERE room_number = %s LIMIT 1", (pat.room_number,))
                     if room_lookup and len(room_lookup) > 0:
-                        update_parts.append(f"room_id={room_lookup[0]['room_id']}")
+                        update_parts.append("room_id = %s")
+                        params.append(room_lookup[0]['room_id'])
                 if pat.status:
-                    update_parts.append(f"status='{pat.status}'")
+                    update_parts.append("status = %s")
+                    params.append(pat.status)
                 
                 if update_parts:
                     adm_id = admission_check[0]['admission_id']
-                    update_sql = f"UPDATE admissions SET {', '.join(update_parts)} WHERE admission_id={adm_id}"
-                    execute_query(update_sql)
+                    update_sql = f"UPDATE admissions SET {', '.join(update_parts)} WHERE admission_id = %s"
+                    execute_query(update_sql, (*params, adm_id))
     
     log_audit("admin", "admin", f"Updated Patient ID: {id}", "SUCCESS")
     return {"message": "Patient updated"}
 
 @router.delete("/patients/{id}")
 def delete_patient(id: int):
-    # Cleanup all linked data before deleting patient
-    execute_query(f"DELETE FROM appointments WHERE patient_id={id}")
-    execute_query(f"DELETE FROM medical_records WHERE patient_id={id}")
-    execute_query(f"DELETE FROM allergies WHERE patient_id={id}")
-    execute_query(f"DELETE FROM invoices WHERE patient_id={id}")
-    execute_query(f"DELETE FROM admissions WHERE patient_id={id}")
-    execute_query(f"DELETE FROM patients WHERE patient_id={id}")
-    return {"message": "Patient deleted"}
+    # All linked rows and the patient go in one transaction
+    result = _run_deletion(deletion.delete_patients, [id], "Patient")
+    log_audit("admin", "admin", f"Deleted Patient ID: {id}", "SUCCESS")
+    return {"message": "Patient deleted", **result}
+
+@router.post("/patients/bulk-delete")
+async def bulk_delete_patients(request: BulkDeleteRequest):
+    """Delete many patients at once; large lists (or background=true) run as a purge job"""
+    return await _bulk_delete("patients", deletion.delete_patients, request)
+
+@router.get("/purge-jobs/{job_id}")
+def get_purge_job(job_id: str):
+    job = deletion.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    return job.to_dict()
+
+@router.get("/bed-board")
+def get_bed_board():
+    """Free beds per room type, wing and floor, from the in-memory bed board"""
+    if not bed_board.ready:
+        raise HTTPException(status_code=503, detail="Bed board is not running")
+    return bed_board.summary()
+
+def _run_deletion(delete, ids, label):
+    try:
+        result = delete(ids)
+    except deletion.DeletionBlocked as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database Error: {e}")
+    if len(ids) == 1 and result["missing"]:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    return result
+
+async def _bulk_delete(kind, delete, request):
+    if not request.ids:
+        raise HTTPException(status_code=400, detail="ids must not be empty")
+    background = request.background
+    if background is None:
+        background = len(request.ids) > deletion.BACKGROUND_THRESHOLD
+    if background:
+        job = deletion.start_purge(kind, request.ids)
+        await run_in_threadpool(log_audit, "admin", "admin",
+                                f"Started {kind} purge {job.id} ({len(job.ids)} ids)", "SUCCESS")
+        return {"message": "Purge started", **job.to_dict()}
+    result = await run_in_threadpool(_run_deletion, delete, request.ids, kind.capitalize())
+    await run_in_threadpool(log_audit, "admin", "admin",
+                            f"Deleted {result['requested'] - len(result['missing'])} {kind}", "SUCCESS")
+    return {"message": f"{kind.capitalize()} deleted", **result}
 
 @router.post("/appointments")
 def create_appointment(appt: AppointmentCreate):
@@ -441,8 +502,8 @@ def create_appointment(appt: AppointmentCreate):
         predicted_severity = "Low"
         
     # --- 2. ASSIGN DOCTOR ---
-    doc_query = f"SELECT doctor_id, department_id FROM doctors WHERE specialty = '{predicted_specialty}' LIMIT 1"
-    doc_result = execute_query(doc_query)
+    doc_query = "SELECT doctor_id, department_id FROM doctors WHERE specialty = %s LIMIT 1"
+    doc_result = execute_query(doc_query, (predicted_specialty,), prepare=True)
     
     if not doc_result:
         doc_result = execute_query("SELECT doctor_id, department_id FROM doctors LIMIT 1")
@@ -453,26 +514,24 @@ def create_appointment(appt: AppointmentCreate):
     doctor_id = doc_result[0]['doctor_id']
     dept_id = doc_result[0]['department_id']
     
-    # --- 3. ASSIGN ROOM ---
-    room_query = f"SELECT room_id FROM rooms WHERE status = 'Available' LIMIT 1"
-    room_result = execute_query(room_query)
-    
-    room_id = room_result[0]['room_id'] if room_result else "NULL"
-    
-    # --- 4. INSERT APPOINTMENT ---
-    sql = f"""
+    # --- 3. INSERT APPOINTMENT + ASSIGN ROOM ---
+    sql = """
         INSERT INTO appointments 
         (patient_id, doctor_id, department_id, room_id, patient_problem_text, predicted_specialty, predicted_severity, status, appointment_date)
         VALUES 
-        ({appt.patient_id}, {doctor_id}, {dept_id}, {room_id}, '{appt.problem_text}', '{predicted_specialty}', '{predicted_severity}', 'Scheduled', NOW())
+        (%s, %s, %s, %s, %s, %s, %s, 'Scheduled', NOW())
         RETURNING appointment_id
     """
     
+    room = None
     try:
-        new_appt = execute_query(sql)
-        # Mark room as Occupied if assigned
-        if room_id != "NULL":
-             execute_query(f"UPDATE rooms SET status = 'Occupied', current_occupancy = current_occupancy + 1 WHERE room_id = {room_id}")
+        # The bed is taken (by severity) and the appointment inserted in one transaction
+        with transaction() as conn:
+            room = take_room(conn, predicted_severity)
+            room_id = room['room_id'] if room else None
+            with conn.cursor() as cursor:
+                execute_prepared(cursor, sql, (appt.patient_id, doctor_id, dept_id, room_id, appt.problem_text,
+                                               predicted_specialty, predicted_severity))
              
         return {
             "status": "success", 
@@ -485,4 +544,6 @@ def create_appointment(appt: AppointmentCreate):
             }
         }
     except Exception as e:
+         if room:
+             bed_board.invalidate(room['room_id'])
          return {"status": "error", "message": str(e)}
\ No newline at end of file
@@ -1,9 +1,13 @@
 import os
 import re
-from fastapi import APIRouter
+from datetime import date
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from backend.db import execute_query
+from backend import billing_analytics, db_async, invoice_listing, invoicing, payment_reconciliation
 
 router = APIRouter()
 
@@ -36,6 +40,15 @@ class InvoiceCreateRequest(BaseModel):
     appointment_id: Optional[int] = None
     admission_id: Optional[int] = None
 
+class BatchInvoiceRequest(BaseModel):
+    # Either admission_ids, or discharged admissions within at least one date bound
+    admission_ids: Optional[List[int]] = None
+    discharged_from: Optional[date] = None
+    discharged_to: Optional[date] = None
+    tax_percentage: Optional[float] = 5.0
+    discount_percentage: Optional[float] = 0
+    due_days: Optional[int] = 30
+
 def is_safe_billing_sql(sql: str) -> bool:
     """Prevent access to sensitive clinical data"""
     if not sql:
@@ -256,8 +269,10 @@ async def billing_query(request: QueryRequest):
         
         # Audit log
         try:
-            safe_q = (request.text or "").replace("'", "''")[:500]
-            execute_query(f"INSERT INTO audit_logs (username, role, question, status) VALUES ('{(request.username or 'guest').replace(chr(39), chr(39)+chr(39))}', 'billing', '{safe_q}', 'GENERATED')")
+            await db_async.execute(
+                "INSERT INTO audit_logs (username, role, question, status) VALUES (%s, 'billing', %s, 'GENERATED')",
+                (request.username or 'guest', (request.text or "")[:500])
+            )
         except:
             pass
         
@@ -278,7 +293,7 @@ async def billing_query(request: QueryRequest):
             return {"error": "Query rejected - access to clinical data prohibited", "code": "UNSAFE_QUERY"}
         
         try:
-            results = execute_query(request.sql)
+            results = await db_async.fetch(request.sql, read_only=True)
             
             if not results:
                 return {
@@ -310,51 +325,15 @@ async def billing_query(request: QueryRequest):
 def get_billing_analytics():
     """Get billing analytics matching frontend expected format"""
     try:
-        # 1. SUMMARY CARDS
-        pending_invoices = execute_query("SELECT COUNT(*) as count FROM invoices WHERE status = 'Pending'")[0]['count']
-        
-        # Revenue today
-        rev_res = execute_query("SELECT COALESCE(SUM(total_amount), 0) as total FROM invoices WHERE issue_date = CURRENT_DATE AND status = 'Paid'")
-        revenue_today = rev_res[0]['total'] if rev_res else 0
-        
-        overdue_payments = execute_query("SELECT COUNT(*) as count FROM invoices WHERE status = 'Unpaid' AND issue_date < CURRENT_DATE - INTERVAL '30 days'")[0]['count']
-        
-        avg_delay_res = execute_query("SELECT AVG(CURRENT_DATE - issue_date) as days FROM invoices WHERE status = 'Unpaid'")
-        if avg_delay_res and avg_delay_res[0]['days'] is not None:
-             avg_delay = int(avg_delay_res[0]['days'])
-        else:
-             avg_delay = 0
-
-        # 2. REVENUE TREND
-        trend_raw = execute_query("SELECT to_char(issue_date, 'Mon DD') as date, COALESCE(SUM(total_amount), 0) as total FROM invoices WHERE status = 'Paid' GROUP BY 1 ORDER BY MIN(issue_date) LIMIT 7")
-        trend_labels = [row['date'] for row in trend_raw] if trend_raw else []
-        trend_values = [float(row['total']) for row in trend_raw] if trend_raw else []
-
-        # 3. INVOICE STATUS BREAKDOWN
-        status_raw = execute_query("SELECT status, COUNT(*) as count FROM invoices GROUP BY status")
-        status_data = {row['status']: row['count'] for row in status_raw} if status_raw else {}
+        # Summary, trend, status breakdown and aging come from one invoices scan
+        today, groups = billing_analytics.fetch_invoice_groups()
+        dashboard = billing_analytics.billing_dashboard(groups, today)
 
-        # 4. INSURANCE PROVIDER ANALYSIS
+        # INSURANCE PROVIDER ANALYSIS
         prov_raw = execute_query("SELECT insurance_provider, COUNT(*) as count FROM patients GROUP BY insurance_provider")
         prov_data = {row['insurance_provider']: row['count'] for row in prov_raw} if prov_raw else {}
 
-        # 5. INVOICE AGING
-        aging_sql = """
-            SELECT 
-                CASE 
-                    WHEN CURRENT_DATE - issue_date <= 7 THEN '0-7 Days'
-                    WHEN CURRENT_DATE - issue_date <= 30 THEN '7-30 Days'
-                    ELSE '30+ Days'
-                END as age_group,
-                COUNT(*) as count
-            FROM invoices
-            WHERE status != 'Paid'
-            GROUP BY 1
-        """
-        aging_raw = execute_query(aging_sql)
-        aging_data = {row['age_group']: row['count'] for row in aging_raw} if aging_raw else {}
-
-        # 6. AI FINANCE QUERIES
+        # AI FINANCE QUERIES
         try:
             ai_finance = execute_query("SELECT COUNT(*) as count FROM audit_logs WHERE role='billing' AND DATE(timestamp) = CURRENT_DATE")[0]['count']
             most_req = execute_query("SELECT question, COUNT(*) as count FROM audit_logs WHERE role='billing' GROUP BY question ORDER BY count DESC LIMIT 1")
@@ -364,59 +343,57 @@ def get_billing_analytics():
             most_req_txt = "None"
 
         return {
-            "summary": {
-                "pending": pending_invoices,
-                "revenue_today": float(revenue_today) if revenue_today else 0,
-                "overdue": overdue_payments,
-                "delay": avg_delay
-            },
-            "trend": {"labels": trend_labels, "data": trend_values},
-            "status": status_data,
+            "summary": dashboard["summary"],
+            "trend": dashboard["trend"],
+            "status": dashboard["status"],
             "insurance": prov_data,
-            "aging": aging_data,
+            "aging": dashboard["aging"],
             "ai": {"count": ai_finance, "top_query": most_req_txt}
         }
     except Exception as e:
         return {"error": str(e)}
 
 
+@router.post("/billing/rollup/reconcile")
+def reconcile_billing_rollup():
+    """Re-check invoice_daily_rollup against invoices now (also runs nightly)"""
+    try:
+        corrected = billing_analytics.reconcile_rollup()
+        return {"corrected_rows": corrected, "status": "success"}
+    except Exception as e:
+        return {"error": str(e), "status": "failed"}
+
+
 @router.get("/billing/unpaid-invoices")
-def get_unpaid_invoices():
-    """Get all unpaid invoices for dashboard display"""
+def get_unpaid_invoices(limit: int = invoice_listing.DEFAULT_PAGE_SIZE, cursor: Optional[str] = None):
+    """Get unpaid invoices for dashboard display, one keyset page at a time (pass next_cursor back)"""
     try:
-        query = """
-            SELECT 
-                i.invoice_id,
-                p.patient_id,
-                COALESCE(p.first_name, 'Unknown') as first_name,
-                COALESCE(p.last_name, 'Unknown') as last_name,
-                i.total_amount,
-                i.status,
-                i.issue_date,
-                COALESCE(i.due_date, i.issue_date + INTERVAL '30 days') as due_date,
-                CAST(CURRENT_DATE - i.issue_date AS INTEGER) as days_outstanding,
-                CASE 
-                    WHEN CURRENT_DATE - i.issue_date > 90 THEN 'Critical'
-                    WHEN CURRENT_DATE - i.issue_date > 60 THEN 'Overdue'
-                    WHEN CURRENT_DATE - i.issue_date > 30 THEN 'Due Soon'
-                    ELSE 'Current'
-                END as priority
-            FROM invoices i
-            INNER JOIN patients p ON i.patient_id = p.patient_id
-            WHERE LOWER(i.status) IN ('unpaid', 'pending')
-            ORDER BY days_outstanding DESC, i.total_amount DESC
-            LIMIT 500
-        """
-        results = execute_query(query)
+        page = invoice_listing.unpaid_invoice_page(limit, cursor)
         return {
-            "invoices": results,
-            "count": len(results) if results else 0,
+            "invoices": page["invoices"],
+            "count": len(page["invoices"]),
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"],
             "status": "success"
         }
     except Exception as e:
         return {"error": str(e), "status": "failed"}
 
 
+@router.get("/billing/unpaid-invoices/export")
+def export_unpaid_invoices(format: str = "csv"):
+    """Stream every unpaid invoice as CSV or NDJSON (constant memory, no row limit)"""
+    if format == "csv":
+        return StreamingResponse(
+            invoice_listing.export_csv(),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="unpaid_invoices.csv"'}
+        )
+    if format == "ndjson":
+        return StreamingResponse(invoice_listing.export_ndjson(), media_type="application/x-ndjson")
+    return {"error": "Invalid format. Must be one of: ['csv', 'ndjson']", "status": "failed"}
+
+
 @router.put("/billing/update-payment")
 async def update_payment(request: PaymentUpdateRequest):
     """Update invoice payment status"""
@@ -430,26 +407,32 @@ async def update_payment(request: PaymentUpdateRequest):
             return {"error": f"Invalid status. Must be one of: {valid_statuses}", "status": "failed"}
         
         # Build update query based on actual table columns
-        payment_date = f"'{request.payment_date}'" if request.payment_date else "CURRENT_TIMESTAMP"
         amount_paid = request.payment_amount if request.payment_amount else 0
         
         # Get current invoice info first
-        check_query = f"SELECT invoice_id, total_amount, amount_paid FROM invoices WHERE invoice_id = {request.invoice_id}"
-        existing = execute_query(check_query)
+        existing = await db_async.fetch(
+            "SELECT invoice_id, total_amount, amount_paid FROM invoices WHERE invoice_id = %s",
+            (request.invoice_id,),
+            prepare=True
+        )
         
         if not existing:
             return {"error": "Invoice not found", "status": "failed"}
         
-        update_query = f"""
+        update_query = """
             UPDATE invoices
-            SET status = '{request.status}',
-                payment_date = {payment_date},
-                amount_paid = {amount_paid}
-            WHERE invoice_id = {request.invoice_id}
+            SET status = %s,
+                payment_date = COALESCE(%s::timestamp, CURRENT_TIMESTAMP),
+                amount_paid = %s
+            WHERE invoice_id = %s
             RETURNING invoice_id, status, payment_date, total_amount, amount_paid
         """
         
-        result = execute_query(update_query)
+        result = await db_async.fetch(
+            update_query,
+            (request.status, request.payment_date, amount_paid, request.invoice_id),
+            prepare=True
+        )
         
         if result:
             return {
@@ -464,78 +447,29 @@ async def update_payment(request: PaymentUpdateRequest):
         return {"error": str(e), "status": "failed"}
 
 
+@router.post("/billing/reconcile-payments")
+async def reconcile_payments(request: Request):
+    """
+    Apply a settlement batch of (invoice_id, amount, date, mode) payments in one transaction.
+    Body is CSV (Content-Type: text/csv, header row) or JSON (a list or {"payments": [...]}).
+    """
+    try:
+        rows = payment_reconciliation.parse_body(await request.body(), request.headers.get("content-type", ""))
+        result = await run_in_threadpool(payment_reconciliation.reconcile_payments, rows)
+        return {**result, "status": "success"}
+    except Exception as e:
+        return {"error": str(e), "status": "failed"}
+
+
 @router.get("/billing/payment-analytics")
 def get_payment_analytics():
     """Get real-time payment analytics for dashboard"""
     try:
-        # Summary cards
-        summary_query = """
-            SELECT 
-                COUNT(CASE WHEN status = 'Pending' THEN 1 END) as pending_count,
-                COUNT(CASE WHEN status IN ('Unpaid', 'Pending') AND CURRENT_DATE > (issue_date + INTERVAL '30 days') THEN 1 END) as overdue_count,
-                COALESCE(SUM(CASE WHEN DATE(issue_date) = CURRENT_DATE AND status = 'Paid' THEN total_amount ELSE 0 END), 0) as revenue_today,
-                COALESCE(SUM(CASE WHEN status IN ('Unpaid', 'Pending') THEN total_amount ELSE 0 END), 0) as pending_revenue
-            FROM invoices
-        """
-        
-        summary = execute_query(summary_query)[0] if execute_query(summary_query) else {}
-        
-        # Invoice status breakdown
-        status_query = """
-            SELECT status, COUNT(*) as count, COALESCE(SUM(total_amount), 0) as total
-            FROM invoices
-            GROUP BY status
-            ORDER BY count DESC
-        """
-        
-        status_data = execute_query(status_query) or []
-        
-        # Revenue trend (last 7 days)
-        trend_query = """
-            SELECT 
-                TO_CHAR(issue_date, 'Mon DD') as date,
-                COALESCE(SUM(CASE WHEN status = 'Paid' THEN total_amount ELSE 0 END), 0) as paid,
-                COALESCE(SUM(CASE WHEN status IN ('Unpaid', 'Pending') THEN total_amount ELSE 0 END), 0) as unpaid
-            FROM invoices
-            WHERE issue_date >= CURRENT_DATE - INTERVAL '7 days'
-            GROUP BY TO_CHAR(issue_date, 'Mon DD'), issue_date
-            ORDER BY issue_date ASC
-        """
-        
-        trend_data = execute_query(trend_query) or []
-        
-        # Invoice aging
-        aging_query = """
-            SELECT 
-                CASE 
-                    WHEN CURRENT_DATE - issue_date <= 7 THEN '0-7 Days'
-                    WHEN CURRENT_DATE - issue_date <= 30 THEN '7-30 Days'
-                    WHEN CURRENT_DATE - issue_date <= 60 THEN '30-60 Days'
-                    ELSE '60+ Days'
-                END as age_group,
-                COUNT(*) as count,
-                COALESCE(SUM(total_amount), 0) as total
-            FROM invoices
-            WHERE status IN ('Unpaid', 'Pending')
-            GROUP BY age_group
-            ORDER BY 
-                CASE age_group
-                    WHEN '0-7 Days' THEN 1
-                    WHEN '7-30 Days' THEN 2
-                    WHEN '30-60 Days' THEN 3
-                    ELSE 4
-                END
-        """
-        
-        aging_data = execute_query(aging_query) or []
-        
-        return {
-            "summary": summary,
-            "status_breakdown": status_data,
-            "revenue_trend": trend_data,
-            "invoice_aging": aging_data,
-            "status": "success"
-        }
+        # Everything below is derived from one aggregated invoices scan
+        today, groups = billing_analytics.fetch_invoice_groups()
+        dashboard = billing_analytics.payment_dashboard(groups, today)
+
+        return {**dashboard, "status": "success"}
         
     except Exception as e:
         return {"error": str(e), "status": "failed"}
@@ -546,27 +480,27 @@ async def generate_invoice(request: InvoiceCreateRequest):
     """Generate a new invoice for a patient"""
     try:
         # Validate patient exists
-        patient_check = execute_query(f"SELECT patient_id, first_name, last_name FROM patients WHERE patient_id = {request.patient_id}")
+        patient_check = await db_async.fetch(
+            "SELECT patient_id, first_name, last_name FROM patients WHERE patient_id = %s",
+            (request.patient_id,)
+        )
         if not patient_check:
             return {"error": "Patient not found", "status": "failed"}
         
         patient = patient_check[0]
         
-        # Calculate amounts
-        subtotal = (request.consultation_charges + request.room_charges + 
-                   request.medication_charges + request.lab_charges + 
-                   request.surgery_charges + request.other_charges)
-        
-        tax_amount = round(subtotal * (request.tax_percentage / 100), 2)
-        discount_amount = round(subtotal * (request.discount_percentage / 100), 2)
-        total_amount = round(subtotal + tax_amount - discount_amount, 2)
-        patient_payable = round(total_amount - request.insurance_claim_amount, 2)
-        
-        # Build insert query
-        appointment_id = request.appointment_id if request.appointment_id else "NULL"
-        admission_id = request.admission_id if request.admission_id else "NULL"
-        
-        insert_query = f"""
+        # Calculate amounts (shared with batch invoicing)
+        amounts = invoicing.invoice_amounts(
+            {field: getattr(request, field) for field in invoicing.CHARGE_FIELDS},
+            request.tax_percentage, request.discount_percentage, request.insurance_claim_amount
+        )
+        subtotal = amounts["subtotal"]
+        tax_amount = amounts["tax_amount"]
+        discount_amount = amounts["discount_amount"]
+        total_amount = amounts["total_amount"]
+        patient_payable = amounts["patient_payable"]
+        
+        insert_query = """
             INSERT INTO invoices (
                 patient_id, appointment_id, admission_id,
                 consultation_charges, room_charges, medication_charges,
@@ -576,18 +510,26 @@ async def generate_invoice(request: InvoiceCreateRequest):
                 total_amount, insurance_claim_amount, patient_payable,
                 status, issue_date, due_date
             ) VALUES (
-                {request.patient_id}, {appointment_id}, {admission_id},
-                {request.consultation_charges}, {request.room_charges}, {request.medication_charges},
-                {request.lab_charges}, {request.surgery_charges}, {request.other_charges},
-                {request.tax_percentage}, {tax_amount},
-                {request.discount_percentage}, {discount_amount},
-                {total_amount}, {request.insurance_claim_amount}, {patient_payable},
-                'Unpaid', CURRENT_DATE, CURRENT_DATE + INTERVAL '{request.due_days} days'
+                %s, %s, %s,
+                %s, %s, %s,
+                %s, %s, %s,
+                %s, %s,
+                %s, %s,
+                %s, %s, %s,
+                'Unpaid', CURRENT_DATE, CURRENT_DATE + make_interval(days => %s)
             )
             RETURNING invoice_id, patient_id, total_amount, patient_payable, status, issue_date, due_date
         """
         
-        result = execute_query(insert_query)
+        result = await db_async.fetch(insert_query, (
+            request.patient_id, request.appointment_id or None, request.admission_id or None,
+            request.consultation_charges, request.room_charges, request.medication_charges,
+            request.lab_charges, request.surgery_charges, request.other_charges,
+            request.tax_percentage, tax_amount,
+            request.discount_percentage, discount_amount,
+            total_amount, request.insurance_claim_amount, patient_payable,
+            request.due_days
+        ))
         
         if result:
             invoice = result[0]
@@ -609,11 +551,37 @@ async def generate_invoice(request: InvoiceCreateRequest):
         return {"error": str(e), "status": "failed"}
 
 
+@router.post("/billing/invoices/batch")
+def start_batch_invoices(request: BatchInvoiceRequest):
+    """Invoice many admissions at once in the background; poll the returned job for progress"""
+    selection = {"admission_ids": request.admission_ids,
+                 "discharged_from": request.discharged_from,
+                 "discharged_to": request.discharged_to}
+    try:
+        invoicing.check_selection(**selection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        job = invoicing.start_job(selection, request.tax_percentage, request.discount_percentage, request.due_days)
+        return {"job": job, "status": "success"}
+    except Exception as e:
+        return {"error": str(e), "status": "failed"}
+
+
+@router.get("/billing/invoices/batch/{job_id}")
+def get_batch_invoice_job(job_id: str):
+    """Progress of a batch invoice job"""
+    job = invoicing.get_job(job_id)
+    if job is None:
+        return {"error": "Job not found", "status": "failed"}
+    return {"job": job, "status": "success"}
+
+
 @router.get("/billing/invoice/{invoice_id}")
 async def get_invoice_details(invoice_id: int):
     """Get detailed invoice information for printing/viewing"""
     try:
-        query = f"""
+        query = """
             SELECT 
                 i.*,
                 p.first_name, p.last_name, p.contact_number, p.email,
@@ -621,10 +589,10 @@ async def get_invoice_details(invoice_id: int):
                 p.insurance_provider, p.insurance_number
             FROM invoices i
             INNER JOIN patients p ON i.patient_id = p.patient_id
-            WHERE i.invoice_id = {invoice_id}
+            WHERE i.invoice_id = %s
         """
         
-        result = execute_query(query)
+        result = await db_async.fetch(query, (invoice_id,), prepare=True)
         
         if result:
             invoice = result[0]
@@ -656,7 +624,7 @@ async def get_patients_for_billing():
             LIMIT 500
         """
         
-        result = execute_query(query)
+        result = await db_async.fetch(query, prepare=True)
         
         return {
             "patients": result or [],
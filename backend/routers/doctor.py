@@ -3,6 +3,7 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 from typing import Optional
 from backend.db import execute_query
+from backend import db_async, patient_listing
 from huggingface_hub import InferenceClient
 
 router = APIRouter()
@@ -93,7 +94,7 @@ async def doctor_query(request: QueryRequest):
                 INNER JOIN rooms r ON adm.room_id = r.room_id
                 WHERE adm.primary_doctor_id = (SELECT doctor_id FROM doctors WHERE is_active = TRUE LIMIT 1) 
                   AND adm.status = 'Active'
-                  AND adm.discharge_date IS NULL
+                  AND adm.actual_discharge_date IS NULL
                 ORDER BY adm.admission_date DESC
                 LIMIT 50
             """,
@@ -112,7 +113,7 @@ async def doctor_query(request: QueryRequest):
                 INNER JOIN rooms r ON adm.room_id = r.room_id
                 WHERE adm.primary_doctor_id = (SELECT doctor_id FROM doctors WHERE is_active = TRUE LIMIT 1) 
                   AND adm.status = 'Active'
-                  AND adm.discharge_date IS NULL
+                  AND adm.actual_discharge_date IS NULL
                 LIMIT 50
             """,
 
@@ -252,12 +253,12 @@ async def doctor_query(request: QueryRequest):
         if not matched and any(kw in req_lower for kw in dangerous_keywords):
             return {"generated_sql": "INVALID_SQL_REQUEST", "reason": "Unsafe query detected"}
 
-        # Audit Log (SQL Injection Protected)
+        # Audit Log (parameterized, truncated to prevent overflow)
         try:
-            safe_q = (request.text or "").replace("'", "''")[:500]  # Truncate to prevent overflow
-            safe_user = (request.username or "guest").replace("'", "''")[:100]
-            safe_role = (request.role or "unknown").replace("'", "''")[:50]
-            execute_query(f"INSERT INTO audit_logs (username, role, question, status) VALUES ('{safe_user}', '{safe_role}', '{safe_q}', 'GENERATED')")
+            await db_async.execute(
+                "INSERT INTO audit_logs (username, role, question, status) VALUES (%s, %s, %s, 'GENERATED')",
+                ((request.username or "guest")[:100], (request.role or "unknown")[:50], (request.text or "")[:500])
+            )
         except Exception:
             pass  # Fail silently - audit is not critical
             
@@ -277,7 +278,7 @@ async def doctor_query(request: QueryRequest):
             return {"error": "Query too long", "code": "QUERY_TOO_LONG"}
         
         try:
-            results = execute_query(request.sql)
+            results = await db_async.fetch(request.sql, read_only=True)
             
             # Handle empty results gracefully
             if not results or len(results) == 0:
@@ -359,25 +360,7 @@ def get_doctor_analytics():
 def get_doctor_patients():
     """Returns a list of patients assigned to the doctor"""
     try:
-        # Improved Logic: Get latest medical record for each patient
-        query = """
-            SELECT 
-                p.patient_id, 
-                p.first_name, 
-                p.last_name, 
-                p.dob, 
-                p.gender, 
-                p.contact_number, 
-                m.diagnosis, 
-                m.treatment_plan
-            FROM patients p
-            LEFT JOIN (
-                SELECT DISTINCT ON (patient_id) * FROM medical_records 
-                ORDER BY patient_id, record_date DESC
-            ) m ON p.patient_id = m.patient_id
-            LIMIT 50
-        """
-        results = execute_query(query)
-        return results
+        # Latest medical record per patient, from the patient_current_state projection
+        return patient_listing.doctor_patients()
     except Exception as e:
         return {"error": str(e)}
\ No newline at end of file
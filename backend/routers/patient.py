@@ -2,8 +2,8 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from datetime import date
 from typing import Optional
-from ..ml_service import predict_department
-from ..db import get_available_doctor, get_available_room, create_emergency_patient, create_emergency_appointment, verify_patient_login
+from ..ml_service import predict_department_timed
+from ..db import get_available_doctor, admit_emergency_patient, verify_patient_login
 
 router = APIRouter()
 
@@ -119,7 +119,7 @@ def assign_doctor(request: SymptomCheck):
         
         # 1. Use ML to predict the department based on symptoms
         try:
-            predicted_dept_name, confidence = predict_department(request.problem_description)
+            predicted_dept_name, confidence, ml_timings = predict_department_timed(request.problem_description)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"ML prediction error: {str(e)}")
         
@@ -139,7 +139,8 @@ def assign_doctor(request: SymptomCheck):
             "patient_id": request.patient_id,
             "symptoms": request.problem_description,
             "predicted_department": predicted_dept_name,
-            "confidence_score": round(float(confidence), 4)
+            "confidence_score": round(float(confidence), 4),
+            "ml_timings_ms": ml_timings
         }
 
         if not doctor:
@@ -174,12 +175,13 @@ def emergency_patient_intake(request: EmergencyPatientIntake):
     Emergency Patient Registration and Assignment System
     
     Flow:
-    1. Create new patient record with emergency priority
-    2. Use ML to predict department and severity (default: Critical/Emergency)
-    3. Assign available doctor based on specialization
-    4. Assign available room based on severity (Emergency/ICU/General)
-    5. Create emergency appointment with all assignments
-    6. Return complete registration details
+    1. Use ML to predict department and severity (default: Critical/Emergency)
+    2. In one database transaction:
+       create the patient record with emergency priority,
+       assign an available doctor based on specialization,
+       assign an available room based on severity (Emergency/ICU/General),
+       create the emergency appointment and take the bed
+    3. Return complete registration details
     
     Returns:
         Complete patient registration with doctor and room assignments
@@ -200,7 +202,19 @@ def emergency_patient_intake(request: EmergencyPatientIntake):
         
         response_data["messages"].append("✅ Input validated")
         
-        # Step 2: Create Patient Record (EMERGENCY PRIORITY)
+        # Step 2: ML Prediction for Department & Severity (before any row is locked)
+        try:
+            predicted_dept_name, confidence, ml_timings = predict_department_timed(request.problem_description)
+            predicted_dept_name = predicted_dept_name.strip()
+            
+            # Default to Emergency/Critical severity for all new patients
+            severity = "Emergency"
+            
+        except Exception as e:
+            response_data["messages"].append(f"❌ ML prediction error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"ML prediction failed: {str(e)}")
+        
+        # Step 3: Register patient, doctor, room and appointment atomically
         try:
             patient_data = {
                 "first_name": request.first_name,
@@ -217,116 +231,84 @@ def emergency_patient_intake(request: EmergencyPatientIntake):
                 "state": request.state,
                 "pincode": request.pincode
             }
+            appointment_data = {
+                "problem_description": request.problem_description,
+                "symptoms": request.symptoms or request.problem_description,
+                "predicted_specialty": predicted_dept_name,
+                "severity": severity,
+                "confidence_score": float(confidence)
+            }
             
-            patient_id = create_emergency_patient(patient_data)
-            response_data["patient_id"] = patient_id
-            response_data["patient_created"] = True
-            response_data["messages"].append(f"✅ PATIENT REGISTERED - ID: {patient_id}")
+            intake = admit_emergency_patient(patient_data, predicted_dept_name, severity, appointment_data)
             
         except Exception as e:
-            response_data["messages"].append(f"❌ Patient creation failed: {str(e)}")
+            response_data["messages"].append(f"❌ Patient registration failed: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Patient registration failed: {str(e)}")
         
-        # Step 3: ML Prediction for Department & Severity
-        try:
-            predicted_dept_name, confidence = predict_department(request.problem_description)
-            predicted_dept_name = predicted_dept_name.strip()
-            
-            # Default to Emergency/Critical severity for all new patients
-            severity = "Emergency"
-            
-            response_data["predicted_department"] = predicted_dept_name
-            response_data["confidence_score"] = round(float(confidence), 4)
-            response_data["severity"] = severity
-            response_data["messages"].append(f"✅ ML PREDICTION: {predicted_dept_name} (Confidence: {round(confidence*100, 2)}%)")
-            
-        except Exception as e:
-            response_data["messages"].append(f"❌ ML prediction error: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"ML prediction failed: {str(e)}")
+        patient_id = intake["patient_id"]
+        response_data["patient_id"] = patient_id
+        response_data["patient_created"] = True
+        response_data["messages"].append(f"✅ PATIENT REGISTERED - ID: {patient_id}")
         
-        # Step 4: Assign Doctor
-        try:
-            doctor = get_available_doctor(predicted_dept_name)
-            
-            if not doctor:
-                response_data["doctor_status"] = "Doctor Not Available"
-                response_data["messages"].append(f"⚠️ DOCTOR NOT AVAILABLE in {predicted_dept_name}")
-                response_data["assigned_doctor"] = {
-                    "status": "unavailable",
-                    "message": f"No doctors currently available in {predicted_dept_name} department"
-                }
-            else:
-                response_data["doctor_assigned"] = True
-                response_data["doctor_status"] = "Assigned"
-                response_data["assigned_doctor"] = {
-                    "doctor_id": doctor['doctor_id'],
-                    "first_name": doctor['first_name'],
-                    "last_name": doctor['last_name'],
-                    "full_name": f"Dr. {doctor['first_name']} {doctor['last_name']}",
-                    "room_number": doctor['room_number'],
-                    "consultation_fee": doctor['consultation_fee'],
-                    "department": doctor['department_name'],
-                    "status": "available"
-                }
-                response_data["messages"].append(f"✅ DOCTOR ASSIGNED: Dr. {doctor['first_name']} {doctor['last_name']}")
-                
-        except Exception as e:
-            response_data["messages"].append(f"❌ Doctor assignment error: {str(e)}")
-            response_data["doctor_status"] = "Error"
+        response_data["predicted_department"] = predicted_dept_name
+        response_data["confidence_score"] = round(float(confidence), 4)
+        response_data["severity"] = severity
+        response_data["ml_timings_ms"] = ml_timings
+        response_data["messages"].append(f"✅ ML PREDICTION: {predicted_dept_name} (Confidence: {round(confidence*100, 2)}%)")
         
-        # Step 5: Assign Room
-        try:
-            room = get_available_room(severity)
-            
-            if not room:
-                response_data["room_status"] = "Room Not Available – Immediate Attention Required"
-                response_data["messages"].append("⚠️ ROOM NOT AVAILABLE - IMMEDIATE ATTENTION REQUIRED")
-                response_data["assigned_room"] = {
-                    "status": "unavailable",
-                    "message": "No rooms available - Patient needs immediate attention in waiting area"
-                }
-            else:
-                response_data["room_assigned"] = True
-                response_data["room_status"] = "Assigned"
-                response_data["assigned_room"] = {
-                    "room_id": room['room_id'],
-                    "room_number": room['room_number'],
-                    "room_type": room['room_type'],
-                    "wing": room['wing'],
-                    "floor": room['floor_number'],
-                    "status": "assigned"
-                }
-                response_data["messages"].append(f"✅ ROOM ASSIGNED: {room['room_number']} ({room['room_type']})")
-                
-        except Exception as e:
-            response_data["messages"].append(f"❌ Room assignment error: {str(e)}")
-            response_data["room_status"] = "Error"
+        # Doctor assignment
+        doctor = intake["doctor"]
+        if not doctor:
+            response_data["doctor_status"] = "Doctor Not Available"
+            response_data["messages"].append(f"⚠️ DOCTOR NOT AVAILABLE in {predicted_dept_name}")
+            response_data["assigned_doctor"] = {
+                "status": "unavailable",
+                "message": f"No doctors currently available in {predicted_dept_name} department"
+            }
+        else:
+            response_data["doctor_assigned"] = True
+            response_data["doctor_status"] = "Assigned"
+            response_data["assigned_doctor"] = {
+                "doctor_id": doctor['doctor_id'],
+                "first_name": doctor['first_name'],
+                "last_name": doctor['last_name'],
+                "full_name": f"Dr. {doctor['first_name']} {doctor['last_name']}",
+                "room_number": doctor['room_number'],
+                "consultation_fee": doctor['consultation_fee'],
+                "department": doctor['department_name'],
+                "status": "available"
+            }
+            response_data["messages"].append(f"✅ DOCTOR ASSIGNED: Dr. {doctor['first_name']} {doctor['last_name']}")
         
-        # Step 6: Create Emergency Appointment
-        if response_data["patient_created"]:
-            try:
-                appointment_data = {
-                    "patient_id": patient_id,
-                    "doctor_id": doctor['doctor_id'] if doctor else None,
-                    "department_id": doctor['department_id'] if doctor else None,
-                    "room_id": room['room_id'] if room else None,
-                    "problem_description": request.problem_description,
-                    "symptoms": request.symptoms or request.problem_description,
-                    "predicted_specialty": predicted_dept_name,
-                    "severity": severity,
-                    "confidence_score": float(confidence)
-                }
-                
-                if doctor:  # Only create appointment if doctor is available
-                    appointment_id = create_emergency_appointment(appointment_data)
-                    response_data["appointment_id"] = appointment_id
-                    response_data["appointment_created"] = True
-                    response_data["messages"].append(f"✅ EMERGENCY APPOINTMENT CREATED - ID: {appointment_id}")
-                else:
-                    response_data["messages"].append("⚠️ APPOINTMENT NOT CREATED - No doctor available (Patient in waitlist)")
-                    
-            except Exception as e:
-                response_data["messages"].append(f"⚠️ Appointment creation warning: {str(e)}")
+        # Room assignment
+        room = intake["room"]
+        if not room:
+            response_data["room_status"] = "Room Not Available – Immediate Attention Required"
+            response_data["messages"].append("⚠️ ROOM NOT AVAILABLE - IMMEDIATE ATTENTION REQUIRED")
+            response_data["assigned_room"] = {
+                "status": "unavailable",
+                "message": "No rooms available - Patient needs immediate attention in waiting area"
+            }
+        else:
+            response_data["room_assigned"] = True
+            response_data["room_status"] = "Assigned"
+            response_data["assigned_room"] = {
+                "room_id": room['room_id'],
+                "room_number": room['room_number'],
+                "room_type": room['room_type'],
+                "wing": room['wing'],
+                "floor": room['floor_number'],
+                "status": "assigned"
+            }
+            response_data["messages"].append(f"✅ ROOM ASSIGNED: {room['room_number']} ({room['room_type']})")
+        
+        # Emergency appointment
+        if intake["appointment_id"]:
+            response_data["appointment_id"] = intake["appointment_id"]
+            response_data["appointment_created"] = True
+            response_data["messages"].append(f"✅ EMERGENCY APPOINTMENT CREATED - ID: {intake['appointment_id']}")
+        else:
+            response_data["messages"].append("⚠️ APPOINTMENT NOT CREATED - No doctor available (Patient in waitlist)")
         
         # Final Status
         if response_data["patient_created"] and response_data["doctor_assigned"] and response_data["room_assigned"]:
@@ -1,10 +1,16 @@
 """
 FastAPI routes for Triage System with Database Persistence
 """
+import os
 from fastapi import APIRouter
 from typing import List, Dict, Any
+import psycopg2
 from backend.core.triage_engine import MedicalTriageEngine
-from backend.db import execute_query
+from backend.core.triage_pool import triage_pool
+from backend.core.multilingual import detect_language
+from backend import db_async
+from backend.runtime import cpu_executor
+from backend.write_behind import WriteBehindWriter
 from backend.schemas.triage import (
     TriageRequest, TriageResponse, BatchTriageRequest,
     Explainability, SeverityEnum, StatusEnum
@@ -15,6 +21,8 @@ router = APIRouter(prefix="/triage", tags=["Medical Triage"])
 # Initialize engine (singleton)
 engine = MedicalTriageEngine.get_instance()
 
+_DB_TRIAGE_STATUS = {"ASSIGNED": "ASSIGN"}
+
 def _fallback_response() -> TriageResponse:
     return TriageResponse(
         medical_category="REFER",
@@ -30,63 +38,89 @@ def _fallback_response() -> TriageResponse:
         )
     )
 
-def _save_triage_result(result: dict, request: TriageRequest) -> int:
+_INSERT_TRIAGE_SQL = """
+    INSERT INTO triage_results (
+        symptoms,
+        patient_age,
+        patient_gender,
+        medical_category,
+        severity,
+        assigned_doctor,
+        room_allotted,
+        triage_status,
+        explanation_en,
+        explanation_kn,
+        explanation_hi,
+        detected_language,
+        confidence_score,
+        model_version,
+        analysis_timestamp
+    ) VALUES %s
+"""
+# Last value is the seconds the row waited in the write-behind queue, so
+# analysis_timestamp is when the analysis ran, not when the batch was flushed
+_TRIAGE_ROW_TEMPLATE = ("(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '1.0', "
+                        "CURRENT_TIMESTAMP - make_interval(secs => %s))")
+
+
+async def _insert_triage_rows(batch: List[tuple]):
+    """Flushes queued triage rows with multi-row INSERTs"""
+    rows = [row + (queued_s,) for row, queued_s in batch]
+    try:
+        await db_async.insert_many(_INSERT_TRIAGE_SQL, rows, template=_TRIAGE_ROW_TEMPLATE)
+    except (psycopg2.DataError, psycopg2.IntegrityError):
+        # One bad row shouldn't sink the batch: insert row by row, skip the rejects
+        for row in rows:
+            try:
+                await db_async.insert_many(_INSERT_TRIAGE_SQL, [row], template=_TRIAGE_ROW_TEMPLATE)
+            except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+                print(f"❌ Error saving triage result: {e}")
+
+
+# Rows are queued and written in the background; requests don't wait on the insert
+triage_writer = WriteBehindWriter(
+    "triage_results",
+    _insert_triage_rows,
+    batch_size=int(os.getenv("TRIAGE_WRITE_BATCH_ROWS", "200")),
+    flush_ms=float(os.getenv("TRIAGE_WRITE_FLUSH_MS", "50")),
+    max_queue=int(os.getenv("TRIAGE_WRITE_QUEUE_SIZE", "10000")),
+    enqueue_timeout=float(os.getenv("TRIAGE_WRITE_ENQUEUE_TIMEOUT", "2")),
+)
+
+
+def _triage_row(result: dict, request: TriageRequest) -> tuple:
+    """triage_results values for one analysis (see _INSERT_TRIAGE_SQL)"""
+    # analyze() doesn't report language/confidence; fall back to detection
+    metadata = result.get('metadata') or {}
+    detected_language = metadata.get('detected_language') or detect_language(request.symptoms)[0]
+    return (
+        request.symptoms,
+        request.age if request.age else None,
+        request.gender or None,
+        result['medical_category'],
+        result['severity'],
+        result['assigned_doctor'],
+        result['room_allotted'],
+        # triage_results CHECK allows 'ASSIGN' (engine reports 'ASSIGNED')
+        _DB_TRIAGE_STATUS.get(result['status'], result['status']),
+        result['explainability']['explanation_en'],
+        result['explainability']['explanation_kn'],
+        result['explainability']['explanation_hi'],
+        detected_language,
+        metadata.get('confidence')
+    )
+
+
+async def _save_triage_result(result: dict, request: TriageRequest) -> bool:
     """
-    Save triage analysis result to database
-    Returns: triage_id
-    ✅ NEW: Persists triage analysis to database
+    Queue a triage analysis for the database (write-behind, see triage_writer)
+    Returns: False if the row could not be queued
     """
     try:
-        # Escape strings for SQL safety
-        symptoms = request.symptoms.replace("'", "''")
-        exp_en = result['explainability']['explanation_en'].replace("'", "''")
-        exp_kn = result['explainability']['explanation_kn'].replace("'", "''")
-        exp_hi = result['explainability']['explanation_hi'].replace("'", "''")
-        
-        insert_query = f"""
-        INSERT INTO triage_results (
-            symptoms,
-            patient_age,
-            patient_gender,
-            medical_category,
-            severity,
-            assigned_doctor,
-            room_allotted,
-            triage_status,
-            explanation_en,
-            explanation_kn,
-            explanation_hi,
-            detected_language,
-            confidence_score,
-            model_version,
-            analysis_timestamp
-        ) VALUES (
-            '{symptoms}',
-            {request.age if request.age else 'NULL'},
-            {'NULL' if not request.gender else f"'{request.gender}'"},
-            '{result['medical_category'].replace("'", "''")}',
-            '{result['severity']}',
-            '{result['assigned_doctor'].replace("'", "''")}',
-            '{result['room_allotted'].replace("'", "''")}',
-            '{result['status']}',
-            '{exp_en}',
-            '{exp_kn}',
-            '{exp_hi}',
-            '{result['metadata']['detected_language']}',
-            {result['metadata']['confidence']},
-            '1.0',
-            CURRENT_TIMESTAMP
-        )
-        RETURNING triage_id;
-        """
-        
-        result_data = execute_query(insert_query)
-        if result_data and len(result_data) > 0 and 'triage_id' in result_data[0]:
-            return result_data[0].get('triage_id')
-        return None
+        return await triage_writer.put(_triage_row(result, request))
     except Exception as e:
         print(f"❌ Error saving triage result: {e}")
-        return None
+        return False
 
 @router.post("/analyze", response_model=TriageResponse)
 async def analyze_symptoms(request: TriageRequest) -> TriageResponse:
@@ -97,17 +131,11 @@ async def analyze_symptoms(request: TriageRequest) -> TriageResponse:
     ✅ NEW: Results now saved to database
     """
     try:
-        result = engine.analyze(
-            symptoms=request.symptoms,
-            age=request.age,
-            gender=request.gender
-        )
+        # CPU-bound: runs on the bounded triage executor, not on the event loop
+        result = await cpu_executor.run(engine.analyze, request.symptoms, request.age, request.gender)
 
-        # ✅ SAVE TO DATABASE (NEW)
-        triage_id = _save_triage_result(result, request)
-        if triage_id:
-            print(f"✅ Triage result saved with ID: {triage_id}")
-        else:
+        # ✅ SAVE TO DATABASE (queued, written in the background)
+        if not await _save_triage_result(result, request):
             print("⚠️ Triage result could not be saved to database")
 
         # Map to response model
@@ -128,18 +156,17 @@ async def analyze_symptoms(request: TriageRequest) -> TriageResponse:
 async def batch_analyze(request: BatchTriageRequest) -> List[TriageResponse]:
     """Analyze multiple patients at once and save all to database"""
     try:
+        # Sharded across the triage worker processes; each shard makes one
+        # vectorize/predict call for every case that needs the ML override
+        analyses = await triage_pool.analyze_batch([
+            {"symptoms": case.symptoms, "age": case.age, "gender": case.gender}
+            for case in request.cases
+        ])
+
         results: List[TriageResponse] = []
-        for case in request.cases:
-            result = engine.analyze(
-                symptoms=case.symptoms,
-                age=case.age,
-                gender=case.gender
-            )
-            
-            # ✅ SAVE EACH BATCH RESULT (NEW)
-            triage_id = _save_triage_result(result, case)
-            if triage_id:
-                print(f"✅ Batch triage saved: ID {triage_id}")
+        for case, result in zip(request.cases, analyses):
+            # ✅ SAVE EACH BATCH RESULT (queued, flushed as multi-row INSERTs)
+            await _save_triage_result(result, case)
             
             results.append(TriageResponse(
                 medical_category=result['medical_category'],
@@ -175,7 +202,7 @@ async def get_available_departments() -> Dict[str, Any]:
 async def get_triage_history(patient_id: int) -> Dict[str, Any]:
     """Get all triage analyses for a specific patient ✅ NEW"""
     try:
-        query = f"""
+        query = """
         SELECT 
             triage_id,
             symptoms,
@@ -190,11 +217,11 @@ async def get_triage_history(patient_id: int) -> Dict[str, Any]:
             confidence_score,
             analysis_timestamp
         FROM triage_results
-        WHERE patient_id = {patient_id}
+        WHERE patient_id = %s
         ORDER BY analysis_timestamp DESC
         LIMIT 50;
         """
-        results = execute_query(query)
+        results = await db_async.fetch(query, (patient_id,), prepare=True)
         return {"patient_id": patient_id, "history": results, "total": len(results) if isinstance(results, list) else 0}
     except Exception as e:
         print(f"❌ Error fetching history: {e}")
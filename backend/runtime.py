@@ -0,0 +1,165 @@
+"""
+Keeping the event loop free: a bounded executor for CPU-bound work and a
+monitor that reports how long the loop gets stalled.
+
+CPU-bound calls from async routes (triage analysis, ML) go through
+cpu_executor instead of running inline:
+
+    result = await cpu_executor.run(engine.analyze, symptoms, age, gender)
+
+At most TRIAGE_CPU_WORKERS calls run at once and at most
+TRIAGE_CPU_MAX_PENDING are accepted (running + queued); further callers
+wait their turn on the loop instead of piling up in the executor queue.
+
+loop_monitor wakes every LOOP_LAG_INTERVAL_MS and records how late it
+woke up. Anything at or above LOOP_STALL_MS counts as a stall; stalls of
+LOOP_STALL_WARN_MS or more are also logged. Both report to /metrics.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional
+
+CPU_WORKERS = int(os.getenv("TRIAGE_CPU_WORKERS", str(min(os.cpu_count() or 1, 4))))
+CPU_MAX_PENDING = int(os.getenv("TRIAGE_CPU_MAX_PENDING", "64"))
+
+LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "50"))
+STALL_MS = float(os.getenv("LOOP_STALL_MS", "100"))
+STALL_WARN_MS = float(os.getenv("LOOP_STALL_WARN_MS", "1000"))
+
+
+def _percentiles(samples) -> Dict[str, float]:
+    values = sorted(samples)
+    if not values:
+        return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "p50": round(values[int(0.50 * (len(values) - 1))], 3),
+        "p99": round(values[int(0.99 * (len(values) - 1))], 3),
+        "max": round(values[-1], 3),
+    }
+
+
+class BoundedCPUExecutor:
+    """Thread executor with a cap on accepted work; run() is awaited from the loop"""
+
+    def __init__(self, name: str, workers: int = CPU_WORKERS, max_pending: int = CPU_MAX_PENDING):
+        self.name = name
+        self.workers = max(int(workers), 1)
+        self.max_pending = max(int(max_pending), self.workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight = 0
+        self.completed = 0
+        self.waits = 0
+        self._wait_ms: Deque[float] = deque(maxlen=1000)
+        self._run_ms: Deque[float] = deque(maxlen=1000)
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots, self._loop = asyncio.Semaphore(self.max_pending), loop
+
+        queued = time.perf_counter()
+        if self._slots.locked():
+            self.waits += 1
+        async with self._slots:
+            self._in_flight += 1
+            try:
+                return await loop.run_in_executor(self._executor, self._timed, queued, fn, args)
+            finally:
+                self._in_flight -= 1
+                self.completed += 1
+
+    def _timed(self, queued: float, fn: Callable[..., Any], args: tuple) -> Any:
+        started = time.perf_counter()
+        self._wait_ms.append((started - queued) * 1000)
+        try:
+            return fn(*args)
+        finally:
+            self._run_ms.append((time.perf_counter() - started) * 1000)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._slots = self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "waits_for_slot": self.waits,
+            "queue_wait_ms": _percentiles(self._wait_ms),
+            "run_ms": _percentiles(self._run_ms),
+        }
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic timer fires; lateness = time the loop was blocked"""
+
+    def __init__(self, interval_ms: float = LAG_INTERVAL_MS, stall_ms: float = STALL_MS,
+                 warn_ms: float = STALL_WARN_MS):
+        self.interval = max(interval_ms, 1.0) / 1000.0
+        self.stall_ms = stall_ms
+        self.warn_ms = warn_ms
+        self._task: Optional[asyncio.Task] = None
+        self._lag_ms: Deque[float] = deque(maxlen=1200)  # last minute at 50 ms
+        self._recent_stalls: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self.samples = 0
+        self.stalls = 0
+        self.stalled_ms_total = 0.0
+        self.longest_stall_ms = 0.0
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def record(self, lag_ms: float):
+        self.samples += 1
+        self._lag_ms.append(lag_ms)
+        if lag_ms >= self.stall_ms:
+            self.stalls += 1
+            self.stalled_ms_total += lag_ms
+            self.longest_stall_ms = max(self.longest_stall_ms, lag_ms)
+            self._recent_stalls.append({"at": datetime.now().isoformat(timespec="seconds"),
+                                        "ms": round(lag_ms, 1)})
+            if lag_ms >= self.warn_ms:
+                print(f"⚠️ Event loop stalled for {lag_ms:.0f} ms")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(loop.time() - expected, 0.0) * 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_ms": self.interval * 1000,
+            "stall_threshold_ms": self.stall_ms,
+            "samples": self.samples,
+            "lag_ms": _percentiles(self._lag_ms),
+            "stalls": self.stalls,
+            "stalled_ms_total": round(self.stalled_ms_total, 1),
+            "longest_stall_ms": round(self.longest_stall_ms, 1),
+            "recent_stalls": list(self._recent_stalls),
+        }
+
+
+cpu_executor = BoundedCPUExecutor("triage-cpu")
+loop_monitor = LoopLagMonitor()
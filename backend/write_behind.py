@@ -0,0 +1,164 @@
+"""
+Write-behind buffering for rows the request doesn't need to wait on.
+
+A WriteBehindWriter accepts rows with `await writer.put(row)` and returns
+as soon as the row is queued. A background task collects queued rows and
+hands them to `flush` in batches, when `batch_size` rows are waiting or
+`flush_ms` after the first one arrived, whichever comes first.
+
+- the queue is bounded (`max_queue`): when it is full, put() waits for room
+  (backpressure) for up to `enqueue_timeout` seconds, then gives up and
+  counts the row as dropped
+- a failed flush is retried `retries` times with exponential backoff, then
+  counted as failed
+- close() stops the flusher after everything queued has been flushed
+  (call it on shutdown, before the database pool closes)
+
+    writer = WriteBehindWriter("triage_results", flush_rows, batch_size=200, flush_ms=50)
+    await writer.put(row)
+    ...
+    await writer.close()
+
+`flush` receives a list of (row, seconds the row spent queued), so rows can
+be timestamped as of when they were produced.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+FlushFn = Callable[[List[Tuple[Any, float]]], Awaitable[None]]
+
+# Queued by close() so the flusher stops waiting for a full batch
+_CLOSE = object()
+
+
+class WriteBehindWriter:
+    """Bounded queue plus a background task that flushes rows in batches"""
+
+    def __init__(self, name: str, flush: FlushFn, batch_size: int = 200, flush_ms: float = 50.0,
+                 max_queue: int = 10000, enqueue_timeout: float = 2.0, retries: int = 3):
+        self.name = name
+        self.flush = flush
+        self.batch_size = max(int(batch_size), 1)
+        self.flush_s = max(flush_ms, 0.0) / 1000.0
+        self.max_queue = max(int(max_queue), self.batch_size)
+        self.enqueue_timeout = enqueue_timeout
+        self.retries = retries
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self._enqueued = 0
+        self._flushed = 0
+        self._flushes = 0
+        self._failed = 0
+        self._dropped = 0
+        self._backpressure_waits = 0
+        self._flush_ms: Deque[float] = deque(maxlen=256)
+
+    async def put(self, row: Any) -> bool:
+        """Queue one row; False if it had to be dropped"""
+        if self._closed:
+            # Late writes during shutdown go straight through
+            return await self._flush_batch([(row, time.monotonic())])
+        self._ensure_started()
+        item = (row, time.monotonic())
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._backpressure_waits += 1
+            try:
+                await asyncio.wait_for(self._queue.put(item), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self._dropped += 1
+                print(f"⚠️ {self.name} write queue full for {self.enqueue_timeout:g}s; row dropped")
+                return False
+        self._enqueued += 1
+        return True
+
+    async def close(self, timeout: float = 10.0):
+        """Flush everything queued, then stop the background task"""
+        self._closed = True
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.put(_CLOSE), timeout)
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ {self.name} writer closed with {self._queue.qsize()} rows not flushed")
+        if self._task is not None:
+            self._task.cancel()
+        print(f"✅ {self.name} writer flushed and closed")
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = list(self._flush_ms)
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_ms": self.flush_s * 1000,
+            "enqueued": self._enqueued,
+            "flushed_rows": self._flushed,
+            "flushes": self._flushes,
+            "avg_batch_size": round(self._flushed / self._flushes, 2) if self._flushes else 0.0,
+            "failed_rows": self._failed,
+            "dropped_rows": self._dropped,
+            "backpressure_waits": self._backpressure_waits,
+            "flush_ms_avg": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "flush_ms_max": round(max(latencies), 3) if latencies else None,
+        }
+
+    # --- internals ---
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_s
+            while len(batch) < self.batch_size and batch[-1] is not _CLOSE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            rows = [item for item in batch if item is not _CLOSE]
+            try:
+                if rows:
+                    await self._flush_batch(rows)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush_batch(self, batch: List[Tuple[Any, float]]) -> bool:
+        for attempt in range(self.retries + 1):
+            now = time.monotonic()
+            started = time.perf_counter()
+            try:
+                await self.flush([(row, now - enqueued) for row, enqueued in batch])
+            except Exception as e:
+                if attempt == self.retries:
+                    self._failed += len(batch)
+                    print(f"❌ {self.name} flush of {len(batch)} rows failed: {e}")
+                    return False
+                await asyncio.sleep(0.1 * 2 ** attempt)
+                continue
+            self._flush_ms.append((time.perf_counter() - started) * 1000)
+            self._flushes += 1
+            self._flushed += len(batch)
+            return True
+        return False
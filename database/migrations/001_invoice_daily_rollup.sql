@@ -0,0 +1,130 @@
+-- 001. INVOICE DAILY ROLLUP (Billing Dashboards)
+-- One row per (issue_date, status) with invoice count and total amount,
+-- kept current by statement-level triggers on invoices. The billing
+-- dashboards read this table (O(days) rows) instead of scanning invoices;
+-- aging buckets are derived from the per-day rows at read time, so they
+-- never need re-bucketing as days pass.
+--
+-- NULL keys are stored as sentinels so they can be part of the primary key
+-- on PostgreSQL 12+: issue_date NULL -> '-infinity', status NULL -> ''.
+--
+-- Safe to re-run; it rebuilds the rollup from invoices.
+-- Apply: psql -U postgres -d hospital_db -1 -f database/migrations/001_invoice_daily_rollup.sql
+
+CREATE TABLE IF NOT EXISTS invoice_daily_rollup (
+    issue_date DATE NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    invoice_count BIGINT NOT NULL DEFAULT 0,
+    total_amount NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (issue_date, status)
+);
+
+-- Adds per-(issue_date, status) deltas; keys are locked in a fixed order so
+-- concurrent invoice writers cannot deadlock on the rollup rows
+CREATE OR REPLACE FUNCTION invoice_rollup_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO invoice_daily_rollup AS r (issue_date, status, invoice_count, total_amount)
+        SELECT COALESCE(issue_date, '-infinity'), COALESCE(status, ''), COUNT(*), COALESCE(SUM(total_amount), 0)
+        FROM new_rows
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (issue_date, status) DO UPDATE
+        SET invoice_count = r.invoice_count + EXCLUDED.invoice_count,
+            total_amount = r.total_amount + EXCLUDED.total_amount;
+
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO invoice_daily_rollup AS r (issue_date, status, invoice_count, total_amount)
+        SELECT COALESCE(issue_date, '-infinity'), COALESCE(status, ''), -COUNT(*), -COALESCE(SUM(total_amount), 0)
+        FROM old_rows
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+        ON CONFLICT (issue_date, status) DO UPDATE
+        SET invoice_count = r.invoice_count + EXCLUDED.invoice_count,
+            total_amount = r.total_amount + EXCLUDED.total_amount;
+
+    ELSE
+        -- Updates that leave status, issue_date and total_amount alone net out to nothing
+        INSERT INTO invoice_daily_rollup AS r (issue_date, status, invoice_count, total_amount)
+        SELECT d, s, SUM(c), SUM(t)
+        FROM (
+            SELECT COALESCE(issue_date, '-infinity') AS d, COALESCE(status, '') AS s,
+                   -1 AS c, -COALESCE(total_amount, 0) AS t
+            FROM old_rows
+            UNION ALL
+            SELECT COALESCE(issue_date, '-infinity'), COALESCE(status, ''), 1, COALESCE(total_amount, 0)
+            FROM new_rows
+        ) delta
+        GROUP BY d, s
+        HAVING SUM(c) <> 0 OR SUM(t) <> 0
+        ORDER BY d, s
+        ON CONFLICT (issue_date, status) DO UPDATE
+        SET invoice_count = r.invoice_count + EXCLUDED.invoice_count,
+            total_amount = r.total_amount + EXCLUDED.total_amount;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION invoice_rollup_truncate() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM invoice_daily_rollup;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables need one trigger per event
+DROP TRIGGER IF EXISTS trg_invoice_rollup_insert ON invoices;
+DROP TRIGGER IF EXISTS trg_invoice_rollup_update ON invoices;
+DROP TRIGGER IF EXISTS trg_invoice_rollup_delete ON invoices;
+DROP TRIGGER IF EXISTS trg_invoice_rollup_truncate ON invoices;
+
+CREATE TRIGGER trg_invoice_rollup_insert AFTER INSERT ON invoices
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION invoice_rollup_apply();
+CREATE TRIGGER trg_invoice_rollup_update AFTER UPDATE ON invoices
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION invoice_rollup_apply();
+CREATE TRIGGER trg_invoice_rollup_delete AFTER DELETE ON invoices
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION invoice_rollup_apply();
+CREATE TRIGGER trg_invoice_rollup_truncate AFTER TRUNCATE ON invoices
+    FOR EACH STATEMENT EXECUTE FUNCTION invoice_rollup_truncate();
+
+-- Recomputes the rollup from invoices and fixes any drifted rows (nightly job).
+-- Invoice writers wait for the duration; dashboard reads do not.
+-- Returns the number of (issue_date, status) rows that had to be corrected.
+CREATE OR REPLACE FUNCTION reconcile_invoice_daily_rollup() RETURNS INTEGER AS $$
+DECLARE
+    corrected INTEGER;
+BEGIN
+    LOCK TABLE invoices IN SHARE MODE;
+
+    WITH actual AS (
+        SELECT COALESCE(issue_date, '-infinity') AS issue_date, COALESCE(status, '') AS status,
+               COUNT(*) AS invoice_count, COALESCE(SUM(total_amount), 0) AS total_amount
+        FROM invoices
+        GROUP BY 1, 2
+    ), drift AS (
+        SELECT COALESCE(a.issue_date, r.issue_date) AS issue_date, COALESCE(a.status, r.status) AS status,
+               COALESCE(a.invoice_count, 0) AS invoice_count, COALESCE(a.total_amount, 0) AS total_amount
+        FROM actual a
+        FULL JOIN invoice_daily_rollup r ON r.issue_date = a.issue_date AND r.status = a.status
+        WHERE (a.issue_date IS NULL AND (r.invoice_count <> 0 OR r.total_amount <> 0))
+           OR r.issue_date IS NULL
+           OR r.invoice_count <> a.invoice_count
+           OR r.total_amount <> a.total_amount
+    )
+    INSERT INTO invoice_daily_rollup AS r (issue_date, status, invoice_count, total_amount)
+    SELECT issue_date, status, invoice_count, total_amount FROM drift
+    ON CONFLICT (issue_date, status) DO UPDATE
+    SET invoice_count = EXCLUDED.invoice_count,
+        total_amount = EXCLUDED.total_amount;
+    GET DIAGNOSTICS corrected = ROW_COUNT;
+
+    DELETE FROM invoice_daily_rollup WHERE invoice_count = 0 AND total_amount = 0;
+    RETURN corrected;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT reconcile_invoice_daily_rollup();
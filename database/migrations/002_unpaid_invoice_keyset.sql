@@ -0,0 +1,10 @@
+-- 002. UNPAID INVOICE KEYSET INDEX (Billing Collections)
+-- Serves /billing/unpaid-invoices pages and the streaming export in sort
+-- order: oldest issue_date first, then largest amount, then invoice_id.
+-- The expressions must match _SORT_KEY in backend/invoice_listing.py.
+--
+-- Apply: psql -U postgres -d hospital_db -f database/migrations/002_unpaid_invoice_keyset.sql
+
+CREATE INDEX IF NOT EXISTS idx_invoices_unpaid_keyset
+    ON invoices ((COALESCE(issue_date, '-infinity'::date)), (COALESCE(-total_amount, -100000000)), invoice_id)
+    WHERE LOWER(status) IN ('unpaid', 'pending');
@@ -0,0 +1,9 @@
+-- 003. INVOICES BY ADMISSION (Batch Invoicing)
+-- Batch invoice runs skip admissions that already have an invoice
+-- (NOT EXISTS ... WHERE i.admission_id = a.admission_id) for every chunk.
+--
+-- Apply: psql -U postgres -d hospital_db -f database/migrations/003_invoice_admission_index.sql
+
+CREATE INDEX IF NOT EXISTS idx_invoices_admission_id
+    ON invoices (admission_id)
+    WHERE admission_id IS NOT NULL;
@@ -0,0 +1,83 @@
+-- 004. HOT QUERY INDEXES (Dashboards, Patient Lists, Room Allocation)
+-- Table.sql only indexes triage_results; every index below matches the
+-- predicate / ORDER BY of a query the routers run on each page load.
+-- DATE(col) and col::date are the same expression to the planner, so the
+-- ::date expression indexes serve the DATE(...) = CURRENT_DATE filters.
+-- tests/test_hot_query_indexes.py EXPLAINs each query against these.
+--
+-- Every index is built CONCURRENTLY so the tables keep taking writes while
+-- it builds. CONCURRENTLY cannot run inside a transaction block: apply with
+-- plain psql (no -1 / --single-transaction), which commits each statement.
+-- A build that fails leaves an INVALID index that IF NOT EXISTS would then
+-- skip; drop it (\d <table> marks it INVALID) and re-run this file.
+--
+-- Apply: psql -U postgres -d hospital_db -f database/migrations/004_hot_query_indexes.sql
+
+-- Doctor "appointments today": doctor_id = ? AND DATE(appointment_date) = CURRENT_DATE ORDER BY appointment_date
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_doctor_day
+    ON appointments (doctor_id, (appointment_date::date), appointment_date);
+
+-- Admin/doctor dashboards: COUNT(*) WHERE DATE(appointment_date) = CURRENT_DATE
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_day
+    ON appointments ((appointment_date::date));
+
+-- 7-day appointment trend: appointment_date >= CURRENT_DATE - INTERVAL '7 days'
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_date
+    ON appointments (appointment_date);
+
+-- Patient list DISTINCT ON (patient_id) ... ORDER BY patient_id, appointment_date DESC,
+-- and "latest appointment for patient" lookups
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_patient_latest
+    ON appointments (patient_id, appointment_date DESC);
+
+-- Same two access paths for admissions
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_admissions_patient_latest
+    ON admissions (patient_id, admission_date DESC);
+
+-- Doctor "active inpatients": primary_doctor_id = ? AND status = 'Active' AND actual_discharge_date IS NULL
+-- ORDER BY admission_date DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_admissions_doctor_active
+    ON admissions (primary_doctor_id, admission_date DESC)
+    WHERE status = 'Active' AND actual_discharge_date IS NULL;
+
+-- Doctor patient list DISTINCT ON (patient_id) ... ORDER BY patient_id, record_date DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_medical_records_patient_latest
+    ON medical_records (patient_id, record_date DESC);
+
+-- Doctor "history": doctor_id = ? AND record_date IS NOT NULL ORDER BY record_date DESC LIMIT 10
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_medical_records_doctor_recent
+    ON medical_records (doctor_id, record_date DESC)
+    WHERE record_date IS NOT NULL;
+
+-- Billing "pending": status = 'Pending' ORDER BY issue_date
+-- (LOWER(status) IN ('unpaid', 'pending') is served by idx_invoices_unpaid_keyset, 002)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoices_status_issue_date
+    ON invoices (status, issue_date);
+
+-- Billing "today": DATE(issue_date) = CURRENT_DATE (issue_date is already a DATE)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoices_issue_date
+    ON invoices (issue_date);
+
+-- Billing "paid": status = 'Paid' ORDER BY payment_date DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoices_paid_recent
+    ON invoices (payment_date DESC)
+    WHERE status = 'Paid';
+
+-- Bed allocation: room_type = ANY(?) AND status = 'Available' AND current_occupancy < bed_capacity
+-- ORDER BY <type priority>, current_occupancy
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rooms_available_by_type
+    ON rooms (room_type, current_occupancy)
+    WHERE status = 'Available' AND current_occupancy < bed_capacity;
+
+-- audit_logs is created by the deployment, not Table.sql; index it when present.
+-- (A DO block would run in a transaction, so the check is a psql conditional.)
+SELECT to_regclass('audit_logs') IS NOT NULL AS has_audit_logs \gset
+\if :has_audit_logs
+-- AI usage counters: role = ? AND DATE(timestamp) = CURRENT_DATE
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_role_day
+    ON audit_logs (role, ("timestamp"::date));
+
+-- Security log: ORDER BY timestamp DESC LIMIT 5
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_timestamp
+    ON audit_logs ("timestamp" DESC);
+\endif
@@ -0,0 +1,224 @@
+-- 005. PATIENT CURRENT STATE (Patient Lists, Patient Panels)
+-- One row per patient with the latest appointment, admission and medical
+-- record, plus the derived doctor / room / status the screens show:
+--   doctor_id = latest appointment's doctor, else latest admission's
+--   room_id   = latest appointment's room, else latest admission's
+--   status    = latest admission's status, else latest appointment's, else 'Registered'
+-- "Latest" is ORDER BY <date> DESC (NULL dates first), as the DISTINCT ON
+-- queries this replaces had it; ties go to the highest id.
+--
+-- Statement-level triggers on appointments, admissions and medical_records
+-- recompute the rows of every patient a statement touched, in the same
+-- transaction, so every write path keeps it current. Each recompute is
+-- three index lookups per patient (indexes from 004).
+-- Before recomputing, a trigger takes a per-patient transaction lock, so two
+-- transactions writing for the same patient take turns: the second one's
+-- recompute starts after the first commits and sees its rows (READ
+-- COMMITTED gives each statement a fresh snapshot). Without it the second
+-- upsert could overwrite the first with a state computed before it existed.
+--
+-- Safe to re-run; it rebuilds the projection from the source tables.
+-- Apply: psql -U postgres -d hospital_db -1 -f database/migrations/005_patient_current_state.sql
+
+CREATE TABLE IF NOT EXISTS patient_current_state (
+    patient_id INT PRIMARY KEY REFERENCES patients(patient_id) ON DELETE CASCADE,
+
+    appointment_id INT,
+    appointment_date TIMESTAMP,
+    appointment_status VARCHAR(20),
+    appointment_doctor_id INT,
+    appointment_room_id INT,
+
+    admission_id INT,
+    admission_date TIMESTAMP,
+    admission_status VARCHAR(20),
+    admission_doctor_id INT,
+    admission_room_id INT,
+
+    record_id INT,
+    record_date TIMESTAMP,
+    diagnosis TEXT,
+    treatment_plan TEXT,
+
+    doctor_id INT,
+    room_id INT,
+    status VARCHAR(20) NOT NULL DEFAULT 'Registered',
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- "My patients" style filters on the derived columns
+CREATE INDEX IF NOT EXISTS idx_patient_current_state_doctor
+    ON patient_current_state (doctor_id, patient_id DESC);
+
+-- Current state of the given patients, computed from the source tables
+CREATE OR REPLACE FUNCTION patient_current_state_compute(ids INT[])
+RETURNS SETOF patient_current_state AS $$
+    SELECT
+        p.patient_id,
+        appt.appointment_id, appt.appointment_date, appt.status, appt.doctor_id, appt.room_id,
+        adm.admission_id, adm.admission_date, adm.status, adm.primary_doctor_id, adm.room_id,
+        mr.record_id, mr.record_date, mr.diagnosis, mr.treatment_plan,
+        COALESCE(appt.doctor_id, adm.primary_doctor_id),
+        COALESCE(appt.room_id, adm.room_id),
+        COALESCE(adm.status, appt.status, 'Registered'),
+        CURRENT_TIMESTAMP::timestamp
+    FROM patients p
+    LEFT JOIN LATERAL (
+        SELECT a.appointment_id, a.appointment_date, a.status, a.doctor_id, a.room_id
+        FROM appointments a
+        WHERE a.patient_id = p.patient_id
+        ORDER BY a.appointment_date DESC, a.appointment_id DESC
+        LIMIT 1
+    ) appt ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT ad.admission_id, ad.admission_date, ad.status, ad.primary_doctor_id, ad.room_id
+        FROM admissions ad
+        WHERE ad.patient_id = p.patient_id
+        ORDER BY ad.admission_date DESC, ad.admission_id DESC
+        LIMIT 1
+    ) adm ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT m.record_id, m.record_date, m.diagnosis, m.treatment_plan
+        FROM medical_records m
+        WHERE m.patient_id = p.patient_id
+        ORDER BY m.record_date DESC, m.record_id DESC
+        LIMIT 1
+    ) mr ON TRUE
+    WHERE p.patient_id = ANY(ids)
+$$ LANGUAGE sql STABLE;
+
+-- Rows are upserted in patient_id order so concurrent writers cannot deadlock
+CREATE OR REPLACE FUNCTION refresh_patient_current_state(ids INT[]) RETURNS VOID AS $$
+    INSERT INTO patient_current_state AS s
+    SELECT * FROM patient_current_state_compute(ids)
+    ORDER BY patient_id
+    ON CONFLICT (patient_id) DO UPDATE
+    SET appointment_id = EXCLUDED.appointment_id,
+        appointment_date = EXCLUDED.appointment_date,
+        appointment_status = EXCLUDED.appointment_status,
+        appointment_doctor_id = EXCLUDED.appointment_doctor_id,
+        appointment_room_id = EXCLUDED.appointment_room_id,
+        admission_id = EXCLUDED.admission_id,
+        admission_date = EXCLUDED.admission_date,
+        admission_status = EXCLUDED.admission_status,
+        admission_doctor_id = EXCLUDED.admission_doctor_id,
+        admission_room_id = EXCLUDED.admission_room_id,
+        record_id = EXCLUDED.record_id,
+        record_date = EXCLUDED.record_date,
+        diagnosis = EXCLUDED.diagnosis,
+        treatment_plan = EXCLUDED.treatment_plan,
+        doctor_id = EXCLUDED.doctor_id,
+        room_id = EXCLUDED.room_id,
+        status = EXCLUDED.status,
+        updated_at = EXCLUDED.updated_at;
+$$ LANGUAGE sql;
+
+-- Shared by the three source tables; they all carry patient_id
+CREATE OR REPLACE FUNCTION patient_current_state_touch() RETURNS trigger AS $$
+DECLARE
+    ids INT[];
+    id INT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT patient_id ORDER BY patient_id) INTO ids FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT patient_id ORDER BY patient_id) INTO ids FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT patient_id ORDER BY patient_id) INTO ids
+        FROM (SELECT patient_id FROM old_rows UNION SELECT patient_id FROM new_rows) touched;
+    END IF;
+    IF ids IS NOT NULL THEN
+        -- One lock per patient (held to commit), taken in patient_id order
+        FOREACH id IN ARRAY ids LOOP
+            PERFORM pg_advisory_xact_lock(hashtext('patient_current_state'), id);
+        END LOOP;
+        -- A new statement, so its snapshot includes whatever the lock waited for
+        PERFORM refresh_patient_current_state(ids);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- New patients start out 'Registered'
+CREATE OR REPLACE FUNCTION patient_current_state_register() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO patient_current_state (patient_id)
+    SELECT patient_id FROM new_rows ORDER BY patient_id
+    ON CONFLICT (patient_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION patient_current_state_rebuild() RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_patient_current_state(ARRAY(SELECT patient_id FROM patients));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables need one trigger per event
+DO $$
+DECLARE
+    source TEXT;
+BEGIN
+    FOREACH source IN ARRAY ARRAY['appointments', 'admissions', 'medical_records'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_current_state_insert ON %I', source, source);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_current_state_update ON %I', source, source);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_current_state_delete ON %I', source, source);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_current_state_truncate ON %I', source, source);
+
+        EXECUTE format('CREATE TRIGGER trg_%s_current_state_insert AFTER INSERT ON %I
+                        REFERENCING NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION patient_current_state_touch()', source, source);
+        EXECUTE format('CREATE TRIGGER trg_%s_current_state_update AFTER UPDATE ON %I
+                        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION patient_current_state_touch()', source, source);
+        EXECUTE format('CREATE TRIGGER trg_%s_current_state_delete AFTER DELETE ON %I
+                        REFERENCING OLD TABLE AS old_rows
+                        FOR EACH STATEMENT EXECUTE FUNCTION patient_current_state_touch()', source, source);
+        EXECUTE format('CREATE TRIGGER trg_%s_current_state_truncate AFTER TRUNCATE ON %I
+                        FOR EACH STATEMENT EXECUTE FUNCTION patient_current_state_rebuild()', source, source);
+    END LOOP;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_patients_current_state_insert ON patients;
+CREATE TRIGGER trg_patients_current_state_insert AFTER INSERT ON patients
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION patient_current_state_register();
+
+-- Recomputes every row and fixes the ones that drifted (e.g. writes made
+-- while the triggers were disabled). Source-table writers wait for the
+-- duration; readers do not. Returns the number of rows corrected.
+CREATE OR REPLACE FUNCTION reconcile_patient_current_state() RETURNS INTEGER AS $$
+DECLARE
+    ids_to_fix INT[];
+    corrected INTEGER;
+BEGIN
+    LOCK TABLE appointments, admissions, medical_records IN SHARE MODE;
+
+    WITH drift AS (
+        SELECT c.patient_id
+        FROM patient_current_state_compute(ARRAY(SELECT patient_id FROM patients)) c
+        LEFT JOIN patient_current_state s ON s.patient_id = c.patient_id
+        WHERE s.patient_id IS NULL
+           OR (c.appointment_id, c.appointment_date, c.appointment_status, c.appointment_doctor_id,
+               c.appointment_room_id, c.admission_id, c.admission_date, c.admission_status,
+               c.admission_doctor_id, c.admission_room_id, c.record_id, c.record_date, c.diagnosis,
+               c.treatment_plan, c.doctor_id, c.room_id, c.status)
+              IS DISTINCT FROM
+              (s.appointment_id, s.appointment_date, s.appointment_status, s.appointment_doctor_id,
+               s.appointment_room_id, s.admission_id, s.admission_date, s.admission_status,
+               s.admission_doctor_id, s.admission_room_id, s.record_id, s.record_date, s.diagnosis,
+               s.treatment_plan, s.doctor_id, s.room_id, s.status)
+    )
+    SELECT array_agg(patient_id), COUNT(*) INTO STRICT ids_to_fix, corrected FROM drift;
+
+    IF corrected > 0 THEN
+        PERFORM refresh_patient_current_state(ids_to_fix);
+    END IF;
+    RETURN corrected;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT reconcile_patient_current_state();
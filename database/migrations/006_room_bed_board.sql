@@ -0,0 +1,69 @@
+-- 006. ROOM BED BOARD (Room Allocation)
+-- The API keeps an in-memory index of free beds (backend/bed_board.py),
+-- seeded from rooms. This migration lets it follow changes made by other
+-- processes and by hand:
+--   bed_version  bumped from a sequence whenever a bed-relevant column
+--                changes; a row with a higher version is always newer, so
+--                notifications that arrive late never overwrite fresher state
+--   room_beds    NOTIFY channel; one JSON payload per inserted, updated or
+--                deleted room, sent when the writing transaction commits
+--
+-- Safe to re-run.
+-- Apply: psql -U postgres -d hospital_db -1 -f database/migrations/006_room_bed_board.sql
+
+CREATE SEQUENCE IF NOT EXISTS rooms_bed_version_seq;
+
+ALTER TABLE rooms
+    ADD COLUMN IF NOT EXISTS bed_version BIGINT NOT NULL DEFAULT nextval('rooms_bed_version_seq');
+
+CREATE OR REPLACE FUNCTION rooms_bump_bed_version() RETURNS trigger AS $$
+BEGIN
+    NEW.bed_version := nextval('rooms_bed_version_seq');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rooms_notify_bed_board() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('room_beds', json_build_object('op', TG_OP, 'room_id', OLD.room_id)::text);
+        RETURN OLD;
+    END IF;
+    PERFORM pg_notify('room_beds', json_build_object(
+        'op', TG_OP,
+        'room_id', NEW.room_id,
+        'room_number', NEW.room_number,
+        'room_type', NEW.room_type,
+        'wing', NEW.wing,
+        'floor_number', NEW.floor_number,
+        'bed_capacity', NEW.bed_capacity,
+        'current_occupancy', NEW.current_occupancy,
+        'status', NEW.status,
+        'bed_version', NEW.bed_version
+    )::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rooms_bed_version ON rooms;
+CREATE TRIGGER rooms_bed_version
+    BEFORE UPDATE ON rooms
+    FOR EACH ROW
+    WHEN ((OLD.room_number, OLD.room_type, OLD.wing, OLD.floor_number, OLD.bed_capacity,
+           OLD.current_occupancy, OLD.status)
+          IS DISTINCT FROM
+          (NEW.room_number, NEW.room_type, NEW.wing, NEW.floor_number, NEW.bed_capacity,
+           NEW.current_occupancy, NEW.status))
+    EXECUTE FUNCTION rooms_bump_bed_version();
+
+DROP TRIGGER IF EXISTS rooms_notify_bed_board_write ON rooms;
+CREATE TRIGGER rooms_notify_bed_board_write
+    AFTER INSERT OR DELETE ON rooms
+    FOR EACH ROW EXECUTE FUNCTION rooms_notify_bed_board();
+
+DROP TRIGGER IF EXISTS rooms_notify_bed_board_update ON rooms;
+CREATE TRIGGER rooms_notify_bed_board_update
+    AFTER UPDATE ON rooms
+    FOR EACH ROW
+    WHEN (OLD.bed_version IS DISTINCT FROM NEW.bed_version)
+    EXECUTE FUNCTION rooms_notify_bed_board();
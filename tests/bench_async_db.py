@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Requests/sec of async DB-backed routes at 50 and 200 concurrent clients.
+
+Start the backend first (single worker), then run:
+    python tests/bench_async_db.py [--base-url http://127.0.0.1:8000] [--seconds 10]
+
+To compare before/after, run it once against a server started from the
+commit before the async DB layer, and once against the current tree.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+ENDPOINTS = [
+    ("GET", "/api/v1/admin/users", None),
+    ("GET", "/api/v1/billing/patients-list", None),
+    ("GET", "/api/v1/billing/invoice/1", None),
+    ("POST", "/api/v1/admin/login", {"username": "admin", "password": "admin123", "role": "admin"}),
+]
+CONCURRENCY = [50, 200]
+
+
+async def client_loop(client, method, path, body, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            res = await client.request(method, path, json=body)
+            if res.status_code >= 500:
+                errors.append(res.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def bench(base_url, method, path, body, clients, seconds):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        latencies, errors = [], []
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*[
+            client_loop(client, method, path, body, deadline, latencies, errors)
+            for _ in range(clients)
+        ])
+    latencies.sort()
+    p99 = latencies[int(0.99 * (len(latencies) - 1))] * 1000 if latencies else 0
+    return len(latencies) / seconds, p99, len(errors)
+
+
+async def main(base_url, seconds):
+    print("=" * 72)
+    print(f"Async DB route throughput against {base_url} ({seconds}s per run)")
+    print("=" * 72)
+    print(f"{'endpoint':<36} | {'clients':>7} | {'req/sec':>8} | {'p99 ms':>8} | {'errors':>6}")
+    print("-" * 72)
+    for method, path, body in ENDPOINTS:
+        for clients in CONCURRENCY:
+            rps, p99, errors = await bench(base_url, method, path, body, clients, seconds)
+            print(f"{method + ' ' + path:<36} | {clients:>7} | {rps:>8.0f} | {p99:>8.1f} | {errors:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.seconds))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Month-end invoicing throughput: one admission at a time vs the batch job.
+
+Creates --admissions discharged admissions (each with two prescriptions
+and a lab test) inside a transaction, then invoices all of them two ways
+from the same savepoint:
+
+- one by one: what a script calling POST /billing/generate-invoice per
+  admission does (patient check, per-admission charge lookups, one INSERT)
+- batch: invoicing.admission_charges (one set-based query) plus
+  invoicing.insert_invoices in chunks of CHUNK_SIZE rows
+
+Everything is rolled back at the end.
+
+Run from the project root (needs DATABASE_URL):
+    python tests/bench_batch_invoices.py [--admissions 5000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import invoicing
+
+
+def one_by_one(cur, ids):
+    for admission_id in ids:
+        cur.execute("SELECT patient_id, primary_doctor_id, room_id, admission_date, actual_discharge_date "
+                    "FROM admissions WHERE admission_id = %s", (admission_id,))
+        a = cur.fetchone()
+        cur.execute("SELECT patient_id, first_name, last_name FROM patients WHERE patient_id = %s", (a["patient_id"],))
+        cur.fetchall()
+        cur.execute("SELECT consultation_fee FROM doctors WHERE doctor_id = %s", (a["primary_doctor_id"],))
+        fee = cur.fetchone()["consultation_fee"] or 0
+        cur.execute("SELECT daily_rate FROM rooms WHERE room_id = %s", (a["room_id"],))
+        rate = cur.fetchone()["daily_rate"] or 0
+        cur.execute("SELECT COALESCE(SUM(COALESCE(quantity, 1)), 0) AS units FROM prescriptions WHERE admission_id = %s",
+                    (admission_id,))
+        units = cur.fetchone()["units"]
+        cur.execute("SELECT COUNT(*) AS tests FROM lab_tests WHERE admission_id = %s AND status <> 'Cancelled'",
+                    (admission_id,))
+        tests = cur.fetchone()["tests"]
+        days = max(1, (a["actual_discharge_date"].date() - a["admission_date"].date()).days)
+        row = {"patient_id": a["patient_id"], "admission_id": admission_id,
+               "consultation_charges": fee, "room_charges": rate * days,
+               "medication_charges": units * invoicing.MEDICATION_UNIT_RATE,
+               "lab_charges": tests * invoicing.LAB_TEST_RATE}
+        charges = {field: float(row.get(field) or 0) for field in invoicing.CHARGE_FIELDS}
+        amounts = invoicing.invoice_amounts(charges, 5.0, 0)
+        cur.execute("""
+            INSERT INTO invoices (patient_id, admission_id, consultation_charges, room_charges, medication_charges,
+                                  lab_charges, tax_percentage, tax_amount, discount_percentage, discount_amount,
+                                  total_amount, insurance_claim_amount, patient_payable, status, issue_date, due_date)
+            VALUES (%s, %s, %s, %s, %s, %s, 5.0, %s, 0, %s, %s, 0, %s, 'Unpaid', CURRENT_DATE, CURRENT_DATE + 30)
+            RETURNING invoice_id
+        """, (row["patient_id"], admission_id, charges["consultation_charges"], charges["room_charges"],
+              charges["medication_charges"], charges["lab_charges"], amounts["tax_amount"],
+              amounts["discount_amount"], amounts["total_amount"], amounts["patient_payable"]))
+        cur.fetchall()
+
+
+def batch(cur, ids):
+    rows = invoicing.admission_charges(cur, admission_ids=ids)
+    for i in range(0, len(rows), invoicing.CHUNK_SIZE):
+        invoicing.insert_invoices(cur, rows[i:i + invoicing.CHUNK_SIZE], 5.0, 0, 30)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--admissions", type=int, default=5000)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT p.patient_id, d.doctor_id, d.department_id, r.room_id
+                FROM patients p, doctors d, rooms r LIMIT 1
+            """)
+            ref = cur.fetchone()
+            cur.execute("""
+                INSERT INTO admissions (patient_id, primary_doctor_id, room_id, department_id, admission_date,
+                                        actual_discharge_date, admission_reason, status)
+                SELECT %s, %s, %s, %s, now() - (i %% 9) * interval '1 day', now(), 'bench', 'Discharged'
+                FROM generate_series(1, %s) AS i
+                RETURNING admission_id
+            """, (ref["patient_id"], ref["doctor_id"], ref["room_id"], ref["department_id"], args.admissions))
+            ids = [row["admission_id"] for row in cur.fetchall()]
+            cur.execute("""
+                INSERT INTO prescriptions (patient_id, doctor_id, admission_id, medication_name, dosage, frequency, quantity)
+                SELECT %s, %s, a, 'bench', '1', 'daily', 10 FROM unnest(%s::int[]) AS a, generate_series(1, 2)
+            """, (ref["patient_id"], ref["doctor_id"], ids))
+            cur.execute("""
+                INSERT INTO lab_tests (patient_id, doctor_id, admission_id, test_name, status)
+                SELECT %s, %s, a, 'bench', 'Completed' FROM unnest(%s::int[]) AS a
+            """, (ref["patient_id"], ref["doctor_id"], ids))
+            cur.execute("ANALYZE prescriptions; ANALYZE lab_tests; ANALYZE admissions")
+            cur.execute("SAVEPOINT bench")
+
+            print("=" * 56)
+            print(f"Batch invoicing: {len(ids):,} discharged admissions")
+            print("=" * 56)
+            print(f"{'path':<12} | {'seconds':>8} | {'invoices/sec':>12}")
+            print("-" * 56)
+            for label, run in (("one by one", one_by_one), ("batch", batch)):
+                started = time.perf_counter()
+                run(cur, ids)
+                elapsed = time.perf_counter() - started
+                cur.execute("SELECT COUNT(*) AS n FROM invoices WHERE admission_id = ANY(%s)", (ids,))
+                assert cur.fetchone()["n"] == len(ids)
+                print(f"{label:<12} | {elapsed:>8.2f} | {len(ids) / elapsed:>12,.0f}")
+                cur.execute("ROLLBACK TO SAVEPOINT bench")
+    finally:
+        conn.rollback()
+        conn.close()
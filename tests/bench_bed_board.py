@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""
+Room allocation: latency and overbooking for three ways of taking a bed.
+
+- select then update: what admin.create_appointment did, a plain
+  SELECT ... LIMIT 1 and a separate unconditional UPDATE
+- SQL pick: db.take_room without the bed board, _AVAILABLE_ROOM_SQL with
+  FOR UPDATE SKIP LOCKED plus a conditional UPDATE, in one transaction
+- bed board: db.take_room with backend.bed_board running, a heap pop plus
+  the conditional UPDATE
+
+Builds `bench_beds.rooms` (same columns and indexes as public.rooms, default
+20,000 rooms of the four bed types across wings and floors) and points the
+connections at it with PGOPTIONS. Each path gets a latency round (every
+bed free, --allocations allocations) and a contention round (only --scarce
+rooms per bed type open, twice as many allocations as they have beds),
+after which patients assigned beyond capacity are counted:
+rooms.valid_occupancy rejects the UPDATE that would overfill a room, so the
+old path's race shows up as patients sent to a room whose bed was never
+taken. The schema is dropped at the end.
+
+Run from the project root (needs DATABASE_URL):
+    python tests/bench_bed_board.py [--rooms 20000] [--allocations 2000] [--clients 8] [--scarce 10]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import db
+from backend.bed_board import bed_board
+
+SEVERITIES = ["Emergency", "High", "Low", "Medium"]
+
+
+def build(cur, rooms):
+    cur.execute("DROP SCHEMA IF EXISTS bench_beds CASCADE")
+    cur.execute("CREATE SCHEMA bench_beds")
+    cur.execute("CREATE TABLE bench_beds.rooms (LIKE public.rooms INCLUDING ALL)")
+    cur.execute("""
+        INSERT INTO bench_beds.rooms (room_id, room_number, wing, floor_number, room_type, bed_capacity,
+                                      current_occupancy, status)
+        SELECT i, 'B' || i, (ARRAY['A', 'B', 'C', 'Ground'])[1 + i %% 4], i %% 5,
+               (ARRAY['General Ward', 'Private Room', 'ICU', 'Emergency'])[1 + (i::bigint * 7 %% 13) %% 4],
+               CASE WHEN i %% 3 = 0 THEN 6 ELSE 1 + i %% 2 END, 0, 'Available'
+        FROM generate_series(1, %s) AS i
+    """, (rooms,))
+    cur.execute("ANALYZE bench_beds.rooms")
+
+
+def reset(cur, open_rooms=None):
+    cur.execute("UPDATE rooms SET current_occupancy = 0, status = 'Available'")
+    if open_rooms is not None:
+        # The first open_rooms rooms of each bed type stay open, the rest go to Maintenance
+        cur.execute("""
+            UPDATE rooms SET status = 'Maintenance'
+            WHERE room_id NOT IN (
+                SELECT room_id FROM (
+                    SELECT room_id, ROW_NUMBER() OVER (PARTITION BY room_type ORDER BY room_id) AS n FROM rooms
+                ) r WHERE n <= %s
+            )
+        """, (open_rooms,))
+    cur.execute("SELECT COALESCE(SUM(bed_capacity), 0) FROM rooms WHERE status = 'Available'")
+    return cur.fetchone()[0]
+
+
+def select_then_update(i):
+    room = db.execute_query("SELECT room_id FROM rooms WHERE status = 'Available' LIMIT 1", prepare=True)
+    if room:
+        db.execute_query("UPDATE rooms SET status = 'Occupied', current_occupancy = current_occupancy + 1 "
+                         "WHERE room_id = %s", (room[0]["room_id"],), prepare=True)
+        return room[0]["room_id"]
+    return None
+
+
+def take_room(i):
+    with db.transaction() as conn:
+        room = db.take_room(conn, SEVERITIES[i % len(SEVERITIES)])
+    return room and room["room_id"]
+
+
+def run(allocate, clients, allocations):
+    latencies = []
+
+    def timed(i):
+        started = time.perf_counter()
+        room_id = allocate(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+        return room_id
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as ex:
+        assigned = [room_id for room_id in ex.map(timed, range(allocations)) if room_id]
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {"per_sec": allocations / elapsed, "p50": latencies[len(latencies) // 2],
+            "p99": latencies[int(0.99 * (len(latencies) - 1))], "assigned": assigned}
+
+
+def overbooked(cur, assigned):
+    """Patients assigned to a room beyond its bed capacity"""
+    cur.execute("""
+        SELECT COALESCE(SUM(GREATEST(a.n - r.bed_capacity, 0)), 0)
+        FROM (SELECT room_id, COUNT(*) AS n FROM unnest(%s::int[]) AS room_id GROUP BY room_id) a
+        JOIN rooms r ON r.room_id = a.room_id
+    """, (assigned,))
+    return cur.fetchone()[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=20_000)
+    parser.add_argument("--allocations", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--scarce", type=int, default=10, help="open rooms per bed type in the contention round")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    conn.autocommit = True
+    cur = conn.cursor()
+    build(cur, args.rooms)
+    os.environ["PGOPTIONS"] = "-c search_path=bench_beds,public"
+    cur.execute("SET search_path = bench_beds, public")
+    db.init_connection_pool()
+
+    paths = [("select then update", select_then_update, False),
+             ("SQL pick", take_room, False),
+             ("bed board", take_room, True)]
+    results = []
+    try:
+        for name, allocate, use_board in paths:
+            rounds = {}
+            for label, open_rooms in (("latency", None), ("contention", args.scarce)):
+                beds = reset(cur, open_rooms)
+                if use_board:
+                    bed_board.seed(conn)
+                bed_board.ready = use_board
+                allocations = args.allocations if open_rooms is None else 2 * beds
+                result = run(allocate, args.clients, allocations)
+                rounds[label] = {**result, "beds": beds, "over": overbooked(cur, result["assigned"])}
+            results.append((name, rounds))
+    finally:
+        bed_board.ready = False
+        db.close_connection_pool()
+        cur.execute("DROP SCHEMA bench_beds CASCADE")
+        conn.close()
+
+    print("=" * 89)
+    print(f"Room allocation, {args.rooms:,} rooms, {args.clients} clients")
+    print("=" * 89)
+    print(f"{'path':<20} | {'allocs/sec':>10} | {'p50 ms':>7} | {'p99 ms':>7} || "
+          f"{'beds':>5} | {'asked':>5} | {'assigned':>8} | {'overbooked':>10}")
+    print("-" * 89)
+    for name, rounds in results:
+        lat, con = rounds["latency"], rounds["contention"]
+        print(f"{name:<20} | {lat['per_sec']:>10.0f} | {lat['p50']:>7.2f} | {lat['p99']:>7.2f} || "
+              f"{con['beds']:>5} | {2 * con['beds']:>5} | {len(con['assigned']):>8} | {con['over']:>10}")
+    print(f"latency round: {args.allocations} allocations, every bed free; "
+          f"contention round: {args.scarce} open rooms per bed type")
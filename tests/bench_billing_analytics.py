@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Billing dashboards on a large invoices table: per-widget queries vs one scan.
+
+Builds `bench_billing.invoices` (same columns as public.invoices, default
+5M rows spread over two years) once and reuses it on later runs. Each
+round computes both dashboards (/billing/analytics and
+/billing/payment-analytics) the old way, one query per widget including
+the duplicated summary query, then through backend.billing_analytics from
+one invoices scan and from the invoice_daily_rollup table (when migration
+001 is applied).
+
+Run from the project root (needs DATABASE_URL):
+    python tests/bench_billing_analytics.py [--rows 5000000] [--rounds 5] [--rebuild]
+Drop the data afterwards with: DROP SCHEMA bench_billing CASCADE
+"""
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import billing_analytics
+from test_billing_analytics import LEGACY_BILLING, LEGACY_PAYMENT
+
+# get_payment_analytics ran its summary query twice
+LEGACY_QUERIES = list(LEGACY_BILLING.values()) + [LEGACY_PAYMENT["summary"]] + list(LEGACY_PAYMENT.values())
+
+
+def build(cur, rows, rebuild):
+    cur.execute("CREATE SCHEMA IF NOT EXISTS bench_billing")
+    cur.execute("SELECT to_regclass('bench_billing.invoices') IS NOT NULL AS present")
+    if cur.fetchone()["present"] and not rebuild:
+        cur.execute("SELECT COUNT(*) AS n FROM bench_billing.invoices")
+        if cur.fetchone()["n"] == rows:
+            return False
+    cur.execute("DROP TABLE IF EXISTS bench_billing.invoices")
+    cur.execute("CREATE TABLE bench_billing.invoices (LIKE public.invoices INCLUDING DEFAULTS)")
+    cur.execute("""
+        INSERT INTO bench_billing.invoices (invoice_id, patient_id, consultation_charges, total_amount, status, issue_date)
+        SELECT i, 1 + i %% 100, 500, (i::bigint * 7919 %% 200000) / 10.0,
+               (ARRAY['Paid', 'Paid', 'Paid', 'Unpaid', 'Pending', 'Partial', 'Insurance-Claim'])[1 + i %% 7],
+               CURRENT_DATE - (i * 31 %% 730)
+        FROM generate_series(1, %s) AS i
+    """, (rows,))
+    cur.execute("ANALYZE bench_billing.invoices")
+    return True
+
+
+def build_rollup(cur):
+    """Copies invoice_daily_rollup's shape and fills it from the bench invoices"""
+    cur.execute("SELECT to_regclass('public.invoice_daily_rollup') IS NOT NULL AS present")
+    if not cur.fetchone()["present"]:
+        return False
+    cur.execute("DROP TABLE IF EXISTS bench_billing.invoice_daily_rollup")
+    cur.execute("CREATE TABLE bench_billing.invoice_daily_rollup (LIKE public.invoice_daily_rollup INCLUDING ALL)")
+    cur.execute("""
+        INSERT INTO bench_billing.invoice_daily_rollup
+        SELECT COALESCE(issue_date, '-infinity'), COALESCE(status, ''), COUNT(*), COALESCE(SUM(total_amount), 0)
+        FROM bench_billing.invoices
+        GROUP BY 1, 2
+    """)
+    return True
+
+
+def legacy_round(cur):
+    for sql in LEGACY_QUERIES:
+        cur.execute(sql)
+        cur.fetchall()
+
+
+def engine_round(cur, sql=billing_analytics.INVOICE_GROUPS_SQL):
+    cur.execute(sql)
+    today, groups = billing_analytics.invoice_groups(cur.fetchall())
+    billing_analytics.billing_dashboard(groups, today)
+    billing_analytics.payment_dashboard(groups, today)
+    return len(groups)
+
+
+def timed(run, rounds):
+    run()  # warm the buffer cache
+    started = time.perf_counter()
+    for _ in range(rounds):
+        run()
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    conn.autocommit = True
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        started = time.perf_counter()
+        if build(cur, args.rows, args.rebuild):
+            print(f"built bench_billing.invoices ({args.rows:,} rows) in {time.perf_counter() - started:.1f}s")
+
+        has_rollup = build_rollup(cur)
+        cur.execute("SET search_path = bench_billing, public")
+
+        legacy_ms = timed(lambda: legacy_round(cur), args.rounds)
+        groups = engine_round(cur)
+        engine_ms = timed(lambda: engine_round(cur), args.rounds)
+        rollup_ms = timed(lambda: engine_round(cur, billing_analytics.ROLLUP_GROUPS_SQL), args.rounds) \
+            if has_rollup else None
+
+    conn.close()
+    print("=" * 64)
+    print(f"Billing dashboards, {args.rows:,} invoices, {args.rounds} rounds")
+    print("=" * 64)
+    print(f"{'path':<24} | {'scans':>5} | {'ms / both dashboards':>20}")
+    print("-" * 64)
+    print(f"{'per-widget queries':<24} | {len(LEGACY_QUERIES):>5} | {legacy_ms:>20.1f}")
+    print(f"{'single scan':<24} | {1:>5} | {engine_ms:>20.1f}")
+    if rollup_ms is not None:
+        print(f"{'daily rollup':<24} | {0:>5} | {rollup_ms:>20.1f}")
+    else:
+        print("daily rollup: skipped (apply database/migrations/001_invoice_daily_rollup.sql)")
+    print(f"single scan speedup: {legacy_ms / engine_ms:.1f}x  ({groups} (status, issue_date) groups)")
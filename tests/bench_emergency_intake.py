@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Emergency intake throughput under parallel load, and a bed overbooking check.
+
+Compares the old multi-step path (separate helper calls, each on its own
+pooled connection) with admit_emergency_patient (one transaction, rows
+locked with FOR UPDATE SKIP LOCKED). Only the database path is measured;
+the ML prediction is replaced by a fixed rotation of departments.
+
+Every room is emptied before each run, more intakes are sent than there are
+beds, and afterwards bench appointments per room are compared with bed
+capacity. Rooms, patients and appointments are restored at the end.
+
+Run from the project root (needs DATABASE_URL):
+    python tests/bench_emergency_intake.py [--clients 16] [--intakes 600]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import db
+
+MARKER = "BenchIntake"
+DEPARTMENTS = ["Cardiology", "Orthopedics", "General Medicine", "Neurology", "Dermatology"]
+SEVERITIES = ["Emergency", "High", "Low"]
+
+
+def patient(i):
+    return {"first_name": f"P{i}", "last_name": MARKER, "dob": "1990-01-01", "gender": "Male",
+            "contact_number": "9000000000"}
+
+
+def appointment(i):
+    return {"problem_description": "bench", "symptoms": "bench", "predicted_specialty": DEPARTMENTS[i % 5],
+            "severity": SEVERITIES[i % 3], "confidence_score": 0.9}
+
+
+def multi_step_intake(i):
+    patient_id = db.create_emergency_patient(patient(i))
+    doctor = db.get_available_doctor(DEPARTMENTS[i % 5])
+    room = db.get_available_room(SEVERITIES[i % 3])
+    if doctor:
+        db.create_emergency_appointment({**appointment(i), "patient_id": patient_id,
+                                         "doctor_id": doctor["doctor_id"], "department_id": doctor["department_id"],
+                                         "room_id": room["room_id"] if room else None})
+
+
+def single_transaction_intake(i):
+    db.admit_emergency_patient(patient(i), DEPARTMENTS[i % 5], SEVERITIES[i % 3], appointment(i))
+
+
+def empty_rooms():
+    db.execute_query("UPDATE rooms SET current_occupancy = 0, status = 'Available'")
+
+
+def overbooked_beds():
+    rows = db.execute_query("""
+        SELECT COALESCE(SUM(GREATEST(booked - r.bed_capacity, 0)), 0) AS over,
+               COALESCE(SUM(booked), 0) AS booked
+        FROM rooms r
+        JOIN (
+            SELECT a.room_id, COUNT(*) AS booked
+            FROM appointments a JOIN patients p ON p.patient_id = a.patient_id
+            WHERE p.last_name = %s AND a.room_id IS NOT NULL
+            GROUP BY a.room_id
+        ) b ON b.room_id = r.room_id
+    """, (MARKER,))
+    return int(rows[0]["over"]), int(rows[0]["booked"])
+
+
+def cleanup():
+    db.execute_query("DELETE FROM appointments WHERE patient_id IN (SELECT patient_id FROM patients WHERE last_name = %s)", (MARKER,))
+    db.execute_query("DELETE FROM patients WHERE last_name = %s", (MARKER,))
+
+
+def run(label, intake, clients, intakes):
+    empty_rooms()
+    errors = []
+
+    def guarded(i):
+        try:
+            intake(i)
+        except Exception as e:
+            errors.append(str(e))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as ex:
+        list(ex.map(guarded, range(intakes)))
+    elapsed = time.perf_counter() - started
+
+    over, booked = overbooked_beds()
+    print(f"{label:<20} | {intakes / elapsed:>11.0f} | {booked:>11} | {over:>10} | {len(errors):>6}")
+    cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--intakes", type=int, default=600)
+    args = parser.parse_args()
+
+    db.init_connection_pool()
+    snapshot = db.execute_query("SELECT room_id, current_occupancy, status FROM rooms")
+    beds = db.execute_query("SELECT SUM(bed_capacity) AS beds FROM rooms")[0]["beds"]
+    try:
+        print("=" * 72)
+        print(f"Emergency intake: {args.intakes} intakes, {args.clients} clients, {beds} beds")
+        print("=" * 72)
+        print(f"{'path':<20} | {'intakes/sec':>11} | {'beds taken':>11} | {'overbooked':>10} | {'errors':>6}")
+        print("-" * 72)
+        run("multi-step", multi_step_intake, args.clients, args.intakes)
+        run("single transaction", single_transaction_intake, args.clients, args.intakes)
+    finally:
+        cleanup()
+        for room in snapshot:
+            db.execute_query("UPDATE rooms SET current_occupancy = %s, status = %s WHERE room_id = %s",
+                             (room["current_occupancy"], room["status"], room["room_id"]))
+        db.close_connection_pool()
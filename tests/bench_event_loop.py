@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Event-loop responsiveness while /triage/analyze traffic is running:
+engine.analyze inline in the coroutine vs on the bounded CPU executor.
+
+--clients coroutines each send --requests analyses (the result cache is off,
+so every call computes). Meanwhile a probe coroutine stands in for every other
+request on the worker: it wakes every 5 ms and records how late it was.
+loop_monitor stats are reported for the same window.
+
+Run from the project root:
+    python tests/bench_event_loop.py [--clients 16] [--requests 50]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure the analysis itself, not the result cache
+os.environ["TRIAGE_CACHE_SIZE"] = "0"
+
+from backend.core.triage_engine import MedicalTriageEngine
+from backend.runtime import BoundedCPUExecutor, LoopLagMonitor
+
+SYMPTOMS = [
+    "Severe chest pain radiating to left arm, sweating, breathless",
+    "Knee pain since 5 days, difficulty walking, mild swelling",
+    "ಮಂಡಿ ನೋವು 4 ದಿನಗಳು, ನಡೆಯುವಲ್ಲಿ ಕಷ್ಟ",
+    "घुटने में दर्द 3 दिनों से, चलने में तकलीफ",
+    "itchy skin rash and hair fall for two weeks",
+    "feeling unwell", "tired all the time", "fever for 4 days with cough",
+]
+
+
+async def probe(stop, delays):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + 0.005
+        await asyncio.sleep(0.005)
+        delays.append((loop.time() - expected) * 1000)
+
+
+async def scenario(analyze, clients, requests):
+    rng = random.Random(1)
+    stop, delays = asyncio.Event(), []
+    monitor = LoopLagMonitor(interval_ms=10, stall_ms=50, warn_ms=1e9)
+    monitor.start()
+    prober = asyncio.create_task(probe(stop, delays))
+
+    async def client():
+        for _ in range(requests):
+            await analyze(rng.choice(SYMPTOMS), rng.choice([None, 8, 40]), rng.choice([None, "Female"]))
+            await asyncio.sleep(0)  # the route would await the DB write here
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(clients)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await prober
+    monitor.stop()
+    delays.sort()
+    return elapsed, delays[int(0.99 * (len(delays) - 1))], monitor.stats()
+
+
+async def main(clients, requests):
+    engine = MedicalTriageEngine()
+    engine._ml_batcher.window = 0
+    executor = BoundedCPUExecutor("bench-cpu")
+
+    async def inline(*args):
+        return engine.analyze(*args)
+
+    async def offloaded(*args):
+        return await executor.run(engine.analyze, *args)
+
+    print(f"\n{clients} clients x {requests} analyses, {os.cpu_count()} cores\n")
+    print(f"{'mode':<10}{'req/s':>8}{'probe p99 ms':>14}{'lag max ms':>12}{'stalls':>8}")
+    for name, fn in (("inline", inline), ("executor", offloaded)):
+        elapsed, probe_p99, stats = await scenario(fn, clients, requests)
+        print(f"{name:<10}{clients * requests / elapsed:>8.0f}{probe_p99:>14.1f}"
+              f"{stats['lag_ms']['max']:>12.1f}{stats['stalls']:>8}")
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.clients, args.requests))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Unpaid invoice listing on a large table: OFFSET vs keyset pages, and the
+streaming CSV/NDJSON export.
+
+Uses the `bench_billing.invoices` table from bench_billing_analytics.py
+(built on first use, default 5M rows of which ~1.4M are Unpaid/Pending)
+plus the keyset index from migration 002. The pool is pointed at the
+bench schema through the connection's search_path.
+
+"RSS growth MB" is how far the process high-water mark (ru_maxrss) rose
+while the export generator was drained; it should stay flat as --rows grows.
+
+Run from the project root (needs DATABASE_URL):
+    python tests/bench_invoice_export.py [--rows 5000000] [--page 500]
+"""
+import argparse
+import os
+import sys
+import resource
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_billing_analytics import build
+
+KEYSET_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_bench_invoices_unpaid_keyset
+        ON bench_billing.invoices ((COALESCE(issue_date, '-infinity'::date)), (COALESCE(-total_amount, -100000000)), invoice_id)
+        WHERE LOWER(status) IN ('unpaid', 'pending')
+"""
+
+
+def use_bench_schema():
+    url = os.environ["DATABASE_URL"]
+    os.environ["DATABASE_URL"] = url + ("&" if "?" in url else "?") + "options=-csearch_path%3Dbench_billing,public"
+
+
+def timed_ms(run, repeat=5):
+    run()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def drain(export):
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    size = lines = 0
+    for chunk in export():
+        size += len(chunk)
+        lines += chunk.count("\n")
+    elapsed = time.perf_counter() - started
+    growth_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    return lines, elapsed, size, growth_kb * 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--page", type=int, default=500)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    conn.autocommit = True
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        build(cur, args.rows, rebuild=False)
+        cur.execute(KEYSET_INDEX)
+        cur.execute("ANALYZE bench_billing.invoices")
+        cur.execute("SELECT COUNT(*) AS n FROM bench_billing.invoices WHERE LOWER(status) IN ('unpaid', 'pending')")
+        unpaid = cur.fetchone()["n"]
+    conn.close()
+
+    use_bench_schema()
+    from backend import db, invoice_listing
+    db.init_connection_pool()
+
+    # Old query shape with OFFSET vs keyset, at increasing depth
+    offset_sql = invoice_listing._UNPAID_SELECT + "ORDER BY days_outstanding DESC, i.total_amount DESC LIMIT %s OFFSET %s"
+    print("=" * 60)
+    print(f"Unpaid invoice pages ({unpaid:,} unpaid of {args.rows:,}), {args.page} rows/page")
+    print("=" * 60)
+    print(f"{'depth':>10} | {'OFFSET ms':>10} | {'keyset ms':>10}")
+    print("-" * 60)
+    for depth in (0, 10_000, 100_000, unpaid - args.page):
+        before = db.execute_query(invoice_listing.EXPORT_SQL + " OFFSET %s LIMIT 1", (max(depth - 1, 0),))[0]
+        cursor = invoice_listing.encode_cursor(before) if depth else None
+        offset_ms = timed_ms(lambda: db.execute_query(offset_sql, (args.page, depth)), repeat=3)
+        keyset_ms = timed_ms(lambda: invoice_listing.unpaid_invoice_page(args.page, cursor))
+        print(f"{depth:>10,} | {offset_ms:>10.1f} | {keyset_ms:>10.1f}")
+
+    print()
+    print(f"{'export':<8} | {'rows':>10} | {'rows/sec':>10} | {'MB out':>8} | {'RSS growth MB':>13}")
+    print("-" * 60)
+    for label, export in (("csv", invoice_listing.export_csv), ("ndjson", invoice_listing.export_ndjson)):
+        lines, elapsed, size, peak = drain(export)
+        rows = lines - 1 if label == "csv" else lines
+        print(f"{label:<8} | {rows:>10,} | {rows / elapsed:>10,.0f} | {size / 1e6:>8.1f} | {peak / 1e6:>13.1f}")
+
+    db.close_connection_pool()
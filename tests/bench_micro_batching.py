@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Throughput vs. batching window for department prediction and triage ML override.
+
+Simulates an ER surge: N threads (like FastAPI's threadpool) each submit
+single-row predictions as fast as they can. Window 0 = no batching.
+
+Run from the project root:
+    python tests/bench_micro_batching.py
+"""
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ml_service import ResidentModel, MODEL_PATH
+from backend.core.micro_batcher import MicroBatcher
+
+SYMPTOMS = [
+    "severe chest pain radiating to left arm",
+    "itchy skin rash on both arms",
+    "fever for 3 days with body pain",
+    "knee fracture after bike accident",
+    "migraine with dizziness and numbness",
+    "stomach pain and vomiting since morning",
+    "sore throat and ear pain",
+    "missed period and abdominal cramps",
+]
+
+THREADS = 32
+REQUESTS_PER_THREAD = 200
+WINDOWS_MS = [0, 1, 2, 5]
+
+
+def run(predict, threads=THREADS, per_thread=REQUESTS_PER_THREAD) -> float:
+    """Returns predictions/sec"""
+    def worker(offset):
+        for i in range(per_thread):
+            predict(SYMPTOMS[(offset + i) % len(SYMPTOMS)])
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return threads * per_thread / (time.perf_counter() - started)
+
+
+def bench_department_model():
+    print("\n📊 predict_department (TF-IDF + MultinomialNB)")
+    print(f"{'window (ms)':>12} | {'pred/sec':>10} | {'avg batch':>9}")
+    print("-" * 38)
+    for window in WINDOWS_MS:
+        model = ResidentModel(MODEL_PATH, batch_window_ms=window)
+        model.load()
+        rate = run(lambda text: model.predict(text))
+        print(f"{window:>12} | {rate:>10.0f} | {model.batcher.stats()['avg_batch_size']:>9}")
+
+
+def bench_triage_override():
+    """Same comparison for the vectorizer/model pair used by MedicalTriageEngine._ml_predict"""
+    model = ResidentModel(MODEL_PATH).load()
+    vectorizer, classifier = model.steps[0][1], model.steps[-1][1]
+
+    def predict_batch(texts):
+        return list(classifier.predict(vectorizer.transform(texts)))
+
+    print("\n📊 MedicalTriageEngine._ml_predict (vectorizer.transform + model.predict)")
+    print(f"{'window (ms)':>12} | {'pred/sec':>10} | {'avg batch':>9}")
+    print("-" * 38)
+    for window in WINDOWS_MS:
+        batcher = MicroBatcher(predict_batch, window_ms=window, max_batch=64)
+        rate = run(batcher.submit)
+        print(f"{window:>12} | {rate:>10.0f} | {batcher.stats()['avg_batch_size']:>9}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print(f"Micro-batching benchmark: {THREADS} threads x {REQUESTS_PER_THREAD} requests")
+    print("=" * 60)
+    bench_department_model()
+    bench_triage_override()
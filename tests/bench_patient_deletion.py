@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Deleting patients: the old per-statement endpoint vs backend.deletion.
+
+- per statement: what admin.delete_patient did, six DELETEs per patient,
+  each through execute_query (own pooled connection, own commit)
+- one transaction: deletion.delete_patients(ids), one set-based DELETE
+  per table for the whole list
+
+Seeds --patients patients per path, each with an appointment, an
+admission, a medical record, an invoice and an allergy (rows the old
+statement order could delete), then deletes them.
+
+Run from the project root (needs DATABASE_URL):
+    python tests/bench_patient_deletion.py [--patients 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import db, deletion
+from backend.db import execute_query, transaction
+
+LEGACY_STATEMENTS = [
+    "DELETE FROM appointments WHERE patient_id = %s",
+    "DELETE FROM medical_records WHERE patient_id = %s",
+    "DELETE FROM allergies WHERE patient_id = %s",
+    "DELETE FROM invoices WHERE patient_id = %s",
+    "DELETE FROM admissions WHERE patient_id = %s",
+    "DELETE FROM patients WHERE patient_id = %s",
+]
+
+
+def seed(n):
+    with transaction() as conn, conn.cursor() as cur:
+        cur.execute("SELECT doctor_id, department_id FROM doctors ORDER BY doctor_id LIMIT 1")
+        doctor_id, department_id = cur.fetchone()
+        cur.execute("SELECT room_id FROM rooms ORDER BY room_id LIMIT 1")
+        room_id = cur.fetchone()[0]
+        cur.execute("""
+            INSERT INTO patients (first_name, last_name, dob, gender, contact_number)
+            SELECT 'Bench', 'Delete', '1990-01-01', 'Male', '9000000002' FROM generate_series(1, %s)
+            RETURNING patient_id
+        """, (n,))
+        ids = [row[0] for row in cur.fetchall()]
+        cur.execute("""
+            INSERT INTO appointments (patient_id, doctor_id, department_id, appointment_date, patient_problem_text)
+            SELECT id, %s, %s, CURRENT_TIMESTAMP, 'bench' FROM unnest(%s) AS id
+        """, (doctor_id, department_id, ids))
+        cur.execute("""
+            INSERT INTO admissions (patient_id, primary_doctor_id, room_id, department_id, admission_reason, status)
+            SELECT id, %s, %s, %s, 'bench', 'Discharged' FROM unnest(%s) AS id
+        """, (doctor_id, room_id, department_id, ids))
+        cur.execute("INSERT INTO medical_records (patient_id, doctor_id, diagnosis) "
+                    "SELECT id, %s, 'bench' FROM unnest(%s) AS id", (doctor_id, ids))
+        cur.execute("INSERT INTO invoices (patient_id, consultation_charges) SELECT id, 500 FROM unnest(%s) AS id", (ids,))
+        cur.execute("INSERT INTO allergies (patient_id, allergen) SELECT id, 'bench' FROM unnest(%s) AS id", (ids,))
+    return ids
+
+
+def legacy_delete(ids):
+    for patient_id in ids:
+        for sql in LEGACY_STATEMENTS:
+            execute_query(sql, (patient_id,))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, default=500)
+    args = parser.parse_args()
+
+    db.init_connection_pool()
+    try:
+        ids = seed(args.patients)
+        started = time.perf_counter()
+        legacy_delete(ids)
+        legacy_ms = (time.perf_counter() - started) * 1000
+
+        ids = seed(args.patients)
+        result = deletion.delete_patients(ids)
+    finally:
+        db.close_connection_pool()
+
+    print("=" * 60)
+    print(f"Deleting {args.patients:,} patients with linked rows")
+    print("=" * 60)
+    print(f"{'path':<18} | {'statements':>10} | {'commits':>7} | {'ms':>9}")
+    print("-" * 60)
+    print(f"{'per statement':<18} | {len(ids) * 6:>10} | {len(ids) * 6:>7} | {legacy_ms:>9.1f}")
+    print(f"{'one transaction':<18} | {len(deletion.PATIENT_STEPS) + 1:>10} | {1:>7} | {result['elapsed_ms']:>9.1f}")
+    print(f"speedup: {legacy_ms / result['elapsed_ms']:.0f}x   rows removed: {result['deleted']}")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Admin patient grid on a large hospital: DISTINCT ON subqueries vs LATERAL lookups.
+
+Builds `bench_patients.{patients, appointments, admissions}` (same columns
+as public, default 1M patients with 3 appointments each and an admission
+for every 5th patient) once and reuses it on later runs. Doctors and rooms
+come from public. The indexes are the ones migration 004 adds. When
+migration 005 is applied, `bench_patients.patient_current_state` is filled
+from the bench tables too.
+
+Each round fetches the first page, a page deep in the list (keyset
+after_patient_id) and a filtered page, with LATERAL lookups and from the
+projection; the old query can only do the first page (it had no paging),
+so that is the one it is timed on.
+
+Run from the project root (needs DATABASE_URL):
+    python tests/bench_patient_listing.py [--patients 1000000] [--rounds 5] [--rebuild]
+Drop the data afterwards with: DROP SCHEMA bench_patients CASCADE
+"""
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import patient_listing
+from test_patient_listing import LEGACY_SQL
+
+PAGE = 50
+
+
+def build(cur, patients, rebuild):
+    cur.execute("CREATE SCHEMA IF NOT EXISTS bench_patients")
+    # The admissions index is built last, so its presence means a complete build
+    cur.execute("SELECT to_regclass('bench_patients.idx_admissions_patient_latest') IS NOT NULL")
+    if cur.fetchone()[0] and not rebuild:
+        cur.execute("SELECT COUNT(*) FROM bench_patients.patients")
+        if cur.fetchone()[0] == patients:
+            return False
+    for table in ("patient_current_state", "medical_records", "admissions", "appointments", "patients"):
+        cur.execute(f"DROP TABLE IF EXISTS bench_patients.{table}")
+    for table in ("admissions", "appointments", "patients"):
+        cur.execute(f"CREATE TABLE bench_patients.{table} (LIKE public.{table} INCLUDING DEFAULTS)")
+    cur.execute("SELECT array_agg(doctor_id) FROM doctors")
+    doctors = cur.fetchone()[0]
+    cur.execute("SELECT array_agg(room_id) FROM rooms")
+    rooms = cur.fetchone()[0]
+
+    cur.execute("""
+        INSERT INTO bench_patients.patients (patient_id, first_name, last_name, dob, gender, contact_number, is_active)
+        SELECT i, 'First' || i, 'Last' || (i %% 5000), DATE '1940-01-01' + (i::bigint * 37 %% 29000)::int,
+               (ARRAY['Male', 'Female', 'Other'])[1 + i %% 3], '9' || lpad(i::text, 9, '0'), TRUE
+        FROM generate_series(1, %s) AS i
+    """, (patients,))
+    cur.execute("""
+        INSERT INTO bench_patients.appointments (appointment_id, patient_id, doctor_id, department_id, room_id,
+                                                 appointment_date, patient_problem_text, status)
+        SELECT i, 1 + i %% %s, (%s::int[])[1 + i %% cardinality(%s::int[])], 1,
+               (%s::int[])[1 + i %% cardinality(%s::int[])],
+               TIMESTAMP '2024-01-01' + (i::bigint * 7919 %% 1000000) * INTERVAL '1 minute', 'checkup',
+               (ARRAY['Scheduled', 'Completed', 'Cancelled'])[1 + i %% 3]
+        FROM generate_series(1, %s) AS i
+    """, (patients, doctors, doctors, rooms, rooms, patients * 3))
+    cur.execute("""
+        INSERT INTO bench_patients.admissions (admission_id, patient_id, primary_doctor_id, room_id, department_id,
+                                               admission_date, admission_reason, status)
+        SELECT i, i * 5, (%s::int[])[1 + i %% cardinality(%s::int[])], (%s::int[])[1 + i %% cardinality(%s::int[])], 1,
+               TIMESTAMP '2024-01-01' + (i::bigint * 104729 %% 1000000) * INTERVAL '1 minute', 'observation',
+               (ARRAY['Active', 'Discharged'])[1 + i %% 2]
+        FROM generate_series(1, %s) AS i
+    """, (doctors, doctors, rooms, rooms, patients // 5))
+    cur.execute("ALTER TABLE bench_patients.patients ADD PRIMARY KEY (patient_id)")
+    for table in ("patients", "appointments", "admissions"):
+        cur.execute(f"ANALYZE bench_patients.{table}")
+    cur.execute("CREATE INDEX idx_appointments_patient_latest ON bench_patients.appointments (patient_id, appointment_date DESC)")
+    cur.execute("CREATE INDEX idx_admissions_patient_latest ON bench_patients.admissions (patient_id, admission_date DESC)")
+    return True
+
+
+def build_state(cur):
+    """Fills bench_patients.patient_current_state with migration 005's compute function"""
+    cur.execute("SELECT to_regproc('public.patient_current_state_compute') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return False
+    cur.execute("SELECT to_regclass('bench_patients.patient_current_state') IS NOT NULL")
+    if cur.fetchone()[0]:
+        return True
+    # The function resolves its tables through search_path, so it reads the bench copies
+    cur.execute("CREATE TABLE bench_patients.medical_records (LIKE public.medical_records INCLUDING DEFAULTS)")
+    cur.execute("CREATE INDEX ON bench_patients.medical_records (patient_id, record_date DESC)")
+    cur.execute("CREATE TABLE bench_patients.patient_current_state (LIKE public.patient_current_state INCLUDING DEFAULTS)")
+    cur.execute("SET search_path = bench_patients, public")
+    cur.execute("""
+        INSERT INTO bench_patients.patient_current_state
+        SELECT * FROM patient_current_state_compute(ARRAY(SELECT patient_id FROM bench_patients.patients))
+    """)
+    cur.execute("RESET search_path")
+    cur.execute("ALTER TABLE bench_patients.patient_current_state ADD PRIMARY KEY (patient_id)")
+    cur.execute("ANALYZE bench_patients.patient_current_state")
+    return True
+
+
+def timed(cur, sql, params, rounds):
+    cur.execute(sql, params)  # warm the buffer cache
+    cur.fetchall()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        cur.execute(sql, params)
+        cur.fetchall()
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        started = time.perf_counter()
+        if build(cur, args.patients, args.rebuild):
+            print(f"built bench_patients ({args.patients:,} patients) in {time.perf_counter() - started:.1f}s")
+        has_state = build_state(cur)
+        cur.execute("SET search_path = bench_patients, public")
+
+        pages = [
+            ("first page", {}),
+            ("middle page", {"after_patient_id": args.patients // 2}),
+            ("filtered page", {"gender": "Female", "search": "Last12"}),
+        ]
+        cases = [("DISTINCT ON, first page", LEGACY_SQL + f"LIMIT {PAGE}", None)]
+        for source, from_state in (("LATERAL", False), ("projection", True)):
+            if from_state and not has_state:
+                continue
+            for name, filters in pages:
+                sql, params = patient_listing.page_sql(from_state=from_state, **filters)
+                cases.append((f"{source}, {name}", sql, (*params, PAGE + 1)))
+        results = [(name, timed(cur, sql, params, args.rounds)) for name, sql, params in cases]
+
+    conn.close()
+    print("=" * 52)
+    print(f"Admin patient grid, {args.patients:,} patients, page of {PAGE}, {args.rounds} rounds")
+    print("=" * 52)
+    for name, ms in results:
+        print(f"{name:<28} | {ms:>12.1f} ms")
+    print(f"first page speedup: {results[0][1] / results[1][1]:.0f}x")
+    if not has_state:
+        print("projection: skipped (apply database/migrations/005_patient_current_state.sql)")
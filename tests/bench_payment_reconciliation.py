@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Settlement batch throughput: update_payment once per row vs bulk reconcile.
+
+Creates --payments invoices inside a transaction, then applies one payment
+per invoice (2% unknown invoice ids, 2% overpayments) two ways:
+
+- per row: what calling PUT /billing/update-payment for each payment does
+  (existence SELECT, then UPDATE ... RETURNING; two round trips per row)
+- bulk: payment_reconciliation.apply_batch (COPY into a temp table, one
+  UPDATE ... FROM)
+
+Each path runs from the same savepoint; everything is rolled back at the end.
+Round trips here go over a local socket, so the per-row numbers are a best case.
+
+Run from the project root (needs DATABASE_URL):
+    python tests/bench_payment_reconciliation.py [--payments 20000]
+"""
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import payment_reconciliation
+
+
+def per_row(cur, payments):
+    for _, invoice_id, amount, paid_at, _ in payments:
+        cur.execute("SELECT invoice_id, total_amount, amount_paid FROM invoices WHERE invoice_id = %s", (invoice_id,))
+        if not cur.fetchall():
+            continue
+        cur.execute("""
+            UPDATE invoices
+            SET status = %s, payment_date = COALESCE(%s::timestamp, CURRENT_TIMESTAMP), amount_paid = %s
+            WHERE invoice_id = %s
+            RETURNING invoice_id, status, payment_date, total_amount, amount_paid
+        """, ("Paid", paid_at, amount, invoice_id))
+        cur.fetchall()
+
+
+def bulk(cur, payments):
+    return payment_reconciliation.apply_batch(cur, payments)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payments", type=int, default=20000)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                INSERT INTO invoices (patient_id, total_amount, amount_paid, status)
+                SELECT (SELECT MIN(patient_id) FROM patients), 500, 0, 'Unpaid'
+                FROM generate_series(1, %s)
+                RETURNING invoice_id
+            """, (args.payments,))
+            ids = [row["invoice_id"] for row in cur.fetchall()]
+            cur.execute("SELECT MAX(invoice_id) AS id FROM invoices")
+            missing = cur.fetchone()["id"] + 1
+
+            payments = []
+            for n, invoice_id in enumerate(ids, start=1):
+                if n % 50 == 0:
+                    payments.append((n, missing + n, Decimal("500"), None, "UPI"))    # not found
+                elif n % 50 == 1:
+                    payments.append((n, invoice_id, Decimal("900"), None, "UPI"))     # overpaid
+                else:
+                    payments.append((n, invoice_id, Decimal("500"), None, "UPI"))
+            cur.execute("SAVEPOINT bench")
+
+            print("=" * 64)
+            print(f"Settlement batch: {len(payments):,} payments")
+            print("=" * 64)
+            print(f"{'path':<10} | {'seconds':>8} | {'rows/sec':>10} | outcomes")
+            print("-" * 64)
+            for label, run in (("per row", per_row), ("bulk", bulk)):
+                started = time.perf_counter()
+                outcomes = run(cur, payments)
+                elapsed = time.perf_counter() - started
+                summary = ""
+                if outcomes:
+                    counts = {}
+                    for row in outcomes.values():
+                        counts[row["outcome"]] = counts.get(row["outcome"], 0) + 1
+                    summary = ", ".join(f"{k} {v}" for k, v in sorted(counts.items()))
+                print(f"{label:<10} | {elapsed:>8.2f} | {len(payments) / elapsed:>10,.0f} | {summary}")
+                cur.execute("ROLLBACK TO SAVEPOINT bench")
+    finally:
+        conn.rollback()
+        conn.close()
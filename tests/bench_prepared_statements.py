@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Parse/plan time saved by server-side prepared statements, per endpoint.
+
+Each hot statement is run ROUNDS times on one connection as a plain
+execute and as a cached prepared statement. "plan ms" is PostgreSQL's own
+planning time for one plain execution (EXPLAIN ANALYZE summary). Writes
+run inside a transaction that is rolled back.
+
+Run from the project root (needs DATABASE_URL):
+    python tests/bench_prepared_statements.py
+"""
+import os
+import sys
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.db_prepared import PreparedStatementConnection, execute_prepared
+
+ROUNDS = 2000
+
+STATEMENTS = [
+    ("POST /admin/login", "SELECT * FROM users WHERE username = %s AND role = %s", ("admin", "admin")),
+    ("POST /login (patient)", """
+        SELECT patient_id, first_name, last_name, contact_number, email, dob, gender, blood_group, is_active
+        FROM patients
+        WHERE patient_id = %s AND contact_number = %s AND is_active = TRUE
+    """, (1, "9876543210")),
+    ("intake: doctor availability", """
+        SELECT d.doctor_id, d.first_name, d.last_name, d.doctor_room_number, d.consultation_fee,
+               dept.department_id, dept.department_name
+        FROM doctors d
+        JOIN departments dept ON d.department_id = dept.department_id
+        WHERE LOWER(TRIM(dept.department_name)) = LOWER(TRIM(%s))
+          AND d.is_available = TRUE
+        ORDER BY d.current_workload ASC
+        LIMIT 1
+    """, ("Cardiology",)),
+    ("intake: room availability", """
+        SELECT room_id, room_number, room_type, wing, floor_number, bed_capacity, current_occupancy
+        FROM rooms
+        WHERE room_type = %s AND status = 'Available' AND current_occupancy < bed_capacity
+        ORDER BY current_occupancy ASC
+        LIMIT 1
+    """, ("General Ward",)),
+    ("GET /billing/invoice/{id}", """
+        SELECT i.*, p.first_name, p.last_name, p.contact_number, p.email,
+               p.address, p.city, p.state, p.pincode, p.insurance_provider, p.insurance_number
+        FROM invoices i
+        INNER JOIN patients p ON i.patient_id = p.patient_id
+        WHERE i.invoice_id = %s
+    """, (1,)),
+    ("POST /triage/analyze (insert)", """
+        INSERT INTO triage_results (
+            symptoms, patient_age, patient_gender, medical_category, severity, assigned_doctor,
+            room_allotted, triage_status, explanation_en, explanation_kn, explanation_hi,
+            detected_language, confidence_score, model_version, analysis_timestamp
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '1.0', CURRENT_TIMESTAMP)
+        RETURNING triage_id
+    """, ("chest pain", 40, "M", "Cardiology", "HIGH", "Cardiology", "ICU", "ASSIGN",
+          "en", "kn", "hi", "en", None)),
+]
+
+
+def planning_ms(cur, sql, params) -> float:
+    cur.execute("EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) " + sql, params)
+    return cur.fetchone()[0][0]["Planning Time"]
+
+
+def per_call_us(run) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        run()
+    return (time.perf_counter() - started) / ROUNDS * 1e6
+
+
+if __name__ == "__main__":
+    conn = psycopg2.connect(os.environ["DATABASE_URL"], connection_factory=PreparedStatementConnection)
+    print("=" * 86)
+    print(f"Prepared vs plain statements ({ROUNDS} executions each, one connection)")
+    print("=" * 86)
+    print(f"{'endpoint':<32} | {'plan ms':>8} | {'plain µs':>9} | {'prepared µs':>11} | {'saved µs':>9} | {'saved':>6}")
+    print("-" * 86)
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        for label, sql, params in STATEMENTS:
+            with conn.cursor() as plain_cur:
+                plan = planning_ms(plain_cur, sql, params)
+            plain = per_call_us(lambda: (cur.execute(sql, params), cur.fetchall()))
+            execute_prepared(cur, sql, params)  # PREPARE outside the timed loop
+            prepared = per_call_us(lambda: (execute_prepared(cur, sql, params), cur.fetchall()))
+            conn.rollback()
+            saved = plain - prepared
+            print(f"{label:<32} | {plan:>8.3f} | {plain:>9.1f} | {prepared:>11.1f} | {saved:>9.1f} | {saved / plain:>6.1%}")
+    conn.close()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Per-call latency of the triage rule engines: compiled matchers vs. the
+original per-keyword / per-pattern loops (reference copies in test_rule_engine.py).
+
+Run from the project root:
+    python tests/bench_rule_engine.py
+"""
+import os
+import sys
+import time
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, TESTS_DIR)
+
+from backend.core.rule_engine import DepartmentRuleEngine, SeverityRuleEngine
+from test_rule_engine import legacy_classify_department, legacy_determine_severity
+
+SAMPLES = [
+    "Bike accident 2 hours ago, severe leg pain, cannot walk, visible deformity",
+    "Severe chest pain radiating to left arm, sweating, breathless",
+    "Knee pain since 5 days, difficulty walking, mild swelling",
+    "ಮಂಡಿ ನೋವು 4 ದಿನಗಳು, ನಡೆಯುವಲ್ಲಿ ಕಷ್ಟ",
+    "घुटने में दर्द 3 दिनों से, चलने में तकलीफ",
+    "itchy skin rash and hair fall for two weeks",
+    "blurred vision in left eye",
+    "Routine health check",
+]
+ROUNDS = 200
+
+
+def per_call_us(fn) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for text in SAMPLES:
+            fn(text)
+    return (time.perf_counter() - started) / (ROUNDS * len(SAMPLES)) * 1e6
+
+
+if __name__ == "__main__":
+    engine = DepartmentRuleEngine()
+    print("=" * 60)
+    print(f"Rule engine latency ({ROUNDS * len(SAMPLES)} calls each)")
+    print("=" * 60)
+
+    legacy = per_call_us(lambda t: legacy_classify_department(engine, t))
+    compiled = per_call_us(engine.classify_department)
+    print(f"classify_department  legacy: {legacy:8.1f} µs/call | compiled: {compiled:8.1f} µs/call | {legacy / compiled:.1f}x")
+
+    severity = SeverityRuleEngine()
+    legacy = per_call_us(lambda t: legacy_determine_severity(severity, t, 40))
+    compiled = per_call_us(lambda t: severity.determine_severity(t, 40))
+    print(f"determine_severity   legacy: {legacy:8.1f} µs/call | compiled: {compiled:8.1f} µs/call | {legacy / compiled:.1f}x")
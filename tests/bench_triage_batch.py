@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+/triage/batch engine time: analyze() per case vs batch_analyze().
+
+- per case: the old batch_analyze, a list comprehension over analyze();
+  every ML override is its own vectorize/predict (through the micro-batcher,
+  which waits up to ML_BATCH_WINDOW_MS for company that never comes)
+- batched: rules per case, one vectorize/predict for all ML overrides
+
+Cases are drawn from the synthetic training corpus plus vague complaints
+that the rules can't place (those are the ones that reach the model). The
+ML override is enabled for both paths (accept_pipeline=True); by default
+the shipped pipeline artifact is not served and no case reaches the model.
+
+Run from the project root:
+    python tests/bench_triage_batch.py [--rounds 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure the analysis itself, not the result cache
+os.environ["TRIAGE_CACHE_SIZE"] = "0"
+
+from backend.core.triage_engine import MedicalTriageEngine
+from backend.models.train_model import generate_training_data
+
+SIZES = [10, 100, 1000]
+VAGUE = ["feeling unwell", "tired all the time", "something is wrong", "not feeling good since morning",
+         "weakness", "pain", "uneasy", "general checkup needed"]
+
+
+def make_cases(n, texts, rng):
+    return [{"symptoms": rng.choice(texts), "age": rng.choice([None, 8, 30, 65]),
+             "gender": rng.choice([None, "Male", "Female"])} for _ in range(n)]
+
+
+def median_ms(fn, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = generate_training_data(output_path=os.path.join(tmp, "training_data.csv"), n_samples=3000)
+    texts = list(dict.fromkeys(df["symptoms"].astype(str))) + VAGUE * 50
+
+    engine = MedicalTriageEngine(accept_pipeline=True)
+    rng = random.Random(3)
+    print(f"\nmodel: {type(engine.ml_model).__name__}, {args.rounds} rounds (median)\n")
+    print(f"{'cases':>6}{'ML cases':>10}{'per case ms':>14}{'batched ms':>12}{'speedup':>9}")
+    for n in SIZES:
+        cases = make_cases(n, texts, rng)
+        ml_cases = sum(engine._needs_ml(engine._rule_stage(c["symptoms"], c["age"], c["gender"])[1]) for c in cases)
+        per_case = median_ms(lambda: [engine.analyze(c["symptoms"], c["age"], c["gender"]) for c in cases], args.rounds)
+        batched = median_ms(lambda: engine.batch_analyze(cases), args.rounds)
+        assert engine.batch_analyze(cases) == [engine.analyze(c["symptoms"], c["age"], c["gender"]) for c in cases]
+        print(f"{n:>6}{ml_cases:>10}{per_case:>14.1f}{batched:>12.1f}{per_case / batched:>8.1f}x")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+analyze() latency with and without the triage result cache.
+
+Simulates kiosk / call-centre traffic: --calls requests drawn from
+--distinct complaints with a Zipf-like skew (a few complaints dominate),
+random ages and genders, and some casing/spacing noise.
+
+Run from the project root:
+    python tests/bench_triage_cache.py [--calls 20000] [--distinct 500]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.triage_engine import MedicalTriageEngine
+from backend.models.train_model import generate_training_data
+
+
+def make_traffic(calls, distinct, rng):
+    with tempfile.TemporaryDirectory() as tmp:
+        df = generate_training_data(output_path=os.path.join(tmp, "training_data.csv"), n_samples=distinct * 4)
+    texts = list(dict.fromkeys(df["symptoms"].astype(str)))[:distinct]
+    weights = [1 / (rank + 1) for rank in range(len(texts))]
+    traffic = []
+    for text in rng.choices(texts, weights, k=calls):
+        if rng.random() < 0.2:
+            text = "  " + text.upper().replace(" ", "  ")
+        traffic.append((text, rng.choice([None, 8, 30, 45, 70]), rng.choice([None, "Male", "Female", "F"])))
+    return traffic
+
+
+def run(engine, traffic):
+    timings = []
+    for symptoms, age, gender in traffic:
+        started = time.perf_counter()
+        engine.analyze(symptoms, age, gender)
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return statistics.mean(timings), timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--distinct", type=int, default=500)
+    args = parser.parse_args()
+
+    traffic = make_traffic(args.calls, args.distinct, random.Random(5))
+    uncached = MedicalTriageEngine()
+    uncached.result_cache.max_entries = 0
+    cached = MedicalTriageEngine()
+
+    print(f"\n{args.calls} analyze() calls over {args.distinct} distinct complaints\n")
+    print(f"{'':<10}{'mean µs':>10}{'p50 µs':>10}{'p99 µs':>10}")
+    for name, engine in (("uncached", uncached), ("cached", cached)):
+        mean, p50, p99 = run(engine, traffic)
+        print(f"{name:<10}{mean:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+    stats = cached.result_cache.stats()
+    print(f"\nhit ratio {stats['hit_ratio']:.1%}, {stats['entries']} entries, {stats['evictions']} evictions")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+/triage/batch scaling across worker processes.
+
+Runs --concurrency batches of --cases each at the same time (like several
+clients posting batches at once). It measures throughput inline, i.e. one
+process doing batch_analyze, and through TriageProcessPool with 1, 2, 4
+and 8 workers.
+
+Speedup can't exceed the number of cores; the core count is printed first.
+"loop stall" is the longest the event loop was blocked meanwhile: inline,
+that is the whole batch; with the pool the loop keeps serving requests.
+
+Run from the project root:
+    python tests/bench_triage_pool.py [--cases 2000] [--concurrency 4] [--rounds 3]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure the analysis itself, not the result cache (workers inherit this too)
+os.environ["TRIAGE_CACHE_SIZE"] = "0"
+
+from backend.core.triage_engine import MedicalTriageEngine
+from backend.core.triage_pool import TriageProcessPool
+from backend.models.train_model import generate_training_data
+
+PROCESSES = [1, 2, 4, 8]
+
+
+def make_cases(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        df = generate_training_data(output_path=os.path.join(tmp, "training_data.csv"), n_samples=n)
+    texts = df["symptoms"].astype(str).tolist()
+    return [{"symptoms": texts[i % len(texts)], "age": [None, 8, 30, 65][i % 4],
+             "gender": [None, "Male", "Female"][i % 3]} for i in range(n)]
+
+
+async def run_round(analyze, cases, concurrency):
+    """Elapsed seconds, plus the longest the event loop went without running a 1 ms ticker"""
+    stall = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal stall
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stall = max(stall, now - last)
+            last = now
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await asyncio.gather(*[analyze(cases) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    running = False
+    await tick
+    return elapsed, stall
+
+
+async def measure(analyze, cases, concurrency, rounds):
+    await analyze(cases[:50])  # warm-up
+    timings = [await run_round(analyze, cases, concurrency) for _ in range(rounds)]
+    return statistics.median(t[0] for t in timings), max(t[1] for t in timings)
+
+
+async def main(n, concurrency, rounds):
+    cases = make_cases(n)
+    engine = MedicalTriageEngine.get_instance()
+    total = n * concurrency
+    print(f"\n{os.cpu_count()} cores; {concurrency} concurrent batches of {n} cases, {rounds} rounds (median)\n")
+    print(f"{'processes':<10}{'seconds':>9}{'cases/s':>10}{'speedup':>9}{'loop stall ms':>15}")
+
+    async def inline(batch):
+        return engine.batch_analyze(batch)
+
+    base, stall = await measure(inline, cases, concurrency, rounds)
+    print(f"{'inline':<10}{base:>9.2f}{total / base:>10.0f}{1.0:>8.1f}x{stall * 1000:>15.1f}")
+    for workers in PROCESSES:
+        pool = TriageProcessPool(workers=workers)
+        pool.start()
+        try:
+            elapsed, stall = await measure(pool.analyze_batch, cases, concurrency, rounds)
+        finally:
+            pool.shutdown()
+        print(f"{workers:<10}{elapsed:>9.2f}{total / elapsed:>10.0f}{base / elapsed:>8.1f}x{stall * 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.cases, args.concurrency, args.rounds))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Triage result persistence: one INSERT per case vs the write-behind writer.
+
+Saves --cases triage rows (the size of a large /triage/batch request) two ways:
+
+- per case: what _save_triage_result used to do (one awaited INSERT per row)
+- write-behind: triage_writer.put() for each row, then close() to drain;
+  "request" is the time until every put() returned, i.e. what the route waits
+
+Rows are tagged and deleted afterwards.
+
+Run from the project root (needs DATABASE_URL):
+    python tests/bench_triage_writes.py [--cases 500] [--rounds 5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import db_async
+from backend.routers import triage
+from backend.write_behind import WriteBehindWriter
+
+MARKER = "bench_triage_writes"
+
+PER_ROW_SQL = """
+    INSERT INTO triage_results (
+        symptoms, patient_age, patient_gender, medical_category, severity, assigned_doctor,
+        room_allotted, triage_status, explanation_en, explanation_kn, explanation_hi,
+        detected_language, confidence_score, model_version, analysis_timestamp
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '1.0', CURRENT_TIMESTAMP)
+    RETURNING triage_id
+"""
+
+
+def make_rows(n):
+    return [(MARKER, 20 + i % 60, "Female", "General Medicine", "MEDIUM", "Dr. Bench", "Room 7",
+             "ASSIGN", "en", "kn", "hi", "en", 0.8) for i in range(n)]
+
+
+async def per_case(rows):
+    started = time.perf_counter()
+    for row in rows:
+        await db_async.fetch_one(PER_ROW_SQL, row, prepare=True)
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+
+async def write_behind(rows):
+    writer = WriteBehindWriter("bench", triage._insert_triage_rows, batch_size=triage.triage_writer.batch_size,
+                               flush_ms=triage.triage_writer.flush_s * 1000)
+    started = time.perf_counter()
+    for row in rows:
+        await writer.put(row)
+    request = time.perf_counter() - started
+    await writer.close()
+    return request, time.perf_counter() - started
+
+
+async def main(cases, rounds):
+    rows = make_rows(cases)
+    print(f"{cases} triage rows per round, {rounds} rounds (median)\n")
+    print(f"{'path':<14}{'request ms':>12}{'durable ms':>12}{'rows/s':>10}")
+    try:
+        for name, fn in (("per case", per_case), ("write-behind", write_behind)):
+            timings = [await fn(rows) for _ in range(rounds)]
+            request = statistics.median(t[0] for t in timings)
+            durable = statistics.median(t[1] for t in timings)
+            print(f"{name:<14}{request * 1000:>12.1f}{durable * 1000:>12.1f}{cases / durable:>10.0f}")
+    finally:
+        await db_async.execute("DELETE FROM triage_results WHERE symptoms = %s", (MARKER,))
+        await db_async.close_async_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.cases, args.rounds))
@@ -0,0 +1,294 @@
+"""
+Bed board (backend/bed_board.py).
+
+The index tests feed rows straight into a BedBoard. The database tests
+create their own Observation Rooms (a type intake never allocates), take
+beds through the board and check them against `rooms`; they need
+DATABASE_URL, and the notification test also needs migration 006.
+Run: python -m pytest -q tests/test_bed_board.py
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import db
+from backend.bed_board import BedBoard
+
+needs_db = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+
+ROOM_TYPE = "Observation Room"
+PREFIX = "BBT-"
+
+
+def row(room_id, room_type="General Ward", wing="A", floor_number=1, capacity=2, occupancy=0,
+        status="Available", version=1):
+    return {"room_id": room_id, "room_number": f"R{room_id}", "room_type": room_type, "wing": wing,
+            "floor_number": floor_number, "bed_capacity": capacity, "current_occupancy": occupancy,
+            "status": status, "bed_version": version}
+
+
+def board_with(*rows):
+    board = BedBoard()
+    for r in rows:
+        board._apply(r)
+    board.ready = True
+    return board
+
+
+def test_find_follows_type_priority_then_least_occupied():
+    board = board_with(row(1, occupancy=1), row(2, occupancy=0), row(3, "ICU", capacity=1),
+                       row(4, "ICU", capacity=1, occupancy=1, status="Occupied"))
+    assert board.find(["ICU", "General Ward"])["room_id"] == 3
+    assert board.find(["General Ward"])["room_id"] == 2
+    assert board.find(["Emergency"]) is None
+
+
+def test_find_by_wing_and_floor():
+    board = board_with(row(1, wing="A", floor_number=1), row(2, wing="B", floor_number=3, capacity=3, occupancy=2),
+                       row(3, wing="B", floor_number=2, occupancy=1))
+    assert board.find(["General Ward"], wing="B")["room_id"] == 3
+    assert board.find(["General Ward"], wing="B", floor_number=3)["room_id"] == 2
+    assert board.find(["General Ward"], floor_number=1)["room_id"] == 1
+    assert board.find(["General Ward"], wing="C") is None
+
+
+def test_notifications_apply_in_version_order():
+    board = board_with(row(1, version=5))
+    board.apply_notification('{"op": "UPDATE", "room_id": 1, "room_number": "R1", "room_type": "General Ward", '
+                             '"wing": "A", "floor_number": 1, "bed_capacity": 2, "current_occupancy": 2, '
+                             '"status": "Occupied", "bed_version": 4}')
+    assert board.stale_notifications == 1 and board.find(["General Ward"])["room_id"] == 1
+
+    board.apply_notification('{"op": "UPDATE", "room_id": 1, "room_number": "R1", "room_type": "General Ward", '
+                             '"wing": "A", "floor_number": 1, "bed_capacity": 2, "current_occupancy": 2, '
+                             '"status": "Occupied", "bed_version": 6}')
+    assert board.find(["General Ward"]) is None
+
+    board._apply(row(2, version=7))
+    board.apply_notification('{"op": "DELETE", "room_id": 2}')
+    assert board.find(["General Ward"]) is None and board.stats()["rooms"] == 1
+
+
+def test_summary_and_heap_compaction():
+    board = board_with(*[row(i, wing="AB"[i % 2], floor_number=i % 3, capacity=3) for i in range(1, 41)])
+    for n in range(2000):
+        room_id = 1 + n % 40
+        board._apply(row(room_id, wing="AB"[room_id % 2], floor_number=room_id % 3, capacity=3,
+                         occupancy=n % 3, version=n + 2))
+    summary = board.summary()["room_types"]["General Ward"]
+    assert summary["free_beds"] == sum(room.free_beds() for room in board._rooms.values())
+    assert summary["wings"]["A"]["free_beds"] + summary["wings"]["B"]["free_beds"] == summary["free_beds"]
+    assert board.stats()["heap_entries"] <= 16 * 64 + 4
+
+
+def test_not_ready_board_answers_nothing():
+    board = board_with(row(1))
+    board.ready = False
+    assert board.find(["General Ward"]) is None
+    assert board.reserve(None, ["General Ward"]) is None
+
+
+@pytest.fixture
+def conn():
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM rooms WHERE room_number LIKE %s", (PREFIX + "%",))
+        cur.execute("SELECT COUNT(*) FROM rooms WHERE room_type = %s", (ROOM_TYPE,))
+        if cur.fetchone()[0]:
+            pytest.skip(f"database already has {ROOM_TYPE}s")
+    yield conn
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM rooms WHERE room_number LIKE %s", (PREFIX + "%",))
+    conn.close()
+
+
+def make_rooms(conn, capacities, wing="A"):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO rooms (room_number, wing, floor_number, room_type, bed_capacity, current_occupancy, status)
+            SELECT %s || n, %s, 1, %s, c, 0, 'Available' FROM unnest(%s::int[]) WITH ORDINALITY AS t(c, n)
+            RETURNING room_id
+        """, (PREFIX, wing, ROOM_TYPE, list(capacities)))
+        return [r[0] for r in cur.fetchall()]
+
+
+def occupancy(conn, room_ids):
+    with conn.cursor() as cur:
+        cur.execute("SELECT room_id, current_occupancy, bed_capacity, status FROM rooms WHERE room_id = ANY(%s)",
+                    (room_ids,))
+        return {r[0]: r[1:] for r in cur.fetchall()}
+
+
+@pytest.fixture
+def board(conn):
+    board = BedBoard()
+    board.seed(conn)
+    board.ready = True
+    yield board
+    board.stop()
+
+
+@needs_db
+def test_reserve_takes_beds_until_full(conn, board):
+    room_ids = make_rooms(conn, [2, 1])
+    board.seed(conn)
+
+    taken = []
+    for _ in range(4):
+        with db.transaction() as tx:
+            room = board.reserve(tx, [ROOM_TYPE])
+        taken.append(room and room["room_id"])
+    assert sorted(taken[:3]) == sorted([room_ids[0], room_ids[0], room_ids[1]]) and taken[3] is None
+    assert occupancy(conn, room_ids) == {room_ids[0]: (2, 2, "Occupied"), room_ids[1]: (1, 1, "Occupied")}
+    assert board.stats()["reservations"] == 3 and board.misses == 1
+
+
+@needs_db
+def test_stale_board_never_overbooks(conn, board):
+    room_ids = make_rooms(conn, [1, 1])
+    board.seed(conn)
+    # Someone else fills the first room; this board never hears about it
+    with conn.cursor() as cur:
+        cur.execute("UPDATE rooms SET current_occupancy = 1, status = 'Occupied' WHERE room_id = %s", (room_ids[0],))
+
+    with db.transaction() as tx:
+        room = board.reserve(tx, [ROOM_TYPE])
+    assert room["room_id"] == room_ids[1] and board.conflicts == 1
+    assert all(occ <= cap for occ, cap, _ in occupancy(conn, room_ids).values())
+
+
+@needs_db
+def test_rolled_back_reservation_is_restored(conn, board):
+    room_ids = make_rooms(conn, [1])
+    board.seed(conn)
+    room = None
+    with pytest.raises(RuntimeError):
+        with db.transaction() as tx:
+            room = board.reserve(tx, [ROOM_TYPE])
+            raise RuntimeError("appointment insert failed")
+    assert board.find([ROOM_TYPE]) is None
+    board.invalidate(room["room_id"])
+    board.refresh(conn, [room["room_id"]])
+    assert board.find([ROOM_TYPE])["room_id"] == room_ids[0]
+    assert occupancy(conn, room_ids)[room_ids[0]][0] == 0
+
+
+@needs_db
+def test_concurrent_reservations_fill_every_bed_once(conn, board):
+    capacities = [1, 2, 3, 1, 2, 3, 1, 2]
+    room_ids = make_rooms(conn, capacities)
+    board.seed(conn)
+
+    def take(_):
+        with db.transaction() as tx:
+            room = board.reserve(tx, [ROOM_TYPE])
+        return room and room["room_id"]
+
+    db.init_connection_pool()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            taken = [room_id for room_id in ex.map(take, range(3 * sum(capacities))) if room_id]
+    finally:
+        db.close_connection_pool()
+
+    assert len(taken) == sum(capacities)
+    for room_id, (occ, cap, status) in occupancy(conn, room_ids).items():
+        assert occ == cap == taken.count(room_id) and status == "Occupied"
+
+
+class NotifyDuringSeed:
+    """Connection wrapper: delivers notifications to the board right after seed() reads rooms"""
+
+    def __init__(self, conn, board, payloads):
+        self.conn, self.board, self.payloads = conn, board, payloads
+        self.autocommit = conn.autocommit
+
+    def cursor(self, **kwargs):
+        wrapper, cur = self, self.conn.cursor(**kwargs)
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                cur.close()
+
+            def execute(self, *args):
+                cur.execute(*args)
+
+            def fetchone(self):
+                return cur.fetchone()
+
+            def fetchall(self):
+                rows = cur.fetchall()
+                for payload in wrapper.payloads:
+                    wrapper.board.apply_notification(payload)
+                return rows
+
+        return Cursor()
+
+
+def notification(room_id, version, occupied, op="UPDATE"):
+    return ('{"op": "%s", "room_id": %d, "room_number": "R%d", "room_type": "%s", "wing": "A", "floor_number": 1, '
+            '"bed_capacity": 2, "current_occupancy": %d, "status": "Available", "bed_version": %d}'
+            % (op, room_id, room_id, ROOM_TYPE, occupied, version))
+
+
+@needs_db
+def test_reseed_keeps_newer_notifications(conn, board):
+    if not board.versioned:
+        pytest.skip("migration 006 not applied")
+    room_id = make_rooms(conn, [2])[0]
+    board.seed(conn)
+    version = board._rooms[room_id].bed_version
+
+    # One bed taken elsewhere, notified before the reseed's snapshot is applied
+    newer = NotifyDuringSeed(conn, board, [notification(room_id, version + 1, 1),
+                                           notification(10 ** 9, 1, 0, op="INSERT")])
+    board.seed(newer)
+    assert board._rooms[room_id].bed_version == version + 1
+    assert board._rooms[room_id].current_occupancy == 1 and 10 ** 9 in board._rooms
+    assert board.summary()["room_types"][ROOM_TYPE]["free_beds"] == 1 + 2
+
+    # Once the table moves past it the reseed takes the row again, and drops rooms not in the table
+    with conn.cursor() as cur:
+        for occupancy in (1, 0):
+            cur.execute("UPDATE rooms SET current_occupancy = %s WHERE room_id = %s", (occupancy, room_id))
+    board.seed(conn)
+    assert board._rooms[room_id].current_occupancy == 0 and 10 ** 9 not in board._rooms
+
+
+@needs_db
+def test_listener_follows_other_writers(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regproc('rooms_notify_bed_board')")
+        if cur.fetchone()[0] is None:
+            pytest.skip("migration 006 not applied")
+    board = BedBoard()
+    board.start(os.environ["DATABASE_URL"])
+    try:
+        room_id = make_rooms(conn, [2], wing="B")[0]
+
+        def wait_for(check):
+            deadline = time.monotonic() + 5
+            while not check() and time.monotonic() < deadline:
+                time.sleep(0.02)
+            return check()
+
+        assert wait_for(lambda: (board.find([ROOM_TYPE], wing="B") or {}).get("room_id") == room_id)
+        with conn.cursor() as cur:
+            cur.execute("UPDATE rooms SET status = 'Maintenance' WHERE room_id = %s", (room_id,))
+        assert wait_for(lambda: board.find([ROOM_TYPE], wing="B") is None)
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM rooms WHERE room_id = %s", (room_id,))
+        assert wait_for(lambda: room_id not in board._rooms)
+        assert board.stats()["listening"] and board.notifications >= 3
+    finally:
+        board.stop()
@@ -0,0 +1,220 @@
+"""
+Billing analytics engine: derived payloads match the per-widget SQL they replaced.
+
+The pure tests run anywhere. The differential test needs a reachable
+database (skipped when DATABASE_URL is not set); it fills a temporary
+`invoices` table with edge cases and compares the old queries with the
+single-scan engine.
+Run: python -m pytest -q tests/test_billing_analytics.py
+"""
+import os
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import billing_analytics
+from backend.billing_analytics import InvoiceGroup
+
+TODAY = date(2026, 3, 15)
+
+
+def group(status, days_ago, count=1, total="100.00"):
+    issue_date = TODAY - timedelta(days=days_ago) if days_ago is not None else None
+    label = issue_date.strftime("%b %d") if issue_date else None
+    return InvoiceGroup(status, issue_date, label, count, Decimal(total))
+
+
+def test_billing_dashboard_edges():
+    groups = [
+        group("Pending", 0, count=2),
+        group("Paid", 0, total="250.50"),
+        group("Paid", 40),
+        group("Unpaid", 31, count=3),   # overdue, 30+ bucket
+        group("Unpaid", 30),            # not overdue, 7-30 bucket
+        group("Unpaid", None),          # excluded from delay, 30+ bucket
+        group("Partial", 7),            # 0-7 bucket
+    ]
+    dashboard = billing_analytics.billing_dashboard(groups, TODAY)
+
+    assert dashboard["summary"] == {"pending": 2, "revenue_today": 250.5, "overdue": 3, "delay": 30}
+    assert dashboard["trend"]["data"] == [100.0, 250.5]  # oldest first
+    assert dashboard["status"] == {"Pending": 2, "Paid": 2, "Unpaid": 5, "Partial": 1}
+    assert dashboard["aging"] == {"0-7 Days": 3, "7-30 Days": 1, "30+ Days": 4}
+
+
+def test_payment_dashboard_edges():
+    groups = [
+        group("Pending", 61, total="10.00"),
+        group("Unpaid", 60, total="20.00"),
+        group("Unpaid", 8, count=2, total="30.00"),
+        group("Paid", 3, total="40.00"),
+        group("Paid", -1, total="5.00"),  # future dates stay in the trend
+        group("Partial", 2, total="50.00"),
+    ]
+    dashboard = billing_analytics.payment_dashboard(groups, TODAY)
+
+    assert dashboard["summary"] == {"pending_count": 1, "overdue_count": 2,
+                                    "revenue_today": Decimal(0), "pending_revenue": Decimal("60.00")}
+    assert dashboard["status_breakdown"][0] == {"status": "Unpaid", "count": 3, "total": Decimal("50.00")}
+    assert [row["date"] for row in dashboard["revenue_trend"]] == ["Mar 12", "Mar 13", "Mar 16"]
+    assert [(row["age_group"], row["count"]) for row in dashboard["invoice_aging"]] == \
+        [("7-30 Days", 2), ("30-60 Days", 1), ("60+ Days", 1)]
+
+
+def test_empty_table():
+    assert billing_analytics.billing_dashboard([], None)["summary"]["delay"] == 0
+    assert billing_analytics.payment_dashboard([], None)["revenue_trend"] == []
+
+
+# --- differential test against the old queries ---
+
+LEGACY_BILLING = {
+    "pending": "SELECT COUNT(*) as count FROM invoices WHERE status = 'Pending'",
+    "revenue_today": "SELECT COALESCE(SUM(total_amount), 0) as total FROM invoices WHERE issue_date = CURRENT_DATE AND status = 'Paid'",
+    "overdue": "SELECT COUNT(*) as count FROM invoices WHERE status = 'Unpaid' AND issue_date < CURRENT_DATE - INTERVAL '30 days'",
+    "delay": "SELECT AVG(CURRENT_DATE - issue_date) as days FROM invoices WHERE status = 'Unpaid'",
+    "trend": "SELECT to_char(issue_date, 'Mon DD') as date, COALESCE(SUM(total_amount), 0) as total FROM invoices WHERE status = 'Paid' GROUP BY 1 ORDER BY MIN(issue_date) LIMIT 7",
+    "status": "SELECT status, COUNT(*) as count FROM invoices GROUP BY status",
+    "aging": """
+        SELECT CASE WHEN CURRENT_DATE - issue_date <= 7 THEN '0-7 Days'
+                    WHEN CURRENT_DATE - issue_date <= 30 THEN '7-30 Days'
+                    ELSE '30+ Days' END as age_group, COUNT(*) as count
+        FROM invoices WHERE status != 'Paid' GROUP BY 1
+    """,
+}
+
+LEGACY_PAYMENT = {
+    "summary": """
+        SELECT COUNT(CASE WHEN status = 'Pending' THEN 1 END) as pending_count,
+               COUNT(CASE WHEN status IN ('Unpaid', 'Pending') AND CURRENT_DATE > (issue_date + INTERVAL '30 days') THEN 1 END) as overdue_count,
+               COALESCE(SUM(CASE WHEN DATE(issue_date) = CURRENT_DATE AND status = 'Paid' THEN total_amount ELSE 0 END), 0) as revenue_today,
+               COALESCE(SUM(CASE WHEN status IN ('Unpaid', 'Pending') THEN total_amount ELSE 0 END), 0) as pending_revenue
+        FROM invoices
+    """,
+    "status_breakdown": "SELECT status, COUNT(*) as count, COALESCE(SUM(total_amount), 0) as total FROM invoices GROUP BY status ORDER BY count DESC, status",
+    "revenue_trend": """
+        SELECT TO_CHAR(issue_date, 'Mon DD') as date,
+               COALESCE(SUM(CASE WHEN status = 'Paid' THEN total_amount ELSE 0 END), 0) as paid,
+               COALESCE(SUM(CASE WHEN status IN ('Unpaid', 'Pending') THEN total_amount ELSE 0 END), 0) as unpaid
+        FROM invoices WHERE issue_date >= CURRENT_DATE - INTERVAL '7 days'
+        GROUP BY TO_CHAR(issue_date, 'Mon DD'), issue_date ORDER BY issue_date ASC
+    """,
+    "invoice_aging": """
+        SELECT CASE WHEN CURRENT_DATE - issue_date <= 7 THEN '0-7 Days'
+                    WHEN CURRENT_DATE - issue_date <= 30 THEN '7-30 Days'
+                    WHEN CURRENT_DATE - issue_date <= 60 THEN '30-60 Days'
+                    ELSE '60+ Days' END as age_group,
+               COUNT(*) as count, COALESCE(SUM(total_amount), 0) as total
+        FROM invoices WHERE status IN ('Unpaid', 'Pending') GROUP BY age_group
+    """,  # the endpoint's ORDER BY CASE age_group ... never ran (alias in an expression); sorted below
+}
+
+
+@pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+def test_matches_legacy_queries():
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            # Shadows public.invoices for this session only
+            cur.execute("CREATE TEMP TABLE invoices (status VARCHAR(20), issue_date DATE, total_amount DECIMAL(10, 2))")
+            cur.execute("""
+                INSERT INTO invoices (status, issue_date, total_amount)
+                SELECT (ARRAY['Paid', 'Unpaid', 'Pending', 'Partial', 'Insurance-Claim', NULL])[1 + i % 6],
+                       CASE WHEN i % 17 = 0 THEN NULL ELSE CURRENT_DATE - (i % 75 - 5) END,
+                       CASE WHEN i % 13 = 0 THEN NULL ELSE (i * 37 % 5000) / 4.0 END
+                FROM generate_series(1, 3000) AS i
+            """)
+
+            def run(sql):
+                cur.execute(sql)
+                return cur.fetchall()
+
+            today, groups = billing_analytics.invoice_groups(run(billing_analytics.INVOICE_GROUPS_SQL))
+            billing = billing_analytics.billing_dashboard(groups, today)
+            payment = billing_analytics.payment_dashboard(groups, today)
+
+            legacy = {name: run(sql) for name, sql in LEGACY_BILLING.items()}
+            assert billing["summary"] == {
+                "pending": legacy["pending"][0]["count"],
+                "revenue_today": float(legacy["revenue_today"][0]["total"]),
+                "overdue": legacy["overdue"][0]["count"],
+                "delay": int(legacy["delay"][0]["days"]),
+            }
+            assert billing["trend"] == {"labels": [r["date"] for r in legacy["trend"]],
+                                        "data": [float(r["total"]) for r in legacy["trend"]]}
+            assert billing["status"] == {r["status"]: r["count"] for r in legacy["status"]}
+            assert billing["aging"] == {r["age_group"]: r["count"] for r in legacy["aging"]}
+
+            legacy = {name: run(sql) for name, sql in LEGACY_PAYMENT.items()}
+            assert payment["summary"] == dict(legacy["summary"][0])
+            # ORDER BY count DESC leaves ties unordered; compare as sets of rows
+            assert sorted(payment["status_breakdown"], key=str) == sorted(map(dict, legacy["status_breakdown"]), key=str)
+            assert payment["revenue_trend"] == [dict(r) for r in legacy["revenue_trend"]]
+            aging = sorted(legacy["invoice_aging"], key=lambda r: billing_analytics.AGING_4.index(r["age_group"]))
+            assert payment["invoice_aging"] == [dict(r) for r in aging]
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+# --- invoice_daily_rollup maintenance ---
+
+MIGRATION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "database", "migrations", "001_invoice_daily_rollup.sql")
+
+
+@pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+def test_rollup_tracks_invoice_writes():
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            def groups(sql):
+                cur.execute(sql)
+                today, rows = billing_analytics.invoice_groups(cur.fetchall())
+                return sorted(((g.status, g.issue_date, g.count, g.total) for g in rows), key=str)
+
+            # Everything below, migration included, is rolled back
+            with open(MIGRATION) as f:
+                cur.execute(f.read())
+            cur.execute("SELECT MIN(patient_id) AS id FROM patients")
+            patient_id = cur.fetchone()["id"]
+            if patient_id is None:
+                pytest.skip("no patients to attach invoices to")
+
+            cur.execute("""
+                INSERT INTO invoices (patient_id, total_amount, status, issue_date)
+                SELECT %s, CASE WHEN i %% 5 = 0 THEN NULL ELSE i * 10.25 END,
+                       (ARRAY['Paid', 'Unpaid', 'Pending', 'Partial'])[1 + i %% 4],
+                       CASE WHEN i %% 7 = 0 THEN NULL ELSE CURRENT_DATE - i END
+                FROM generate_series(1, 200) AS i
+            """, (patient_id,))
+            cur.execute("UPDATE invoices SET status = 'Paid' WHERE status = 'Pending'")
+            cur.execute("UPDATE invoices SET total_amount = total_amount + 1 WHERE status = 'Unpaid'")
+            cur.execute("UPDATE invoices SET issue_date = CURRENT_DATE WHERE issue_date IS NULL")
+            cur.execute("UPDATE invoices SET payment_mode = 'Cash' WHERE status = 'Paid'")  # no rollup change
+            cur.execute("DELETE FROM invoices WHERE status = 'Partial'")
+
+            assert groups(billing_analytics.ROLLUP_GROUPS_SQL) == groups(billing_analytics.INVOICE_GROUPS_SQL)
+            cur.execute("SELECT reconcile_invoice_daily_rollup() AS corrected")
+            assert cur.fetchone()["corrected"] == 0
+
+            # Drift (e.g. rows loaded with triggers disabled) is repaired by the nightly job
+            cur.execute("UPDATE invoice_daily_rollup SET invoice_count = invoice_count + 3 WHERE ctid IN "
+                        "(SELECT ctid FROM invoice_daily_rollup LIMIT 2)")
+            cur.execute("INSERT INTO invoice_daily_rollup VALUES ('1999-01-01', 'Paid', 1, 5)")
+            cur.execute("SELECT reconcile_invoice_daily_rollup() AS corrected")
+            assert cur.fetchone()["corrected"] == 3
+            assert groups(billing_analytics.ROLLUP_GROUPS_SQL) == groups(billing_analytics.INVOICE_GROUPS_SQL)
+    finally:
+        conn.rollback()
+        conn.close()
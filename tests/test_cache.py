@@ -0,0 +1,83 @@
+"""
+TTL snapshot cache (backend/cache.py): freshness, stale-while-revalidate,
+single-flight recomputes and error fallback.
+
+Run: python -m pytest -q tests/test_cache.py
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.cache import TTLSnapshotCache
+
+
+class Loader:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("db down")
+        return {"version": self.calls}
+
+
+def test_fresh_snapshot_served_from_memory():
+    async def scenario():
+        loader = Loader()
+        cache = TTLSnapshotCache("t_fresh", loader, ttl=60, stale_ttl=120)
+        assert await cache.get() == {"version": 1}
+        for _ in range(10):
+            assert await cache.get() == {"version": 1}
+        assert loader.calls == 1
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (10, 1, round(10 / 11, 4))
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_recompute():
+    async def scenario():
+        loader = Loader(delay=0.05)
+        cache = TTLSnapshotCache("t_single_flight", loader, ttl=60, stale_ttl=120)
+        results = await asyncio.gather(*[cache.get() for _ in range(20)])
+        assert loader.calls == 1
+        assert all(r == {"version": 1} for r in results)
+    asyncio.run(scenario())
+
+
+def test_stale_snapshot_served_while_revalidating():
+    async def scenario():
+        loader = Loader(delay=0.02)
+        cache = TTLSnapshotCache("t_stale", loader, ttl=0.2, stale_ttl=60)
+        await cache.get()
+        await asyncio.sleep(0.25)
+        # Stale: returned immediately, one background refresh for all callers
+        assert [await cache.get() for _ in range(5)] == [{"version": 1}] * 5
+        await asyncio.sleep(0.05)
+        assert loader.calls == 2
+        assert await cache.get() == {"version": 2}
+        assert cache.stats()["stale_hits"] == 5
+    asyncio.run(scenario())
+
+
+def test_failed_recompute_keeps_last_snapshot():
+    async def scenario():
+        loader = Loader()
+        cache = TTLSnapshotCache("t_errors", loader, ttl=0.0, stale_ttl=0.0)
+        assert await cache.get() == {"version": 1}
+        loader.fail = True
+        assert await cache.get() == {"version": 1}
+        assert cache.stats()["recompute_errors"] == 1
+
+        empty = TTLSnapshotCache("t_errors_empty", Loader(), ttl=1, stale_ttl=1)
+        empty.loader.fail = True
+        with pytest.raises(RuntimeError):
+            await empty.get()
+    asyncio.run(scenario())
@@ -0,0 +1,65 @@
+"""
+Async database layer (backend/db_async.py): read-only fetch for user- or
+LLM-supplied SQL.
+
+Needs a reachable database; skipped when DATABASE_URL is not set.
+Run: python -m pytest -q tests/test_db_async.py
+"""
+import asyncio
+import os
+import sys
+
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import db_async
+
+pytestmark = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+
+MARKER = "db-async-read-only"
+
+
+def run(coro_fn):
+    async def scenario():
+        await db_async.init_async_pool()
+        try:
+            return await coro_fn()
+        finally:
+            await db_async.close_async_pool()
+    return asyncio.run(scenario())
+
+
+def audit_rows():
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM audit_logs WHERE question = %s", (MARKER,))
+            return cur.fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("sql", [
+    f"INSERT INTO audit_logs (username, role, question) VALUES ('t', 't', '{MARKER}') RETURNING 1",
+    f"WITH w AS (INSERT INTO audit_logs (username, role, question) VALUES ('t', 't', '{MARKER}') RETURNING 1) "
+    "SELECT * FROM w",
+])
+def test_read_only_fetch_cannot_write(sql):
+    with pytest.raises(psycopg2.errors.ReadOnlySqlTransaction):
+        run(lambda: db_async.fetch(sql, read_only=True))
+    assert audit_rows() == 0
+
+
+def test_read_only_fetch_rejects_a_second_statement():
+    sql = f"SELECT 1; COMMIT; INSERT INTO audit_logs (username, role, question) VALUES ('t', 't', '{MARKER}')"
+    with pytest.raises(ValueError):
+        run(lambda: db_async.fetch(sql, read_only=True))
+    assert audit_rows() == 0
+
+
+def test_read_only_fetch_returns_rows():
+    # A trailing semicolon is fine
+    rows = run(lambda: db_async.fetch("SELECT 1 AS one, 'a' AS text;\n", read_only=True))
+    assert rows == [{"one": 1, "text": "a"}]
@@ -0,0 +1,147 @@
+"""
+Connection pool hygiene for the db.py helpers.
+
+Needs a reachable database; skipped when DATABASE_URL is not set.
+Run: python -m pytest -q tests/test_db_pool.py
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import db
+from backend.db_pool import BoundedConnectionPool, PoolTimeout
+
+pytestmark = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+
+
+@pytest.fixture
+def pool():
+    db.init_connection_pool()
+    yield
+    db.close_connection_pool()
+
+
+def test_helpers_return_connections(pool):
+    def call(i):
+        db.verify_patient_login(i % 50 + 1, "0000000000")
+        db.get_available_doctor("Cardiology")
+        db.get_available_room("Low")
+        db.execute_query("SELECT 1 AS ok")
+
+    # Far more calls than the pool holds; a leak would exhaust it
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(call, range(200)))
+
+    stats = db.pool_stats()
+    assert stats["in_use"] == 0
+    assert stats["exhausted"] == 0
+    assert stats["checkouts"] == 800
+
+
+def test_transaction_rolls_back_on_error(pool):
+    with pytest.raises(RuntimeError):
+        with db.transaction() as conn, conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE pool_probe (x int)")
+            raise RuntimeError("boom")
+    with db.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('pg_temp.pool_probe') IS NULL")
+        assert cur.fetchone()[0]
+    assert db.pool_stats()["in_use"] == 0
+
+
+def test_broken_connection_is_replaced(pool):
+    with db.connection() as conn:
+        conn.close()
+    assert db.pool_stats()["discarded"] == 1
+    assert db.execute_query("SELECT 1 AS ok") == [{"ok": 1}]
+
+
+def test_checkout_waits_for_a_free_connection():
+    pool = BoundedConnectionPool(os.environ["DATABASE_URL"], minconn=1, maxconn=2, timeout=5)
+    held = [pool.getconn(), pool.getconn()]
+
+    def release_later():
+        time.sleep(0.2)
+        pool.putconn(held.pop())
+
+    threading.Thread(target=release_later).start()
+    started = time.monotonic()
+    conn = pool.getconn()
+    assert 0.15 < time.monotonic() - started < 5
+    assert pool.stats()["exhausted"] == 0
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.1)
+    assert pool.stats()["exhausted"] == 1
+
+    pool.putconn(conn)
+    pool.putconn(held.pop())
+    assert pool.stats()["idle"] == 2
+    pool.closeall()
+
+
+def test_overload_queues_instead_of_failing():
+    pool = BoundedConnectionPool(os.environ["DATABASE_URL"], minconn=2, maxconn=3, timeout=10)
+    pool.prewarm()
+
+    def work(_):
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_sleep(0.01)")
+        finally:
+            pool.putconn(conn)
+
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        list(ex.map(work, range(64)))
+
+    stats = pool.stats()
+    assert stats["checkouts"] == 64
+    assert stats["exhausted"] == 0
+    assert stats["in_use"] == 0 and stats["idle"] <= 3
+    pool.closeall()
+
+
+def test_idle_reaping_and_lifetime_recycling():
+    pool = BoundedConnectionPool(os.environ["DATABASE_URL"], minconn=1, maxconn=4,
+                                 idle_timeout=0.05, max_lifetime=60)
+    conns = [pool.getconn() for _ in range(3)]
+    for conn in conns:
+        pool.putconn(conn)
+    time.sleep(0.1)
+    pool.reap()
+    assert pool.stats()["idle"] == 1
+    assert pool.stats()["reaped"] == 2
+
+    pool.max_lifetime = 0
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.stats()["recycled"] >= 1
+    assert conn.closed
+    pool.closeall()
+
+
+def test_relation_probe_is_rechecked(pool, monkeypatch):
+    name = "relation_probe_test"
+    monkeypatch.setattr(db, "_relation_probes", {})
+    with db.transaction() as conn, conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {name}")
+    assert db.relation_exists(name) is False
+
+    with db.transaction() as conn, conn.cursor() as cur:
+        cur.execute(f"CREATE TABLE {name} (id int)")
+    try:
+        # Cached until the interval runs out
+        assert db.relation_exists(name) is False
+        monkeypatch.setattr(db, "RELATION_PROBE_INTERVAL", 0)
+        assert db.relation_exists(name) is True
+    finally:
+        with db.transaction() as conn, conn.cursor() as cur:
+            cur.execute(f"DROP TABLE {name}")
+    assert db.relation_exists(name) is False
@@ -0,0 +1,72 @@
+"""
+Server-side prepared statement cache (backend/db_prepared.py).
+
+The placeholder rewrite is pure; the rest needs a reachable database and
+is skipped when DATABASE_URL is not set.
+Run: python -m pytest -q tests/test_db_prepared.py
+"""
+import os
+import sys
+
+import psycopg2
+import pytest
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import db
+from backend.db_prepared import PreparedStatementConnection, execute_prepared, to_server_placeholders
+
+needs_db = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+
+
+def test_placeholders_rewritten_in_order():
+    sql, n = to_server_placeholders("SELECT * FROM t WHERE a = %s AND b LIKE 'x%%' AND c IN (%s, %s)")
+    assert sql == "SELECT * FROM t WHERE a = $1 AND b LIKE 'x%' AND c IN ($2, $3)"
+    assert n == 3
+
+
+def test_named_placeholders_rejected():
+    with pytest.raises(ValueError):
+        to_server_placeholders("SELECT %(id)s")
+
+
+@pytest.fixture
+def conn():
+    conn = psycopg2.connect(os.environ["DATABASE_URL"], connection_factory=PreparedStatementConnection)
+    yield conn
+    conn.close()
+
+
+@needs_db
+def test_statement_prepared_once_per_connection(conn):
+    sql = "SELECT %s::int + %s::int AS total, 'a%%b' AS literal"
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        for i in range(5):
+            execute_prepared(cur, sql, (i, 10))
+            assert cur.fetchone() == {"total": i + 10, "literal": "a%b"}
+        cur.execute("SELECT count(*) AS n FROM pg_prepared_statements")
+        assert cur.fetchone()["n"] == 1
+    assert len(conn.prepared) == 1
+
+
+@needs_db
+def test_prepared_statement_survives_rollback(conn):
+    with conn.cursor() as cur:
+        execute_prepared(cur, "SELECT %s::text", ("x",))
+        conn.rollback()
+        execute_prepared(cur, "SELECT %s::text", ("y",))
+        assert cur.fetchone() == ("y",)
+
+
+@needs_db
+def test_execute_query_prepare_flag():
+    db.init_connection_pool()
+    try:
+        sql = "SELECT doctor_id FROM doctors WHERE doctor_id = %s"
+        plain = db.execute_query(sql, (1,))
+        prepared = [db.execute_query(sql, (1,), prepare=True) for _ in range(3)]
+        assert all(rows == plain for rows in prepared)
+        assert "error" in db.execute_query("SELECT %s::int", ("not a number",), prepare=True)
+    finally:
+        db.close_connection_pool()
@@ -0,0 +1,184 @@
+"""
+Transactional patient/doctor deletion (backend/deletion.py).
+
+Each test builds its own doctor and patients with rows in every linked
+table, commits them, deletes through the service and checks what is left.
+Needs a reachable database; skipped when DATABASE_URL is not set.
+Run: python -m pytest -q tests/test_deletion.py
+"""
+import asyncio
+import os
+import sys
+import uuid
+
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import db, deletion
+
+pytestmark = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+
+PATIENT_TABLES = ["prescriptions", "lab_tests", "medical_records", "invoices", "allergies",
+                  "triage_results", "appointments", "admissions", "patients"]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    db.init_connection_pool()
+    yield
+    db.close_connection_pool()
+
+
+@pytest.fixture
+def conn(pool):
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    conn.autocommit = True
+    yield conn
+    conn.close()
+
+
+def scalar(conn, sql, params=None):
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchone()[0]
+
+
+def make_doctor(conn):
+    department_id = scalar(conn, "SELECT department_id FROM departments ORDER BY department_id LIMIT 1")
+    return scalar(conn, """
+        INSERT INTO doctors (department_id, first_name, last_name, specialty, seniority_level, email)
+        VALUES (%s, 'Delete', 'Test', 'General Medicine', 'Junior', %s) RETURNING doctor_id
+    """, (department_id, f"delete-{uuid.uuid4().hex}@test.local")), department_id
+
+
+def make_patient(conn, doctor_id, department_id):
+    """A patient with one row in every table that references patients"""
+    room_id = scalar(conn, "SELECT room_id FROM rooms ORDER BY room_id LIMIT 1")
+    patient_id = scalar(conn, """
+        INSERT INTO patients (first_name, last_name, dob, gender, contact_number)
+        VALUES ('Delete', 'Test', '1990-01-01', 'Male', '9000000001') RETURNING patient_id
+    """)
+    appointment_id = scalar(conn, """
+        INSERT INTO appointments (patient_id, doctor_id, department_id, appointment_date, patient_problem_text)
+        VALUES (%s, %s, %s, CURRENT_TIMESTAMP, 'cough') RETURNING appointment_id
+    """, (patient_id, doctor_id, department_id))
+    admission_id = scalar(conn, """
+        INSERT INTO admissions (patient_id, primary_doctor_id, room_id, department_id, admission_reason, status)
+        VALUES (%s, %s, %s, %s, 'observation', 'Discharged') RETURNING admission_id
+    """, (patient_id, doctor_id, room_id, department_id))
+    with conn.cursor() as cur:
+        cur.execute("""INSERT INTO medical_records (patient_id, doctor_id, appointment_id, admission_id, diagnosis)
+                       VALUES (%s, %s, %s, %s, 'Flu')""", (patient_id, doctor_id, appointment_id, admission_id))
+        cur.execute("""INSERT INTO prescriptions (patient_id, doctor_id, appointment_id, medication_name, dosage, frequency)
+                       VALUES (%s, %s, %s, 'Paracetamol', '500mg', 'BD')""", (patient_id, doctor_id, appointment_id))
+        cur.execute("""INSERT INTO lab_tests (patient_id, doctor_id, appointment_id, test_name)
+                       VALUES (%s, %s, %s, 'CBC')""", (patient_id, doctor_id, appointment_id))
+        cur.execute("""INSERT INTO invoices (patient_id, appointment_id, admission_id, consultation_charges)
+                       VALUES (%s, %s, %s, 500)""", (patient_id, appointment_id, admission_id))
+        cur.execute("""INSERT INTO allergies (patient_id, allergen, diagnosed_by)
+                       VALUES (%s, 'Penicillin', %s)""", (patient_id, doctor_id))
+        cur.execute("""INSERT INTO triage_results (symptoms, patient_id, medical_category, severity, triage_status)
+                       VALUES ('cough', %s, 'General Medicine', 'LOW', 'ASSIGN')""", (patient_id,))
+    return patient_id
+
+
+def remaining(conn, patient_ids):
+    return {table: scalar(conn, f"SELECT COUNT(*) FROM {table} WHERE patient_id = ANY(%s)", (patient_ids,))
+            for table in PATIENT_TABLES}
+
+
+def test_delete_patients_in_one_transaction(conn):
+    doctor_id, department_id = make_doctor(conn)
+    patients = [make_patient(conn, doctor_id, department_id) for _ in range(3)]
+
+    result = deletion.delete_patients(patients + [-1])
+
+    assert result["requested"] == 4 and result["missing"] == [-1]
+    assert result["deleted"] == {table: 3 for table in PATIENT_TABLES}
+    assert result["elapsed_ms"] >= 0
+    assert all(count == 0 for count in remaining(conn, patients).values())
+    deletion.delete_doctors([doctor_id])
+
+
+def test_failure_midway_deletes_nothing(conn, monkeypatch):
+    doctor_id, department_id = make_doctor(conn)
+    patients = [make_patient(conn, doctor_id, department_id) for _ in range(2)]
+    before = remaining(conn, patients)
+
+    steps = list(deletion.PATIENT_STEPS)
+    steps.insert(len(steps) - 1, ("boom", "deleted", "SELECT 1 / 0 WHERE %s IS NOT NULL"))
+    monkeypatch.setattr(deletion, "PATIENT_STEPS", steps)
+    with pytest.raises(psycopg2.errors.DivisionByZero):
+        deletion.delete_patients(patients)
+    assert remaining(conn, patients) == before
+
+    monkeypatch.undo()
+    deletion.delete_patients(patients)
+    deletion.delete_doctors([doctor_id])
+
+
+def test_delete_doctor_removes_authored_rows_and_unlinks_the_rest(conn):
+    doctor_id, department_id = make_doctor(conn)
+    patient_id = make_patient(conn, doctor_id, department_id)
+    # The admission keeps the doctor; move it to another one first
+    other = scalar(conn, "SELECT doctor_id FROM doctors WHERE doctor_id <> %s ORDER BY doctor_id LIMIT 1", (doctor_id,))
+
+    with pytest.raises(deletion.DeletionBlocked):
+        deletion.delete_doctors([doctor_id])
+    assert scalar(conn, "SELECT COUNT(*) FROM doctors WHERE doctor_id = %s", (doctor_id,)) == 1
+
+    with conn.cursor() as cur:
+        cur.execute("UPDATE admissions SET primary_doctor_id = %s WHERE patient_id = %s", (other, patient_id))
+    result = deletion.delete_doctors([doctor_id])
+
+    assert result["deleted"] == {"prescriptions": 1, "lab_tests": 1, "medical_records": 1,
+                                 "appointments": 1, "doctors": 1}
+    assert result["unlinked"] == {"invoices": 1, "allergies": 1}
+    assert scalar(conn, "SELECT COUNT(*) FROM invoices WHERE patient_id = %s AND appointment_id IS NULL",
+                  (patient_id,)) == 1
+    deletion.delete_patients([patient_id])
+
+
+def test_background_purge_in_chunks(conn):
+    doctor_id, department_id = make_doctor(conn)
+    patients = [make_patient(conn, doctor_id, department_id) for _ in range(5)]
+
+    async def scenario():
+        job = deletion.start_purge("patients", patients + [-1], chunk_size=2)
+        assert deletion.get_job(job.id) is job
+        await job.task
+        return job.to_dict()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "completed" and job["error"] is None
+    assert job["processed"] == 6 and job["chunks_done"] == 3 and job["missing"] == 1
+    assert job["deleted"]["patients"] == 5 and job["deleted"]["appointments"] == 5
+    assert all(count == 0 for count in remaining(conn, patients).values())
+    deletion.delete_doctors([doctor_id])
+
+
+def test_empty_list_is_a_no_op():
+    assert deletion.delete_patients([])["deleted"] == {}
+
+
+def test_bulk_delete_audits_off_the_event_loop(monkeypatch):
+    from backend.routers import admin
+
+    audited = []
+
+    def log_audit(*args):
+        try:
+            asyncio.get_running_loop()
+            audited.append("event loop")
+        except RuntimeError:
+            audited.append("worker thread")
+
+    monkeypatch.setattr(admin, "log_audit", log_audit)
+    fake_delete = lambda ids: {"requested": len(ids), "missing": [], "deleted": {"patients": len(ids)}}
+    request = admin.BulkDeleteRequest(ids=[1, 2], background=False)
+
+    result = asyncio.run(admin._bulk_delete("patients", fake_delete, request))
+    assert result["message"] == "Patients deleted"
+    assert audited == ["worker thread"]
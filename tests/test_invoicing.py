@@ -0,0 +1,130 @@
+"""
+Invoice amount math and batch invoice generation.
+
+The batch test needs a reachable database (skipped when DATABASE_URL is
+not set); it runs inside a transaction that is rolled back.
+Run: python -m pytest -q tests/test_invoicing.py
+"""
+import os
+import random
+import sys
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import invoicing
+
+
+def legacy_amounts(c, tax_percentage, discount_percentage, insurance_claim_amount):
+    # The inline math generate_invoice used before it moved to invoice_amounts()
+    subtotal = (c["consultation_charges"] + c["room_charges"] +
+                c["medication_charges"] + c["lab_charges"] +
+                c["surgery_charges"] + c["other_charges"])
+    tax_amount = round(subtotal * (tax_percentage / 100), 2)
+    discount_amount = round(subtotal * (discount_percentage / 100), 2)
+    total_amount = round(subtotal + tax_amount - discount_amount, 2)
+    patient_payable = round(total_amount - insurance_claim_amount, 2)
+    return subtotal, tax_amount, discount_amount, total_amount, patient_payable
+
+
+def test_amounts_match_generate_invoice_math():
+    rng = random.Random(7)
+    for _ in range(5000):
+        charges = {field: round(rng.uniform(0, 20000), rng.choice([0, 1, 2])) for field in invoicing.CHARGE_FIELDS}
+        tax, discount, claim = rng.choice([0, 5, 12.5, 18]), rng.choice([0, 2.5, 10]), round(rng.uniform(0, 500), 2)
+        amounts = invoicing.invoice_amounts(charges, tax, discount, claim)
+        assert (amounts["subtotal"], amounts["tax_amount"], amounts["discount_amount"],
+                amounts["total_amount"], amounts["patient_payable"]) == legacy_amounts(charges, tax, discount, claim)
+
+
+@pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+def test_batch_invoices_admissions_once():
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT p.patient_id, d.doctor_id, d.consultation_fee, d.department_id, r.room_id, r.daily_rate
+                FROM patients p, doctors d, rooms r
+                WHERE d.consultation_fee IS NOT NULL AND r.daily_rate IS NOT NULL
+                LIMIT 1
+            """)
+            ref = cur.fetchone()
+            if ref is None:
+                pytest.skip("needs a patient, a doctor with a fee and a priced room")
+
+            cur.execute("""
+                INSERT INTO admissions (patient_id, primary_doctor_id, room_id, department_id, admission_date,
+                                        actual_discharge_date, admission_reason, status)
+                VALUES (%(patient_id)s, %(doctor_id)s, %(room_id)s, %(department_id)s, now() - interval '3 days',
+                        now(), 'batch test', 'Discharged'),
+                       (%(patient_id)s, %(doctor_id)s, %(room_id)s, %(department_id)s, now(), NULL, 'batch test', 'Active')
+                RETURNING admission_id
+            """, ref)
+            three_days, same_day = (row["admission_id"] for row in cur.fetchall())
+            cur.execute("""
+                INSERT INTO prescriptions (patient_id, doctor_id, admission_id, medication_name, dosage, frequency, quantity)
+                VALUES (%s, %s, %s, 'A', '1', 'daily', 4), (%s, %s, %s, 'B', '1', 'daily', NULL)
+            """, (ref["patient_id"], ref["doctor_id"], three_days) * 2)
+            cur.execute("""
+                INSERT INTO lab_tests (patient_id, doctor_id, admission_id, test_name, status)
+                VALUES (%s, %s, %s, 'CBC', 'Completed'), (%s, %s, %s, 'LFT', 'Cancelled')
+            """, (ref["patient_id"], ref["doctor_id"], three_days) * 2)
+
+            rows = {row["admission_id"]: row for row in
+                    invoicing.admission_charges(cur, admission_ids=[three_days, same_day])}
+            assert rows[three_days]["room_charges"] == ref["daily_rate"] * 3
+            assert rows[same_day]["room_charges"] == ref["daily_rate"]  # at least one day
+            assert float(rows[three_days]["medication_charges"]) == 5 * invoicing.MEDICATION_UNIT_RATE
+            assert float(rows[three_days]["lab_charges"]) == 1 * invoicing.LAB_TEST_RATE
+            assert rows[three_days]["consultation_charges"] == ref["consultation_fee"]
+
+            assert invoicing.insert_invoices(cur, list(rows.values()), 5.0, 10.0, 15) == 2
+            # A second run finds nothing left to invoice, and a replayed chunk inserts nothing
+            assert invoicing.admission_charges(cur, admission_ids=[three_days, same_day]) == []
+            assert invoicing.insert_invoices(cur, list(rows.values()), 5.0, 10.0, 15) == 0
+
+            cur.execute("""
+                SELECT total_amount, tax_amount, discount_amount, patient_payable, due_date - issue_date AS due_days
+                FROM invoices WHERE admission_id = %s
+            """, (three_days,))
+            stored = cur.fetchone()
+            charges = {field: float(rows[three_days].get(field) or 0) for field in invoicing.CHARGE_FIELDS}
+            expected = invoicing.invoice_amounts(charges, 5.0, 10.0)
+            assert stored["total_amount"] == Decimal(str(expected["total_amount"])).quantize(Decimal("0.01"))
+            assert stored["tax_amount"] == Decimal(str(expected["tax_amount"])).quantize(Decimal("0.01"))
+            assert stored["due_days"] == 15
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+@pytest.mark.parametrize("selection", [
+    {},
+    {"admission_ids": None, "discharged_from": None, "discharged_to": None},
+    {"admission_ids": []},
+])
+def test_unbounded_batch_is_refused(selection):
+    with pytest.raises(ValueError):
+        invoicing.check_selection(**selection)
+    with pytest.raises(ValueError):
+        invoicing.start_job(selection)
+    with pytest.raises(ValueError):
+        invoicing.admission_charges(None, **selection)
+
+
+def test_batch_endpoint_rejects_an_empty_request():
+    from fastapi import HTTPException
+    from backend.routers.billing import BatchInvoiceRequest, start_batch_invoices
+
+    for body in ({}, {"admission_ids": []}):
+        with pytest.raises(HTTPException) as raised:
+            start_batch_invoices(BatchInvoiceRequest(**body))
+        assert raised.value.status_code == 400
+    invoicing.check_selection(discharged_from=date(2026, 1, 1))
+    invoicing.check_selection(admission_ids=[1])
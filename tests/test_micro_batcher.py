@@ -0,0 +1,91 @@
+"""
+MicroBatcher (backend/core/micro_batcher.py): coalescing, batch size cap,
+error fan-out and the inline paths.
+
+Run: python -m pytest -q tests/test_micro_batcher.py
+"""
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.micro_batcher import MicroBatcher
+
+
+class Recorder:
+    """batch_fn that doubles its inputs and records every batch"""
+
+    def __init__(self, fail=None, short=False):
+        self.batches = []
+        self.threads = []
+        self.fail = fail
+        self.short = short
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        self.threads.append(threading.current_thread().name)
+        if self.fail:
+            raise self.fail
+        results = [item * 2 for item in items]
+        return results[:-1] if self.short else results
+
+
+def submit_all(batcher, items, workers=None):
+    with ThreadPoolExecutor(max_workers=workers or len(items)) as ex:
+        futures = [ex.submit(batcher.submit, item) for item in items]
+        return [f.exception(timeout=5) or f.result() for f in futures]
+
+
+def test_concurrent_calls_are_coalesced():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, window_ms=100, max_batch=64)
+    assert submit_all(batcher, list(range(16))) == [i * 2 for i in range(16)]
+    assert len(fn.batches) < 16
+    assert sorted(i for batch in fn.batches for i in batch) == list(range(16))
+    assert batcher.stats()["items"] == 16 and batcher.stats()["batches"] == len(fn.batches)
+
+
+def test_batches_never_exceed_max_batch():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, window_ms=200, max_batch=4)
+    assert submit_all(batcher, list(range(10))) == [i * 2 for i in range(10)]
+    assert max(len(batch) for batch in fn.batches) <= 4
+    assert len(fn.batches) >= 3
+
+
+def test_exception_reaches_every_caller():
+    fn = Recorder(fail=RuntimeError("model crashed"))
+    batcher = MicroBatcher(fn, window_ms=100, max_batch=64)
+    results = submit_all(batcher, list(range(6)))
+    assert all(isinstance(r, RuntimeError) and str(r) == "model crashed" for r in results)
+    # The worker survives a failed batch
+    fn.fail = None
+    assert batcher.submit(21) == 42
+
+
+def test_short_result_list_fails_every_caller_instead_of_hanging():
+    fn = Recorder(short=True)
+    batcher = MicroBatcher(fn, window_ms=100, max_batch=64)
+    results = submit_all(batcher, list(range(5)))
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_zero_window_runs_inline():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, window_ms=0)
+    assert batcher.submit(3) == 6
+    assert fn.threads == [threading.current_thread().name] and batcher._worker is None
+
+
+def test_submit_on_event_loop_runs_inline():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, window_ms=1000)
+
+    async def scenario():
+        return batcher.submit(5)
+
+    assert asyncio.run(scenario()) == 10
+    assert fn.batches == [[5]] and batcher._worker is None
@@ -0,0 +1,113 @@
+"""
+Resident department model (backend/ml_service.py): artifact change
+detection, hot swap under concurrent predictions.
+
+Each test trains two tiny pipelines that disagree on every input and
+swaps them in and out of a temporary artifact.
+Run: python -m pytest -q tests/test_ml_service.py
+"""
+import os
+import pickle
+import sys
+import threading
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import make_pipeline
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ml_service import ResidentModel
+
+TEXTS = ["chest pain", "bone fracture", "skin rash"]
+
+
+def pipeline(labels):
+    return make_pipeline(TfidfVectorizer(), MultinomialNB()).fit(TEXTS, labels)
+
+
+MODEL_A = pickle.dumps(pipeline(["Cardiology", "Orthopedics", "Dermatology"]))
+MODEL_B = pickle.dumps(pipeline(["Neurology", "Neurology", "Neurology"]))
+
+
+def write(path, raw, mtime_ns=None, atomic=False):
+    target = str(path) + ".tmp" if atomic else str(path)
+    with open(target, "wb") as f:
+        f.write(raw)
+    if mtime_ns is not None:
+        os.utime(target, ns=(mtime_ns, mtime_ns))
+    if atomic:
+        os.replace(target, path)
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / "model.pkl"
+    write(path, MODEL_A, mtime_ns=1_000_000_000_000_000_000)
+    return path
+
+
+def department(model, text="chest pain"):
+    return model.predict(text)[0]
+
+
+def test_rewritten_artifact_is_swapped_in(artifact):
+    model = ResidentModel(str(artifact), check_interval=0, batch_window_ms=0)
+    assert department(model) == "Cardiology"
+    version = model.version
+
+    write(artifact, MODEL_B, mtime_ns=2_000_000_000_000_000_000)
+    assert department(model) == "Neurology"
+    assert model.reloads == 2 and model.version != version
+
+
+def test_touched_artifact_with_same_content_is_not_reloaded(artifact):
+    model = ResidentModel(str(artifact), check_interval=0, batch_window_ms=0)
+    served = model.get()
+    os.utime(artifact, ns=(2_000_000_000_000_000_000,) * 2)
+    assert model.get() is served and model.reloads == 1
+
+
+def test_replaced_artifact_with_preserved_mtime_is_swapped_in(artifact):
+    model = ResidentModel(str(artifact), check_interval=0, batch_window_ms=0)
+    assert department(model) == "Cardiology"
+    # e.g. `cp -p` to a temp file then mv: same mtime, new inode
+    write(artifact, MODEL_B, mtime_ns=os.stat(artifact).st_mtime_ns, atomic=True)
+    assert department(model) == "Neurology"
+
+
+def test_check_interval_limits_stat_calls(artifact):
+    model = ResidentModel(str(artifact), check_interval=3600, batch_window_ms=0)
+    assert department(model) == "Cardiology"
+    write(artifact, MODEL_B, mtime_ns=2_000_000_000_000_000_000)
+    assert department(model) == "Cardiology"
+
+
+def test_predictions_continue_during_swaps(artifact):
+    model = ResidentModel(str(artifact), check_interval=0, batch_window_ms=1)
+    model.load()
+    results, errors = [], []
+    stop = threading.Event()
+
+    def predict():
+        while not stop.is_set():
+            try:
+                results.append(department(model, TEXTS[len(results) % 3]))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=predict) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for n in range(20):
+        write(artifact, MODEL_B if n % 2 == 0 else MODEL_A, mtime_ns=(2 + n) * 10**18, atomic=True)
+        model.get()
+    stop.set()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert model.reloads == 21
+    assert set(results) <= {"Cardiology", "Orthopedics", "Dermatology", "Neurology"} and results
+    assert department(model) == "Cardiology"
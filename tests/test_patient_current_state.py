@@ -0,0 +1,237 @@
+"""
+patient_current_state projection (database/migrations/005_patient_current_state.sql).
+
+Applies the migration inside a transaction, writes appointments,
+admissions and medical records through plain SQL (as every write path
+does) and checks the projection after each statement. Everything is
+rolled back afterwards. The concurrency test commits through two
+connections against the applied migration and deletes its rows afterwards.
+
+Needs a reachable database; skipped when DATABASE_URL is not set.
+Run: python -m pytest -q tests/test_patient_current_state.py
+"""
+import os
+import sys
+import threading
+
+import psycopg2
+import pytest
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import db, patient_listing
+
+needs_db = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+
+MIGRATION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "database", "migrations", "005_patient_current_state.sql")
+
+
+@pytest.fixture
+def cur():
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    with open(MIGRATION) as f:
+        cur.execute(f.read())
+    yield cur
+    conn.rollback()
+    conn.close()
+
+
+@pytest.fixture
+def refs(cur):
+    cur.execute("SELECT doctor_id, department_id FROM doctors WHERE department_id IS NOT NULL ORDER BY doctor_id LIMIT 2")
+    doctors = cur.fetchall()
+    cur.execute("SELECT room_id FROM rooms ORDER BY room_id LIMIT 2")
+    rooms = [row["room_id"] for row in cur.fetchall()]
+    if len(doctors) < 2 or len(rooms) < 2:
+        pytest.skip("needs two doctors with departments and two rooms")
+    return doctors, rooms
+
+
+def new_patient(cur):
+    cur.execute("""
+        INSERT INTO patients (first_name, last_name, dob, gender, contact_number)
+        VALUES ('State', 'Test', '1990-01-01', 'Female', '9000000000') RETURNING patient_id
+    """)
+    return cur.fetchone()["patient_id"]
+
+
+def state(cur, patient_id):
+    cur.execute("SELECT * FROM patient_current_state WHERE patient_id = %s", (patient_id,))
+    return cur.fetchone()
+
+
+@needs_db
+def test_new_patient_is_registered(cur):
+    row = state(cur, new_patient(cur))
+    assert row["status"] == "Registered"
+    assert row["doctor_id"] is None and row["room_id"] is None and row["diagnosis"] is None
+
+
+@needs_db
+def test_follows_latest_appointment_admission_and_record(cur, refs):
+    (doc_a, doc_b), (room_a, room_b) = refs
+    patient_id = new_patient(cur)
+
+    cur.execute("""
+        INSERT INTO appointments (patient_id, doctor_id, department_id, room_id, appointment_date, patient_problem_text)
+        VALUES (%s, %s, %s, %s, '2026-01-01 09:00', 'cough'), (%s, %s, %s, NULL, '2026-02-01 09:00', 'fever')
+        RETURNING appointment_id
+    """, (patient_id, doc_a["doctor_id"], doc_a["department_id"], room_a,
+          patient_id, doc_b["doctor_id"], doc_b["department_id"]))
+    first, latest = [row["appointment_id"] for row in cur.fetchall()]
+    row = state(cur, patient_id)
+    assert row["appointment_id"] == latest and row["doctor_id"] == doc_b["doctor_id"]
+    assert row["room_id"] is None and row["status"] == "Scheduled"
+
+    # Moving the older appointment later makes it the latest
+    cur.execute("UPDATE appointments SET appointment_date = '2026-03-01 09:00' WHERE appointment_id = %s", (first,))
+    row = state(cur, patient_id)
+    assert row["appointment_id"] == first and row["doctor_id"] == doc_a["doctor_id"] and row["room_id"] == room_a
+
+    # An admission's status wins; its room fills in when the appointment has none
+    cur.execute("""
+        INSERT INTO admissions (patient_id, primary_doctor_id, room_id, department_id, admission_date, admission_reason)
+        VALUES (%s, %s, %s, %s, '2026-03-02', 'observation') RETURNING admission_id
+    """, (patient_id, doc_b["doctor_id"], room_b, doc_b["department_id"]))
+    admission_id = cur.fetchone()["admission_id"]
+    row = state(cur, patient_id)
+    assert row["admission_id"] == admission_id and row["status"] == "Active"
+    assert row["doctor_id"] == doc_a["doctor_id"] and row["room_id"] == room_a
+
+    cur.execute("DELETE FROM appointments WHERE patient_id = %s", (patient_id,))
+    row = state(cur, patient_id)
+    assert row["appointment_id"] is None
+    assert row["doctor_id"] == doc_b["doctor_id"] and row["room_id"] == room_b and row["status"] == "Active"
+
+    cur.execute("""
+        INSERT INTO medical_records (patient_id, doctor_id, diagnosis, treatment_plan, record_date)
+        VALUES (%s, %s, 'Flu', 'Rest', '2026-03-03'), (%s, %s, 'Old', 'None', '2025-01-01')
+    """, (patient_id, doc_b["doctor_id"], patient_id, doc_b["doctor_id"]))
+    row = state(cur, patient_id)
+    assert (row["diagnosis"], row["treatment_plan"]) == ("Flu", "Rest")
+
+    cur.execute("UPDATE admissions SET status = 'Discharged' WHERE admission_id = %s", (admission_id,))
+    assert state(cur, patient_id)["status"] == "Discharged"
+
+
+@needs_db
+def test_deleting_patient_removes_row(cur):
+    patient_id = new_patient(cur)
+    cur.execute("DELETE FROM patients WHERE patient_id = %s", (patient_id,))
+    assert state(cur, patient_id) is None
+
+
+@needs_db
+def test_projection_matches_source_tables(cur):
+    cur.execute("""
+        SELECT COUNT(*) AS n FROM patients p
+        LEFT JOIN patient_current_state s ON s.patient_id = p.patient_id
+        WHERE s.patient_id IS NULL
+    """)
+    assert cur.fetchone()["n"] == 0
+    cur.execute("SELECT reconcile_patient_current_state() AS corrected")
+    assert cur.fetchone()["corrected"] == 0
+
+
+@needs_db
+def test_reconcile_repairs_drift(cur):
+    cur.execute("SELECT patient_id FROM patient_current_state WHERE status <> 'Registered' LIMIT 1")
+    row = cur.fetchone()
+    if row is None:
+        pytest.skip("no patients with appointments or admissions")
+    cur.execute("UPDATE patient_current_state SET status = 'Registered', doctor_id = NULL WHERE patient_id = %s",
+                (row["patient_id"],))
+    cur.execute("SELECT reconcile_patient_current_state() AS corrected")
+    assert cur.fetchone()["corrected"] == 1
+    assert state(cur, row["patient_id"])["status"] != "Registered"
+
+
+@needs_db
+def test_concurrent_writers_for_one_patient_do_not_lose_updates():
+    setup = psycopg2.connect(os.environ["DATABASE_URL"])
+    setup.autocommit = True
+    first = psycopg2.connect(os.environ["DATABASE_URL"])
+    second = psycopg2.connect(os.environ["DATABASE_URL"])
+    patient_id = None
+    try:
+        with setup.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("SELECT to_regclass('patient_current_state') AS t")
+            if cur.fetchone()["t"] is None:
+                pytest.skip("migration 005 not applied")
+            cur.execute("SELECT doctor_id, department_id FROM doctors WHERE department_id IS NOT NULL LIMIT 1")
+            doctor = cur.fetchone()
+            if doctor is None:
+                pytest.skip("needs a doctor with a department")
+            patient_id = new_patient(cur)
+
+        def book(conn, when):
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO appointments (patient_id, doctor_id, department_id, appointment_date, patient_problem_text)
+                    VALUES (%s, %s, %s, %s, 'race') RETURNING appointment_id
+                """, (patient_id, doctor["doctor_id"], doctor["department_id"], when))
+                return cur.fetchone()[0]
+
+        # The first writer books the later appointment and holds its transaction open
+        latest = book(first, "2030-01-01 09:00")
+        second_done = threading.Event()
+
+        def second_writer():
+            book(second, "2020-01-01 09:00")
+            second.commit()
+            second_done.set()
+
+        worker = threading.Thread(target=second_writer)
+        worker.start()
+        # The second writer's trigger waits on the first writer's patient lock
+        assert not second_done.wait(0.5)
+        first.commit()
+        worker.join(5)
+        assert second_done.is_set()
+
+        with setup.cursor(cursor_factory=RealDictCursor) as cur:
+            assert state(cur, patient_id)["appointment_id"] == latest
+    finally:
+        first.rollback()
+        second.rollback()
+        if patient_id is not None:
+            with setup.cursor() as cur:
+                cur.execute("DELETE FROM appointments WHERE patient_id = %s", (patient_id,))
+                cur.execute("DELETE FROM patients WHERE patient_id = %s", (patient_id,))
+        for conn in (setup, first, second):
+            conn.close()
+
+
+@pytest.fixture(scope="module")
+def pool():
+    db.init_connection_pool()
+    yield
+    db.close_connection_pool()
+
+
+@needs_db
+def test_list_reads_agree_with_lateral_lookups(pool):
+    if db.execute_query("SELECT to_regclass('patient_current_state') AS t")[0]["t"] is None:
+        pytest.skip("migration 005 not applied")
+    def first_page(from_state):
+        sql, params = patient_listing.page_sql(from_state=from_state)
+        return db.execute_query(sql, (*params, patient_listing.MAX_PAGE_SIZE))
+
+    projected = first_page(True)
+    assert projected == first_page(False)
+
+    patient_id = projected[0]["patient_id"]
+    assert patient_listing.patient_state(patient_id) == {**projected[0], "serial_no": 1}
+    assert patient_listing.patient_state(-1) is None
+
+
+@needs_db
+def test_nightly_reconcile_job(pool):
+    if db.execute_query("SELECT to_regclass('patient_current_state') AS t")[0]["t"] is None:
+        pytest.skip("migration 005 not applied")
+    patient_listing.reconcile_state()
+    # A second pass right after has nothing left to fix
+    assert patient_listing.reconcile_state() == 0
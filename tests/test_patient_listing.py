@@ -0,0 +1,153 @@
+"""
+Admin patient grid (backend/patient_listing.py): LATERAL lookups + keyset pages.
+
+The SQL builder tests run anywhere; the rest need a reachable database
+(skipped when DATABASE_URL is not set) and compare against the old
+DISTINCT ON query.
+Run: python -m pytest -q tests/test_patient_listing.py
+"""
+import os
+import re
+import sys
+
+import psycopg2
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import db, patient_listing
+
+needs_db = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+
+# admin.get_patients before keyset paging, without its LIMIT 50; date ties broken by id
+# (DISTINCT ON picked either row) so the comparison is deterministic
+LEGACY_SQL = """
+    SELECT
+        ROW_NUMBER() OVER (ORDER BY p.patient_id DESC) as serial_no,
+        p.patient_id, p.first_name, p.last_name, p.dob, p.gender,
+        p.contact_number, p.address, p.insurance_provider,
+        EXTRACT(YEAR FROM AGE(CURRENT_DATE, p.dob)) as age,
+        COALESCE(d_appt.doctor_id, d_adm.doctor_id) as doctor_id,
+        COALESCE(
+            d_appt.first_name || ' ' || d_appt.last_name,
+            d_adm.first_name || ' ' || d_adm.last_name,
+            'Unassigned'
+        ) as assigned_doctor,
+        COALESCE(r_appt.room_number, r_adm.room_number, 'Waiting') as room_no,
+        COALESCE(adm.status, appt.status, 'Registered') as status
+    FROM patients p
+    LEFT JOIN (
+        SELECT DISTINCT ON (patient_id) * FROM appointments
+        ORDER BY patient_id, appointment_date DESC, appointment_id DESC
+    ) appt ON p.patient_id = appt.patient_id
+    LEFT JOIN doctors d_appt ON appt.doctor_id = d_appt.doctor_id
+    LEFT JOIN rooms r_appt ON appt.room_id = r_appt.room_id
+    LEFT JOIN (
+        SELECT DISTINCT ON (patient_id) * FROM admissions
+        ORDER BY patient_id, admission_date DESC, admission_id DESC
+    ) adm ON p.patient_id = adm.patient_id
+    LEFT JOIN doctors d_adm ON adm.primary_doctor_id = d_adm.doctor_id
+    LEFT JOIN rooms r_adm ON adm.room_id = r_adm.room_id
+    ORDER BY p.patient_id DESC
+"""
+
+
+def test_page_sql_without_filters():
+    sql, params = patient_listing.page_sql(from_state=False)
+    assert "WHERE" not in sql.split("FROM patients p")[1].split("LEFT JOIN")[0]
+    assert "DISTINCT ON" not in sql and sql.count("LATERAL") == 2
+    assert params == []
+
+    sql, _ = patient_listing.page_sql()
+    assert "LATERAL" not in sql and "patient_current_state" in sql
+
+
+def test_page_sql_filters_in_order():
+    sql, params = patient_listing.page_sql(after_patient_id=90, status="active", doctor_id=3,
+                                           gender="F", search="  o'n_ ")
+    assert "p.patient_id < %s" in sql
+    assert params == [90, "F", "o'n\\_%", "o'n\\_%", 3, "active"]
+
+
+def test_like_prefix_escapes_wildcards():
+    assert patient_listing._like_prefix("50%_off\\") == "50\\%\\_off\\\\%"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    db.init_connection_pool()
+    yield
+    db.close_connection_pool()
+
+
+@pytest.fixture(scope="module")
+def legacy(pool):
+    return db.execute_query(LEGACY_SQL)
+
+
+@needs_db
+def test_first_page_matches_legacy_query(legacy):
+    page = patient_listing.patient_page(page_size=50)
+    assert page["patients"] == legacy[:50]
+    assert page["has_more"] == (len(legacy) > 50)
+
+
+@needs_db
+def test_pages_cover_every_patient_once(legacy):
+    seen, after = [], None
+    while True:
+        page = patient_listing.patient_page(page_size=13, after_patient_id=after)
+        assert len(page["patients"]) <= 13
+        assert [row["serial_no"] for row in page["patients"]] == list(range(1, len(page["patients"]) + 1))
+        seen.extend(page["patients"])
+        if not page["has_more"]:
+            assert page["next_after_patient_id"] is None
+            break
+        after = page["next_after_patient_id"]
+
+    strip = lambda rows: [{k: v for k, v in row.items() if k != "serial_no"} for row in rows]
+    assert strip(seen) == strip(legacy)
+
+
+@needs_db
+@pytest.mark.parametrize("field", ["status", "doctor_id", "gender"])
+def test_filters_match_legacy_rows(legacy, field):
+    values = [row[field] for row in legacy if row[field] is not None]
+    if not values:
+        pytest.skip(f"no patients with a {field}")
+    value = max(set(values), key=values.count)
+
+    page = patient_listing.patient_page(page_size=patient_listing.MAX_PAGE_SIZE, **{field: value})
+    expected = [row["patient_id"] for row in legacy if row[field] == value]
+    assert [row["patient_id"] for row in page["patients"]] == expected[:patient_listing.MAX_PAGE_SIZE]
+
+
+@needs_db
+def test_search_is_name_prefix(legacy):
+    name = legacy[0]["last_name"]
+    page = patient_listing.patient_page(page_size=patient_listing.MAX_PAGE_SIZE, search=name[:3].upper())
+    expected = [row["patient_id"] for row in legacy
+                if (row["first_name"] or "").lower().startswith(name[:3].lower())
+                or (row["last_name"] or "").lower().startswith(name[:3].lower())]
+    assert [row["patient_id"] for row in page["patients"]] == expected
+
+
+@needs_db
+def test_latest_lookups_use_indexes(pool):
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT to_regclass('idx_appointments_patient_latest'), to_regclass('idx_admissions_patient_latest')")
+        if None in cur.fetchone():
+            pytest.skip("migration 004 not applied")
+        cur.execute("SET LOCAL enable_seqscan = off")
+        sql, params = patient_listing.page_sql(after_patient_id=10 ** 9, from_state=False)
+        cur.execute("EXPLAIN " + sql, (*params, 51))
+        plan = "\n".join(row[0] for row in cur.fetchall())
+        assert "idx_appointments_patient_latest" in plan and "idx_admissions_patient_latest" in plan
+        # Patients come off the primary key in order; only date ties are sorted (incrementally)
+        assert "patients_pkey" in plan
+        assert not re.search(r"(^|->  )Sort  ", plan, re.MULTILINE)
+    finally:
+        conn.rollback()
+        conn.close()
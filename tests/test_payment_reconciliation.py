@@ -0,0 +1,92 @@
+"""
+Bulk payment reconciliation: parsing, validation and the set-based apply.
+
+The apply test needs a reachable database (skipped when DATABASE_URL is
+not set); it runs inside a transaction that is rolled back.
+Run: python -m pytest -q tests/test_payment_reconciliation.py
+"""
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import payment_reconciliation as pr
+
+
+def test_parse_csv_and_json():
+    rows = pr.parse_body(b"invoice_id, amount,date,mode\n7,100.50,2026-10-01,UPI\n8,20,,\n", "text/csv")
+    assert rows == [{"invoice_id": "7", "amount": "100.50", "date": "2026-10-01", "mode": "UPI"},
+                    {"invoice_id": "8", "amount": "20", "date": "", "mode": ""}]
+    assert pr.parse_body(b'{"payments": [{"invoice_id": 7, "amount": 1}]}', "application/json") == \
+        [{"invoice_id": 7, "amount": 1}]
+    with pytest.raises(pr.BatchError):
+        pr.parse_body(b"id,value\n1,2\n", "text/csv")
+    with pytest.raises(pr.BatchError):
+        pr.parse_body(b'{"rows": []}', "application/json")
+
+
+def test_validate_reports_bad_rows():
+    staged, invalid = pr.validate([
+        {"invoice_id": "7", "amount": "100.50", "date": "2026-10-01", "mode": "UPI"},
+        {"invoice_id": 8, "amount": 20},
+        {"invoice_id": "x", "amount": "1"},
+        {"invoice_id": 9, "amount": "-5"},
+        {"invoice_id": 9, "amount": "1.005"},
+        {"invoice_id": 9, "amount": "1", "mode": "Cheque"},
+        {"invoice_id": 9, "amount": "1", "date": "yesterday"},
+        {"invoice_id": 2 ** 40, "amount": "1"},
+        "not a row",
+    ])
+    assert [(r[0], r[1], r[2], r[4]) for r in staged] == [(1, 7, Decimal("100.50"), "UPI"), (2, 8, Decimal("20"), None)]
+    assert [r["row"] for r in invalid] == [3, 4, 5, 6, 7, 8, 9]
+    assert all(r["outcome"] == "invalid" for r in invalid)
+
+
+@pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+def test_apply_batch_outcomes():
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"])
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("SELECT MIN(patient_id) AS id FROM patients")
+            patient_id = cur.fetchone()["id"]
+            if patient_id is None:
+                pytest.skip("no patients to attach invoices to")
+            cur.execute("""
+                INSERT INTO invoices (patient_id, total_amount, amount_paid, status)
+                VALUES (%s, 100, 0, 'Unpaid'), (%s, 100, 0, 'Unpaid'), (%s, 100, 60, 'Partial')
+                RETURNING invoice_id
+            """, (patient_id, patient_id, patient_id))
+            full, split, partial = (row["invoice_id"] for row in cur.fetchall())
+            cur.execute("SELECT COALESCE(MAX(invoice_id), 0) + 1000 AS id FROM invoices")
+            missing = cur.fetchone()["id"]
+
+            staged, _ = pr.validate([
+                {"invoice_id": full, "amount": "100", "mode": "UPI", "date": "2026-10-01"},
+                {"invoice_id": split, "amount": "30", "mode": "Cash"},
+                {"invoice_id": split, "amount": "20", "mode": "Card"},   # summed with the row above
+                {"invoice_id": partial, "amount": "50"},                 # 60 + 50 > 100
+                {"invoice_id": missing, "amount": "10"},
+            ])
+            outcomes = pr.apply_batch(cur, staged)
+
+            assert outcomes[full]["outcome"] == "applied" and outcomes[full]["invoice_status"] == "Paid"
+            assert outcomes[split]["outcome"] == "applied" and outcomes[split]["invoice_status"] == "Partial"
+            assert outcomes[split]["amount_paid"] == Decimal("50.00")
+            assert outcomes[partial]["outcome"] == "overpaid" and outcomes[partial]["amount_paid"] == Decimal("60.00")
+            assert outcomes[missing]["outcome"] == "not_found"
+
+            cur.execute("SELECT invoice_id, amount_paid, status, payment_mode FROM invoices WHERE invoice_id = ANY(%s)",
+                        ([full, split, partial],))
+            stored = {row["invoice_id"]: row for row in cur.fetchall()}
+            assert stored[full]["payment_mode"] == "UPI"
+            assert stored[split]["payment_mode"] == "Card"   # last row's mode wins
+            assert (stored[partial]["amount_paid"], stored[partial]["status"]) == (Decimal("60.00"), "Partial")
+    finally:
+        conn.rollback()
+        conn.close()
@@ -0,0 +1,145 @@
+"""
+Differential tests for the triage rule engines.
+
+The compiled matchers must give exactly the same results as the original
+per-keyword / per-pattern implementations (kept below as references) over
+the synthetic training corpus plus some boundary-heavy inputs.
+
+Run: python -m pytest -q tests/test_rule_engine.py
+"""
+import os
+import random
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.rule_engine import DepartmentRuleEngine, SeverityRuleEngine
+from backend.models.train_model import generate_training_data
+
+
+# --- Reference implementation (pre-automaton classify_department) ---
+
+def _legacy_exact_match(text, keyword):
+    if any(ch.isalnum() for ch in keyword) and all(ord(ch) < 128 for ch in keyword):
+        pattern = r"(?<!\w)" + re.escape(keyword) + r"(?!\w)"
+        return re.search(pattern, text) is not None
+    return keyword in text
+
+
+def legacy_classify_department(engine, text, age=None, gender=None):
+    text_lower = text.lower()
+    scores, matched_keywords = {}, {}
+
+    if age is not None and age < 14:
+        gyne_keywords = set(engine.dept_keywords.get("Gynecology", []))
+        is_female = gender and str(gender).lower() in ["f", "female"]
+        if is_female and any(k in text_lower for k in gyne_keywords):
+            return {"department": "Gynecology", "confidence": 1.0,
+                    "keywords": ["age<14_female_gynecology"], "method": "age_override"}
+        return {"department": "Pediatrics", "confidence": 1.0,
+                "keywords": ["pediatric_rule"], "method": "pediatric_rule"}
+
+    for dept, keywords in engine.dept_keywords.items():
+        dept_score, matches = 0, []
+        for keyword in keywords:
+            key_lower = keyword.lower()
+            if _legacy_exact_match(text_lower, key_lower):
+                dept_score += 10
+                matches.append(keyword)
+                continue
+            if key_lower in text_lower:
+                dept_score += 5
+                matches.append(keyword)
+        if dept_score > 0:
+            scores[dept] = dept_score
+            matched_keywords[dept] = matches
+
+    if not scores and any(k in text_lower for k in engine.refer_keywords):
+        return {"department": None, "confidence": 0.0,
+                "keywords": [k for k in engine.refer_keywords if k in text_lower][:5],
+                "method": "refer_rule"}
+    if not scores:
+        return {"department": None, "confidence": 0.0, "keywords": [], "method": "no_match"}
+
+    best_dept = max(scores.items(), key=lambda x: x[1])
+    return {"department": best_dept[0], "confidence": min(best_dept[1] / 10, 1.0),
+            "keywords": matched_keywords[best_dept[0]], "method": "keyword_scoring"}
+
+
+# --- Reference implementation (pre-scanner determine_severity) ---
+
+def legacy_determine_severity(engine, text, age=None):
+    text_lower = text.lower()
+    for pattern in engine.high_patterns:
+        if re.search(pattern, text_lower):
+            return "HIGH"
+    if age is not None and age < 14:
+        if re.search(r"(fe\s*ver|fever|बुखार|ಜ್ವರ)", text_lower):
+            return "MEDIUM"
+    for pattern in engine.medium_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            if "fever" in pattern and match.group(1).isdigit():
+                if int(match.group(1)) >= 3:
+                    return "MEDIUM"
+            else:
+                return "MEDIUM"
+    if re.search(r"\b(fe\s*ver|fever)\b", text_lower):
+        return "MEDIUM"
+    return "LOW"
+
+
+# --- Corpus ---
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    data_path = tmp_path_factory.mktemp("triage") / "training_data.csv"
+    df = generate_training_data(output_path=str(data_path), n_samples=15000)
+    texts = list(dict.fromkeys(df["symptoms"].astype(str)))
+
+    # Keyword soup: overlapping keywords, word-boundary edges, mixed scripts
+    engine = DepartmentRuleEngine()
+    vocab = [k for kws in engine.dept_keywords.values() for k in kws] + engine.refer_keywords
+    glue = [" ", "", "_", "-", ", ", "1", "x", "ing ", "\n"]
+    rng = random.Random(7)
+    for _ in range(3000):
+        parts = rng.sample(vocab, rng.randint(1, 4))
+        text = "".join(p + rng.choice(glue) for p in parts)
+        texts.append(text.upper() if rng.random() < 0.1 else text)
+    texts += ["", "heartear", "heart_attack", "ear-ache", "chest pain2", "BP HIGH!", "eye", "pcod12"]
+
+    # Severity triggers: fever/day counts, HIGH words hidden inside MEDIUM spans
+    severity_vocab = [
+        "fever", "fe ver", "FEVER", "fever 2 days", "fever for 5 days", "fevers", "feverish",
+        "persistent", "swelling", "pus", "daily life", "cannot sleep", "chest pain", "accident",
+        "bike accident", "cancer  emergency", "tumor bleeding", "cannot breathe", "seizure",
+        "ಜ್ವರ", "ಅಪಘಾತ", "बुखार", "दुर्घटना", "दौरा", "|", "3", "day", "days", "mild cough",
+    ]
+    for _ in range(5000):
+        parts = rng.sample(severity_vocab, rng.randint(1, 5))
+        texts.append("".join(p + rng.choice(glue) for p in parts))
+    return texts
+
+
+def test_classify_department_matches_reference(corpus):
+    engine = DepartmentRuleEngine()
+    for text in corpus:
+        assert engine.classify_department(text) == legacy_classify_department(engine, text), text
+
+
+def test_classify_department_age_rules_unchanged(corpus):
+    engine = DepartmentRuleEngine()
+    for text in corpus[:500]:
+        for age, gender in [(8, "F"), (8, "M"), (30, "F"), (None, None)]:
+            assert engine.classify_department(text, age, gender) == \
+                legacy_classify_department(engine, text, age, gender)
+
+
+def test_determine_severity_matches_reference(corpus):
+    engine = SeverityRuleEngine()
+    for text in corpus:
+        for age in (None, 5, 13, 14, 40):
+            assert engine.determine_severity(text, age) == legacy_determine_severity(engine, text, age), (text, age)
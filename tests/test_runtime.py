@@ -0,0 +1,73 @@
+"""
+Bounded CPU executor and event-loop lag monitor.
+
+Run: python -m pytest -q tests/test_runtime.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.runtime import BoundedCPUExecutor, LoopLagMonitor
+
+
+def test_monitor_reports_a_blocked_loop():
+    async def scenario():
+        monitor = LoopLagMonitor(interval_ms=10, stall_ms=50, warn_ms=10_000)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # blocking call on the loop
+        await asyncio.sleep(0.05)
+        monitor.stop()
+        stats = monitor.stats()
+        assert stats["stalls"] == 1
+        assert 150 <= stats["longest_stall_ms"] < 400
+        assert stats["recent_stalls"][0]["ms"] == stats["longest_stall_ms"]
+    asyncio.run(scenario())
+
+
+def test_executor_keeps_the_loop_free():
+    async def scenario():
+        monitor = LoopLagMonitor(interval_ms=10, stall_ms=50)
+        executor = BoundedCPUExecutor("t-cpu", workers=2, max_pending=4)
+        monitor.start()
+        results = await asyncio.gather(*[executor.run(lambda x: time.sleep(0.1) or x * 2, i) for i in range(4)])
+        monitor.stop()
+        executor.shutdown()
+        assert results == [0, 2, 4, 6]
+        assert monitor.stats()["stalls"] == 0
+        assert executor.stats()["completed"] == 4
+    asyncio.run(scenario())
+
+
+def test_executor_bounds_pending_work():
+    async def scenario():
+        executor = BoundedCPUExecutor("t-bounded", workers=1, max_pending=1)
+        running = []
+
+        def work():
+            running.append(executor.stats()["in_flight"])
+            time.sleep(0.02)
+
+        await asyncio.gather(*[executor.run(work) for _ in range(5)])
+        executor.shutdown()
+        assert running == [1] * 5
+        stats = executor.stats()
+        assert stats["waits_for_slot"] >= 1 and stats["in_flight"] == 0
+    asyncio.run(scenario())
+
+
+def test_errors_propagate():
+    async def scenario():
+        executor = BoundedCPUExecutor("t-errors", workers=1)
+        try:
+            await executor.run(lambda: 1 / 0)
+        except ZeroDivisionError:
+            pass
+        else:
+            raise AssertionError("expected ZeroDivisionError")
+        assert executor.stats()["in_flight"] == 0
+        executor.shutdown()
+    asyncio.run(scenario())
@@ -0,0 +1,70 @@
+"""
+MedicalTriageEngine.batch_analyze: one vectorize/predict call per batch.
+
+The batch path must give exactly the same results as analyze() case by case,
+with the ML override enabled so it actually runs. By default the shipped
+pipeline artifact is not served and triage is rules only.
+Run: python -m pytest -q tests/test_triage_batch.py
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.triage_engine import MedicalTriageEngine
+from backend.models.train_model import generate_training_data
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = MedicalTriageEngine(accept_pipeline=True)
+    engine._ml_batcher.window = 0  # analyze() predicts inline; no batching window per call
+    engine.result_cache.max_entries = 0  # every call computes (caching has its own tests)
+    return engine
+
+
+@pytest.fixture(scope="module")
+def cases(tmp_path_factory):
+    data_path = tmp_path_factory.mktemp("triage") / "training_data.csv"
+    df = generate_training_data(output_path=str(data_path), n_samples=1500)
+    texts = list(dict.fromkeys(df["symptoms"].astype(str)))
+    # Low-confidence / no-keyword inputs that go to the ML override
+    texts += ["feeling unwell", "tired all the time", "something is wrong", "pain", "Routine health check"]
+    rng = random.Random(11)
+    return [{"symptoms": text, "age": rng.choice([None, 5, 12, 30, 70]),
+             "gender": rng.choice([None, "Male", "Female"])} for text in texts]
+
+
+def test_batch_matches_analyze(engine, cases):
+    expected = [engine.analyze(c["symptoms"], c["age"], c["gender"]) for c in cases]
+    assert engine.batch_analyze(cases) == expected
+
+
+def test_one_predict_call_per_batch(engine, cases, monkeypatch):
+    assert engine.ml_model is not None
+    calls = []
+    original = engine._ml_predict_batch
+
+    def counting(texts):
+        calls.append(len(texts))
+        return original(texts)
+
+    monkeypatch.setattr(engine, "_ml_predict_batch", counting)
+    results = engine.batch_analyze(cases)
+    assert len(results) == len(cases)
+    assert len(calls) == 1 and 0 < calls[0] < len(cases)
+
+
+def test_pipeline_artifact_is_off_by_default(cases):
+    engine = MedicalTriageEngine(accept_pipeline=False)
+    engine.result_cache.max_entries = 0
+    assert engine.ml_model is None and engine.ml_version is None
+    results = engine.batch_analyze(cases)
+    assert not any("ml_predicted" in r["explainability"]["key_keywords"] for r in results)
+
+
+def test_empty_batch(engine):
+    assert engine.batch_analyze([]) == []
@@ -0,0 +1,143 @@
+"""
+Triage result cache: keys, LRU/TTL bounds and version invalidation.
+
+Cached analyze() must return exactly what an uncached engine computes.
+Run: python -m pytest -q tests/test_triage_cache.py
+"""
+import os
+import pickle
+import shutil
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.triage_cache import TriageResultCache, cache_key
+from backend.core.triage_engine import MedicalTriageEngine
+
+CASES = [
+    ("Severe chest pain radiating to left arm, sweating", 55, "Male"),
+    ("Knee pain since 5 days, difficulty walking", 40, "Female"),
+    ("ಮಂಡಿ ನೋವು 4 ದಿನಗಳು", None, None),
+    ("घुटने में दर्द 3 दिनों से", 70, "M"),
+    ("fever for 4 days", 6, "F"),
+    ("fever for 4 days", 30, "F"),
+    ("lower abdominal pain, irregular periods", 12, "female"),
+    ("feeling unwell", 25, None),
+    ("eye pain and blurred vision", 45, "male"),
+]
+
+
+@pytest.fixture
+def engine():
+    engine = MedicalTriageEngine()
+    engine._ml_batcher.window = 0
+    return engine
+
+
+def test_key_ignores_what_the_rules_ignore():
+    assert cache_key("  Chest PAIN\n", None, None) == cache_key("chest pain", None, None)
+    # The rule patterns see inner whitespace, so the key does too
+    assert cache_key("chest  pain", None, None) != cache_key("chest pain", None, None)
+    assert cache_key("fever", 3, "F") == cache_key("fever", 13, "female")
+    assert cache_key("fever", 14, "Male") == cache_key("fever", 80, "m")
+    assert cache_key("fever", None, None) != cache_key("fever", 30, None)
+    assert cache_key("fever", 3, "F") != cache_key("fever", 3, "M")
+    # The rules don't strip gender, so neither does the key
+    assert cache_key("fever", 3, " f ") != cache_key("fever", 3, "f")
+
+
+@pytest.mark.parametrize("genders", [["f", " f "], [" F", "Female"], ["FEMALE", "female "]])
+def test_gender_spellings_match_uncached(engine, genders):
+    uncached = MedicalTriageEngine()
+    uncached.result_cache.max_entries = 0
+    for gender in genders:
+        assert engine.analyze("delivery", 10, gender) == uncached.analyze("delivery", 10, gender)
+        assert engine.batch_analyze([{"symptoms": "delivery", "age": 10, "gender": gender}]) == \
+            [uncached.analyze("delivery", 10, gender)]
+
+
+def test_cached_results_match_uncached(engine):
+    uncached = MedicalTriageEngine()
+    uncached._ml_batcher.window = 0
+    uncached.result_cache.max_entries = 0
+
+    expected = [uncached.analyze(*case) for case in CASES]
+    assert [engine.analyze(*case) for case in CASES] == expected
+    assert [engine.analyze(*case) for case in CASES] == expected
+    stats = engine.result_cache.stats()
+    assert stats["misses"] == len(CASES) and stats["hits"] == len(CASES)
+    assert engine.batch_analyze([{"symptoms": s, "age": a, "gender": g} for s, a, g in CASES]) == expected
+
+
+@pytest.mark.parametrize("symptoms", ["chest  pain", "cannot  sleep", "Chest\tpain", "  CHEST PAIN  "])
+def test_cache_never_changes_the_analyzed_text(engine, symptoms):
+    uncached = MedicalTriageEngine()
+    uncached._ml_batcher.window = 0
+    uncached.result_cache.max_entries = 0
+    expected = uncached.analyze(symptoms, 40)
+    assert engine.analyze(symptoms, 40) == expected
+    assert engine.analyze(symptoms, 40) == expected
+    assert engine.batch_analyze([{"symptoms": symptoms, "age": 40}]) == [expected]
+
+
+def test_callers_cannot_modify_cached_entries(engine):
+    first = engine.analyze("chest pain", 50, "Male")
+    first["explainability"]["key_keywords"].append("tampered")
+    first["severity"] = "LOW"
+    again = engine.analyze("chest pain", 50, "Male")
+    assert again["severity"] == "HIGH" and "tampered" not in again["explainability"]["key_keywords"]
+
+
+def test_batch_computes_repeats_once(engine, monkeypatch):
+    calls = []
+    original = engine._batch_analyze
+    monkeypatch.setattr(engine, "_batch_analyze", lambda cases: calls.append(len(cases)) or original(cases))
+    batch = [{"symptoms": "Chest pain", "age": 50}, {"symptoms": " chest pain", "age": 60}, {"symptoms": "rash"}]
+    results = engine.batch_analyze(batch)
+    assert calls == [2] and results[0] == results[1]
+    engine.batch_analyze(batch)
+    assert calls == [2, 0]
+
+
+def test_lru_eviction_and_ttl():
+    cache = TriageResultCache(max_entries=2, ttl=0.05)
+    result = {"severity": "LOW", "explainability": {"key_keywords": []}}
+    for key in ("a", "b", "c"):
+        cache.put(key, 1, result)
+    assert cache.get("a", 1) is None and cache.get("c", 1) == result
+    assert cache.stats()["evictions"] == 1
+    time.sleep(0.06)
+    assert cache.get("c", 1) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_rule_change_invalidates(engine):
+    assert engine.analyze("feeling unwell", 30)["severity"] == "LOW"
+    engine.severity_engine.high_patterns.append(r"\bfeeling unwell\b")
+    engine.severity_engine._compile_patterns()
+    assert engine.analyze("feeling unwell", 30)["severity"] == "HIGH"
+    assert engine.result_cache.stats()["invalidations"] == 1
+
+
+def test_model_change_invalidates(tmp_path):
+    # The engine follows the artifact its ResidentModel hot-swaps
+    artifact = tmp_path / "doctor_recommender.pkl"
+    shutil.copy(MedicalTriageEngine()._resident_model.model_path, artifact)
+    engine = MedicalTriageEngine(model_path=str(artifact), accept_pipeline=True)
+    engine._ml_batcher.window = 0
+    engine._resident_model.check_interval = 0
+    engine.analyze("chest pain", 50)
+    version = engine.ml_version
+
+    with open(artifact, "rb") as f:
+        model = pickle.load(f)
+    # Same model re-pickled (new bytes, new checksum), as a retrain would be
+    with open(artifact, "wb") as f:
+        pickle.dump(model, f, protocol=2)
+    engine.analyze("chest pain", 50)
+    stats = engine.result_cache.stats()
+    assert engine.ml_version != version and engine.ml_model is not None
+    assert stats["invalidations"] == 1 and stats["hits"] == 0
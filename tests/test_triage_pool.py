@@ -0,0 +1,58 @@
+"""
+Triage process pool: sharding and results across worker processes.
+
+Run: python -m pytest -q tests/test_triage_pool.py
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.triage_engine import MedicalTriageEngine
+from backend.core.triage_pool import TriageProcessPool
+
+SYMPTOMS = [
+    "Severe chest pain radiating to left arm, sweating, breathless",
+    "Knee pain since 5 days, difficulty walking, mild swelling",
+    "ಮಂಡಿ ನೋವು 4 ದಿನಗಳು, ನಡೆಯುವಲ್ಲಿ ಕಷ್ಟ",
+    "घुटने में दर्द 3 दिनों से, चलने में तकलीफ",
+    "itchy skin rash and hair fall for two weeks",
+    "feeling unwell",
+    "fever for 4 days with cough",
+]
+CASES = [{"symptoms": SYMPTOMS[i % len(SYMPTOMS)], "age": [None, 6, 35, 70][i % 4],
+          "gender": [None, "Female", "Male"][i % 3]} for i in range(150)]
+
+
+def test_shards_are_contiguous_and_bounded():
+    pool = TriageProcessPool(workers=4, min_shard=32)
+    assert pool.shard([]) == []
+    assert [len(s) for s in pool.shard(CASES[:10])] == [10]
+    shards = pool.shard(CASES)
+    assert [len(s) for s in shards] == [38, 38, 38, 36]
+    assert [c for s in shards for c in s] == CASES
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = TriageProcessPool(workers=2, min_shard=8)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_matches_inline_batch(pool):
+    expected = MedicalTriageEngine.get_instance().batch_analyze(CASES)
+    assert asyncio.run(pool.analyze_batch(CASES)) == expected
+    stats = pool.stats()
+    assert stats["running"] and stats["batches"] == 1 and stats["shards"] == 2
+
+
+def test_disabled_pool_runs_inline():
+    pool = TriageProcessPool(workers=0)
+    expected = MedicalTriageEngine.get_instance().batch_analyze(CASES[:5])
+    assert asyncio.run(pool.analyze_batch(CASES[:5])) == expected
+    assert not pool.stats()["running"]
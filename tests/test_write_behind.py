@@ -0,0 +1,128 @@
+"""
+Write-behind writer: batching, backpressure, retries and drain on close.
+
+The writer tests use an in-memory flush and run anywhere; the triage
+insert test needs a reachable database (skipped when DATABASE_URL is not set).
+Run: python -m pytest -q tests/test_write_behind.py
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.write_behind import WriteBehindWriter
+
+needs_db = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set")
+
+
+class Sink:
+    def __init__(self, delay=0.0, fail_times=0):
+        self.batches = []
+        self.delay = delay
+        self.fail_times = fail_times
+
+    async def __call__(self, batch):
+        await asyncio.sleep(self.delay)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("db down")
+        self.batches.append([row for row, _ in batch])
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+
+def test_flushes_full_batches_without_waiting_for_the_timer():
+    async def scenario():
+        sink = Sink()
+        writer = WriteBehindWriter("t_size", sink, batch_size=10, flush_ms=10_000)
+        for i in range(30):
+            await writer.put(i)
+        await asyncio.sleep(0.05)
+        assert [len(b) for b in sink.batches] == [10, 10, 10]
+        await writer.close()
+    asyncio.run(scenario())
+
+
+def test_partial_batch_flushed_after_flush_ms():
+    async def scenario():
+        sink = Sink()
+        writer = WriteBehindWriter("t_timer", sink, batch_size=100, flush_ms=30)
+        for i in range(3):
+            assert await writer.put(i)
+        assert sink.rows == []  # put() doesn't wait on the flush
+        await asyncio.sleep(0.1)
+        assert sink.batches == [[0, 1, 2]]
+        await writer.close()
+    asyncio.run(scenario())
+
+
+def test_full_queue_applies_backpressure_then_drops():
+    async def scenario():
+        sink = Sink(delay=0.2)
+        writer = WriteBehindWriter("t_full", sink, batch_size=2, flush_ms=0, max_queue=2,
+                                   enqueue_timeout=0.05)
+        results = [await writer.put(i) for i in range(8)]
+        stats = writer.stats()
+        assert stats["backpressure_waits"] > 0
+        assert stats["dropped_rows"] == results.count(False) > 0
+        await writer.close()
+        assert len(sink.rows) == results.count(True)
+    asyncio.run(scenario())
+
+
+def test_failed_flush_is_retried():
+    async def scenario():
+        sink = Sink(fail_times=2)
+        writer = WriteBehindWriter("t_retry", sink, batch_size=5, flush_ms=0, retries=3)
+        for i in range(5):
+            await writer.put(i)
+        await writer.close()
+        assert sink.rows == [0, 1, 2, 3, 4]
+        assert writer.stats()["failed_rows"] == 0
+    asyncio.run(scenario())
+
+
+def test_close_flushes_everything_queued():
+    async def scenario():
+        sink = Sink(delay=0.01)
+        writer = WriteBehindWriter("t_close", sink, batch_size=7, flush_ms=10_000)
+        for i in range(100):
+            await writer.put(i)
+        await writer.close()
+        assert sink.rows == list(range(100))
+        stats = writer.stats()
+        assert stats["queued"] == 0 and stats["flushed_rows"] == 100
+        # Writes after close go straight through
+        assert await writer.put(100)
+        assert sink.rows[-1] == 100
+    asyncio.run(scenario())
+
+
+@needs_db
+def test_triage_rows_inserted_in_one_flush():
+    from backend import db_async
+    from backend.routers import triage
+
+    marker = f"write-behind test {os.getpid()}"
+    row = (marker, 40, "Male", "Cardiology", "HIGH", "Dr. Test", "Room 1", "ASSIGN",
+           "en", "kn", "hi", "en", 0.9)
+
+    async def scenario():
+        try:
+            await triage._insert_triage_rows([(row, 0.0), (row, 5.0)])
+            saved = await db_async.fetch(
+                "SELECT CURRENT_TIMESTAMP - analysis_timestamp AS age, model_version "
+                "FROM triage_results WHERE symptoms = %s ORDER BY analysis_timestamp", (marker,))
+            assert len(saved) == 2
+            # Queued time is subtracted from analysis_timestamp
+            assert saved[0]["age"].total_seconds() >= 5
+            assert saved[1]["model_version"] == "1.0"
+        finally:
+            await db_async.execute("DELETE FROM triage_results WHERE symptoms = %s", (marker,))
+            await db_async.close_async_pool()
+    asyncio.run(scenario())